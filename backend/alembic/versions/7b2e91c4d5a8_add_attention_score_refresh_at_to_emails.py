@@ -0,0 +1,36 @@
+"""add_attention_score_refresh_at_to_emails
+
+Revision ID: 7b2e91c4d5a8
+Revises: 25a3fecf7f7e
+Create Date: 2025-07-20 10:12:45.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e91c4d5a8'
+down_revision: Union[str, Sequence[str], None] = '25a3fecf7f7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Add the predicted bucket-crossing time (NULL = not scheduled yet)
+    op.add_column('emails', sa.Column('attention_score_refresh_at', sa.DateTime(timezone=True), nullable=True))
+    
+    # Create index so the refresh scheduler can find due emails cheaply
+    op.create_index('ix_emails_attention_score_refresh_at', 'emails', ['attention_score_refresh_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Drop the index first
+    op.drop_index('ix_emails_attention_score_refresh_at', table_name='emails')
+    
+    # Drop the attention_score_refresh_at column
+    op.drop_column('emails', 'attention_score_refresh_at')
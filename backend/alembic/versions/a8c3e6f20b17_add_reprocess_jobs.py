@@ -0,0 +1,60 @@
+"""add_reprocess_jobs
+
+Revision ID: a8c3e6f20b17
+Revises: f7b2c8d41e06
+Create Date: 2025-07-28 14:06:33.519204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c3e6f20b17'
+down_revision: Union[str, Sequence[str], None] = 'f7b2c8d41e06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reprocess_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('filter_params', sa.JSON(), nullable=True),
+        sa.Column('include_reprocessed', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('total_emails', sa.Integer(), nullable=True),
+        sa.Column('processed_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('category_changes', sa.JSON(), nullable=True),
+        sa.Column('cursor_received_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('cursor_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reprocess_jobs_user_id_created_at', 'reprocess_jobs', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_reprocess_jobs_status', 'reprocess_jobs', ['status'], unique=False)
+    
+    # Keyset pagination order of the reprocess runner: newest first, id as tie-breaker
+    op.create_index(
+        'ix_emails_user_id_received_at_id', 'emails',
+        ['user_id', sa.text('received_at DESC NULLS FIRST'), sa.text('id DESC')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_emails_user_id_received_at_id', table_name='emails')
+    op.drop_index('ix_reprocess_jobs_status', table_name='reprocess_jobs')
+    op.drop_index('ix_reprocess_jobs_user_id_created_at', table_name='reprocess_jobs')
+    op.drop_table('reprocess_jobs')
@@ -0,0 +1,30 @@
+"""add_runner_token_to_reprocess_jobs
+
+Revision ID: b3e9d5a71c28
+Revises: a8c3e6f20b17
+Create Date: 2025-07-30 09:17:48.206415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e9d5a71c28'
+down_revision: Union[str, Sequence[str], None] = 'a8c3e6f20b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Set by each claim; checkpoints and heartbeats only write while it still matches
+    op.add_column('reprocess_jobs', sa.Column('runner_token', postgresql.UUID(as_uuid=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('reprocess_jobs', 'runner_token')
@@ -0,0 +1,30 @@
+"""add_attention_base_score_to_emails
+
+Revision ID: c4f1a8e2b937
+Revises: 7b2e91c4d5a8
+Create Date: 2025-07-22 14:37:09.562310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f1a8e2b937'
+down_revision: Union[str, Sequence[str], None] = '7b2e91c4d5a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Add the stored base score (NULL = not calculated yet, stored attention_score is used)
+    op.add_column('emails', sa.Column('attention_base_score', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Drop the attention_base_score column
+    op.drop_column('emails', 'attention_base_score')
@@ -0,0 +1,75 @@
+"""add_sender_profiles
+
+Revision ID: e5d3a7f19c42
+Revises: c4f1a8e2b937
+Create Date: 2025-07-24 09:18:51.204937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5d3a7f19c42'
+down_revision: Union[str, Sequence[str], None] = 'c4f1a8e2b937'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Lowercase address of a raw From header ("Name <addr>" or a bare address)
+_ADDRESS_SQL = "lower(trim(coalesce(substring(from_email from '<([^>]+)>'), from_email)))"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sender_profiles',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('sender_key', sa.String(), nullable=False),
+        sa.Column('email_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('read_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('trashed_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('replied_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('important_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('first_seen_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('last_seen_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'kind', 'sender_key', name='uq_sender_profiles_user_kind_key')
+    )
+    op.create_index('ix_sender_profiles_user_id', 'sender_profiles', ['user_id'], unique=False)
+    
+    # Seed profiles from the emails already stored (replies are only counted from now on)
+    for kind, key_sql in (
+        ('address', _ADDRESS_SQL),
+        ('domain', f"split_part({_ADDRESS_SQL}, '@', 2)")
+    ):
+        op.execute(f"""
+            INSERT INTO sender_profiles (
+                id, user_id, kind, sender_key, email_count, read_count, trashed_count,
+                replied_count, important_count, first_seen_at, last_seen_at, updated_at
+            )
+            SELECT gen_random_uuid(), user_id, '{kind}', sender_key, count(*),
+                   count(*) FILTER (WHERE is_read),
+                   count(*) FILTER (WHERE category = 'trash' OR 'TRASH' = ANY(labels)),
+                   0,
+                   count(*) FILTER (WHERE 'IMPORTANT' = ANY(labels)),
+                   min(received_at), max(received_at), now()
+            FROM (
+                SELECT user_id, {key_sql} AS sender_key, is_read, category, labels, received_at
+                FROM emails
+                WHERE from_email LIKE '%@%' AND NOT ('SENT' = ANY(coalesce(labels, '{{}}')))
+            ) AS received
+            WHERE sender_key <> ''
+            GROUP BY user_id, sender_key
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sender_profiles_user_id', table_name='sender_profiles')
+    op.drop_table('sender_profiles')
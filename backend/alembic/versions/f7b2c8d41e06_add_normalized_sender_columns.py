@@ -0,0 +1,35 @@
+"""add_normalized_sender_columns
+
+Revision ID: f7b2c8d41e06
+Revises: e5d3a7f19c42
+Create Date: 2025-07-25 10:42:17.835291
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b2c8d41e06'
+down_revision: Union[str, Sequence[str], None] = 'e5d3a7f19c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Normalized sender columns; existing rows are filled by backfill_senders.py
+    op.add_column('emails', sa.Column('sender_email', sa.String(), nullable=True))
+    op.add_column('emails', sa.Column('sender_domain', sa.String(), nullable=True))
+    op.create_index('ix_emails_user_id_sender_email', 'emails', ['user_id', 'sender_email'], unique=False)
+    op.create_index('ix_emails_user_id_sender_domain', 'emails', ['user_id', 'sender_domain'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_emails_user_id_sender_domain', table_name='emails')
+    op.drop_index('ix_emails_user_id_sender_email', table_name='emails')
+    op.drop_column('emails', 'sender_domain')
+    op.drop_column('emails', 'sender_email')
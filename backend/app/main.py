@@ -4,13 +4,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from .config import settings, get_settings
 # Import routers from __init__.py
 from .routers import auth_router, users_router, emails_router, analytics_router, email_management_router, ml_router, action_management_router, proposed_actions_router, flow_buckets_router, impersonate, sync_details
-from .db import engine, Base
+from .db import engine, Base, SessionLocal
 # Import models to ensure they're registered with SQLAlchemy
 from .models.user import User
 from .models.email import Email
 from .models.email_sync import EmailSync
 from .models.email_category import EmailCategory, CategoryKeyword, SenderRule
 from .services.email_classifier_service import email_classifier_service
+from .services.bucket_refresh import start_bucket_refresh_scheduler, stop_bucket_refresh_scheduler
+from .services.enhanced_attention_scoring import start_metrics_publisher, stop_metrics_publisher
+from .services.reprocess_jobs import start_reprocess_resumer, stop_reprocess_resumer
 from contextlib import asynccontextmanager
 from .core.logging_config import configure_logging
 
@@ -58,10 +61,23 @@ async def lifespan(app: FastAPI):
     model_path = email_classifier_service.get_model_path(None)
     logger.info(f"Expected global model path: {model_path}")
     
+    # Keep stored attention scores in the right flow bucket as they decay
+    if settings.BUCKET_REFRESH_SCHEDULER_ENABLED:
+        start_bucket_refresh_scheduler(SessionLocal)
+    
+    # Publish this worker's scoring metrics for fleet-wide aggregation
+    start_metrics_publisher()
+    
+    # Pick up reprocess jobs interrupted by a crash or restart, now and once they go stale
+    start_reprocess_resumer(SessionLocal)
+    
     logger.debug("Application initialization complete")
     yield
     # Shutdown code
     logger.debug("Application shutting down")
+    stop_bucket_refresh_scheduler()
+    stop_metrics_publisher()
+    stop_reprocess_resumer()
 
 # Create FastAPI app with lifespan manager
 app = FastAPI(
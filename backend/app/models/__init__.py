@@ -6,6 +6,8 @@ from .categorization_feedback import CategorizationFeedback
 from .email_categorization_decision import EmailCategorizationDecision
 from .email_operation import EmailOperation
 from .email_trash_event import EmailTrashEvent
+from .sender_profile import SenderProfile
 from .email_sync import EmailSync
 from .sync_details import SyncDetails
-from .proposed_action import ProposedAction, ProposedActionStatus 
\ No newline at end of file
+from .proposed_action import ProposedAction, ProposedActionStatus
+from .reprocess_job import ReprocessJob, ReprocessJobStatus 
\ No newline at end of file
@@ -1,8 +1,9 @@
 from sqlalchemy import Column, String, DateTime, Boolean, JSON, ForeignKey, Index, Integer, Float
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from ..db import Base
+from ..utils.email_utils import normalize_sender
 import uuid
 
 class Email(Base):
@@ -15,7 +16,9 @@ class Email(Base):
         gmail_id: Gmail's message ID
         thread_id: Gmail's thread ID
         subject: Email subject
-        from_email: Sender's email address
+        from_email: Sender's email address (raw From header, e.g. "Name <addr>")
+        sender_email: Lowercase address parsed from from_email (kept in sync on assignment)
+        sender_domain: Lowercase domain of sender_email
         received_at: When email was received
         snippet: Short preview of email content
         labels: Gmail labels
@@ -23,6 +26,8 @@ class Email(Base):
         is_processed: Whether email has been processed by our system
         importance_score: Calculated importance (0-100)
         attention_score: Calculated attention urgency (0.0-100.0)
+        attention_score_refresh_at: When attention_score is next predicted to cross a bucket boundary
+        attention_base_score: Time-independent part of the attention score, used to compute live scores in SQL
         category: Classified category (promotional, social, primary, etc.)
         raw_data: Complete email data for future processing
         is_dirty: Flag indicating if the email needs to be reprocessed
@@ -36,6 +41,8 @@ class Email(Base):
     thread_id = Column(String, nullable=False)
     subject = Column(String)
     from_email = Column(String)
+    sender_email = Column(String, nullable=True)
+    sender_domain = Column(String, nullable=True)
     received_at = Column(DateTime(timezone=True))
     snippet = Column(String)
     labels = Column(ARRAY(String))
@@ -43,6 +50,8 @@ class Email(Base):
     is_processed = Column(Boolean, default=False)
     importance_score = Column(Integer)
     attention_score = Column(Float, default=0.0, nullable=False)
+    attention_score_refresh_at = Column(DateTime(timezone=True), nullable=True)
+    attention_base_score = Column(Float, nullable=True)
     category = Column(String)
     raw_data = Column(JSON)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -62,4 +71,20 @@ class Email(Base):
         Index('ix_emails_gmail_id', gmail_id),
         Index('ix_emails_category', category),
         Index('ix_emails_attention_score', attention_score),
-    ) 
\ No newline at end of file
+        Index('ix_emails_attention_score_refresh_at', attention_score_refresh_at),
+        Index('ix_emails_user_id_sender_email', user_id, sender_email),
+        Index('ix_emails_user_id_sender_domain', user_id, sender_domain),
+        Index('ix_emails_user_id_received_at_id', user_id, received_at.desc().nulls_first(), id.desc()),  # Reprocess keyset order
+    )
+    
+    @validates('category', 'labels', 'is_read', 'from_email', 'subject')
+    def _invalidate_attention_base_score(self, key, value):
+        """Drop the stored base score when one of its inputs changes so it gets recalculated."""
+        if getattr(self, key, None) != value:
+            self.attention_base_score = None
+            self.attention_score_refresh_at = None
+        if key == 'from_email':
+            address, domain = normalize_sender(value)
+            self.sender_email = address or None
+            self.sender_domain = domain or None
+        return value 
\ No newline at end of file
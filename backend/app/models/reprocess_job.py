@@ -0,0 +1,77 @@
+from sqlalchemy import Column, String, DateTime, Boolean, JSON, ForeignKey, Index, Integer, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from enum import Enum
+from ..db import Base
+import uuid
+
+class ReprocessJobStatus(str, Enum):
+    """Enum representing reprocess job status"""
+    QUEUED = "queued"        # Created, waiting for a runner to claim it
+    RUNNING = "running"      # Claimed by a runner (heartbeat_at shows it is alive)
+    COMPLETED = "completed"  # Every matching email was reprocessed
+    FAILED = "failed"        # Stopped on an error or superseded by a newer job
+
+class ReprocessJob(Base):
+    """
+    Model for a background email reprocessing run and its checkpoint
+    
+    The runner (app.services.reprocess_jobs) walks the user's matching
+    emails in (received_at, id) order and commits the key of the last
+    contiguous finished batch after every batch, so a run interrupted by a
+    crash or restart resumes from cursor_received_at / cursor_id.
+    
+    Attributes:
+        id: Primary key UUID
+        user_id: Foreign key to the user whose emails are reprocessed
+        status: queued, running, completed or failed
+        filter_params: Email filters (categories, date_from, date_to, search)
+        include_reprocessed: Whether already reprocessed, clean emails are included
+        total_emails: Matching emails counted when the run started
+        processed_count: Emails reprocessed up to the checkpoint
+        error_count: Emails whose categorization failed
+        category_changes: New category -> number of emails moved into it
+        cursor_received_at: received_at of the last checkpointed email (NULL while in the NULL phase)
+        cursor_id: id of the last checkpointed email (NULL before the first batch)
+        error_message: Why the job failed
+        runner_token: Token of the runner that last claimed the job; its writes are conditioned on it
+        created_at: When the job was requested
+        started_at: When a runner first claimed the job
+        heartbeat_at: Last heartbeat of the runner (refreshed while it runs, see REPROCESS_HEARTBEAT_SECONDS)
+        finished_at: When the job completed or failed
+    """
+    __tablename__ = "reprocess_jobs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    status = Column(String(20), default=ReprocessJobStatus.QUEUED, nullable=False)
+    filter_params = Column(JSON, nullable=True)
+    include_reprocessed = Column(Boolean, default=False, nullable=False)
+    total_emails = Column(Integer, nullable=True)
+    processed_count = Column(Integer, default=0, nullable=False)
+    error_count = Column(Integer, default=0, nullable=False)
+    category_changes = Column(JSON, nullable=True)
+    cursor_received_at = Column(DateTime(timezone=True), nullable=True)
+    cursor_id = Column(UUID(as_uuid=True), nullable=True)
+    error_message = Column(Text, nullable=True)
+    runner_token = Column(UUID(as_uuid=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Relationships
+    user = relationship("User")
+    
+    __table_args__ = (
+        Index('ix_reprocess_jobs_user_id_created_at', user_id, created_at),
+        Index('ix_reprocess_jobs_status', status),
+    )
+    
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (ReprocessJobStatus.COMPLETED, ReprocessJobStatus.FAILED)
+    
+    def __repr__(self):
+        return f"<ReprocessJob {self.id} user_id={self.user_id} status={self.status} processed={self.processed_count}>"
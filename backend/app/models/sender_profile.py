@@ -0,0 +1,55 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, Integer, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from ..db import Base
+import uuid
+
+class SenderProfile(Base):
+    """
+    Per-user engagement history of a sender, maintained incrementally
+    
+    One row per (user, normalized sender address) and one per (user, sender
+    domain). Counters are adjusted as emails are ingested, read, replied to
+    and trashed (see app.services.sender_profiles), so scoring and
+    classification can read a sender's history without scanning emails.
+    
+    Attributes:
+        id: Primary key UUID
+        user_id: Foreign key to the user whose mailbox this describes
+        kind: 'address' or 'domain'
+        sender_key: Lowercase sender address or domain
+        email_count: Emails received from the sender
+        read_count: Of those, emails currently read
+        trashed_count: Of those, emails currently in trash
+        replied_count: Replies the user sent in the sender's threads
+        important_count: Emails currently labelled IMPORTANT
+        first_seen_at: When the first email was ingested
+        last_seen_at: When the latest email was ingested
+        updated_at: When any counter last changed
+    """
+    __tablename__ = "sender_profiles"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    kind = Column(String(10), nullable=False)  # address, domain
+    sender_key = Column(String, nullable=False)
+    email_count = Column(Integer, nullable=False, default=0)
+    read_count = Column(Integer, nullable=False, default=0)
+    trashed_count = Column(Integer, nullable=False, default=0)
+    replied_count = Column(Integer, nullable=False, default=0)
+    important_count = Column(Integer, nullable=False, default=0)
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User")
+    
+    __table_args__ = (
+        UniqueConstraint('user_id', 'kind', 'sender_key', name='uq_sender_profiles_user_kind_key'),
+        Index('ix_sender_profiles_user_id', user_id),
+    )
+    
+    def __repr__(self):
+        return f"<SenderProfile user_id={self.user_id} {self.kind}={self.sender_key} emails={self.email_count}>"
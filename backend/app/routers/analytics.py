@@ -5,6 +5,7 @@ from sqlalchemy import func, text
 
 
 from ..db import get_db
+from ..dependencies import get_current_user
 from ..services.analytics.sentiment_service import analyze_sentiment
 from ..services.analytics.response_time_service import analyze_response_time
 from ..services.analytics.volume_service import analyze_email_volume
@@ -43,10 +44,11 @@ async def get_email_volume(
 async def get_top_contacts(
     limit: int = Query(default=10, ge=1, le=100),
     days: int = Query(default=30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
 ):
-    """Get most frequent email contacts over specified period."""
-    return analyze_top_contacts(db, limit=limit, days=days)
+    """Get the current user's most frequent email contacts over specified period."""
+    return analyze_top_contacts(db, current_user.id, limit=limit, days=days)
 
 @router.get("/db-insights")
 async def get_db_insights(db: Session = Depends(get_db)):
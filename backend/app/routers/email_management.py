@@ -13,7 +13,13 @@ from ..db import get_db
 from ..models.user import User
 from ..models.email import Email
 from ..dependencies import get_current_user
-from ..services.email_processor import reprocess_emails
+from ..services.reprocess_jobs import (
+    ReprocessJobConflict,
+    get_reprocess_job,
+    job_status,
+    run_reprocess_job,
+    start_reprocess_job
+)
 from ..services.category_service import (
     initialize_system_categories,
     populate_system_keywords,
@@ -25,6 +31,8 @@ from ..services.category_service import (
 from ..models.email_category import EmailCategory, CategoryKeyword, SenderRule
 from ..models.email_trash_event import EmailTrashEvent
 from ..services.email_classifier_service import email_classifier_service
+from ..services.category_metadata import invalidate_category_metadata
+from ..utils.email_categorizer import invalidate_categorizer_cache
 
 logger = logging.getLogger(__name__)
 
@@ -222,11 +230,19 @@ class ReprocessFilter(BaseModel):
     force_reprocess: Optional[bool] = Field(default=False, description="Whether to mark all matching emails as dirty")
 
 class ReprocessResponse(BaseModel):
-    """Response model for email reprocessing"""
+    """Response model for email reprocessing (progress of the background job)"""
+    job_id: UUID
+    status: str
     total: int
     processed: int
+    errors: int = 0
+    progress: float = 0.0
     category_changes: Dict[str, int]
-    importance_changes: int
+    importance_changes: int = 0  # Not tracked by reprocessing
+    error_message: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 class CategoryItem(BaseModel):
     """Email category item"""
@@ -289,6 +305,7 @@ class SenderRulePatternUpdateRequest(BaseModel):
 
 @router.post("/reprocess", response_model=ReprocessResponse)
 async def reprocess_user_emails(
+    background_tasks: BackgroundTasks,
     filter_criteria: Optional[ReprocessFilter] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -301,6 +318,13 @@ async def reprocess_user_emails(
     
     Can be filtered to only reprocess certain email categories, date ranges,
     or emails matching a search term.
+    
+    Reprocessing runs as a background job and this returns immediately with
+    the job's id and status; poll GET /reprocess/status (or
+    /reprocess/{job_id}) for progress. While a job of the user is running,
+    the same request returns its status instead of starting another, and a
+    request with other filters is rejected with 409 (force_reprocess marks
+    no emails then).
     """
     try:
         if filter_criteria is None:
@@ -318,31 +342,29 @@ async def reprocess_user_emails(
                     filter_dict['date_to'], datetime.max.time()
                 )
         
-        # If force_reprocess is True, mark matching emails as dirty
-        if filter_criteria and filter_criteria.force_reprocess:
-            query = db.query(Email).filter(Email.user_id == current_user.id)
-            
-            # Apply filters if any
-            if filter_dict:
-                from ..utils.filter_utils import apply_email_filters
-                query = apply_email_filters(query, filter_dict)
-            
-            # Mark matching emails as dirty
-            count = query.update({"is_dirty": True})
-            db.commit()
-            logger.info(f"Marked {count} emails as dirty for reprocessing")
+        if filter_dict:
+            # Not email filters
+            filter_dict.pop('include_reprocessed', None)
+            filter_dict.pop('force_reprocess', None)
         
-        # Pass include_reprocessed parameter to reprocess_emails
         include_reprocessed = filter_criteria.include_reprocessed if filter_criteria else False
-        result = reprocess_emails(db, current_user.id, filter_dict, include_reprocessed)
+        force_reprocess = bool(filter_criteria and filter_criteria.force_reprocess)
+        # Marks the matching emails dirty only when a new job is created
+        job = start_reprocess_job(db, current_user.id, filter_dict, include_reprocessed, force_reprocess)
         
-        # Transform the result to match the ReprocessResponse model
-        return {
-            "total": result.get("reprocessed_count", 0),
-            "processed": result.get("reprocessed_count", 0),
-            "category_changes": result.get("category_changes", {}),
-            "importance_changes": 0  # This field is not tracked in reprocess_emails
-        }
+        # Runs after the response is sent; a no-op if the job is already owned by a runner
+        background_tasks.add_task(run_reprocess_job, job.id)
+        
+        return job_status(job)
+    except ReprocessJobConflict as conflict:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "Another reprocess job with different filters is still running",
+                "job_id": str(conflict.job.id),
+                "status": conflict.job.status
+            }
+        )
     except Exception as e:
         logger.error(f"Error reprocessing emails: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -350,6 +372,39 @@ async def reprocess_user_emails(
             detail=f"Error reprocessing emails: {str(e)}"
         )
 
+@router.get("/reprocess/status", response_model=ReprocessResponse)
+async def get_latest_reprocess_status(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the progress of the current user's most recent reprocess job.
+    """
+    job = get_reprocess_job(db, current_user.id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No reprocess job found"
+        )
+    return job_status(job)
+
+@router.get("/reprocess/{job_id}", response_model=ReprocessResponse)
+async def get_reprocess_status(
+    job_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the progress of one of the current user's reprocess jobs.
+    """
+    job = get_reprocess_job(db, current_user.id, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Reprocess job {job_id} not found"
+        )
+    return job_status(job)
+
 @router.get("/categories", response_model=List[CategoryItem])
 async def get_categories(
     db: Session = Depends(get_db),
@@ -397,6 +452,7 @@ async def add_keyword(
                 detail=f"Failed to add keyword. Category '{keyword_data.category_name}' may not exist."
             )
         
+        invalidate_categorizer_cache(current_user.id)
         return {"success": True, "message": "Keyword added successfully"}
     except HTTPException:
         raise
@@ -435,6 +491,7 @@ async def add_sender_rule(
                 detail=f"Failed to add sender rule. Category '{rule_data.category_name}' may not exist."
             )
         
+        invalidate_categorizer_cache(current_user.id)
         return {"success": True, "message": "Sender rule added successfully"}
     except HTTPException:
         raise
@@ -464,6 +521,8 @@ async def initialize_categories(
         categories = initialize_system_categories(db)
         keywords_count = populate_system_keywords(db)
         rules_count = populate_system_sender_rules(db)
+        # System rules changed for everyone
+        invalidate_categorizer_cache()
         
         return {
             "success": True,
@@ -514,6 +573,7 @@ async def create_category(
         
         db.add(new_category)
         db.commit()
+        invalidate_category_metadata()
         db.refresh(new_category)
         
         # Return the created category
@@ -666,6 +726,9 @@ async def delete_category(
             })
         
         db.commit()
+        # The cascade removed rules of every user
+        invalidate_categorizer_cache()
+        invalidate_category_metadata()
         
         return {"success": True, "message": f"Category '{category_name}' deleted successfully"}
     except HTTPException:
@@ -706,6 +769,7 @@ async def update_sender_rule(
         if rule.user_id == current_user.id:
             rule.weight = rule_data.weight
             db.commit()
+            invalidate_categorizer_cache(current_user.id)
             db.refresh(rule)
             return rule
         
@@ -730,6 +794,7 @@ async def update_sender_rule(
             )
             db.add(new_rule)
             db.commit()
+            invalidate_categorizer_cache(current_user.id)
             db.refresh(new_rule)
             return new_rule
         
@@ -778,6 +843,7 @@ async def delete_keyword(
         # Delete the keyword
         db.delete(keyword)
         db.commit()
+        invalidate_categorizer_cache(current_user.id)
         
         return {"success": True, "message": "Keyword deleted successfully"}
     except HTTPException:
@@ -836,6 +902,7 @@ async def update_sender_rule_pattern(
             rule.pattern = rule_data.pattern
             rule.is_domain = rule_data.is_domain
             db.commit()
+            invalidate_categorizer_cache(current_user.id)
             db.refresh(rule)
             return rule
 
@@ -864,6 +931,7 @@ async def update_sender_rule_pattern(
             )
             db.add(new_rule)
             db.commit()
+            invalidate_categorizer_cache(current_user.id)
             db.refresh(new_rule)
             return new_rule
 
@@ -909,6 +977,7 @@ async def update_keyword(
         if keyword.user_id == current_user.id:
             keyword.weight = keyword_data.weight
             db.commit()
+            invalidate_categorizer_cache(current_user.id)
             db.refresh(keyword)
             return keyword
         
@@ -933,6 +1002,7 @@ async def update_keyword(
             )
             db.add(new_keyword)
             db.commit()
+            invalidate_categorizer_cache(current_user.id)
             db.refresh(new_keyword)
             return new_keyword
         
@@ -981,6 +1051,7 @@ async def delete_sender_rule(
         # Delete the rule
         db.delete(rule)
         db.commit()
+        invalidate_categorizer_cache(current_user.id)
         
         return {"success": True, "message": "Sender rule deleted successfully"}
     except HTTPException:
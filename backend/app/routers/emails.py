@@ -25,7 +25,9 @@ from ..models.categorization_feedback import CategorizationFeedback
 from ..models.email_category import EmailCategory
 from ..models.sender_rule import SenderRule
 from ..models.sync_details import SyncDetails, SyncDirection, SyncType, SyncStatus
-from ..utils.email_utils import set_email_category_and_labels
+from ..utils.email_utils import email_sender, set_email_category_and_labels
+from ..services.category_metadata import get_category_metadata
+from ..services.sender_profiles import SenderProfileUpdates
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -759,7 +761,9 @@ async def update_labels_endpoint(
             raise HTTPException(status_code=404, detail="Email not found")
         
         # Get current labels and convert to set for easy manipulation
-        current_labels = set(email.labels or [])
+        old_labels = list(email.labels or [])
+        old_category = email.category
+        current_labels = set(old_labels)
         
         # Add new labels
         for label in add_labels:
@@ -821,6 +825,11 @@ async def update_labels_endpoint(
         
         logger.info(f"[API] Created label update operation for email {email_id}")
         
+        # Update the sender's read/trash history
+        profile_updates = SenderProfileUpdates()
+        profile_updates.labels_changed(email, old_labels, email.labels, old_category)
+        profile_updates.flush(db)
+        
         db.commit()
         
         return {
@@ -875,28 +884,21 @@ async def update_category_endpoint(
         if not email:
             raise HTTPException(status_code=404, detail="Email not found")
         
-        # Get valid categories from database
-        valid_categories = [
-            cat.name for cat in db.query(EmailCategory).filter(
-                or_(
-                    EmailCategory.is_system == True,
-                    and_(
-                        EmailCategory.is_system == False,
-                        # TODO: Add user ownership check once implemented
-                    )
-                )
-            ).all()
-        ]
+        # Valid categories from the cached category metadata
+        # TODO: Add user ownership check for non-system categories once implemented
+        valid_categories = get_category_metadata(db).names
         
         normalized_category = category.lower()
         
         if normalized_category not in valid_categories:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid category. Must be one of: {', '.join(valid_categories)}"
+                detail=f"Invalid category. Must be one of: {', '.join(sorted(valid_categories))}"
             )
         
         # Update the category and labels using the unified utility
+        old_labels = list(email.labels or [])
+        old_category = email.category
         try:
             category_changed = set_email_category_and_labels(email, normalized_category, db)
         except ValueError as ve:
@@ -941,6 +943,10 @@ async def update_category_endpoint(
                     operation_data=operation_data
                 )
 
+            profile_updates = SenderProfileUpdates()
+            profile_updates.labels_changed(email, old_labels, email.labels, old_category)
+            profile_updates.flush(db)
+
         db.commit()
         
         return {
@@ -991,7 +997,9 @@ async def delete_email(
             raise HTTPException(status_code=404, detail="Email not found")
         
         # Get current labels and convert to set for easy manipulation
-        current_labels = set(email.labels or [])
+        old_labels = list(email.labels or [])
+        old_category = email.category
+        current_labels = set(old_labels)
         
         # Add TRASH label if not already present
         if 'TRASH' not in current_labels:
@@ -1032,7 +1040,7 @@ async def delete_email(
             user_id=current_user.id,
             email_id=email.id,
             sender_email=email.from_email,
-            sender_domain=email.from_email.split('@')[-1] if '@' in email.from_email else '',
+            sender_domain=email_sender(email)[1],
             subject=email.subject,
             snippet=email.snippet,
             event_type='moved_to_trash',
@@ -1045,6 +1053,10 @@ async def delete_email(
         db.add(trash_event)
         logger.info(f"[API] Created trash event record for email {email_id}")
         
+        profile_updates = SenderProfileUpdates()
+        profile_updates.labels_changed(email, old_labels, email.labels, old_category)
+        profile_updates.flush(db)
+        
         db.commit()
         
         return {
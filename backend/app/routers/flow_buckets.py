@@ -10,6 +10,7 @@ ENHANCED: Now includes debugging endpoints for the new scoring system.
 
 from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 from ..db import get_db
 from ..dependencies import get_current_user
@@ -24,8 +25,13 @@ from app.services.flow_buckets import (
 from app.services.enhanced_attention_scoring import (
     debug_email_score,
     get_scoring_performance_stats,
-    analyze_score_distribution,
-    invalidate_score_cache
+    get_fleet_performance_stats,
+    get_scoring_metrics_text,
+    get_scoring_engine,
+    analyze_score_distribution_streaming,
+    stream_user_emails_for_analysis,
+    invalidate_score_cache,
+    invalidate_user_score_cache
 )
 from pydantic import BaseModel, field_serializer
 from uuid import UUID
@@ -75,7 +81,7 @@ class BucketSummaryResponse(BaseModel):
 
 
 @router.get("/buckets/now", response_model=List[EmailResponse])
-async def get_now_bucket_emails(
+def get_now_bucket_emails(
     limit: int = Query(50, ge=1, le=100, description="Number of emails to return"),
     offset: int = Query(0, ge=0, description="Number of emails to skip"),
     order_by: str = Query("attention_score", description="Field to order by"),
@@ -128,7 +134,7 @@ async def get_now_bucket_emails(
 
 
 @router.get("/buckets/later", response_model=List[EmailResponse])
-async def get_later_bucket_emails(
+def get_later_bucket_emails(
     limit: int = Query(50, ge=1, le=100, description="Number of emails to return"),
     offset: int = Query(0, ge=0, description="Number of emails to skip"),
     order_by: str = Query("attention_score", description="Field to order by"),
@@ -181,7 +187,7 @@ async def get_later_bucket_emails(
 
 
 @router.get("/buckets/reference", response_model=List[EmailResponse])
-async def get_reference_bucket_emails(
+def get_reference_bucket_emails(
     limit: int = Query(50, ge=1, le=100, description="Number of emails to return"),
     offset: int = Query(0, ge=0, description="Number of emails to skip"),
     order_by: str = Query("attention_score", description="Field to order by"),
@@ -272,7 +278,7 @@ async def get_bucket_summary_endpoint(
 
 
 @router.get("/buckets/{bucket_type}", response_model=List[EmailResponse])
-async def get_bucket_emails_generic(
+def get_bucket_emails_generic(
     bucket_type: BucketType,
     limit: int = Query(50, ge=1, le=100, description="Number of emails to return"),
     offset: int = Query(0, ge=0, description="Number of emails to skip"),
@@ -388,10 +394,52 @@ async def get_scoring_performance_endpoint(
         raise HTTPException(status_code=500, detail=f"Error getting performance stats: {str(e)}")
 
 
+@router.get("/debug/performance/fleet", response_model=Dict[str, Any])
+async def get_fleet_performance_endpoint(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get scoring statistics merged across all workers on this host.
+    
+    Per-worker stats (/debug/performance) only describe whichever worker
+    served the request; this merges every worker's counters and latency
+    histograms into fleet-wide hit rates and percentiles.
+    """
+    try:
+        stats = get_fleet_performance_stats()
+        
+        return {
+            "status": "success",
+            "performance_stats": stats,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting fleet performance stats: {str(e)}")
+
+
+@router.get("/debug/performance/metrics", response_class=PlainTextResponse)
+async def get_scoring_metrics_endpoint(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Export scoring latency histograms and cache counters for Prometheus.
+    
+    Quantiles (p50/p95/p99) are reported per email category in seconds.
+    """
+    try:
+        return PlainTextResponse(get_scoring_metrics_text(), media_type="text/plain; version=0.0.4")
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rendering scoring metrics: {str(e)}")
+
+
 @router.get("/debug/score-distribution", response_model=Dict[str, Any])
-async def analyze_score_distribution_endpoint(
+def analyze_score_distribution_endpoint(
     bucket_type: Optional[BucketType] = Query(None, description="Analyze specific bucket only"),
-    limit: int = Query(100, ge=10, le=1000, description="Number of emails to analyze"),
+    limit: int = Query(1000, ge=10, le=100000, description="Number of newest emails to analyze"),
+    group_by: str = Query("category", pattern="^(category|sender_domain|read_status)$", description="Grouping field"),
+    include_anomalies: bool = Query(False, description="Also report outlier scores"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -400,23 +448,30 @@ async def analyze_score_distribution_endpoint(
     
     This endpoint provides statistical analysis of how scores are distributed,
     helping to understand if the scoring system is working as expected.
+    Emails are streamed from the database in chunks and scored in batches,
+    so memory stays flat even for very large mailboxes.
     """
     try:
-        # Get emails for analysis
-        query = db.query(Email).filter(Email.user_id == current_user.id)
+        # Filter by bucket if specified
+        min_score, max_score = None, None
+        if bucket_type == "now":
+            min_score = 60.0
+        elif bucket_type == "later":
+            min_score, max_score = 30.0, 60.0
+        elif bucket_type == "reference":
+            max_score = 30.0
         
-        if bucket_type:
-            # Filter by bucket if specified
-            if bucket_type == "now":
-                query = query.filter(Email.attention_score >= 60.0)
-            elif bucket_type == "later":
-                query = query.filter(Email.attention_score >= 30.0, Email.attention_score < 60.0)
-            elif bucket_type == "reference":
-                query = query.filter(Email.attention_score < 30.0)
-        
-        emails = query.order_by(Email.received_at.desc()).limit(limit).all()
+        chunks = stream_user_emails_for_analysis(
+            db,
+            current_user.id,
+            min_score=min_score,
+            max_score=max_score,
+            limit=limit,
+            chunk_size=get_scoring_engine().config.ANALYSIS_STREAM_CHUNK_SIZE
+        )
+        analysis = analyze_score_distribution_streaming(chunks, group_by=group_by, include_anomalies=include_anomalies)
         
-        if not emails:
+        if not analysis['total_emails']:
             return {
                 "status": "success",
                 "message": "No emails found for analysis",
@@ -424,16 +479,18 @@ async def analyze_score_distribution_endpoint(
                 "timestamp": datetime.now().isoformat()
             }
         
-        # Analyze score distribution
-        analysis = analyze_score_distribution(emails)
-        
-        return {
+        response = {
             "status": "success",
-            "total_emails_analyzed": len(emails),
+            "total_emails_analyzed": analysis['total_emails'],
             "bucket_filter": bucket_type,
-            "analysis": analysis,
+            "group_by": group_by,
+            "analysis": analysis['distribution'],
             "timestamp": datetime.now().isoformat()
         }
+        if include_anomalies:
+            response["anomalies"] = analysis['anomalies']
+            response["anomaly_count"] = analysis['anomaly_count']
+        return response
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing score distribution: {str(e)}")
@@ -442,24 +499,33 @@ async def analyze_score_distribution_endpoint(
 @router.post("/debug/invalidate-cache", response_model=Dict[str, Any])
 async def invalidate_score_cache_endpoint(
     pattern: Optional[str] = Query(None, description="Pattern to match for cache invalidation"),
+    all_users: bool = Query(False, description="Clear the whole cache instead of only the current user's scores"),
     current_user: User = Depends(get_current_user)
 ):
     """
     Invalidate cached attention scores.
     
     This endpoint allows clearing the scoring cache, which can be useful during
-    development or when testing different scoring strategies.
+    development or when testing different scoring strategies. Without a pattern
+    it invalidates only the current user's scores (an O(1) generation bump).
     """
     try:
         # Only allow cache invalidation for development/testing
         # In production, you might want to restrict this to admin users
         
-        invalidated = invalidate_score_cache(pattern=pattern)
+        if pattern or all_users:
+            invalidated = invalidate_score_cache(pattern=pattern)
+            generation = None
+        else:
+            generation = invalidate_user_score_cache(current_user.id)
+            invalidated = None
         
         return {
             "status": "success",
             "invalidated_entries": invalidated,
             "pattern": pattern,
+            "scope": "pattern" if pattern else ("all" if all_users else "user"),
+            "generation": generation,
             "timestamp": datetime.now().isoformat()
         }
         
@@ -5,18 +5,24 @@ This package provides a comprehensive, modular email attention scoring system.
 """
 
 from app.scoring.config import get_config, current_config
+from app.scoring.decay import DecaySpec
 from app.scoring.engine import EmailScoringEngine, ScoringEngineFactory
+from app.scoring.monitor import ScoringPerformanceMonitor
 from app.scoring.strategies import EnhancedScoringStrategy, SimpleScoringStrategy
 from app.scoring.cache_providers import create_cache_provider
 from app.scoring.debugger import EmailScoringDebugger
+from app.scoring.scheduler import BucketCrossingPredictor
 
 __all__ = [
     'get_config',
     'current_config', 
+    'DecaySpec',
     'EmailScoringEngine',
     'ScoringEngineFactory',
+    'ScoringPerformanceMonitor',
     'EnhancedScoringStrategy',
     'SimpleScoringStrategy',
     'create_cache_provider',
-    'EmailScoringDebugger'
+    'EmailScoringDebugger',
+    'BucketCrossingPredictor'
 ]
\ No newline at end of file
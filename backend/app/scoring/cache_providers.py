@@ -7,12 +7,163 @@ All implementations follow the CacheProvider interface for easy swapping.
 
 import time
 import json
+import hashlib
 import logging
+import math
+import mmap
+import os
 import pickle
-from typing import Optional, Dict, Any
+import struct
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple
 from collections import OrderedDict
 from app.scoring.interfaces import BaseCacheProvider
 
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; the shared memory provider is disabled there
+    fcntl = None
+
+
+class _CacheEntry:
+    """Compact cache entry (slotted, no per-entry dict)."""
+    
+    __slots__ = ('value', 'stale_at', 'expires_at', 'wheel_level', 'wheel_slot')
+    
+    def __init__(self, value: float, expires_at: float, stale_at: Optional[float] = None):
+        self.value = value
+        self.stale_at = expires_at if stale_at is None else min(stale_at, expires_at)
+        self.expires_at = expires_at
+        self.wheel_level = 0
+        self.wheel_slot: Optional[set] = None
+
+
+class _TimingWheel:
+    """
+    Hierarchical timing wheel over whole-second ticks.
+    
+    Each level has 64 slots; level L covers expiry ticks up to 64^(L+1)
+    seconds ahead with a resolution of 64^L seconds. Entries move down one
+    level when their slot comes up (cascade), so scheduling, cancelling and
+    expiring are amortized O(1). Runs of empty ticks are skipped, so a long
+    idle period costs at most one step per slot boundary per level.
+    """
+    
+    BITS = 6
+    SIZE = 1 << BITS
+    MASK = SIZE - 1
+    LEVELS = 4  # 64^4 seconds ≈ 194 days
+    
+    def __init__(self, current_time: float):
+        self.wheels: List[List[set]] = [[set() for _ in range(self.SIZE)] for _ in range(self.LEVELS)]
+        self.level_counts = [0] * self.LEVELS
+        self.next_tick = int(current_time)  # Next tick to process
+    
+    def schedule(self, key: str, entry: _CacheEntry) -> None:
+        """Place an entry in the slot for its expiry tick."""
+        expires_tick = math.ceil(entry.expires_at)
+        delta = expires_tick - self.next_tick
+        
+        if delta < 0:
+            level, slot_index = 0, self.next_tick & self.MASK
+        else:
+            max_delta = (1 << (self.BITS * self.LEVELS)) - 1
+            if delta > max_delta:
+                # Beyond the top level: park it at the far end and re-check on expiry
+                expires_tick = self.next_tick + max_delta
+                delta = max_delta
+            level = 0
+            while delta >= 1 << (self.BITS * (level + 1)):
+                level += 1
+            slot_index = (expires_tick >> (self.BITS * level)) & self.MASK
+        
+        slot = self.wheels[level][slot_index]
+        slot.add(key)
+        entry.wheel_level = level
+        entry.wheel_slot = slot
+        self.level_counts[level] += 1
+    
+    def cancel(self, key: str, entry: _CacheEntry) -> None:
+        """Remove an entry from its slot."""
+        if entry.wheel_slot is not None:
+            entry.wheel_slot.discard(key)
+            self.level_counts[entry.wheel_level] -= 1
+            entry.wheel_slot = None
+    
+    def advance(self, current_time: float, entries: Dict[str, _CacheEntry]) -> List[str]:
+        """
+        Process every tick up to current_time.
+        
+        Returns:
+            Keys of entries that expired (already unscheduled; the caller
+            removes them from its table)
+        """
+        target = int(current_time)
+        expired: List[str] = []
+        
+        while self.next_tick <= target:
+            # Skip ahead while the lower levels are empty
+            span = 1
+            for level in range(self.LEVELS - 1):
+                if self.level_counts[level]:
+                    break
+                span = 1 << (self.BITS * (level + 1))
+            if span > 1 and self.next_tick % span:
+                self.next_tick = min((self.next_tick // span + 1) * span, target + 1)
+                continue
+            
+            tick = self.next_tick
+            if tick & self.MASK == 0:
+                for level in range(1, self.LEVELS):
+                    slot_index = (tick >> (self.BITS * level)) & self.MASK
+                    self._cascade(level, slot_index, entries)
+                    if slot_index:
+                        break
+            
+            slot = self.wheels[0][tick & self.MASK]
+            if slot:
+                self.level_counts[0] -= len(slot)
+                due = list(slot)
+                slot.clear()
+                for key in due:
+                    entry = entries[key]
+                    entry.wheel_slot = None
+                    if entry.expires_at <= current_time:
+                        expired.append(key)
+                    else:
+                        self.schedule(key, entry)
+            
+            self.next_tick += 1
+        
+        return expired
+    
+    def count_due(self, current_time: float, entries: Dict[str, _CacheEntry]) -> int:
+        """Count entries already past expiry that the wheel hasn't reached yet."""
+        slot = self.wheels[0][self.next_tick & self.MASK]
+        return sum(1 for key in slot if entries[key].expires_at <= current_time)
+    
+    def memory_usage(self) -> int:
+        """Measured size of the wheel's slot sets in bytes."""
+        return sys.getsizeof(self.wheels) + sum(
+            sys.getsizeof(wheel) + sum(sys.getsizeof(slot) for slot in wheel)
+            for wheel in self.wheels
+        )
+    
+    def _cascade(self, level: int, slot_index: int, entries: Dict[str, _CacheEntry]) -> None:
+        """Re-schedule a higher-level slot's entries into lower levels."""
+        slot = self.wheels[level][slot_index]
+        if not slot:
+            return
+        
+        self.level_counts[level] -= len(slot)
+        moved = list(slot)
+        slot.clear()
+        for key in moved:
+            self.schedule(key, entries[key])
+
 
 class InMemoryCacheProvider(BaseCacheProvider):
     """
@@ -21,112 +172,245 @@ class InMemoryCacheProvider(BaseCacheProvider):
     This provider stores scores in memory with TTL support. It's useful for
     development environments where you don't want to set up Redis, and for
     testing where you need predictable, isolated cache behavior.
+    
+    Entries are slotted objects in an LRU-ordered dict. Expiry is driven by a
+    hierarchical timing wheel that is advanced on every access, so expired
+    entries are dropped in amortized O(1) instead of by full scans, and
+    statistics come from maintained counters.
     """
     
     def __init__(self, key_prefix: str = "email_score", max_entries: int = 10000):
         super().__init__(key_prefix)
-        self.cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self.cache: OrderedDict[str, _CacheEntry] = OrderedDict()
         self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._wheel = _TimingWheel(time.time())
+        self._entry_bytes = 0  # Measured size of keys and entries currently stored
+        self._expired_count = 0
+        self._evicted_count = 0
+        # Generation counters live outside the LRU table so eviction can never
+        # reset a generation and resurrect entries it invalidated
+        self._generations: Dict[str, int] = {}
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
     
     def get(self, key: str) -> Optional[float]:
         """Retrieve a cached score with TTL checking."""
-        cache_key = self._make_key(key)
+        with self._lock:
+            current_time = time.time()
+            self._expire_unlocked(current_time)
+            score = self._get_unlocked(self._make_key(key), current_time)
         
-        if cache_key not in self.cache:
-            self.logger.debug(f"[CACHE_MISS] Key not found: {key}")
-            return None
+        if score is None:
+            self.logger.debug(f"[CACHE_MISS] Key not found or expired: {key}")
+        else:
+            self.logger.debug(f"[CACHE_HIT] {key}: {score}")
+        return score
+    
+    def set(self, key: str, value: float, ttl: int) -> None:
+        """Store a score with TTL."""
+        with self._lock:
+            current_time = time.time()
+            self._expire_unlocked(current_time)
+            self._set_unlocked(self._make_key(key), value, ttl, current_time)
+            self._evict_unlocked()
         
-        entry = self.cache[cache_key]
-        current_time = time.time()
+        self.logger.debug(f"[CACHE_SET] {key}: {value} (TTL: {ttl}s)")
+    
+    def delete(self, key: str) -> None:
+        """Remove a cached score."""
+        with self._lock:
+            deleted = self._remove_unlocked(self._make_key(key))
         
-        # Check if entry has expired
-        if current_time > entry['expires_at']:
-            self.logger.debug(f"[CACHE_EXPIRED] Key expired: {key}")
-            del self.cache[cache_key]
-            return None
+        if deleted:
+            self.logger.debug(f"[CACHE_DEL] Deleted: {key}")
+    
+    def get_many(self, keys: List[str]) -> Dict[str, float]:
+        """Retrieve several scores in a single locked pass."""
+        results = {}
         
-        # Move to end for LRU behavior
-        self.cache.move_to_end(cache_key)
+        with self._lock:
+            current_time = time.time()
+            self._expire_unlocked(current_time)
+            for key in keys:
+                score = self._get_unlocked(self._make_key(key), current_time)
+                if score is not None:
+                    results[key] = score
         
-        score = entry['value']
-        self.logger.debug(f"[CACHE_HIT] {key}: {score}")
-        return score
+        self.logger.debug(f"[CACHE_GET_MANY] {len(results)}/{len(keys)} hits")
+        return results
     
-    def set(self, key: str, value: float, ttl: int) -> None:
-        """Store a score with TTL."""
-        cache_key = self._make_key(key)
-        expires_at = time.time() + ttl
+    def set_many(self, values: Dict[str, float], ttl: int, soft_ttl: Optional[int] = None) -> None:
+        """Store several scores in a single locked pass."""
+        with self._lock:
+            current_time = time.time()
+            self._expire_unlocked(current_time)
+            for key, value in values.items():
+                self._set_unlocked(self._make_key(key), value, ttl, current_time, soft_ttl)
+            self._evict_unlocked()
         
-        self.cache[cache_key] = {
-            'value': value,
-            'expires_at': expires_at,
-            'created_at': time.time()
-        }
+        self.logger.debug(f"[CACHE_SET_MANY] {len(values)} entries (TTL: {ttl}s, soft TTL: {soft_ttl}s)")
+    
+    def get_many_with_staleness(self, keys: List[str]) -> Dict[str, Tuple[float, bool]]:
+        """Retrieve several scores with their staleness in a single locked pass."""
+        results = {}
+        
+        with self._lock:
+            current_time = time.time()
+            self._expire_unlocked(current_time)
+            for key in keys:
+                entry = self._get_entry_unlocked(self._make_key(key), current_time)
+                if entry is not None:
+                    results[key] = (entry.value, current_time >= entry.stale_at)
+        
+        self.logger.debug(f"[CACHE_GET_MANY] {len(results)}/{len(keys)} hits (with staleness)")
+        return results
+    
+    def delete_many(self, keys: List[str]) -> int:
+        """Remove several scores in a single locked pass."""
+        with self._lock:
+            deleted = sum(1 for key in keys if self._remove_unlocked(self._make_key(key)))
+        
+        self.logger.debug(f"[CACHE_DEL_MANY] Deleted {deleted}/{len(keys)} entries")
+        return deleted
+    
+    def get_generations(self, keys: List[str]) -> Dict[str, int]:
+        """Read generation counters."""
+        with self._lock:
+            return {key: self._generations[key] for key in keys if key in self._generations}
+    
+    def bump_generation(self, key: str, ttl: int) -> int:
+        """Increment a generation counter (counters don't expire in memory)."""
+        with self._lock:
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+        
+        self.logger.debug(f"[CACHE_GENERATION] {key} → {generation}")
+        return generation
+    
+    def _get_unlocked(self, cache_key: str, current_time: float) -> Optional[float]:
+        """Look up a value, dropping it if expired. Caller must hold the lock."""
+        entry = self._get_entry_unlocked(cache_key, current_time)
+        return entry.value if entry is not None else None
+    
+    def _get_entry_unlocked(self, cache_key: str, current_time: float) -> Optional[_CacheEntry]:
+        """Look up an entry, dropping it if expired. Caller must hold the lock."""
+        entry = self.cache.get(cache_key)
+        if entry is None:
+            return None
+        
+        # Check if entry has expired (the wheel works in whole seconds)
+        if current_time > entry.expires_at:
+            self._remove_unlocked(cache_key)
+            self._expired_count += 1
+            return None
         
         # Move to end for LRU behavior
         self.cache.move_to_end(cache_key)
+        return entry
+    
+    def _set_unlocked(
+        self,
+        cache_key: str,
+        value: float,
+        ttl: int,
+        current_time: float,
+        soft_ttl: Optional[int] = None
+    ) -> None:
+        """Store an entry and mark it most recently used. Caller must hold the lock."""
+        expires_at = current_time + ttl
+        stale_at = current_time + soft_ttl if soft_ttl is not None else None
         
-        # Evict oldest entries if we exceed max size
+        entry = self.cache.get(cache_key)
+        if entry is None:
+            entry = _CacheEntry(value, expires_at, stale_at)
+            self.cache[cache_key] = entry
+            self._entry_bytes += sys.getsizeof(cache_key) + sys.getsizeof(entry)
+        else:
+            self._wheel.cancel(cache_key, entry)
+            entry.value = value
+            entry.expires_at = expires_at
+            entry.stale_at = expires_at if stale_at is None else min(stale_at, expires_at)
+            self.cache.move_to_end(cache_key)
+        
+        self._wheel.schedule(cache_key, entry)
+    
+    def _remove_unlocked(self, cache_key: str) -> bool:
+        """Remove an entry and unschedule it. Caller must hold the lock."""
+        entry = self.cache.pop(cache_key, None)
+        if entry is None:
+            return False
+        
+        self._wheel.cancel(cache_key, entry)
+        self._entry_bytes -= sys.getsizeof(cache_key) + sys.getsizeof(entry)
+        return True
+    
+    def _expire_unlocked(self, current_time: float) -> int:
+        """Advance the timing wheel and drop entries that expired. Caller must hold the lock."""
+        expired_keys = self._wheel.advance(current_time, self.cache)
+        for cache_key in expired_keys:
+            entry = self.cache.pop(cache_key)
+            self._entry_bytes -= sys.getsizeof(cache_key) + sys.getsizeof(entry)
+        
+        self._expired_count += len(expired_keys)
+        return len(expired_keys)
+    
+    def _evict_unlocked(self) -> None:
+        """Evict oldest entries if we exceed max size. Caller must hold the lock."""
         while len(self.cache) > self.max_entries:
             oldest_key = next(iter(self.cache))
+            self._remove_unlocked(oldest_key)
+            self._evicted_count += 1
             self.logger.debug(f"[CACHE_EVICT] Evicting oldest entry: {oldest_key}")
-            del self.cache[oldest_key]
-        
-        self.logger.debug(f"[CACHE_SET] {key}: {value} (TTL: {ttl}s)")
-    
-    def delete(self, key: str) -> None:
-        """Remove a cached score."""
-        cache_key = self._make_key(key)
-        if cache_key in self.cache:
-            del self.cache[cache_key]
-            self.logger.debug(f"[CACHE_DEL] Deleted: {key}")
     
     def clear_pattern(self, pattern: str) -> int:
         """Clear entries matching a pattern."""
         # Simple pattern matching for in-memory cache
         import fnmatch
         
-        keys_to_delete = []
-        for cache_key in self.cache.keys():
-            # Remove prefix for pattern matching
-            clean_key = cache_key.replace(f"{self.key_prefix}:", "", 1)
-            if fnmatch.fnmatch(clean_key, pattern):
-                keys_to_delete.append(cache_key)
-        
-        for cache_key in keys_to_delete:
-            del self.cache[cache_key]
+        with self._lock:
+            keys_to_delete = []
+            for cache_key in self.cache.keys():
+                # Remove prefix for pattern matching
+                clean_key = cache_key.replace(f"{self.key_prefix}:", "", 1)
+                if fnmatch.fnmatch(clean_key, pattern):
+                    keys_to_delete.append(cache_key)
+            
+            for cache_key in keys_to_delete:
+                self._remove_unlocked(cache_key)
         
         self.logger.debug(f"[CACHE_CLEAR] Cleared {len(keys_to_delete)} entries matching '{pattern}'")
         return len(keys_to_delete)
     
     def cleanup_expired(self) -> int:
         """Remove all expired entries."""
-        current_time = time.time()
-        keys_to_delete = []
+        with self._lock:
+            removed = self._expire_unlocked(time.time())
         
-        for cache_key, entry in self.cache.items():
-            if current_time > entry['expires_at']:
-                keys_to_delete.append(cache_key)
-        
-        for cache_key in keys_to_delete:
-            del self.cache[cache_key]
-        
-        self.logger.debug(f"[CACHE_CLEANUP] Removed {len(keys_to_delete)} expired entries")
-        return len(keys_to_delete)
+        self.logger.debug(f"[CACHE_CLEANUP] Removed {removed} expired entries")
+        return removed
     
     def get_stats(self) -> Dict[str, Any]:
-        """Get cache statistics."""
-        current_time = time.time()
-        expired_count = sum(1 for entry in self.cache.values() 
-                          if current_time > entry['expires_at'])
+        """Get cache statistics from maintained counters."""
+        with self._lock:
+            current_time = time.time()
+            self._expire_unlocked(current_time)
+            total_entries = len(self.cache)
+            expired_count = self._wheel.count_due(current_time, self.cache)
+            memory_usage = sys.getsizeof(self.cache) + self._entry_bytes + self._wheel.memory_usage()
+            expired_total = self._expired_count
+            evicted_total = self._evicted_count
+            generation_counters = len(self._generations)
         
         return {
-            'total_entries': len(self.cache),
+            'total_entries': total_entries,
             'expired_entries': expired_count,
-            'active_entries': len(self.cache) - expired_count,
+            'active_entries': total_entries - expired_count,
             'max_entries': self.max_entries,
-            'memory_usage_estimate': len(self.cache) * 100  # Rough estimate in bytes
+            'expired_total': expired_total,
+            'evicted_total': evicted_total,
+            'generation_counters': generation_counters,
+            'memory_usage_bytes': memory_usage,
+            'memory_usage_estimate': memory_usage  # Kept for existing consumers
         }
 
 
@@ -138,11 +422,37 @@ class RedisCacheProvider(BaseCacheProvider):
     It's the recommended choice for production environments.
     """
     
+    # Entries written with a soft TTL are stored as "<score>|<stale_at>"
+    STALE_AT_SEPARATOR = "|"
+    
     def __init__(self, redis_client, key_prefix: str = "email_score"):
         super().__init__(key_prefix)
         self.redis = redis_client
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
     
+    def _encode(self, value: float, stale_at: Optional[float]) -> Any:
+        if stale_at is None:
+            return value
+        return f"{value}{self.STALE_AT_SEPARATOR}{stale_at:.3f}"
+    
+    def _decode(self, raw: Any) -> Tuple[float, float]:
+        """Parse a stored entry into (score, stale_at); plain scores never go stale."""
+        if isinstance(raw, bytes):
+            raw = raw.decode()
+        if isinstance(raw, str) and self.STALE_AT_SEPARATOR in raw:
+            score, stale_at = raw.split(self.STALE_AT_SEPARATOR, 1)
+            return float(score), float(stale_at)
+        return float(raw), math.inf
+    
+    def _get_many_decoded(self, keys: List[str]) -> Dict[str, Tuple[float, float]]:
+        """MGET several keys and decode them into (score, stale_at). Raises on Redis errors."""
+        values = self.redis.mget([self._make_key(key) for key in keys])
+        return {
+            key: self._decode(value)
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+    
     def get(self, key: str) -> Optional[float]:
         """Retrieve a cached score from Redis."""
         try:
@@ -153,7 +463,7 @@ class RedisCacheProvider(BaseCacheProvider):
                 self.logger.debug(f"[REDIS_MISS] Key not found: {key}")
                 return None
             
-            score = float(value)
+            score, _ = self._decode(value)
             self.logger.debug(f"[REDIS_HIT] {key}: {score}")
             return score
             
@@ -182,6 +492,97 @@ class RedisCacheProvider(BaseCacheProvider):
         except Exception as e:
             self.logger.error(f"[REDIS_ERROR] Delete failed for {key}: {e}")
     
+    def get_many(self, keys: List[str]) -> Dict[str, float]:
+        """Retrieve several cached scores with a single MGET."""
+        if not keys:
+            return {}
+        
+        try:
+            results = {key: score for key, (score, _) in self._get_many_decoded(keys).items()}
+            self.logger.debug(f"[REDIS_MGET] {len(results)}/{len(keys)} hits")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"[REDIS_ERROR] MGET failed for {len(keys)} keys: {e}")
+            return {}
+    
+    def get_many_with_staleness(self, keys: List[str]) -> Dict[str, Tuple[float, bool]]:
+        """Retrieve several cached scores and their staleness with a single MGET."""
+        if not keys:
+            return {}
+        
+        try:
+            current_time = time.time()
+            results = {
+                key: (score, current_time >= stale_at)
+                for key, (score, stale_at) in self._get_many_decoded(keys).items()
+            }
+            self.logger.debug(f"[REDIS_MGET] {len(results)}/{len(keys)} hits (with staleness)")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"[REDIS_ERROR] MGET failed for {len(keys)} keys: {e}")
+            return {}
+    
+    def set_many(self, values: Dict[str, float], ttl: int, soft_ttl: Optional[int] = None) -> None:
+        """Store several scores with pipelined SETEX commands."""
+        if not values:
+            return
+        
+        try:
+            stale_at = time.time() + soft_ttl if soft_ttl is not None else None
+            pipe = self.redis.pipeline(transaction=False)
+            for key, value in values.items():
+                pipe.setex(self._make_key(key), ttl, self._encode(value, stale_at))
+            pipe.execute()
+            self.logger.debug(f"[REDIS_SET_MANY] {len(values)} entries (TTL: {ttl}s, soft TTL: {soft_ttl}s)")
+            
+        except Exception as e:
+            self.logger.error(f"[REDIS_ERROR] Pipelined set failed for {len(values)} keys: {e}")
+    
+    def delete_many(self, keys: List[str]) -> int:
+        """Remove several cached scores with a single DEL."""
+        if not keys:
+            return 0
+        
+        try:
+            deleted = self.redis.delete(*[self._make_key(key) for key in keys])
+            self.logger.debug(f"[REDIS_DEL_MANY] Deleted {deleted}/{len(keys)} entries")
+            return deleted
+            
+        except Exception as e:
+            self.logger.error(f"[REDIS_ERROR] Delete failed for {len(keys)} keys: {e}")
+            return 0
+    
+    def get_generations(self, keys: List[str]) -> Dict[str, int]:
+        """Read generation counters with a single MGET."""
+        if not keys:
+            return {}
+        
+        try:
+            values = self.redis.mget([self._make_key(key) for key in keys])
+            return {key: int(value) for key, value in zip(keys, values) if value is not None}
+            
+        except Exception as e:
+            self.logger.error(f"[REDIS_ERROR] Generation read failed for {len(keys)} keys: {e}")
+            return {}
+    
+    def bump_generation(self, key: str, ttl: int) -> int:
+        """
+        Atomically increment a generation counter (INCR + EXPIRE).
+        
+        Errors are raised rather than swallowed: a failed bump means the
+        invalidation did not happen, and the caller needs to know.
+        """
+        cache_key = self._make_key(key)
+        pipe = self.redis.pipeline()
+        pipe.incr(cache_key)
+        pipe.expire(cache_key, ttl)
+        generation, _ = pipe.execute()
+        
+        self.logger.debug(f"[REDIS_GENERATION] {key} → {generation}")
+        return int(generation)
+    
     def clear_pattern(self, pattern: str) -> int:
         """Clear Redis entries matching a pattern."""
         try:
@@ -273,6 +674,30 @@ class NullCacheProvider(BaseCacheProvider):
         """Do nothing (no caching)."""
         self.logger.debug(f"[NULL_CACHE] No-op delete: {key}")
     
+    def get_many(self, keys: List[str]) -> Dict[str, float]:
+        """Always return no hits."""
+        return {}
+    
+    def set_many(self, values: Dict[str, float], ttl: int, soft_ttl: Optional[int] = None) -> None:
+        """Do nothing (no caching)."""
+        pass
+    
+    def get_many_with_staleness(self, keys: List[str]) -> Dict[str, Tuple[float, bool]]:
+        """Always return no hits."""
+        return {}
+    
+    def delete_many(self, keys: List[str]) -> int:
+        """Do nothing (no caching)."""
+        return 0
+    
+    def get_generations(self, keys: List[str]) -> Dict[str, int]:
+        """Return no generations (no caching)."""
+        return {}
+    
+    def bump_generation(self, key: str, ttl: int) -> int:
+        """Do nothing (no caching)."""
+        return 0
+    
     def clear_pattern(self, pattern: str) -> int:
         """Do nothing (no caching)."""
         self.logger.debug(f"[NULL_CACHE] No-op clear: {pattern}")
@@ -346,6 +771,82 @@ class MultiTierCacheProvider(BaseCacheProvider):
         self.redis_cache.delete(key)
         self.logger.debug(f"[MULTI_TIER] Deleted both tiers: {key}")
     
+    def get_many(self, keys: List[str]) -> Dict[str, float]:
+        """Read the memory tier, then MGET only the remaining keys from Redis."""
+        results = self.memory_cache.get_many(keys)
+        
+        missing = [key for key in keys if key not in results]
+        if missing:
+            redis_hits = self._get_many_from_redis(missing)
+            results.update({key: score for key, (score, _) in redis_hits.items()})
+        
+        self.logger.debug(
+            f"[MULTI_TIER] get_many: {len(keys) - len(missing)} memory hits, "
+            f"{len(results) - (len(keys) - len(missing))} Redis hits, {len(keys) - len(results)} misses"
+        )
+        return results
+    
+    def get_many_with_staleness(self, keys: List[str]) -> Dict[str, Tuple[float, bool]]:
+        """Read the memory tier, then Redis for the rest, keeping each entry's staleness."""
+        results = self.memory_cache.get_many_with_staleness(keys)
+        
+        missing = [key for key in keys if key not in results]
+        if missing:
+            current_time = time.time()
+            for key, (score, stale_at) in self._get_many_from_redis(missing).items():
+                results[key] = (score, current_time >= stale_at)
+        
+        return results
+    
+    def _get_many_from_redis(self, keys: List[str]) -> Dict[str, Tuple[float, float]]:
+        """
+        MGET keys from Redis as (score, stale_at) and promote fresh hits to memory.
+        
+        Promoted entries keep their remaining soft TTL, so the memory tier
+        turns stale at the same moment as Redis. Stale hits are not promoted:
+        the next read goes back to Redis and sees the refreshed value.
+        """
+        try:
+            redis_hits = self.redis_cache._get_many_decoded(keys)
+        except Exception as e:
+            self.logger.error(f"[MULTI_TIER] Redis MGET failed for {len(keys)} keys: {e}")
+            return {}
+        
+        current_time = time.time()
+        promote_by_soft_ttl: Dict[Optional[int], Dict[str, float]] = {}
+        for key, (score, stale_at) in redis_hits.items():
+            if stale_at == math.inf:
+                promote_by_soft_ttl.setdefault(None, {})[key] = score
+            elif stale_at > current_time:
+                promote_by_soft_ttl.setdefault(math.ceil(stale_at - current_time), {})[key] = score
+        
+        # Promote to memory cache with shorter TTL
+        for soft_ttl, values in promote_by_soft_ttl.items():
+            self.memory_cache.set_many(values, 300, soft_ttl)  # 5 minutes in memory
+        
+        return redis_hits
+    
+    def set_many(self, values: Dict[str, float], ttl: int, soft_ttl: Optional[int] = None) -> None:
+        """Set in both tiers, one pipeline for Redis."""
+        self.redis_cache.set_many(values, ttl, soft_ttl)
+        self.memory_cache.set_many(values, min(ttl, 3600), soft_ttl)  # Max 1 hour in memory
+        self.logger.debug(f"[MULTI_TIER] Set {len(values)} entries in both tiers")
+    
+    def delete_many(self, keys: List[str]) -> int:
+        """Delete from both tiers."""
+        self.memory_cache.delete_many(keys)
+        deleted = self.redis_cache.delete_many(keys)
+        self.logger.debug(f"[MULTI_TIER] Deleted {len(keys)} keys from both tiers")
+        return deleted
+    
+    def get_generations(self, keys: List[str]) -> Dict[str, int]:
+        """Read generations from Redis, the tier shared by all workers."""
+        return self.redis_cache.get_generations(keys)
+    
+    def bump_generation(self, key: str, ttl: int) -> int:
+        """Bump the shared generation in Redis."""
+        return self.redis_cache.bump_generation(key, ttl)
+    
     def clear_pattern(self, pattern: str) -> int:
         """Clear from both tiers."""
         memory_cleared = self.memory_cache.clear_pattern(pattern)
@@ -368,12 +869,366 @@ class MultiTierCacheProvider(BaseCacheProvider):
         }
 
 
+class SharedMemoryCacheProvider(BaseCacheProvider):
+    """
+    Host-wide cache provider backed by a memory-mapped file.
+    
+    All worker processes on the host map the same file (by default under
+    /dev/shm) holding an open-addressing hash table of (key hash, score,
+    soft expiry, hard expiry) slots, so uvicorn workers share hits without
+    running Redis.
+    
+    The table is split into stripes, each with its own lock (an in-process
+    mutex plus an fcntl byte-range lock for other processes). Keys are
+    identified by a 64-bit BLAKE2 hash: the original key strings are not
+    stored, so clear_pattern cannot select entries and clears the whole
+    table for any pattern; scoped invalidation should use generation
+    counters or exact-key deletes. Probing is bounded; when a probe window
+    is full the entry closest to expiry is overwritten, like an LRU cache
+    dropping entries under pressure.
+    
+    Every attached process holds a shared lock on an "attached" byte. The
+    first process to attach when nobody else is (after a restart or deploy)
+    starts from an empty table instead of serving the previous run's scores.
+    """
+    
+    _MAGIC = b'ESCSHM02'
+    _HEADER = struct.Struct('<8sIII')  # magic, slot count, stripe count, reserved
+    _SLOT = struct.Struct('<Qddd')     # key hash, value, stale_at, expires_at
+    _HEADER_SIZE = 64
+    _EMPTY = 0       # Never used: lookups stop here
+    _TOMBSTONE = 1   # Deleted: lookups continue past it
+    PROBE_LIMIT = 16
+    _ATTACH_LOCK_OFFSET = 1 << 24  # Past every stripe lock byte
+    
+    # path -> providers attached in this process (fcntl locks are per process)
+    _attached: Dict[str, List['SharedMemoryCacheProvider']] = {}
+    _attached_lock = threading.Lock()
+    
+    def __init__(
+        self,
+        key_prefix: str = "email_score",
+        path: Optional[str] = None,
+        max_entries: int = 100000,
+        stripes: int = 64
+    ):
+        super().__init__(key_prefix)
+        if fcntl is None:
+            raise RuntimeError("Shared memory cache requires fcntl (POSIX)")
+        
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        self.path = path or self._default_path(key_prefix)
+        
+        # Keep the table at most ~70% full, with stripes of equal power-of-two size
+        stripe_slots = 1 << max(4, math.ceil(math.log2(max(1, max_entries) / 0.7 / stripes)))
+        requested_slots = stripe_slots * stripes
+        
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._attached_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 0)
+            try:
+                reset = not self._attached.get(self.path) and self._no_other_process_attached()
+                self.slots, self.stripes = self._attach_or_initialize(requested_slots, stripes, reset)
+                fcntl.lockf(self._fd, fcntl.LOCK_SH, 1, self._ATTACH_LOCK_OFFSET)
+                self._attached.setdefault(self.path, []).append(self)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 0)
+        
+        self.stripe_slots = self.slots // self.stripes
+        self._mmap = mmap.mmap(self._fd, self._HEADER_SIZE + self.slots * self._SLOT.size)
+        self._thread_locks = [threading.Lock() for _ in range(self.stripes)]
+        self._hits = 0
+        self._misses = 0
+        
+        self.logger.info(f"[SHM_CACHE] Attached {self.path} ({self.slots} slots, {self.stripes} stripes)")
+    
+    @staticmethod
+    def _default_path(key_prefix: str) -> str:
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        return os.path.join(directory, f"{key_prefix}.cache")
+    
+    def _no_other_process_attached(self) -> bool:
+        """Probe the attached byte: an exclusive lock is only granted if no other process holds it."""
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, self._ATTACH_LOCK_OFFSET)
+        except OSError:
+            return False
+        return True
+    
+    def _attach_or_initialize(self, slots: int, stripes: int, reset: bool = False) -> Tuple[int, int]:
+        """
+        Adopt an existing table layout or create a new one. Caller holds the init lock.
+        
+        With reset, an existing table is emptied (keeping its layout) since no
+        other process is using it.
+        """
+        header = os.pread(self._fd, self._HEADER.size, 0)
+        if len(header) == self._HEADER.size:
+            magic, existing_slots, existing_stripes, _ = self._HEADER.unpack(header)
+            expected_size = self._HEADER_SIZE + existing_slots * self._SLOT.size
+            if magic == self._MAGIC and os.fstat(self._fd).st_size == expected_size:
+                if reset:
+                    self.logger.info(f"[SHM_CACHE] No other process attached to {self.path}, starting empty")
+                    os.ftruncate(self._fd, self._HEADER_SIZE)
+                    os.ftruncate(self._fd, expected_size)
+                return existing_slots, existing_stripes
+        
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, self._HEADER_SIZE + slots * self._SLOT.size)  # Zero-filled = all empty
+        os.pwrite(self._fd, self._HEADER.pack(self._MAGIC, slots, stripes, 0), 0)
+        return slots, stripes
+    
+    def _hash(self, key: str) -> int:
+        """Stable 64-bit hash of the prefixed key, avoiding the reserved markers."""
+        digest = hashlib.blake2b(self._make_key(key).encode(), digest_size=8).digest()
+        return max(int.from_bytes(digest, 'little'), self._TOMBSTONE + 1)
+    
+    def _locate(self, key_hash: int) -> Tuple[int, int]:
+        """Return (stripe, home slot index) for a key hash."""
+        stripe = key_hash % self.stripes
+        home = (key_hash // self.stripes) % self.stripe_slots
+        return stripe, home
+    
+    def _slot_offset(self, stripe: int, index: int) -> int:
+        return self._HEADER_SIZE + (stripe * self.stripe_slots + index) * self._SLOT.size
+    
+    @contextmanager
+    def _stripe_lock(self, stripe: int):
+        """Hold a stripe exclusively across threads and processes."""
+        with self._thread_locks[stripe]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 1 + stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 1 + stripe)
+    
+    def _probe(self, key_hash: int, stripe: int, home: int) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Find a key's slot and the best slot to write it to. Caller holds the stripe lock.
+        
+        Returns:
+            (offset holding the key or None, offset to reuse for an insert)
+        """
+        current_time = time.time()
+        reusable = None
+        victim, victim_expiry = None, None
+        
+        for step in range(self.PROBE_LIMIT):
+            offset = self._slot_offset(stripe, (home + step) % self.stripe_slots)
+            slot_hash, _, _, expires_at = self._SLOT.unpack_from(self._mmap, offset)
+            
+            if slot_hash == key_hash:
+                return offset, offset
+            if slot_hash == self._EMPTY:
+                return None, reusable if reusable is not None else offset
+            if reusable is None and (slot_hash == self._TOMBSTONE or expires_at <= current_time):
+                reusable = offset
+            if victim_expiry is None or expires_at < victim_expiry:
+                victim, victim_expiry = offset, expires_at
+        
+        return None, reusable if reusable is not None else victim
+    
+    def _read_unlocked(
+        self,
+        key_hash: int,
+        stripe: int,
+        home: int,
+        current_time: float
+    ) -> Optional[Tuple[float, float]]:
+        """Read a live entry as (value, stale_at), dropping it if expired. Caller holds the stripe lock."""
+        offset, _ = self._probe(key_hash, stripe, home)
+        if offset is None:
+            return None
+        _, value, stale_at, expires_at = self._SLOT.unpack_from(self._mmap, offset)
+        if expires_at <= current_time:
+            self._SLOT.pack_into(self._mmap, offset, self._TOMBSTONE, 0.0, 0.0, 0.0)
+            return None
+        return value, stale_at
+    
+    def _write_unlocked(
+        self,
+        key_hash: int,
+        stripe: int,
+        home: int,
+        value: float,
+        stale_at: float,
+        expires_at: float
+    ) -> None:
+        """Insert or overwrite an entry. Caller holds the stripe lock."""
+        _, target = self._probe(key_hash, stripe, home)
+        self._SLOT.pack_into(self._mmap, target, key_hash, float(value), stale_at, expires_at)
+    
+    def _remove_unlocked(self, key_hash: int, stripe: int, home: int) -> bool:
+        """Tombstone an entry. Caller holds the stripe lock."""
+        offset, _ = self._probe(key_hash, stripe, home)
+        if offset is None:
+            return False
+        self._SLOT.pack_into(self._mmap, offset, self._TOMBSTONE, 0.0, 0.0, 0.0)
+        return True
+    
+    def _group_by_stripe(self, keys) -> Dict[int, List[Tuple[str, int, int]]]:
+        """Group keys by stripe so bulk operations take each stripe lock once."""
+        groups: Dict[int, List[Tuple[str, int, int]]] = {}
+        for key in keys:
+            key_hash = self._hash(key)
+            stripe, home = self._locate(key_hash)
+            groups.setdefault(stripe, []).append((key, key_hash, home))
+        return groups
+    
+    def get(self, key: str) -> Optional[float]:
+        """Retrieve a cached score from the shared table."""
+        score = self.get_many([key]).get(key)
+        
+        if score is None:
+            self.logger.debug(f"[SHM_MISS] Key not found or expired: {key}")
+        else:
+            self.logger.debug(f"[SHM_HIT] {key}: {score}")
+        return score
+    
+    def set(self, key: str, value: float, ttl: int) -> None:
+        """Store a score in the shared table with TTL."""
+        self.set_many({key: value}, ttl)
+    
+    def delete(self, key: str) -> None:
+        """Remove a cached score from the shared table."""
+        if self.delete_many([key]):
+            self.logger.debug(f"[SHM_DEL] Deleted: {key}")
+    
+    def get_many(self, keys: List[str]) -> Dict[str, float]:
+        """Retrieve several scores, taking each stripe lock once."""
+        results = {key: value for key, (value, _) in self._read_many(keys).items()}
+        self.logger.debug(f"[SHM_GET_MANY] {len(results)}/{len(keys)} hits")
+        return results
+    
+    def get_many_with_staleness(self, keys: List[str]) -> Dict[str, Tuple[float, bool]]:
+        """Retrieve several scores and their staleness, taking each stripe lock once."""
+        current_time = time.time()
+        return {
+            key: (value, current_time >= stale_at)
+            for key, (value, stale_at) in self._read_many(keys).items()
+        }
+    
+    def _read_many(self, keys: List[str]) -> Dict[str, Tuple[float, float]]:
+        """Read several live entries as (value, stale_at), updating the hit counters."""
+        results = {}
+        current_time = time.time()
+        
+        for stripe, entries in self._group_by_stripe(keys).items():
+            with self._stripe_lock(stripe):
+                for key, key_hash, home in entries:
+                    entry = self._read_unlocked(key_hash, stripe, home, current_time)
+                    if entry is not None:
+                        results[key] = entry
+        
+        self._hits += len(results)
+        self._misses += len(keys) - len(results)
+        return results
+    
+    def set_many(self, values: Dict[str, float], ttl: int, soft_ttl: Optional[int] = None) -> None:
+        """Store several scores with the same TTL, taking each stripe lock once."""
+        current_time = time.time()
+        expires_at = current_time + ttl
+        stale_at = min(current_time + soft_ttl, expires_at) if soft_ttl is not None else expires_at
+        
+        for stripe, entries in self._group_by_stripe(values).items():
+            with self._stripe_lock(stripe):
+                for key, key_hash, home in entries:
+                    self._write_unlocked(key_hash, stripe, home, values[key], stale_at, expires_at)
+        
+        self.logger.debug(f"[SHM_SET_MANY] {len(values)} entries (TTL: {ttl}s, soft TTL: {soft_ttl}s)")
+    
+    def delete_many(self, keys: List[str]) -> int:
+        """Remove several scores, taking each stripe lock once."""
+        deleted = 0
+        for stripe, entries in self._group_by_stripe(keys).items():
+            with self._stripe_lock(stripe):
+                deleted += sum(1 for _, key_hash, home in entries if self._remove_unlocked(key_hash, stripe, home))
+        
+        self.logger.debug(f"[SHM_DEL_MANY] Deleted {deleted}/{len(keys)} entries")
+        return deleted
+    
+    def get_generations(self, keys: List[str]) -> Dict[str, int]:
+        """Read generation counters stored as table entries."""
+        return {key: int(value) for key, value in self.get_many(keys).items()}
+    
+    def bump_generation(self, key: str, ttl: int) -> int:
+        """Increment a generation counter atomically under its stripe lock."""
+        key_hash = self._hash(key)
+        stripe, home = self._locate(key_hash)
+        
+        with self._stripe_lock(stripe):
+            offset, target = self._probe(key_hash, stripe, home)
+            generation = 1
+            if offset is not None:
+                _, value, _, expires_at = self._SLOT.unpack_from(self._mmap, offset)
+                if expires_at > time.time():
+                    generation = int(value) + 1
+            expires_at = time.time() + ttl
+            self._SLOT.pack_into(self._mmap, target, key_hash, float(generation), expires_at, expires_at)
+        
+        self.logger.debug(f"[SHM_GENERATION] {key} → {generation}")
+        return generation
+    
+    def clear_pattern(self, pattern: str) -> int:
+        """
+        Clear entries matching a pattern.
+        
+        Key strings are not stored, so entries cannot be matched against the
+        pattern; any pattern clears the whole table. That drops unrelated
+        entries too, but never leaves a matching entry behind.
+        """
+        if pattern != "*":
+            self.logger.debug(f"[SHM_CACHE] Clearing the whole table for pattern '{pattern}'")
+        
+        cleared = 0
+        empty_stripe = bytes(self.stripe_slots * self._SLOT.size)
+        for stripe in range(self.stripes):
+            with self._stripe_lock(stripe):
+                start = self._slot_offset(stripe, 0)
+                end = start + len(empty_stripe)
+                cleared += sum(
+                    1 for (slot_hash, _, _, _) in self._SLOT.iter_unpack(self._mmap[start:end])
+                    if slot_hash > self._TOMBSTONE
+                )
+                self._mmap[start:end] = empty_stripe
+        
+        self.logger.debug(f"[SHM_CLEAR] Cleared {cleared} entries")
+        return cleared
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics for the shared table (per-process hit counters)."""
+        total_requests = self._hits + self._misses
+        return {
+            'cache_type': 'shared_memory',
+            'path': self.path,
+            'slots': self.slots,
+            'stripes': self.stripes,
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / total_requests * 100, 2) if total_requests else 0.0,
+            'memory_usage_bytes': len(self._mmap)
+        }
+    
+    def close(self) -> None:
+        """Unmap the table (the file stays for other workers)."""
+        with self._attached_lock:
+            providers = self._attached.get(self.path, [])
+            if self in providers:
+                providers.remove(self)
+            self._mmap.close()
+            os.close(self._fd)  # Releases every fcntl lock this process holds on the file
+            if providers:
+                fcntl.lockf(providers[0]._fd, fcntl.LOCK_SH, 1, self._ATTACH_LOCK_OFFSET)
+            else:
+                self._attached.pop(self.path, None)
+
+
 def create_cache_provider(cache_type: str, **kwargs) -> BaseCacheProvider:
     """
     Factory function to create the appropriate cache provider.
     
     Args:
-        cache_type: Type of cache ('memory', 'redis', 'null', 'multi_tier')
+        cache_type: Type of cache ('memory', 'shared_memory', 'redis', 'null', 'multi_tier')
         **kwargs: Additional arguments for cache provider construction
     
     Returns:
@@ -381,6 +1236,8 @@ def create_cache_provider(cache_type: str, **kwargs) -> BaseCacheProvider:
     """
     if cache_type == 'memory':
         return InMemoryCacheProvider(**kwargs)
+    elif cache_type == 'shared_memory':
+        return SharedMemoryCacheProvider(**kwargs)
     elif cache_type == 'redis':
         return RedisCacheProvider(**kwargs)
     elif cache_type == 'null':
@@ -0,0 +1,462 @@
+"""
+Scoring Strategy Comparison
+
+Tools for deciding whether a different scoring strategy is worth switching to:
+
+- StrategyComparison scores a whole mailbox with several strategies in
+  parallel worker processes and reports, per strategy, throughput and
+  latency, plus how often each candidate puts emails in the same flow bucket
+  as the baseline strategy.
+- ShadowScorer samples live scoring requests and re-scores them with a
+  candidate strategy on a background thread, off the request path, tracking
+  the same agreement statistics against the scores actually served.
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+from app.scoring.config import ScoringConfig
+from app.scoring.debugger import ScoreSketch
+from app.scoring.monitor import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+BUCKET_NAMES = ('now', 'later', 'reference')
+STRATEGY_TYPES = ('enhanced', 'simple', 'category')
+
+# Scoring engines of a comparison worker process, by strategy type (see _init_worker)
+_worker_engines: Dict[str, Any] = {}
+
+
+def bucket_indexes(scores: Any, config: ScoringConfig) -> np.ndarray:
+    """Flow bucket of each score as an index into BUCKET_NAMES."""
+    scores = np.asarray(scores, dtype=np.float64)
+    return np.where(
+        scores >= config.BUCKET_NOW_THRESHOLD, 0,
+        np.where(scores >= config.BUCKET_LATER_THRESHOLD, 1, 2)
+    )
+
+
+class AgreementStats:
+    """
+    How a candidate strategy's scores compare with a baseline's for the same emails.
+    
+    Keeps a bucket confusion matrix (baseline bucket x candidate bucket) and a
+    sketch of absolute score differences; both merge across workers.
+    """
+    
+    def __init__(self):
+        self.confusion = np.zeros((len(BUCKET_NAMES), len(BUCKET_NAMES)), dtype=np.int64)
+        self.differences = ScoreSketch()
+    
+    def add(self, baseline_scores: Any, candidate_scores: Any, config: ScoringConfig) -> None:
+        """Record aligned score arrays; pairs where either side failed (NaN) are skipped."""
+        baseline = np.asarray(baseline_scores, dtype=np.float64)
+        candidate = np.asarray(candidate_scores, dtype=np.float64)
+        valid = np.isfinite(baseline) & np.isfinite(candidate)
+        baseline, candidate = baseline[valid], candidate[valid]
+        if not len(baseline):
+            return
+        
+        np.add.at(self.confusion, (bucket_indexes(baseline, config), bucket_indexes(candidate, config)), 1)
+        self.differences.add(np.abs(candidate - baseline))
+    
+    def merge(self, other: "AgreementStats") -> None:
+        self.confusion += other.confusion
+        self.differences.merge(other.differences)
+    
+    @property
+    def total(self) -> int:
+        return int(self.confusion.sum())
+    
+    def summary(self) -> Dict[str, Any]:
+        total = self.total
+        agreeing = int(np.trace(self.confusion))
+        result = {
+            'emails': total,
+            'bucket_agreement_percent': round(agreeing / total * 100, 2) if total else 0.0,
+            'bucket_changes': total - agreeing,
+            'confusion': {
+                baseline: {candidate: int(self.confusion[i, j]) for j, candidate in enumerate(BUCKET_NAMES)}
+                for i, baseline in enumerate(BUCKET_NAMES)
+            }
+        }
+        if total:
+            result['score_difference'] = {
+                'mean': round(self.differences.mean, 2),
+                'p50': round(self.differences.quantile(0.5), 2),
+                'p95': round(self.differences.quantile(0.95), 2),
+                'max': round(self.differences.max, 2)
+            }
+        return result
+
+
+def _init_worker(config: ScoringConfig, strategy_types: Sequence[str]) -> None:
+    """Pool initializer: build one cache-less engine per strategy once per process."""
+    from app.scoring.engine import ScoringEngineFactory
+    
+    _worker_engines.clear()
+    for strategy_type in strategy_types:
+        _worker_engines[strategy_type] = ScoringEngineFactory.create_engine(
+            config, strategy_type=strategy_type, cache_type="null"
+        )
+
+
+def _score_chunk(
+    rows: List[Dict[str, Any]],
+    current_time: datetime,
+    latency_samples: int
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Score a chunk of email rows with every strategy of this worker.
+    
+    The first latency_samples emails are scored one at a time to measure
+    single-email latency (before the batch, so they are not measured against
+    memo caches the batch has warmed); then the whole chunk goes through the
+    batch path, timed as one batch.
+    
+    Returns:
+        Per strategy: 'scores' (aligned with rows, NaN for failures),
+        'batch_ms' and 'single_ms' (list of per-email timings)
+    """
+    emails = [SimpleNamespace(**row) for row in rows]
+    results = {}
+    
+    for strategy_type, engine in _worker_engines.items():
+        scores = np.full(len(emails), np.nan)
+        
+        single_ms = []
+        for email in emails[:latency_samples]:
+            start = time.perf_counter()
+            try:
+                engine.calculate_fresh_score(email, current_time)
+            except Exception:
+                continue
+            single_ms.append((time.perf_counter() - start) * 1000)
+        
+        start = time.perf_counter()
+        base_scores = engine.calculate_base_scores(emails)
+        valid = [i for i, base_score in enumerate(base_scores) if base_score is not None]
+        if valid:
+            scores[valid] = engine.apply_dynamic_components_batch(
+                [emails[i] for i in valid], [base_scores[i] for i in valid], current_time
+            )
+        batch_ms = (time.perf_counter() - start) * 1000
+        
+        results[strategy_type] = {'scores': scores, 'batch_ms': batch_ms, 'single_ms': single_ms}
+    
+    return results
+
+
+class _StrategyTotals:
+    """Throughput and latency accumulators of one strategy."""
+    
+    def __init__(self, max_latency_ms: float):
+        self.emails = 0
+        self.failed = 0
+        self.scoring_ms = 0.0
+        self.batch_latency = LatencyHistogram(max_value=max_latency_ms, stripes=1)
+        self.single_latency = LatencyHistogram(max_value=max_latency_ms, stripes=1)
+        self.scores = ScoreSketch()
+        self.buckets = np.zeros(len(BUCKET_NAMES), dtype=np.int64)
+    
+    def add(self, result: Dict[str, Any], config: ScoringConfig) -> None:
+        scores = result['scores']
+        finite = scores[np.isfinite(scores)]
+        self.emails += len(scores)
+        self.failed += len(scores) - len(finite)
+        self.scoring_ms += result['batch_ms']
+        self.batch_latency.record(result['batch_ms'])
+        for duration_ms in result['single_ms']:
+            self.single_latency.record(duration_ms)
+        self.scores.add(finite)
+        self.buckets += np.bincount(bucket_indexes(finite, config), minlength=len(BUCKET_NAMES))
+    
+    def summary(self) -> Dict[str, Any]:
+        scored = self.scores.count
+        result = {
+            'emails': self.emails,
+            'failed': self.failed,
+            'scoring_seconds': round(self.scoring_ms / 1000, 3),
+            # Per worker process: CPU spent in this strategy only
+            'emails_per_second': round(self.emails / (self.scoring_ms / 1000), 1) if self.scoring_ms > 0 else 0.0,
+            'batch_latency_ms': self.batch_latency.snapshot().summary(),
+            'single_email_latency_ms': self.single_latency.snapshot().summary()
+        }
+        if scored:
+            result['scores'] = {
+                'mean': round(self.scores.mean, 2),
+                'p50': round(self.scores.quantile(0.5), 2),
+                'p95': round(self.scores.quantile(0.95), 2)
+            }
+            result['buckets'] = {name: int(count) for name, count in zip(BUCKET_NAMES, self.buckets)}
+        return result
+
+
+class StrategyComparison:
+    """
+    Score the same emails with several strategies and compare cost and outcome.
+    
+    Chunks of email rows are scored in a process pool (spawned, so it is safe
+    to run next to open database connections); every worker scores each chunk
+    it receives with all strategies, so their results line up email by email.
+    Memory stays bounded by the number of chunks in flight.
+    """
+    
+    def __init__(
+        self,
+        config: ScoringConfig,
+        strategy_types: Sequence[str] = STRATEGY_TYPES,
+        baseline: Optional[str] = None,
+        workers: Optional[int] = None,
+        latency_samples_per_chunk: int = 20
+    ):
+        unknown = [name for name in strategy_types if name not in STRATEGY_TYPES]
+        if unknown or not strategy_types:
+            raise ValueError(f"Unknown strategy types: {unknown or 'none given'}")
+        
+        self.config = config
+        self.strategy_types = list(dict.fromkeys(strategy_types))
+        self.baseline = baseline or self.strategy_types[0]
+        if self.baseline not in self.strategy_types:
+            raise ValueError(f"Baseline {self.baseline} is not among the compared strategies")
+        self.workers = workers or os.cpu_count() or 1
+        self.latency_samples_per_chunk = latency_samples_per_chunk
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+    
+    def run(
+        self,
+        row_chunks: Iterable[List[Dict[str, Any]]],
+        current_time: Optional[datetime] = None,
+        progress_callback: Optional[Callable[[int], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Compare the strategies over a stream of email row chunks.
+        
+        Args:
+            row_chunks: Lists of email column dicts (picklable, e.g. from
+                app.services.score_rescoring.stream_user_emails)
+            current_time: Scoring timestamp (defaults to now, UTC)
+            progress_callback: Called with the number of emails compared so far
+                after every chunk
+        
+        Returns:
+            Per-strategy throughput/latency/score summaries and, for every
+            candidate, bucket agreement with the baseline
+        """
+        current_time = current_time or datetime.now(timezone.utc)
+        totals = {name: _StrategyTotals(self.config.PERFORMANCE_HISTOGRAM_MAX_MS) for name in self.strategy_types}
+        agreement = {name: AgreementStats() for name in self.strategy_types if name != self.baseline}
+        chunks = 0
+        started = time.perf_counter()
+        
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.config, self.strategy_types)
+        )
+        with pool:
+            in_flight = set()
+            chunk_iter = iter(row_chunks)
+            exhausted = False
+            
+            while in_flight or not exhausted:
+                while not exhausted and len(in_flight) < 2 * self.workers:
+                    rows = next(chunk_iter, None)
+                    if rows is None:
+                        exhausted = True
+                    elif rows:
+                        in_flight.add(pool.submit(_score_chunk, rows, current_time, self.latency_samples_per_chunk))
+                
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results = future.result()
+                    for name, result in results.items():
+                        totals[name].add(result, self.config)
+                    for name, stats in agreement.items():
+                        stats.add(results[self.baseline]['scores'], results[name]['scores'], self.config)
+                    chunks += 1
+                    if progress_callback:
+                        progress_callback(totals[self.baseline].emails)
+        
+        elapsed = time.perf_counter() - started
+        emails = totals[self.baseline].emails
+        self.logger.info(
+            f"[STRATEGY_COMPARISON] Compared {len(self.strategy_types)} strategies on {emails} emails "
+            f"with {self.workers} workers in {elapsed:.2f}s"
+        )
+        
+        return {
+            'emails': emails,
+            'chunks': chunks,
+            'workers': self.workers,
+            'elapsed_seconds': round(elapsed, 2),
+            'baseline': self.baseline,
+            'strategies': {name: totals[name].summary() for name in self.strategy_types},
+            'agreement': {name: stats.summary() for name, stats in agreement.items()}
+        }
+
+
+class ShadowScorer:
+    """
+    Re-score a sample of live requests with a candidate engine, off the request path.
+    
+    submit() is called by the serving engine after it has produced its scores;
+    it samples emails at sample_rate and hands them to a single background
+    thread through a bounded queue. When the queue is full samples are
+    dropped rather than slowing the request down.
+    """
+    
+    def __init__(
+        self,
+        candidate_engine: Any,
+        config: ScoringConfig,
+        sample_rate: float = 0.01,
+        max_pending: int = 1000,
+        name: Optional[str] = None
+    ):
+        self.candidate_engine = candidate_engine
+        self.config = config
+        self.sample_rate = sample_rate
+        self.name = name or type(candidate_engine.scoring_strategy).__name__
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._agreement = AgreementStats()
+        self._latency = LatencyHistogram(max_value=config.PERFORMANCE_HISTOGRAM_MAX_MS, stripes=1)
+        self._sampled = 0
+        self._dropped = 0
+        self._errors = 0
+    
+    def submit(
+        self,
+        emails: List[Any],
+        scores: Dict[str, float],
+        current_time: datetime,
+        detach: Callable[[Any], Any] = lambda email: email
+    ) -> int:
+        """
+        Sample emails of a served request for shadow scoring.
+        
+        Args:
+            emails: Emails that were scored
+            scores: Served scores by email id
+            current_time: Timestamp the served scores were computed for
+            detach: Copies an email into an object safe to read from another
+                thread (ORM instances must not cross threads)
+        
+        Returns:
+            Number of emails queued
+        """
+        if self.sample_rate <= 0 or not emails:
+            return 0
+        
+        sampled = [email for email in emails if random.random() < self.sample_rate]
+        if not sampled:
+            return 0
+        
+        items = []
+        for email in sampled:
+            served = scores.get(str(email.id))
+            if served is not None:
+                items.append((detach(email), served))
+        if not items:
+            return 0
+        
+        try:
+            self._queue.put_nowait((items, current_time))
+        except queue.Full:
+            with self._lock:
+                self._dropped += len(items)
+            return 0
+        
+        self._ensure_thread()
+        return len(items)
+    
+    def drain(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued sample has been scored (for tests and shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'candidate': self.name,
+                'sample_rate': self.sample_rate,
+                'sampled': self._sampled,
+                'dropped': self._dropped,
+                'errors': self._errors,
+                'pending': self._queue.qsize(),
+                'candidate_latency_ms': self._latency.snapshot().summary(),
+                'agreement': self._agreement.summary()
+            }
+    
+    def reset(self) -> None:
+        with self._lock:
+            self._agreement = AgreementStats()
+            self._latency.reset()
+            self._sampled = self._dropped = self._errors = 0
+    
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="scoring-shadow", daemon=True)
+                self._thread.start()
+    
+    def _run(self) -> None:
+        while True:
+            items, current_time = self._queue.get()
+            try:
+                self._score(items, current_time)
+            except Exception as e:
+                with self._lock:
+                    self._errors += len(items)
+                self.logger.error(f"[SHADOW_SCORING] Candidate {self.name} failed on {len(items)} emails: {e}")
+            finally:
+                self._queue.task_done()
+    
+    def _score(self, items: List[Any], current_time: datetime) -> None:
+        emails = [email for email, _ in items]
+        served = [score for _, score in items]
+        
+        candidate = np.full(len(emails), np.nan)
+        durations = []
+        errors = 0
+        for i, email in enumerate(emails):
+            start = time.perf_counter()
+            try:
+                candidate[i] = self.candidate_engine.calculate_fresh_score(email, current_time)
+            except Exception as e:
+                errors += 1
+                self.logger.debug(f"[SHADOW_SCORING] Candidate {self.name} failed for {email.id}: {e}")
+                continue
+            durations.append((time.perf_counter() - start) * 1000)
+        
+        agreement = AgreementStats()
+        agreement.add(served, candidate, self.config)
+        with self._lock:
+            self._agreement.merge(agreement)
+            for duration_ms in durations:
+                self._latency.record(duration_ms)
+            self._sampled += len(emails)
+            self._errors += errors
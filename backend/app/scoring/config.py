@@ -6,10 +6,12 @@ Provides environment-specific configurations with sensible defaults.
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, Callable
+from typing import Dict, Callable, Optional
 from enum import Enum
 import os
 
+from app.scoring.decay import DecaySpec
+
 
 class Environment(Enum):
     DEVELOPMENT = "development"
@@ -62,15 +64,39 @@ class ScoringConfig:
         'default': 3600 * 24       # 24 hours default
     })
     
-    # Temporal decay functions - mathematical formulas for performance
-    TEMPORAL_DECAY_FUNCTIONS: Dict[str, Callable[[float], float]] = field(default_factory=lambda: {
-        'promotions': lambda h: max(0.1, 1.0 * (0.8 ** (h / 12))),      # Aggressive decay: 20% every 12h
-        'newsletters': lambda h: max(0.2, 1.0 * (0.9 ** (h / 24))),     # Medium decay: 10% per day
-        'important': lambda h: max(0.5, 1.0 * (0.98 ** (h / 24))),      # Slow decay: 2% per day, floor 50%
-        'social': lambda h: max(0.3, 1.0 * (0.85 ** (h / 18))),         # Medium-fast decay: 15% every 18h
-        'archive': lambda h: max(0.2, 1.0 * (0.95 ** (h / 168))),       # Very slow: 5% per week
-        'trash': lambda h: 0.1,                                          # Constant low relevance
-        'default': lambda h: max(0.3, 1.0 * (0.95 ** (h / 24)))         # Standard: 5% per day
+    # What the engine caches: 'score' caches final scores with CACHE_TTL_MAP TTLs,
+    # 'components' caches only base scores and re-applies decay/context on read
+    CACHE_MODE: str = 'score'
+    BASE_SCORE_CACHE_TTL: int = 3600 * 24 * 7  # 1 week (base scores don't decay)
+    
+    # Per-user (optionally per-category) generation counters in cache keys, so a
+    # scope is invalidated by bumping one counter instead of scanning keys
+    CACHE_GENERATIONS: bool = False
+    CACHE_CATEGORY_GENERATIONS: bool = False
+    CACHE_GENERATION_TTL: int = 3600 * 24 * 30  # Must outlive every score/base TTL
+    
+    # Coalesce concurrent cache misses for the same key into one calculation
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_TIMEOUT_SECONDS: float = 10.0  # Waiters give up and calculate themselves
+    
+    # Stale-while-revalidate for cached final scores ('score' mode): after the soft TTL
+    # (CACHE_SOFT_TTL_RATIO × category TTL) a score is still served but refreshed in the
+    # background; after the hard TTL it is recalculated on the request path
+    STALE_WHILE_REVALIDATE: bool = True
+    CACHE_SOFT_TTL_RATIO: float = 0.75
+    STALE_REFRESH_WORKERS: int = 2
+    STALE_REFRESH_MAX_PENDING: int = 5000  # Stale keys beyond this wait for a later read
+    
+    # Temporal decay specs (base, half-life hours, floor) - declarative so they can be
+    # evaluated per email, over NumPy arrays, or in SQL, and pickled to worker processes
+    TEMPORAL_DECAY_SPECS: Dict[str, DecaySpec] = field(default_factory=lambda: {
+        'promotions': DecaySpec.from_retention(0.8, 12, floor=0.1),     # Aggressive decay: 20% every 12h
+        'newsletters': DecaySpec.from_retention(0.9, 24, floor=0.2),    # Medium decay: 10% per day
+        'important': DecaySpec.from_retention(0.98, 24, floor=0.5),     # Slow decay: 2% per day, floor 50%
+        'social': DecaySpec.from_retention(0.85, 18, floor=0.3),        # Medium-fast decay: 15% every 18h
+        'archive': DecaySpec.from_retention(0.95, 168, floor=0.2),      # Very slow: 5% per week
+        'trash': DecaySpec.constant(0.1),                               # Constant low relevance
+        'default': DecaySpec.from_retention(0.95, 24, floor=0.3)        # Standard: 5% per day
     })
     
     # Logging configuration
@@ -81,15 +107,86 @@ class ScoringConfig:
     # Performance tuning
     BATCH_SIZE_SCORE_UPDATES: int = 1000
     MAX_CACHE_ENTRIES: int = 100000
+    
+    # Whole-tenant rescoring (app.services.score_rescoring / update_scores.py)
+    RESCORE_WORKERS: Optional[int] = None  # Scoring processes; defaults to the CPU count
+    RESCORE_BATCH_SIZE: int = 2000
+    RESCORE_PER_USER_PARALLELISM: int = 2  # Max batches of one user in flight at once
+    
+    # Bulk score writes (app.services.score_persistence): rows whose score moved less than
+    # the epsilon (without crossing a bucket boundary) are not rewritten
+    SCORE_WRITE_EPSILON: float = 0.5
+    SCORE_WRITE_CHUNK_SIZE: int = 1000
+    
+    # Emails per chunk streamed through distribution/anomaly analysis
+    ANALYSIS_STREAM_CHUNK_SIZE: int = 5000
+    
+    # Local cache used when Redis is unavailable: 'memory' keeps a private cache per
+    # process, 'shared_memory' shares one table between all workers on the host
+    # (it cannot clear by pattern, so any pattern invalidation empties the table)
+    LOCAL_CACHE_BACKEND: str = 'memory'
+    SHARED_MEMORY_CACHE_PATH: Optional[str] = None  # Defaults to /dev/shm/<key prefix>.cache
     SCORE_CALCULATION_TIMEOUT_MS: int = 100
     
+    # Flow bucket boundaries and the bucket refresh scheduler
+    BUCKET_NOW_THRESHOLD: float = 60.0
+    BUCKET_LATER_THRESHOLD: float = 30.0
+    BUCKET_REFRESH_HORIZON_HOURS: int = 168     # Re-check at least weekly
+    BUCKET_REFRESH_INTERVAL_SECONDS: int = 300  # How often the scheduler polls for due emails
+    BUCKET_REFRESH_BATCH_SIZE: int = 500
+    # Compute live scores in Postgres (stored base score + SQL decay/context) for bucket
+    # membership, ordering and pagination instead of re-sorting pages in Python
+    SQL_FRESH_SCORE_BUCKETS: bool = False
+    
+    # Columnar (NumPy) batch scoring for strategies that support it
+    VECTORIZED_BATCH_SCORING: bool = True
+    VECTORIZED_BATCH_MIN_SIZE: int = 32
+    
+    # Memoized per-subject keyword signals and per-sender authority (entries per table)
+    TEXT_FEATURE_CACHE_SIZE: int = 10000
+    
+    # Sender history from the sender_profiles table (app.services.sender_profiles):
+    # open/reply rates raise and trash rate lowers the base score of senders with
+    # at least SENDER_PROFILE_MIN_EMAILS emails (address profile first, then domain).
+    # Opt-in: profile cache misses load with their own session. The SQL fresh-score
+    # path sees history only through attention_base_score as of the last rescoring.
+    SENDER_PROFILE_FEATURES: bool = False
+    SENDER_PROFILE_MIN_EMAILS: int = 5
+    SENDER_PROFILE_CACHE_SIZE: int = 50000  # Profiles held in the per-process LRU
+    SENDER_PROFILE_CACHE_TTL_SECONDS: float = 300.0  # How stale another worker's updates may look
+    SENDER_OPEN_RATE_WEIGHT: float = 4.0     # ±points for always/never opened
+    SENDER_REPLY_RATE_BOOST: float = 6.0     # +points for always replied
+    SENDER_TRASH_RATE_PENALTY: float = 8.0   # -points for always trashed
+    
+    # Latency histograms (ScoringPerformanceMonitor): values above the max land in the top bucket
+    PERFORMANCE_HISTOGRAM_MAX_MS: float = 60000.0
+    PERFORMANCE_MONITOR_STRIPES: int = 8
+    
+    # Fleet-wide metrics: each worker publishes its counters/histograms to a shared
+    # directory (tmpfs by default) that any worker can merge. Opt-in: it only
+    # makes sense with several workers per host
+    METRICS_AGGREGATION_ENABLED: bool = False
+    METRICS_SEGMENT_PATH: Optional[str] = None  # Defaults to /dev/shm/email_scoring_metrics
+    METRICS_PUBLISH_INTERVAL_SECONDS: float = 5.0
+    METRICS_WORKER_STALE_SECONDS: float = 60.0  # Ignore workers that stopped publishing
+    
+    # Shadow scoring: re-score a sample of served emails with a candidate strategy
+    # ('enhanced', 'simple' or 'category') on a background thread and track agreement
+    SHADOW_STRATEGY: Optional[str] = None
+    SHADOW_SAMPLE_RATE: float = 0.01
+    SHADOW_MAX_PENDING: int = 1000  # Queued sample batches; further samples are dropped
+    
     def get_cache_ttl(self, category: str) -> int:
         """Get cache TTL for a specific email category."""
         return self.CACHE_TTL_MAP.get(category.lower(), self.CACHE_TTL_MAP['default'])
     
+    def get_temporal_decay_spec(self, category: str) -> DecaySpec:
+        """Get temporal decay spec for a specific email category."""
+        return self.TEMPORAL_DECAY_SPECS.get(category.lower(), self.TEMPORAL_DECAY_SPECS['default'])
+    
     def get_temporal_decay_function(self, category: str) -> Callable[[float], float]:
-        """Get temporal decay function for a specific email category."""
-        return self.TEMPORAL_DECAY_FUNCTIONS.get(category.lower(), self.TEMPORAL_DECAY_FUNCTIONS['default'])
+        """Get temporal decay function (age hours -> multiplier) for a specific email category."""
+        return self.get_temporal_decay_spec(category)
     
     def get_base_score(self, category: str) -> float:
         """Get base score for a specific email category."""
@@ -144,6 +241,16 @@ class TestingScoringConfig(ScoringConfig):
     # Small batch sizes
     BATCH_SIZE_SCORE_UPDATES: int = 5
     MAX_CACHE_ENTRIES: int = 100
+    
+    # Keep test caches private to the process
+    LOCAL_CACHE_BACKEND: str = 'memory'
+    
+    # No background refresh or publisher threads in tests
+    STALE_WHILE_REVALIDATE: bool = False
+    METRICS_AGGREGATION_ENABLED: bool = False
+    
+    # Scores must not depend on database state in unit tests
+    SENDER_PROFILE_FEATURES: bool = False
 
 
 @dataclass
@@ -162,6 +269,11 @@ class ProductionScoringConfig(ScoringConfig):
         'default': 3600 * 48       # 48 hours default
     })
     
+    # Cache base scores only so cached scores never go stale
+    CACHE_MODE: str = 'components'
+    BASE_SCORE_CACHE_TTL: int = 3600 * 24 * 14  # 2 weeks
+    CACHE_GENERATIONS: bool = True
+    
     # Reduced logging for performance
     LOG_SCORE_CALCULATIONS: bool = False
     LOG_CACHE_OPERATIONS: bool = False
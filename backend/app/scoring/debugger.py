@@ -6,16 +6,21 @@ email scoring system. It helps developers understand scoring decisions and
 optimize the system performance.
 """
 
+import heapq
+import itertools
 import json
+import math
 import statistics
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
 from collections import defaultdict, Counter
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import numpy as np
 from app.models.email import Email
 from app.scoring.engine import EmailScoringEngine
 from app.scoring.config import ScoringConfig
 from app.scoring.interfaces import ScoringStrategy
+from app.utils.email_utils import email_sender
 
 
 @dataclass
@@ -46,6 +51,168 @@ class ScoreDistributionAnalysis:
     score_ranges: Dict[str, int]
 
 
+# Score ranges reported by distribution analyses (the last range includes 100)
+SCORE_RANGE_EDGES = (0, 20, 40, 60, 80, 100)
+
+
+class ScoreSketch:
+    """
+    Mergeable summary of a score distribution with flat memory.
+    
+    Raw scores are kept while a group is small, so its statistics are exact.
+    Past EXACT_LIMIT they are folded into a fixed histogram of BIN_WIDTH-wide
+    bins over [0, 100], and percentiles are interpolated inside a bin. Count,
+    mean, standard deviation, min and max are always exact (moments are
+    merged with Chan's parallel update).
+    """
+    
+    EXACT_LIMIT = 1024
+    BIN_WIDTH = 0.1
+    BINS = int(round(100 / BIN_WIDTH)) + 1
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._values: List[np.ndarray] = []
+        self._histogram: Optional[np.ndarray] = None
+    
+    def add(self, scores: Any) -> None:
+        """Add an array of scores."""
+        scores = np.asarray(scores, dtype=np.float64)
+        if not scores.size:
+            return
+        
+        mean = float(scores.mean())
+        self._merge_moments(scores.size, mean, float(((scores - mean) ** 2).sum()))
+        self.min = min(self.min, float(scores.min()))
+        self.max = max(self.max, float(scores.max()))
+        
+        if self._histogram is None:
+            self._values.append(scores)
+            if self.count > self.EXACT_LIMIT:
+                self._fold_values()
+        else:
+            self._histogram += self._bin_counts(scores)
+    
+    def merge(self, other: "ScoreSketch") -> None:
+        """Add another sketch (e.g. from another chunk or worker) into this one."""
+        if not other.count:
+            return
+        
+        self._merge_moments(other.count, other.mean, other.m2)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        
+        if self._histogram is None and other._histogram is None:
+            self._values.extend(other._values)
+            if self.count > self.EXACT_LIMIT:
+                self._fold_values()
+            return
+        
+        if self._histogram is None:
+            self._fold_values()
+        if other._histogram is not None:
+            self._histogram += other._histogram
+        for values in other._values:
+            self._histogram += self._bin_counts(values)
+    
+    @property
+    def exact(self) -> bool:
+        return self._histogram is None
+    
+    @property
+    def std_dev(self) -> float:
+        """Sample standard deviation (as statistics.stdev)."""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+    
+    def quantile(self, q: float) -> float:
+        """Score at quantile q, interpolating linearly between ranks."""
+        if not self.count:
+            return 0.0
+        if self.exact:
+            return float(np.percentile(np.concatenate(self._values), q * 100))
+        
+        position = q * (self.count - 1)
+        cumulative = np.cumsum(self._histogram)
+        index = int(np.searchsorted(cumulative, position, side='right'))
+        index = min(index, self.BINS - 1)
+        before = cumulative[index - 1] if index else 0
+        fraction = (position - before + 0.5) / self._histogram[index]
+        value = (index - 0.5 + min(fraction, 1.0)) * self.BIN_WIDTH
+        return min(max(value, self.min), self.max)
+    
+    def range_counts(self) -> Dict[str, int]:
+        """Counts per SCORE_RANGE_EDGES range."""
+        ranges = list(zip(SCORE_RANGE_EDGES[:-1], SCORE_RANGE_EDGES[1:]))
+        if self.exact:
+            scores = np.concatenate(self._values) if self._values else np.empty(0)
+            counts = [
+                int(((scores >= low) & ((scores < high) if high < 100 else (scores <= high))).sum())
+                for low, high in ranges
+            ]
+        else:
+            counts = [
+                int(self._histogram[self._bin(low):self._bin(high) + (1 if high == 100 else 0)].sum())
+                for low, high in ranges
+            ]
+        return {f"{low}-{high}": count for (low, high), count in zip(ranges, counts)}
+    
+    def count_outside(self, centre: float, distance: float) -> int:
+        """Number of scores further than distance from centre (bin centres once folded)."""
+        if self.exact:
+            scores = np.concatenate(self._values) if self._values else np.empty(0)
+            return int((np.abs(scores - centre) > distance).sum())
+        centres = np.arange(self.BINS) * self.BIN_WIDTH
+        return int(self._histogram[np.abs(centres - centre) > distance].sum())
+    
+    def to_analysis(self, group_key: str) -> "ScoreDistributionAnalysis":
+        return ScoreDistributionAnalysis(
+            category=group_key,
+            count=self.count,
+            mean=round(self.mean, 2),
+            median=round(self.quantile(0.5), 2),
+            std_dev=round(self.std_dev, 2),
+            min_score=round(self.min, 2),
+            max_score=round(self.max, 2),
+            percentiles={f"p{p}": round(self.quantile(p / 100), 2) for p in (25, 50, 75, 90, 95, 99)},
+            score_ranges=self.range_counts()
+        )
+    
+    def _merge_moments(self, count: int, mean: float, m2: float) -> None:
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+    
+    def _bin(self, score: float) -> int:
+        return int(round(score / self.BIN_WIDTH))
+    
+    def _bin_counts(self, scores: np.ndarray) -> np.ndarray:
+        # Bins are centred on multiples of BIN_WIDTH, matching scores rounded to 0.1
+        indexes = np.clip(np.rint(scores / self.BIN_WIDTH), 0, self.BINS - 1).astype(np.int64)
+        return np.bincount(indexes, minlength=self.BINS)
+    
+    def _fold_values(self) -> None:
+        self._histogram = np.zeros(self.BINS, dtype=np.int64)
+        for values in self._values:
+            self._histogram += self._bin_counts(values)
+        self._values = []
+
+
+@dataclass
+class ScoreStreamSummary:
+    """Single-pass summary of scores: per-group sketches plus the most extreme emails."""
+    groups: Dict[str, ScoreSketch] = field(default_factory=dict)
+    overall: ScoreSketch = field(default_factory=ScoreSketch)
+    highest: List[Tuple[float, int, Any]] = field(default_factory=list)   # Min-heap of the top scores
+    lowest: List[Tuple[float, int, Any]] = field(default_factory=list)    # Min-heap of negated bottom scores
+    errors: int = 0
+
+
 class EmailScoringDebugger:
     """
     Comprehensive debugger for the email scoring system.
@@ -82,13 +249,14 @@ class EmailScoringDebugger:
         gmail_id = getattr(email, 'gmail_id', 'unknown')
         
         # Check if score is cached
-        cached_score = self.engine._get_cached_score(email_id, current_time)
+        cached_score = self.engine.peek_cached_score(email, current_time)
         cache_hit = cached_score is not None
         
         # Calculate each component separately for detailed analysis
         base_score = self.engine.scoring_strategy.calculate_base_score(email)
         
-        age_hours = (current_time - email.received_at).total_seconds() / 3600 if email.received_at else 0
+        # Same age (and naive-as-UTC timezone handling) the engine uses
+        age_hours = float(self.engine.age_hours_array([email], current_time)[0])
         temporal_multiplier = self.engine.scoring_strategy.calculate_temporal_multiplier(email, age_hours)
         
         context_boost = self.engine.scoring_strategy.calculate_context_boost(email, current_time)
@@ -152,62 +320,103 @@ class EmailScoringDebugger:
         if not emails:
             return {}
         
-        # Calculate scores for all emails
-        scores_data = []
-        for email in emails:
-            try:
-                score = self.engine.get_current_score(email)
-                group_key = self._get_group_key(email, group_by)
-                scores_data.append((group_key, score))
-            except Exception as e:
-                self.logger.error(f"Error calculating score for email {email.id}: {e}")
-                continue
+        summary = self.summarize_scores([emails], group_by)
+        return self._distribution_from_summary(summary)
+    
+    def summarize_scores(
+        self,
+        email_chunks: Iterable[Sequence[Email]],
+        group_by: str = 'category',
+        current_time: Optional[datetime] = None,
+        extremes: int = 0
+    ) -> ScoreStreamSummary:
+        """
+        Score a stream of email chunks in one pass with flat memory.
         
-        # Group scores by the specified field
-        grouped_scores = defaultdict(list)
-        for group_key, score in scores_data:
-            grouped_scores[group_key].append(score)
+        Each chunk is scored fresh with the engine's batch (vectorized) path,
+        bypassing the score cache so analyses neither read stale entries nor
+        flood it, and folded into per-group ScoreSketches; only the `extremes`
+        highest and lowest scoring emails are retained.
         
-        # Calculate statistics for each group
-        analyses = {}
-        for group_key, scores in grouped_scores.items():
-            if not scores:
-                continue
+        Args:
+            email_chunks: Iterable of email lists (e.g. batches from a server-side cursor)
+            group_by: Field to group by ('category', 'sender_domain', 'read_status')
+            current_time: Scoring timestamp (defaults to now)
+            extremes: Emails to keep at each end of the distribution
             
-            # Calculate percentiles
-            percentiles = {
-                'p25': self._percentile(scores, 25),
-                'p50': self._percentile(scores, 50),
-                'p75': self._percentile(scores, 75),
-                'p90': self._percentile(scores, 90),
-                'p95': self._percentile(scores, 95),
-                'p99': self._percentile(scores, 99)
-            }
+        Returns:
+            ScoreStreamSummary for the whole stream
+        """
+        current_time = current_time or datetime.now(timezone.utc)
+        summary = ScoreStreamSummary()
+        sequence = itertools.count()
+        
+        for chunk in email_chunks:
+            if not chunk:
+                continue
+            try:
+                emails, scores = self._score_chunk(list(chunk), current_time)
+            except Exception as e:
+                self.logger.error(f"Error scoring chunk of {len(chunk)} emails: {e}")
+                summary.errors += len(chunk)
+                continue
             
-            # Calculate score ranges
-            score_ranges = {
-                '0-20': sum(1 for s in scores if 0 <= s < 20),
-                '20-40': sum(1 for s in scores if 20 <= s < 40),
-                '40-60': sum(1 for s in scores if 40 <= s < 60),
-                '60-80': sum(1 for s in scores if 60 <= s < 80),
-                '80-100': sum(1 for s in scores if 80 <= s <= 100)
-            }
+            summary.errors += len(chunk) - len(emails)
+            if not emails:
+                continue
             
-            analysis = ScoreDistributionAnalysis(
-                category=group_key,
-                count=len(scores),
-                mean=round(statistics.mean(scores), 2),
-                median=round(statistics.median(scores), 2),
-                std_dev=round(statistics.stdev(scores), 2) if len(scores) > 1 else 0.0,
-                min_score=round(min(scores), 2),
-                max_score=round(max(scores), 2),
-                percentiles=percentiles,
-                score_ranges=score_ranges
-            )
+            group_indexes: Dict[str, List[int]] = defaultdict(list)
+            for index, email in enumerate(emails):
+                group_indexes[self._get_group_key(email, group_by)].append(index)
+            for group_key, indexes in group_indexes.items():
+                summary.groups.setdefault(group_key, ScoreSketch()).add(scores[indexes])
+            summary.overall.add(scores)
             
-            analyses[group_key] = analysis
+            if extremes:
+                self._keep_extremes(summary.highest, scores, emails, extremes, sequence)
+                self._keep_extremes(summary.lowest, -scores, emails, extremes, sequence)
         
-        return analyses
+        return summary
+    
+    def _score_chunk(self, emails: List[Email], current_time: datetime) -> Tuple[List[Email], np.ndarray]:
+        """Score a chunk without the cache; emails whose base score failed are dropped."""
+        base_scores = self.engine.calculate_base_scores(emails)
+        scorable = [(email, base) for email, base in zip(emails, base_scores) if base is not None]
+        emails = [email for email, _ in scorable]
+        if not emails:
+            return [], np.empty(0)
+        
+        scores = self.engine.apply_dynamic_components_batch(emails, [base for _, base in scorable], current_time)
+        return emails, np.asarray(scores, dtype=np.float64)
+    
+    def analyze_score_stream(
+        self,
+        email_chunks: Iterable[Sequence[Email]],
+        group_by: str = 'category',
+        threshold_std_devs: float = 2.0,
+        max_anomalies: int = 50,
+        current_time: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Distribution and anomaly analysis over a stream of email chunks.
+        
+        Memory stays flat in the number of emails: groups are summarized by
+        sketches and at most max_anomalies emails are kept at each end of the
+        distribution (anomalies beyond those are counted, not returned).
+        
+        Returns:
+            {'total_emails', 'errors', 'distribution', 'anomalies', 'anomaly_count'}
+        """
+        summary = self.summarize_scores(email_chunks, group_by, current_time, extremes=max_anomalies)
+        anomalies = self._anomalies_from_summary(summary, threshold_std_devs)
+        
+        return {
+            'total_emails': summary.overall.count,
+            'errors': summary.errors,
+            'distribution': self._distribution_from_summary(summary),
+            'anomalies': anomalies,
+            'anomaly_count': self._count_beyond_threshold(summary.overall, threshold_std_devs, len(anomalies))
+        }
     
     def compare_scoring_strategies(
         self, 
@@ -223,8 +432,11 @@ class EmailScoringDebugger:
             
         Returns:
             Comparison results showing scores from each strategy
+            
+        For whole mailboxes (throughput, latency, bucket agreement) see
+        app.scoring.comparison.StrategyComparison.
         """
-        current_time = datetime.now()
+        current_time = datetime.now(timezone.utc)
         results = {}
         
         for strategy_name, strategy in strategies:
@@ -232,7 +444,7 @@ class EmailScoringDebugger:
                 # Calculate components using this strategy
                 base_score = strategy.calculate_base_score(email)
                 
-                age_hours = (current_time - email.received_at).total_seconds() / 3600 if email.received_at else 0
+                age_hours = float(self.engine.age_hours_array([email], current_time)[0])
                 temporal_multiplier = strategy.calculate_temporal_multiplier(email, age_hours)
                 
                 context_boost = strategy.calculate_context_boost(email, current_time)
@@ -281,8 +493,8 @@ class EmailScoringDebugger:
         time_points = [0, 1, 6, 12, 24, 48, 72, 168]  # hours
         time_points = [h for h in time_points if h <= max_hours]
         
-        # Get decay function for this category
-        decay_function = self.config.get_temporal_decay_function(category)
+        # Get decay spec for this category
+        decay_function = self.config.get_temporal_decay_spec(category)
         
         # Calculate multipliers for each time point
         decay_data = []
@@ -306,7 +518,12 @@ class EmailScoringDebugger:
             'final_multiplier': final_multiplier,
             'total_decay_percent': round((1 - final_multiplier / initial_multiplier) * 100, 1),
             'half_life_hours': half_life_hours,
-            'half_life_days': round(half_life_hours / 24, 2) if half_life_hours else None
+            'half_life_days': round(half_life_hours / 24, 2) if half_life_hours else None,
+            'decay_spec': {
+                'base': decay_function.base,
+                'half_life_hours': decay_function.half_life_hours,
+                'floor': decay_function.floor
+            }
         }
     
     def identify_scoring_anomalies(
@@ -327,30 +544,33 @@ class EmailScoringDebugger:
         if len(emails) < 10:  # Need enough data for meaningful statistics
             return []
         
-        # Calculate scores for all emails
-        scores = []
-        email_score_map = {}
-        
-        for email in emails:
-            try:
-                score = self.engine.get_current_score(email)
-                scores.append(score)
-                email_score_map[str(email.id)] = (email, score)
-            except Exception as e:
-                self.logger.error(f"Error calculating score for anomaly detection: {e}")
-                continue
-        
-        if len(scores) < 10:
+        summary = self.summarize_scores([emails], extremes=len(emails))
+        return self._anomalies_from_summary(summary, threshold_std_devs)
+    
+    def _distribution_from_summary(self, summary: ScoreStreamSummary) -> Dict[str, ScoreDistributionAnalysis]:
+        return {group_key: sketch.to_analysis(group_key) for group_key, sketch in summary.groups.items()}
+    
+    def _anomalies_from_summary(
+        self,
+        summary: ScoreStreamSummary,
+        threshold_std_devs: float
+    ) -> List[Dict[str, Any]]:
+        """Anomalies among the retained extremes, most anomalous first."""
+        if summary.overall.count < 10:
             return []
         
-        # Calculate statistics
-        mean_score = statistics.mean(scores)
-        std_dev = statistics.stdev(scores)
+        mean_score = summary.overall.mean
+        std_dev = summary.overall.std_dev
         threshold = threshold_std_devs * std_dev
         
-        # Identify anomalies
+        candidates = {}
+        for score, _, email in summary.highest:
+            candidates[str(email.id)] = (email, score)
+        for negated_score, _, email in summary.lowest:
+            candidates[str(email.id)] = (email, -negated_score)
+        
         anomalies = []
-        for email_id, (email, score) in email_score_map.items():
+        for email_id, (email, score) in candidates.items():
             deviation = abs(score - mean_score)
             
             if deviation > threshold:
@@ -380,6 +600,34 @@ class EmailScoringDebugger:
         
         return anomalies
     
+    @staticmethod
+    def _keep_extremes(
+        heap: List[Tuple[float, int, Any]],
+        keys: np.ndarray,
+        emails: Sequence[Email],
+        limit: int,
+        sequence: Iterable[int]
+    ) -> None:
+        """Merge a chunk into a bounded min-heap holding the `limit` largest keys."""
+        if keys.size > limit:
+            indexes = np.argpartition(keys, -limit)[-limit:]
+        else:
+            indexes = range(keys.size)
+        
+        for index in indexes:
+            entry = (float(keys[index]), next(sequence), emails[index])
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry[0] > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+    
+    @staticmethod
+    def _count_beyond_threshold(sketch: ScoreSketch, threshold_std_devs: float, returned: int) -> int:
+        """Number of anomalies in the whole stream (can exceed the number returned)."""
+        if sketch.count < 10:
+            return 0
+        return max(returned, sketch.count_outside(sketch.mean, threshold_std_devs * sketch.std_dev))
+    
     def generate_scoring_report(self, emails: List[Email]) -> Dict[str, Any]:
         """
         Generate a comprehensive scoring report for a list of emails.
@@ -402,8 +650,9 @@ class EmailScoringDebugger:
         }
         
         try:
-            # Score distribution analysis
-            report['score_distribution'] = self.analyze_score_distribution(emails, 'category')
+            # Score distribution and anomalies from a single scoring pass
+            summary = self.summarize_scores([emails], 'category', extremes=len(emails))
+            report['score_distribution'] = self._distribution_from_summary(summary)
             
             # Temporal decay analysis for major categories
             categories = set(email.category for email in emails if email.category)
@@ -413,7 +662,7 @@ class EmailScoringDebugger:
                     report['temporal_decay'][category] = self.analyze_temporal_decay(category)
             
             # Anomaly detection
-            report['anomalies'] = self.identify_scoring_anomalies(emails)
+            report['anomalies'] = self._anomalies_from_summary(summary, 2.0) if len(emails) >= 10 else []
             
             # Category performance
             report['category_performance'] = self._analyze_category_performance(emails)
@@ -432,29 +681,12 @@ class EmailScoringDebugger:
         if group_by == 'category':
             return email.category or 'uncategorized'
         elif group_by == 'sender_domain':
-            if email.from_email and '@' in email.from_email:
-                return email.from_email.split('@')[1].lower()
-            return 'unknown_domain'
+            return email_sender(email)[1] or 'unknown_domain'
         elif group_by == 'read_status':
             return 'read' if email.is_read else 'unread'
         else:
             return 'unknown'
     
-    def _percentile(self, scores: List[float], percentile: int) -> float:
-        """Calculate a percentile from a list of scores."""
-        if not scores:
-            return 0.0
-        
-        sorted_scores = sorted(scores)
-        index = (percentile / 100) * (len(sorted_scores) - 1)
-        
-        if index.is_integer():
-            return round(sorted_scores[int(index)], 2)
-        else:
-            lower = sorted_scores[int(index)]
-            upper = sorted_scores[int(index) + 1]
-            return round(lower + (upper - lower) * (index - int(index)), 2)
-    
     def _calculate_half_life(self, decay_function, max_hours: int) -> Optional[float]:
         """Calculate the half-life of a decay function."""
         initial_value = decay_function(0)
@@ -0,0 +1,100 @@
+"""
+Temporal Decay Specifications
+
+Declarative description of how email relevance fades with age. Each category
+gets a DecaySpec (base, half-life in hours, floor) instead of a lambda, so the
+same curve can be evaluated for a single email, for a NumPy array of ages, or
+inside a Postgres query, and configs stay picklable for process pools.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+from sqlalchemy import case, func, literal
+
+
+@dataclass(frozen=True)
+class DecaySpec:
+    """
+    Exponential decay curve: max(floor, base × 0.5^(age_hours / half_life_hours)).
+    
+    A half_life_hours of None means no decay (a constant multiplier of
+    max(floor, base)).
+    """
+    
+    base: float = 1.0
+    half_life_hours: Optional[float] = None
+    floor: float = 0.0
+    
+    @classmethod
+    def from_retention(cls, retention: float, period_hours: float, floor: float = 0.0, base: float = 1.0) -> "DecaySpec":
+        """
+        Build a spec from "keep `retention` of the value every `period_hours`".
+        
+        e.g. from_retention(0.8, 12) loses 20% every 12 hours.
+        """
+        half_life_hours = period_hours * math.log(0.5) / math.log(retention)
+        return cls(base=base, half_life_hours=half_life_hours, floor=floor)
+    
+    @classmethod
+    def constant(cls, value: float) -> "DecaySpec":
+        """Build a spec that never decays."""
+        return cls(base=value, half_life_hours=None, floor=value)
+    
+    def __call__(self, age_hours: float) -> float:
+        """Evaluate the multiplier for a single age (scalar Python)."""
+        if self.half_life_hours is None:
+            return max(self.floor, self.base)
+        return max(self.floor, self.base * 0.5 ** (age_hours / self.half_life_hours))
+    
+    def evaluate_array(self, age_hours: np.ndarray) -> np.ndarray:
+        """Evaluate the multiplier for an array of ages (NumPy)."""
+        age_hours = np.asarray(age_hours, dtype=np.float64)
+        if self.half_life_hours is None:
+            return np.full(age_hours.shape, max(self.floor, self.base), dtype=np.float64)
+        return np.maximum(self.floor, self.base * np.exp2(-age_hours / self.half_life_hours))
+    
+    def sql_expression(self, age_hours: Any) -> Any:
+        """
+        Build the multiplier as a SQL expression (Postgres GREATEST/POWER).
+        
+        Args:
+            age_hours: SQLAlchemy expression evaluating to the email age in hours
+        """
+        if self.half_life_hours is None:
+            return literal(max(self.floor, self.base))
+        return func.greatest(
+            self.floor,
+            self.base * func.power(0.5, age_hours / self.half_life_hours)
+        )
+
+
+def decay_sql_expression(
+    specs: Dict[str, DecaySpec],
+    category: Any,
+    age_hours: Any,
+    default_key: str = 'default'
+) -> Any:
+    """
+    Build a SQL CASE expression applying the per-category decay spec.
+    
+    Args:
+        specs: Category → DecaySpec mapping (must contain default_key)
+        category: SQLAlchemy expression for the lowercased email category
+        age_hours: SQLAlchemy expression for the email age in hours
+        default_key: Spec used for categories without their own entry
+    
+    Returns:
+        SQLAlchemy expression evaluating to the temporal multiplier
+    """
+    whens = [
+        (category == name, spec.sql_expression(age_hours))
+        for name, spec in specs.items()
+        if name != default_key
+    ]
+    default = specs[default_key].sql_expression(age_hours)
+    if not whens:
+        return default
+    return case(*whens, else_=default)
@@ -7,11 +7,26 @@ It provides a clean, dependency-injected interface for calculating email attenti
 
 import time
 import logging
-from datetime import datetime
-from typing import Optional, Dict, Any, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Optional, Dict, Any, List, Tuple, Callable
+import numpy as np
+from sqlalchemy import DateTime, case, func, inspect, literal
 from app.models.email import Email
 from app.scoring.config import ScoringConfig
 from app.scoring.interfaces import ScoringStrategy, CacheProvider
+from app.scoring.monitor import ScoringPerformanceMonitor, StripedCounter
+from app.scoring.singleflight import SingleFlight
+
+# Key namespace for cached base scores in the 'components' cache mode
+BASE_SCORE_KEY_PREFIX = "base"
+
+# Key namespaces for per-user (and per-category) generation counters
+USER_SCOPE_KEY_PREFIX = "u"
+GENERATION_KEY_PREFIX = "gen"
 
 
 class EmailScoringEngine:
@@ -37,11 +52,26 @@ class EmailScoringEngine:
         self.performance_monitor = performance_monitor
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
         
-        # Performance tracking
-        self._calculation_count = 0
-        self._cache_hits = 0
-        self._cache_misses = 0
-        self._total_calculation_time = 0.0
+        # Performance tracking (striped counters: safe under concurrent requests)
+        self._calculation_count = StripedCounter()
+        self._cache_hits = StripedCounter()
+        self._cache_misses = StripedCounter()
+        self._total_calculation_time = StripedCounter()
+        
+        # Concurrent cache misses for the same key share one calculation
+        self._single_flight = (
+            SingleFlight(config.SINGLE_FLIGHT_TIMEOUT_SECONDS) if config.SINGLE_FLIGHT_ENABLED else None
+        )
+        
+        # Background refresh of stale cached scores (stale-while-revalidate)
+        self._refresh_executor: Optional[ThreadPoolExecutor] = None
+        self._refresh_lock = threading.Lock()
+        self._refreshing: set = set()
+        self._stale_hits = StripedCounter()
+        self._background_refreshes = StripedCounter()
+        
+        # Optional candidate strategy fed a sample of served scores (see app.scoring.comparison)
+        self.shadow_scorer: Optional[Any] = None
     
     def get_current_score(
         self, 
@@ -72,29 +102,54 @@ class EmailScoringEngine:
         
         try:
             # 1. Try cache first (unless bypassed)
+            namespace = self._cache_namespaces([email])[0]
             if not bypass_cache:
-                cached_score = self._get_cached_score(email_id, current_time)
+                cached_score = self._peek_cached_score(email, current_time, namespace, revalidate=True)
                 if cached_score is not None:
                     self._record_cache_hit(email_id)
                     if self.config.LOG_PERFORMANCE_METRICS:
                         cache_lookup_time = (time.time() - start_time) * 1000
                         self.logger.debug(f"[SCORING_ENGINE] Cache hit for {email_id}: {cached_score:.1f} ({cache_lookup_time:.1f}ms)")
+                    self._submit_shadow([email], {email_id: cached_score}, current_time)
                     return cached_score
             
-            # 2. Cache miss - calculate fresh score
+            # 2. Cache miss - calculate fresh score and cache the result, unless a
+            # concurrent request is already calculating it (then share its result)
             self._record_cache_miss(email_id)
-            fresh_score = self._calculate_fresh_score(email, current_time)
+            calculated = False
             
-            # 3. Cache the result
-            self._cache_score(email_id, email.category, fresh_score)
+            if self._caches_components():
+                def calculate_base() -> float:
+                    nonlocal calculated
+                    calculated = True
+                    base_score = self.scoring_strategy.calculate_base_score(email)
+                    self._cache_base_score(email, base_score, namespace)
+                    return base_score
+                
+                base_score = self._coalesce(self._base_cache_key(email, namespace), calculate_base, bypass_cache)
+                fresh_score = self._apply_dynamic_components(email, base_score, current_time)
+            else:
+                score_key = self._score_cache_key(email, namespace)
+                
+                def calculate_score() -> float:
+                    nonlocal calculated
+                    calculated = True
+                    score = self.calculate_fresh_score(email, current_time)
+                    self._cache_score(score_key, email.category, score)
+                    return score
+                
+                fresh_score = self._coalesce(score_key, calculate_score, bypass_cache)
             
             # 4. Record performance metrics for actual calculations only
             calculation_time = (time.time() - start_time) * 1000
-            self._record_calculation_time(calculation_time, email.category)
+            if calculated:
+                self._record_calculation_time(calculation_time, email.category)
             
             if self.config.LOG_SCORE_CALCULATIONS:
-                self.logger.info(f"[SCORING_ENGINE] Calculated fresh score for {email_id}: {fresh_score:.1f} ({calculation_time:.1f}ms)")
+                source = "Calculated fresh" if calculated else "Shared in-flight"
+                self.logger.info(f"[SCORING_ENGINE] {source} score for {email_id}: {fresh_score:.1f} ({calculation_time:.1f}ms)")
             
+            self._submit_shadow([email], {email_id: fresh_score}, current_time)
             return fresh_score
             
         except Exception as e:
@@ -105,19 +160,22 @@ class EmailScoringEngine:
     def get_scores_batch(
         self, 
         emails: List[Email], 
-        current_time: Optional[datetime] = None
+        current_time: Optional[datetime] = None,
+        bypass_cache: bool = False
     ) -> Dict[str, float]:
         """
         Calculate scores for multiple emails efficiently.
         
         This method optimizes for batch operations by:
         - Checking cache for all emails first
-        - Calculating missing scores in batch
+        - Calculating missing scores in batch (columnar NumPy path when the
+          strategy supports it, see _calculate_fresh_scores_vectorized)
         - Caching results efficiently
         
         Args:
             emails: List of emails to score
             current_time: Current timestamp (defaults to now)
+            bypass_cache: If True, skip cache lookups and recalculate every score
             
         Returns:
             Dictionary mapping email IDs to scores
@@ -128,13 +186,61 @@ class EmailScoringEngine:
         if self.config.LOG_SCORE_CALCULATIONS:
             self.logger.info(f"[SCORING_ENGINE] Batch scoring {len(emails)} emails")
         
+        if self._caches_components():
+            results, calculated_count = self._score_batch_from_components(emails, current_time, bypass_cache)
+        else:
+            results, calculated_count = self._score_batch_from_final_scores(emails, current_time, bypass_cache)
+        
+        # 3. Log performance metrics
+        total_time = (time.time() - start_time) * 1000
+        cache_hit_rate = (len(emails) - calculated_count) / len(emails) * 100 if emails else 0.0
+        
+        if self.performance_monitor is not None and hasattr(self.performance_monitor, 'record_batch'):
+            self.performance_monitor.record_batch(len(emails), total_time)
+        
+        if self.config.LOG_PERFORMANCE_METRICS:
+            self.logger.info(
+                f"[SCORING_ENGINE] Batch complete: {len(emails)} emails, "
+                f"{calculated_count} calculated, "
+                f"{cache_hit_rate:.1f}% cache hit rate, "
+                f"{total_time:.1f}ms total"
+            )
+        
+        self._submit_shadow(emails, results, current_time)
+        return results
+    
+    def _score_batch_from_final_scores(
+        self,
+        emails: List[Email],
+        current_time: datetime,
+        bypass_cache: bool
+    ) -> Tuple[Dict[str, float], int]:
+        """
+        Batch scoring with the 'score' cache mode (final scores are cached).
+        
+        Returns:
+            Tuple of (email ID to score mapping, number of scores calculated)
+        """
         results = {}
         emails_to_calculate = []
         
-        # 1. Check cache for all emails
+        # 1. Check cache for all emails in one round-trip (unless bypassed)
+        cache_keys = {
+            str(email.id): self._score_cache_key(email, namespace)
+            for email, namespace in zip(emails, self._cache_namespaces(emails))
+        }
+        if bypass_cache:
+            cached_scores = {}
+        elif self._revalidates_stale_scores():
+            cached_scores = self._get_cached_scores_revalidating(
+                emails, [cache_keys[str(email.id)] for email in emails], current_time
+            )
+        else:
+            cached_scores = self._get_cached_scores(list(cache_keys.values()))
+        
         for email in emails:
             email_id = str(email.id)
-            cached_score = self._get_cached_score(email_id, current_time)
+            cached_score = cached_scores.get(cache_keys[email_id])
             
             if cached_score is not None:
                 results[email_id] = cached_score
@@ -143,48 +249,277 @@ class EmailScoringEngine:
                 emails_to_calculate.append(email)
                 self._record_cache_miss(email_id)
         
-        # 2. Calculate scores for cache misses
+        # 2. Calculate scores for cache misses, sharing keys already in flight
+        emails_by_key = {cache_keys[str(email.id)]: email for email in emails_to_calculate}
+        fresh_scores = self._coalesce_many(
+            list(emails_by_key),
+            lambda keys: self._calculate_and_cache_scores([emails_by_key[key] for key in keys], keys, current_time),
+            bypass_cache
+        )
+        
         for email in emails_to_calculate:
-            email_id = str(email.id)
+            score = fresh_scores.get(cache_keys[str(email.id)])
+            results[str(email.id)] = score if score is not None else 50.0  # Safe default
+        
+        return results, len(emails_to_calculate)
+    
+    def _calculate_and_cache_scores(
+        self,
+        emails: List[Email],
+        cache_keys: List[str],
+        current_time: datetime
+    ) -> Dict[str, float]:
+        """
+        Calculate final scores for a batch and cache them.
+        
+        Returns:
+            Mapping of cache key to score (failed emails get the safe default
+            and are not cached)
+        """
+        results = {}
+        fresh_scores = None
+        if self._use_vectorized_batch(len(emails)):
+            fresh_scores = self._calculate_fresh_scores_vectorized(emails, current_time)
+        
+        calculated = []
+        if fresh_scores is not None:
+            for email, cache_key, score in zip(emails, cache_keys, fresh_scores):
+                results[cache_key] = score
+                calculated.append((cache_key, email.category, score))
+        else:
+            for email, cache_key in zip(emails, cache_keys):
+                try:
+                    score = self.calculate_fresh_score(email, current_time)
+                    results[cache_key] = score
+                    calculated.append((cache_key, email.category, score))
+                    
+                except Exception as e:
+                    self.logger.error(f"[SCORING_ENGINE] Error in batch calculation for {email.id}: {e}")
+                    results[cache_key] = 50.0  # Safe default
+        
+        # Cache the results, one bulk write per TTL
+        self._cache_scores(calculated)
+        
+        return results
+    
+    def _score_batch_from_components(
+        self,
+        emails: List[Email],
+        current_time: datetime,
+        bypass_cache: bool
+    ) -> Tuple[Dict[str, float], int]:
+        """
+        Batch scoring with the 'components' cache mode.
+        
+        Only base scores are cached. Missing base scores are calculated (and
+        cached), then the temporal multiplier and context boost are applied to
+        every email at read time, so cached results are always exact.
+        
+        Returns:
+            Tuple of (email ID to score mapping, number of base scores calculated)
+        """
+        base_keys = self._base_cache_keys(emails, self._cache_namespaces(emails))
+        cached_bases = {} if bypass_cache else self._get_cached_scores(base_keys)
+        
+        base_scores: List[Optional[float]] = []
+        missing_indexes = []
+        for i, (email, base_key) in enumerate(zip(emails, base_keys)):
+            base_score = cached_bases.get(base_key)
+            base_scores.append(base_score)
+            
+            if base_score is not None:
+                self._record_cache_hit(str(email.id))
+            else:
+                missing_indexes.append(i)
+                self._record_cache_miss(str(email.id))
+        
+        # 1. Calculate and cache base scores for cache misses, sharing keys already in flight
+        if missing_indexes:
+            emails_by_key = {base_keys[i]: emails[i] for i in missing_indexes}
+            fresh_bases = self._coalesce_many(
+                list(emails_by_key),
+                lambda keys: self._calculate_and_cache_base_scores([emails_by_key[key] for key in keys], keys),
+                bypass_cache
+            )
+            for i in missing_indexes:
+                base_scores[i] = fresh_bases.get(base_keys[i])
+        
+        # 2. Apply time-dependent components to every email
+        scorable = [(email, base) for email, base in zip(emails, base_scores) if base is not None]
+        final_scores = self.apply_dynamic_components_batch(
+            [email for email, _ in scorable],
+            [base for _, base in scorable],
+            current_time
+        )
+        
+        results = {str(email.id): 50.0 for email in emails}  # Safe default for failures
+        for (email, _), score in zip(scorable, final_scores):
+            results[str(email.id)] = score
+        
+        return results, len(missing_indexes)
+    
+    def _calculate_and_cache_base_scores(self, emails: List[Email], base_keys: List[str]) -> Dict[str, Optional[float]]:
+        """
+        Calculate base scores for a batch and cache them.
+        
+        Returns:
+            Mapping of base cache key to base score (None when the calculation failed)
+        """
+        fresh_bases = dict(zip(base_keys, self.calculate_base_scores(emails)))
+        to_cache = {key: base_score for key, base_score in fresh_bases.items() if base_score is not None}
+        
+        if to_cache:
             try:
-                score = self._calculate_fresh_score(email, current_time)
-                results[email_id] = score
-                
-                # Cache the result
-                self._cache_score(email_id, email.category, score)
-                
+                self.cache.set_many(to_cache, self.config.BASE_SCORE_CACHE_TTL)
             except Exception as e:
-                self.logger.error(f"[SCORING_ENGINE] Error in batch calculation for {email_id}: {e}")
-                results[email_id] = 50.0  # Safe default
+                self.logger.error(f"[SCORING_ENGINE] Cache set_many error for {len(to_cache)} base scores: {e}")
         
-        # 3. Log performance metrics
-        total_time = (time.time() - start_time) * 1000
-        cache_hit_rate = (len(emails) - len(emails_to_calculate)) / len(emails) * 100
+        return fresh_bases
+    
+    def _coalesce(self, key: str, calculate: Callable[[], float], bypass_cache: bool) -> float:
+        """Run a calculation through the single-flight group (bypassed requests always calculate)."""
+        if self._single_flight is None or bypass_cache:
+            return calculate()
+        return self._single_flight.do(key, calculate)
+    
+    def _coalesce_many(
+        self,
+        keys: List[str],
+        calculate: Callable[[List[str]], Dict[str, Any]],
+        bypass_cache: bool
+    ) -> Dict[str, Any]:
+        """Batch variant of _coalesce: one calculate() call for the keys not already in flight."""
+        if not keys:
+            return {}
+        if self._single_flight is None or bypass_cache:
+            return calculate(keys)
+        return self._single_flight.do_many(keys, calculate)
+    
+    def get_base_scores_batch(self, emails: List[Email]) -> Dict[str, float]:
+        """
+        Calculate time-independent base scores for a batch of emails.
         
-        if self.config.LOG_PERFORMANCE_METRICS:
-            self.logger.info(
-                f"[SCORING_ENGINE] Batch complete: {len(emails)} emails, "
-                f"{len(emails_to_calculate)} calculated, "
-                f"{cache_hit_rate:.1f}% cache hit rate, "
-                f"{total_time:.1f}ms total"
-            )
+        Returns:
+            Dictionary mapping email IDs to base scores (failed emails are omitted)
+        """
+        base_scores = self.calculate_base_scores(emails)
+        return {
+            str(email.id): base_score
+            for email, base_score in zip(emails, base_scores)
+            if base_score is not None
+        }
+    
+    def fresh_score_sql(self, current_time: Optional[datetime] = None) -> Optional[Any]:
+        """
+        Build a SQL expression for the live score of Email rows.
         
-        return results
+        Uses Email.attention_base_score with the strategy's SQL decay/context
+        formula, clamped to 0-100 like the Python path. Rows without a stored
+        base score fall back to the stored attention_score. Sender history
+        enters only through the stored base score, as of the row's last
+        rescoring.
+        
+        Args:
+            current_time: Timestamp to score at (defaults to now, UTC)
+            
+        Returns:
+            SQLAlchemy expression, or None if the strategy can't be expressed in SQL
+        """
+        if not hasattr(type(self.scoring_strategy), 'calculate_dynamic_score_sql'):
+            return None
+        
+        current_time = current_time or datetime.now(timezone.utc)
+        if current_time.tzinfo is None:
+            current_time = current_time.replace(tzinfo=timezone.utc)
+        
+        now = literal(current_time, DateTime(timezone=True))
+        age_hours = func.extract('epoch', now - func.coalesce(Email.received_at, now)) / 3600.0
+        category = func.lower(func.coalesce(Email.category, 'primary'))
+        
+        raw_score = self.scoring_strategy.calculate_dynamic_score_sql(
+            Email.attention_base_score, category, Email.subject, age_hours, current_time
+        )
+        return case(
+            (Email.attention_base_score.is_(None), Email.attention_score),
+            else_=func.greatest(0.0, func.least(100.0, raw_score))
+        )
     
-    def invalidate_cache(self, email_ids: Optional[List[str]] = None, pattern: Optional[str] = None) -> int:
+    def peek_cached_score(self, email: Email, current_time: Optional[datetime] = None) -> Optional[float]:
+        """
+        Get the current score from cache without calculating anything.
+        
+        In 'components' mode the cached base score is combined with the
+        temporal multiplier and context boost for current_time.
+        
+        Returns:
+            Current score if derivable from cache, None on a cache miss
+        """
+        current_time = current_time or datetime.now()
+        return self._peek_cached_score(email, current_time, self._cache_namespaces([email])[0])
+    
+    def _peek_cached_score(
+        self,
+        email: Email,
+        current_time: datetime,
+        namespace: str,
+        revalidate: bool = False
+    ) -> Optional[float]:
+        """
+        peek_cached_score with the email's cache namespace already resolved.
+        
+        With revalidate=True, a stale cached score is still returned and a
+        background refresh is queued for it.
+        """
+        if not self._caches_components():
+            score_key = self._score_cache_key(email, namespace)
+            if revalidate and self._revalidates_stale_scores():
+                return self._get_cached_scores_revalidating([email], [score_key], current_time).get(score_key)
+            return self._get_cached_score(score_key, current_time)
+        
+        base_score = self._get_cached_score(self._base_cache_key(email, namespace), current_time)
+        if base_score is None:
+            return None
+        return self._apply_dynamic_components(email, base_score, current_time)
+    
+    def invalidate_cache(
+        self,
+        email_ids: Optional[List[str]] = None,
+        pattern: Optional[str] = None,
+        emails: Optional[List[Email]] = None
+    ) -> int:
         """
         Invalidate cached scores.
         
         Args:
-            email_ids: Specific email IDs to invalidate
+            email_ids: Specific email IDs to invalidate (un-namespaced keys only)
             pattern: Pattern to match for bulk invalidation
+            emails: Emails to invalidate; their exact keys (generation namespace
+                and base-score state suffix included) are deleted in one call
             
         Returns:
             Number of entries invalidated
+            
+        Raises:
+            ValueError: If email_ids are given while keys are namespaced
+                (CACHE_GENERATIONS or the 'components' cache mode); the keys
+                cannot be rebuilt from an id, so pass emails or use invalidate_user
         """
-        if email_ids:
-            for email_id in email_ids:
-                self.cache.delete(email_id)
+        if emails:
+            namespaces = self._cache_namespaces(emails)
+            keys = [self._score_cache_key(email, namespace) for email, namespace in zip(emails, namespaces)]
+            if self._caches_components():
+                keys.extend(self._base_cache_keys(emails, namespaces))
+            self.cache.delete_many(keys)
+            self.logger.info(f"[SCORING_ENGINE] Invalidated cache for {len(emails)} specific emails")
+            return len(emails)
+        
+        elif email_ids:
+            if self.config.CACHE_GENERATIONS or self._caches_components():
+                raise ValueError(
+                    "Namespaced cache keys cannot be invalidated by email id; "
+                    "pass emails= or use invalidate_user"
+                )
+            self.cache.delete_many([str(email_id) for email_id in email_ids])
             self.logger.info(f"[SCORING_ENGINE] Invalidated cache for {len(email_ids)} specific emails")
             return len(email_ids)
         
@@ -199,6 +534,38 @@ class EmailScoringEngine:
             self.logger.info(f"[SCORING_ENGINE] Invalidated {cleared} cache entries (full clear)")
             return cleared
     
+    def invalidate_user(self, user_id: Any, category: Optional[str] = None) -> int:
+        """
+        Invalidate every cached score of a user (or one of their categories).
+        
+        Bumps the scope's generation counter, which is O(1) regardless of cache
+        size; entries under the old generation are never read again and age
+        out through their TTL. Category scopes need CACHE_CATEGORY_GENERATIONS.
+        
+        Args:
+            user_id: Owner of the scores to invalidate
+            category: Restrict invalidation to one category (optional)
+            
+        Returns:
+            The new generation number (0 if CACHE_GENERATIONS is disabled, in
+            which case keys carry no user scope and the whole cache is cleared)
+        """
+        if not self.config.CACHE_GENERATIONS:
+            self.invalidate_cache()
+            return 0
+        
+        if category is not None and not self.config.CACHE_CATEGORY_GENERATIONS:
+            # Without category generations the user scope is the finest one
+            category = None
+        
+        generation = self.cache.bump_generation(
+            self._generation_key(user_id, category),
+            self.config.CACHE_GENERATION_TTL
+        )
+        scope = f"user {user_id}" + (f", category {category}" if category else "")
+        self.logger.info(f"[SCORING_ENGINE] Invalidated cache for {scope} (generation {generation})")
+        return generation
+    
     def get_performance_stats(self) -> Dict[str, Any]:
         """
         Get performance statistics for the scoring engine.
@@ -206,20 +573,47 @@ class EmailScoringEngine:
         Returns:
             Dictionary with performance metrics
         """
-        total_requests = self._cache_hits + self._cache_misses
-        cache_hit_rate = (self._cache_hits / total_requests * 100) if total_requests > 0 else 0
-        avg_calculation_time = (self._total_calculation_time / self._calculation_count) if self._calculation_count > 0 else 0
+        cache_hits = int(self._cache_hits.value)
+        cache_misses = int(self._cache_misses.value)
+        calculation_count = int(self._calculation_count.value)
+        total_calculation_time = self._total_calculation_time.value
+        
+        total_requests = cache_hits + cache_misses
+        cache_hit_rate = (cache_hits / total_requests * 100) if total_requests > 0 else 0
+        avg_calculation_time = (total_calculation_time / calculation_count) if calculation_count > 0 else 0
         
         stats = {
             'total_score_requests': total_requests,
-            'cache_hits': self._cache_hits,
-            'cache_misses': self._cache_misses,
+            'cache_hits': cache_hits,
+            'cache_misses': cache_misses,
             'cache_hit_rate_percent': round(cache_hit_rate, 2),
-            'calculations_performed': self._calculation_count,
+            'calculations_performed': calculation_count,
             'avg_calculation_time_ms': round(avg_calculation_time, 2),
-            'total_calculation_time_ms': round(self._total_calculation_time, 2)
+            'total_calculation_time_ms': round(total_calculation_time, 2)
         }
         
+        # Latency percentiles and batch distributions from the monitor
+        if self.performance_monitor is not None:
+            try:
+                stats['latency'] = self.performance_monitor.get_metrics_summary()
+            except Exception as e:
+                self.logger.error(f"[SCORING_ENGINE] Performance monitor summary failed: {e}")
+        
+        if self._single_flight is not None:
+            stats['single_flight'] = self._single_flight.get_stats()
+        
+        if self._revalidates_stale_scores():
+            with self._refresh_lock:
+                refresh_queue = len(self._refreshing)
+            stats['stale_while_revalidate'] = {
+                'stale_hits': int(self._stale_hits.value),
+                'background_refreshes': int(self._background_refreshes.value),
+                'refresh_queue': refresh_queue
+            }
+        
+        if self.shadow_scorer is not None:
+            stats['shadow'] = self.shadow_scorer.get_stats()
+        
         # Add cache provider stats if available
         try:
             cache_stats = self.cache.get_stats()
@@ -229,26 +623,66 @@ class EmailScoringEngine:
         
         return stats
     
+    def export_metrics_state(self) -> Dict[str, Any]:
+        """
+        Raw, mergeable counters and histograms of this engine.
+        
+        Unlike get_performance_stats (rounded, derived values), counters from
+        several workers can simply be summed; see app.scoring.metrics_segment.
+        """
+        counters = {
+            'calculations': self._calculation_count.value,
+            'calculation_time_ms': self._total_calculation_time.value,
+            'cache_hits': self._cache_hits.value,
+            'cache_misses': self._cache_misses.value,
+            'stale_hits': self._stale_hits.value,
+            'background_refreshes': self._background_refreshes.value
+        }
+        if self._single_flight is not None:
+            counters['calculations_saved'] = self._single_flight.get_stats()['calculations_saved']
+        
+        state: Dict[str, Any] = {'counters': counters}
+        if self.performance_monitor is not None and hasattr(self.performance_monitor, 'export_state'):
+            state['monitor'] = self.performance_monitor.export_state()
+        return state
+    
     def reset_performance_stats(self) -> None:
         """Reset all performance counters."""
-        self._calculation_count = 0
-        self._cache_hits = 0
-        self._cache_misses = 0
-        self._total_calculation_time = 0.0
+        for counter in (
+            self._calculation_count, self._cache_hits, self._cache_misses,
+            self._total_calculation_time, self._stale_hits, self._background_refreshes
+        ):
+            counter.reset()
+        if self._single_flight is not None:
+            self._single_flight.reset_stats()
+        if self.performance_monitor is not None and hasattr(self.performance_monitor, 'reset'):
+            self.performance_monitor.reset()
+        if self.shadow_scorer is not None:
+            self.shadow_scorer.reset()
         self.logger.info("[SCORING_ENGINE] Performance stats reset")
     
-    def _calculate_fresh_score(self, email: Email, current_time: datetime) -> float:
+    def calculate_fresh_score(self, email: Email, current_time: datetime) -> float:
         """
         Calculate a fresh score using the scoring strategy.
         
         This method breaks down the calculation into components for better
-        debugging and monitoring.
+        debugging and monitoring. Bypasses the cache and the performance
+        counters' per-request bookkeeping (see get_current_score for cached scoring).
         """
-        calculation_start = time.time()
-        
         # 1. Calculate base score (static component)
         base_score = self.scoring_strategy.calculate_base_score(email)
         
+        # 2-4. Apply time-dependent components
+        return self._apply_dynamic_components(email, base_score, current_time)
+    
+    def _apply_dynamic_components(self, email: Email, base_score: float, current_time: datetime) -> float:
+        """
+        Combine a base score with the temporal multiplier and context boost.
+        
+        This is the time-dependent half of the score. It is cheap to evaluate,
+        which is what lets the 'components' cache mode re-derive exact scores
+        from cached base scores on every read.
+        """
         # 2. Calculate temporal multiplier (dynamic component)
         if email.received_at:
             # Handle timezone-aware datetime comparison
@@ -293,6 +727,220 @@ class EmailScoringEngine:
         
         return final_score
     
+    def _caches_components(self) -> bool:
+        """Check whether the cache stores base scores instead of final scores."""
+        return self.config.CACHE_MODE == 'components'
+    
+    def _base_cache_key(self, email: Email, namespace: str = "", history_version: Optional[str] = None) -> str:
+        """
+        Build the cache key for an email's base score.
+        
+        The key includes the mutable inputs of the base score (category, read
+        state, IMPORTANT/STARRED labels and, with sender profiles, the sender
+        history version), so a state change reads a different key instead of
+        a stale base score.
+        """
+        if history_version is None:
+            history_version = self._sender_history_versions([email])[0]
+        labels = email.labels or []
+        label_flags = ('I' if 'IMPORTANT' in labels else '') + ('S' if 'STARRED' in labels else '')
+        category = (email.category or 'primary').lower()
+        key = f"{BASE_SCORE_KEY_PREFIX}:{namespace}{email.id}:{category}:{int(bool(email.is_read))}:{label_flags}"
+        return f"{key}:{history_version}" if history_version else key
+    
+    def _base_cache_keys(self, emails: List[Email], namespaces: List[str]) -> List[str]:
+        """Batch _base_cache_key: sender histories are looked up once for the batch."""
+        return [
+            self._base_cache_key(email, namespace, version)
+            for email, namespace, version in zip(emails, namespaces, self._sender_history_versions(emails))
+        ]
+    
+    def _sender_history_versions(self, emails: List[Email]) -> List[str]:
+        """Sender history version per email ('' when the strategy reads no sender history)."""
+        versions = getattr(self.scoring_strategy, 'sender_history_versions', None)
+        if versions is None:
+            return [''] * len(emails)
+        return versions(emails)
+    
+    def _score_cache_key(self, email: Email, namespace: str = "") -> str:
+        """Build the cache key for an email's final score."""
+        return f"{namespace}{email.id}"
+    
+    def _generation_key(self, user_id: Any, category: Optional[str] = None) -> str:
+        """Build the key of a user's (or a user's category's) generation counter."""
+        if category is None:
+            return f"{GENERATION_KEY_PREFIX}:{user_id}"
+        return f"{GENERATION_KEY_PREFIX}:{user_id}:{category.lower()}"
+    
+    def _cache_namespaces(self, emails: List[Email]) -> List[str]:
+        """
+        Resolve the cache key namespace of each email.
+        
+        With CACHE_GENERATIONS enabled, keys are prefixed with the owning
+        user's generation (and the category's, with CACHE_CATEGORY_GENERATIONS),
+        read for the whole batch in one round-trip. Bumping a generation makes
+        every key in that scope unreachable; the old entries age out via TTL.
+        """
+        if not self.config.CACHE_GENERATIONS:
+            return [""] * len(emails)
+        
+        scopes = []
+        generation_keys = set()
+        for email in emails:
+            user_id = getattr(email, 'user_id', None)
+            category = (email.category or 'primary').lower() if self.config.CACHE_CATEGORY_GENERATIONS else None
+            scopes.append((user_id, category))
+            generation_keys.add(self._generation_key(user_id))
+            if category is not None:
+                generation_keys.add(self._generation_key(user_id, category))
+        
+        try:
+            generations = self.cache.get_generations(list(generation_keys))
+        except Exception as e:
+            self.logger.error(f"[SCORING_ENGINE] Cache generation read error: {e}")
+            generations = {}
+        
+        namespaces = []
+        for user_id, category in scopes:
+            namespace = f"{USER_SCOPE_KEY_PREFIX}:{user_id}:{generations.get(self._generation_key(user_id), 0)}:"
+            if category is not None:
+                namespace += f"{category}:{generations.get(self._generation_key(user_id, category), 0)}:"
+            namespaces.append(namespace)
+        return namespaces
+    
+    def _cache_base_score(self, email: Email, base_score: float, namespace: str = "") -> None:
+        """Cache a base score with the long base-score TTL."""
+        try:
+            self.cache.set(self._base_cache_key(email, namespace), base_score, self.config.BASE_SCORE_CACHE_TTL)
+        except Exception as e:
+            self.logger.error(f"[SCORING_ENGINE] Cache set error for base score of {email.id}: {e}")
+    
+    def calculate_base_scores(self, emails: List[Email]) -> List[Optional[float]]:
+        """
+        Calculate base scores for a batch, vectorized when supported.
+        
+        Bypasses the cache. Together with apply_dynamic_components_batch this
+        is the public batch API for callers that need the components of a
+        score (debugger, bucket scheduler, strategy comparison).
+        Failed calculations are returned as None.
+        """
+        calculation_start = time.time()
+        
+        if self._use_vectorized_batch(len(emails)):
+            try:
+                base_scores = self.scoring_strategy.calculate_base_scores_array(emails).tolist()
+                self._calculation_count.add(len(emails))
+                self._total_calculation_time.add((time.time() - calculation_start) * 1000)
+                return base_scores
+            except Exception as e:
+                self.logger.error(f"[SCORING_ENGINE] Vectorized base calculation failed, falling back: {e}", exc_info=True)
+        
+        base_scores = []
+        for email in emails:
+            try:
+                base_scores.append(self.scoring_strategy.calculate_base_score(email))
+            except Exception as e:
+                self.logger.error(f"[SCORING_ENGINE] Error calculating base score for {email.id}: {e}")
+                base_scores.append(None)
+        
+        self._calculation_count.add(len(emails))
+        self._total_calculation_time.add((time.time() - calculation_start) * 1000)
+        return base_scores
+    
+    def apply_dynamic_components_batch(
+        self,
+        emails: List[Email],
+        base_scores: List[float],
+        current_time: datetime
+    ) -> List[float]:
+        """
+        Apply temporal and context components to a batch, vectorized when supported.
+        
+        base_scores come from calculate_base_scores; the result is the final
+        score per email (0-100).
+        """
+        if self._use_vectorized_batch(len(emails)):
+            try:
+                age_hours = self.age_hours_array(emails, current_time)
+                raw_scores = self.scoring_strategy.calculate_dynamic_scores_array(
+                    emails, np.asarray(base_scores, dtype=np.float64), age_hours, current_time
+                )
+                return np.clip(raw_scores, 0.0, 100.0).tolist()
+            except Exception as e:
+                self.logger.error(f"[SCORING_ENGINE] Vectorized dynamic scoring failed, falling back: {e}", exc_info=True)
+        
+        final_scores = []
+        for email, base_score in zip(emails, base_scores):
+            try:
+                final_scores.append(self._apply_dynamic_components(email, base_score, current_time))
+            except Exception as e:
+                self.logger.error(f"[SCORING_ENGINE] Error applying dynamic components for {email.id}: {e}")
+                final_scores.append(50.0)  # Safe default
+        return final_scores
+    
+    def _use_vectorized_batch(self, batch_size: int) -> bool:
+        """Check whether a batch of cache misses should take the columnar path."""
+        return (
+            self.config.VECTORIZED_BATCH_SCORING
+            and batch_size >= self.config.VECTORIZED_BATCH_MIN_SIZE
+            and hasattr(type(self.scoring_strategy), 'calculate_scores_array')
+        )
+    
+    def _calculate_fresh_scores_vectorized(
+        self,
+        emails: List[Email],
+        current_time: datetime
+    ) -> Optional[List[float]]:
+        """
+        Calculate fresh scores for a batch using the strategy's columnar path.
+        
+        Returns None if the vectorized calculation fails so the caller can fall
+        back to per-email scoring.
+        """
+        calculation_start = time.time()
+        
+        try:
+            age_hours = self.age_hours_array(emails, current_time)
+            raw_scores = self.scoring_strategy.calculate_scores_array(emails, age_hours, current_time)
+            final_scores = np.clip(raw_scores, 0.0, 100.0).tolist()
+        except Exception as e:
+            self.logger.error(f"[SCORING_ENGINE] Vectorized batch calculation failed, falling back: {e}", exc_info=True)
+            return None
+        
+        duration_ms = (time.time() - calculation_start) * 1000
+        self._calculation_count.add(len(emails))
+        self._total_calculation_time.add(duration_ms)
+        
+        if self.config.LOG_PERFORMANCE_METRICS:
+            self.logger.info(
+                f"[SCORING_ENGINE] Vectorized batch: {len(emails)} emails in {duration_ms:.1f}ms"
+            )
+        
+        return final_scores
+    
+    def age_hours_array(self, emails: List[Email], current_time: datetime) -> np.ndarray:
+        """
+        Build an array of email ages in hours.
+        
+        Mirrors the timezone handling in calculate_fresh_score: whichever side
+        is naive is treated as UTC, and emails without received_at have age 0.
+        """
+        if current_time.tzinfo is None:
+            now_epoch = current_time.replace(tzinfo=timezone.utc).timestamp()
+        else:
+            now_epoch = current_time.timestamp()
+        
+        received_epochs = np.full(len(emails), now_epoch, dtype=np.float64)
+        for i, email in enumerate(emails):
+            received_at = email.received_at
+            if received_at is None:
+                continue
+            if received_at.tzinfo is None:
+                received_at = received_at.replace(tzinfo=timezone.utc)
+            received_epochs[i] = received_at.timestamp()
+        
+        return (now_epoch - received_epochs) / 3600
+    
     def _get_cached_score(self, email_id: str, current_time: datetime) -> Optional[float]:
         """
         Get score from cache with logging.
@@ -309,6 +957,153 @@ class EmailScoringEngine:
             self.logger.error(f"[SCORING_ENGINE] Cache get error for {email_id}: {e}")
             return None
     
+    def _get_cached_scores(self, email_ids: List[str]) -> Dict[str, float]:
+        """
+        Get scores for several emails from cache in one round-trip.
+        
+        Cache errors are logged and treated as misses for the whole batch.
+        """
+        if not email_ids:
+            return {}
+        
+        try:
+            scores = self.cache.get_many(email_ids)
+            if self.config.LOG_CACHE_OPERATIONS:
+                self.logger.debug(f"[SCORING_ENGINE] Cache get_many: {len(scores)}/{len(email_ids)} hits")
+            return scores
+        except Exception as e:
+            self.logger.error(f"[SCORING_ENGINE] Cache get_many error for {len(email_ids)} emails: {e}")
+            return {}
+    
+    def _get_cached_scores_revalidating(
+        self,
+        emails: List[Email],
+        cache_keys: List[str],
+        current_time: datetime
+    ) -> Dict[str, float]:
+        """
+        Get cached final scores, serving stale ones and refreshing them in the background.
+        
+        Entries past their soft TTL count as hits and are queued for refresh;
+        entries past their hard TTL are misses, recalculated by the caller.
+        """
+        if not cache_keys:
+            return {}
+        
+        try:
+            entries = self.cache.get_many_with_staleness(cache_keys)
+        except Exception as e:
+            self.logger.error(f"[SCORING_ENGINE] Cache get_many error for {len(cache_keys)} emails: {e}")
+            return {}
+        
+        stale = [
+            (email, cache_key) for email, cache_key in zip(emails, cache_keys)
+            if cache_key in entries and entries[cache_key][1]
+        ]
+        if stale:
+            self._stale_hits.add(len(stale))
+            self._schedule_stale_refresh(stale, current_time)
+        
+        return {cache_key: score for cache_key, (score, _) in entries.items()}
+    
+    def _revalidates_stale_scores(self) -> bool:
+        """Check whether final scores are cached with a soft TTL and refreshed in the background."""
+        return self.config.STALE_WHILE_REVALIDATE and not self._caches_components()
+    
+    def _soft_ttl(self, ttl: int) -> Optional[int]:
+        """Soft TTL for a score cached with the given (hard) TTL, if stale-while-revalidate is on."""
+        if not self._revalidates_stale_scores():
+            return None
+        return int(ttl * self.config.CACHE_SOFT_TTL_RATIO)
+    
+    def _schedule_stale_refresh(self, stale: List[Tuple[Email, str]], current_time: datetime) -> None:
+        """
+        Queue a background recalculation of stale cached scores.
+        
+        Keys already queued are skipped, and at most STALE_REFRESH_MAX_PENDING
+        keys wait at once; anything beyond that keeps being served stale until
+        a later read queues it (or its hard TTL expires).
+        """
+        with self._refresh_lock:
+            room = self.config.STALE_REFRESH_MAX_PENDING - len(self._refreshing)
+            queued = [(email, cache_key) for email, cache_key in stale if cache_key not in self._refreshing][:max(room, 0)]
+            self._refreshing.update(cache_key for _, cache_key in queued)
+            
+            if queued and self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=self.config.STALE_REFRESH_WORKERS,
+                    thread_name_prefix="score-refresh"
+                )
+        
+        if not queued:
+            return
+        
+        # Copy column values now so the refresh never touches the request's Session
+        emails_by_key = {cache_key: self._detach_email(email) for email, cache_key in queued}
+        self._refresh_executor.submit(self._refresh_stale_scores, emails_by_key, current_time)
+    
+    def _refresh_stale_scores(self, emails_by_key: Dict[str, Any], current_time: datetime) -> None:
+        """Recalculate and re-cache stale scores (runs on the refresh executor)."""
+        refreshed = 0
+        try:
+            self._coalesce_many(
+                list(emails_by_key),
+                lambda keys: self._calculate_and_cache_scores([emails_by_key[key] for key in keys], keys, current_time),
+                bypass_cache=False
+            )
+            refreshed = len(emails_by_key)
+            
+            if self.config.LOG_CACHE_OPERATIONS:
+                self.logger.debug(f"[SCORING_ENGINE] Refreshed {len(emails_by_key)} stale scores in the background")
+                
+        except Exception as e:
+            self.logger.error(f"[SCORING_ENGINE] Background refresh failed for {len(emails_by_key)} emails: {e}", exc_info=True)
+        finally:
+            with self._refresh_lock:
+                self._refreshing.difference_update(emails_by_key)
+                self._background_refreshes.add(refreshed)
+    
+    def _submit_shadow(self, emails: List[Email], scores: Dict[str, float], current_time: datetime) -> None:
+        """Offer served scores to the shadow scorer; never fails the request."""
+        if self.shadow_scorer is None:
+            return
+        try:
+            self.shadow_scorer.submit(emails, scores, current_time, detach=self._detach_email)
+        except Exception as e:
+            self.logger.error(f"[SCORING_ENGINE] Shadow scoring submit failed: {e}")
+    
+    def _detach_email(self, email: Email) -> Any:
+        """Snapshot an email's column values into a plain object the strategies can score."""
+        if inspect(email, raiseerr=False) is None:
+            return email  # Not an ORM instance (e.g. already detached)
+        return SimpleNamespace(**{attr.key: getattr(email, attr.key) for attr in inspect(Email).column_attrs})
+    
+    def _cache_scores(self, scored_emails: List[Tuple[str, Optional[str], float]]) -> None:
+        """
+        Cache (cache key, category, score) triples, grouping by category TTL.
+        
+        Each distinct TTL becomes a single set_many call, so a batch costs one
+        round-trip per category rather than one per email.
+        """
+        values_by_ttl: Dict[int, Dict[str, float]] = {}
+        for cache_key, category, score in scored_emails:
+            ttl = self.config.get_cache_ttl(category or 'default')
+            values_by_ttl.setdefault(ttl, {})[cache_key] = score
+        
+        for ttl, values in values_by_ttl.items():
+            try:
+                soft_ttl = self._soft_ttl(ttl)
+                if soft_ttl is None:
+                    self.cache.set_many(values, ttl)
+                else:
+                    self.cache.set_many(values, ttl, soft_ttl)
+                
+                if self.config.LOG_CACHE_OPERATIONS:
+                    self.logger.debug(f"[SCORING_ENGINE] Cached {len(values)} scores (TTL: {ttl}s)")
+                    
+            except Exception as e:
+                self.logger.error(f"[SCORING_ENGINE] Cache set_many error for {len(values)} emails: {e}")
+    
     def _cache_score(self, email_id: str, category: str, score: float) -> None:
         """
         Cache score with appropriate TTL based on category.
@@ -317,7 +1112,11 @@ class EmailScoringEngine:
         """
         try:
             ttl = self.config.get_cache_ttl(category or 'default')
-            self.cache.set(email_id, score, ttl)
+            soft_ttl = self._soft_ttl(ttl)
+            if soft_ttl is None:
+                self.cache.set(email_id, score, ttl)
+            else:
+                self.cache.set_many({email_id: score}, ttl, soft_ttl)
             
             if self.config.LOG_CACHE_OPERATIONS:
                 self.logger.debug(f"[SCORING_ENGINE] Cached: {email_id} → {score:.1f} (TTL: {ttl}s)")
@@ -327,20 +1126,20 @@ class EmailScoringEngine:
     
     def _record_cache_hit(self, email_id: str) -> None:
         """Record cache hit for performance tracking."""
-        self._cache_hits += 1
+        self._cache_hits.add()
         if self.performance_monitor:
             self.performance_monitor.record_cache_hit(email_id)
     
     def _record_cache_miss(self, email_id: str) -> None:
         """Record cache miss for performance tracking."""
-        self._cache_misses += 1
+        self._cache_misses.add()
         if self.performance_monitor:
             self.performance_monitor.record_cache_miss(email_id)
     
     def _record_calculation_time(self, duration_ms: float, category: str) -> None:
         """Record calculation time for performance tracking."""
-        self._calculation_count += 1
-        self._total_calculation_time += duration_ms
+        self._calculation_count.add()
+        self._total_calculation_time.add(duration_ms)
         
         if self.performance_monitor:
             self.performance_monitor.record_calculation_time(duration_ms, category or 'unknown')
@@ -375,7 +1174,7 @@ class ScoringEngineFactory:
         Args:
             config: Scoring configuration
             strategy_type: Type of scoring strategy ('enhanced', 'simple', 'category')
-            cache_type: Type of cache provider ('memory', 'redis', 'null', 'multi_tier')
+            cache_type: Type of cache provider ('memory', 'shared_memory', 'redis', 'null', 'multi_tier')
             redis_client: Redis client (required for Redis-based caching)
             
         Returns:
@@ -407,15 +1206,22 @@ class ScoringEngineFactory:
             if redis_client is None:
                 raise ValueError(f"Redis client required for cache type: {cache_type}")
             cache_kwargs['redis_client'] = redis_client
+        elif cache_type == 'shared_memory':
+            cache_kwargs['path'] = config.SHARED_MEMORY_CACHE_PATH
+            cache_kwargs['max_entries'] = config.MAX_CACHE_ENTRIES
         
         cache_provider = create_cache_provider(cache_type, **cache_kwargs)
         
         # Create and return engine
-        return EmailScoringEngine(
+        engine = EmailScoringEngine(
             scoring_strategy=strategy,
             cache_provider=cache_provider,
-            config=config
+            config=config,
+            performance_monitor=ScoringEngineFactory.create_performance_monitor(config)
         )
+        if config.SHADOW_STRATEGY and config.SHADOW_STRATEGY != strategy_type and cache_type != 'null':
+            engine.shadow_scorer = ScoringEngineFactory.create_shadow_scorer(config, config.SHADOW_STRATEGY)
+        return engine
     
     @staticmethod
     def create_default_engine(config: ScoringConfig) -> EmailScoringEngine:
@@ -430,5 +1236,30 @@ class ScoringEngineFactory:
         return EmailScoringEngine(
             scoring_strategy=strategy,
             cache_provider=cache,
-            config=config
+            config=config,
+            performance_monitor=ScoringEngineFactory.create_performance_monitor(config)
+        )
+    
+    @staticmethod
+    def create_shadow_scorer(config: ScoringConfig, strategy_type: str) -> Any:
+        """Create a shadow scorer that re-scores sampled requests with another strategy."""
+        from app.scoring.comparison import ShadowScorer
+        
+        candidate = ScoringEngineFactory.create_engine(
+            replace(config, SHADOW_STRATEGY=None), strategy_type=strategy_type, cache_type="null"
+        )
+        return ShadowScorer(
+            candidate,
+            config,
+            sample_rate=config.SHADOW_SAMPLE_RATE,
+            max_pending=config.SHADOW_MAX_PENDING,
+            name=strategy_type
+        )
+    
+    @staticmethod
+    def create_performance_monitor(config: ScoringConfig) -> ScoringPerformanceMonitor:
+        """Create the latency histogram monitor configured for this environment."""
+        return ScoringPerformanceMonitor(
+            max_latency_ms=config.PERFORMANCE_HISTOGRAM_MAX_MS,
+            stripes=config.PERFORMANCE_MONITOR_STRIPES
         )
\ No newline at end of file
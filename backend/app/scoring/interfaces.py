@@ -6,7 +6,7 @@ This enables dependency injection and easy testing/swapping of implementations.
 """
 
 from abc import ABC, abstractmethod
-from typing import Protocol, Optional, Dict, Any, List
+from typing import Protocol, Optional, Dict, Any, Iterable, List, Tuple
 from datetime import datetime
 from app.models.email import Email
 
@@ -74,6 +74,33 @@ class ScoringStrategy(Protocol):
         ...
 
 
+class VectorizedScoringStrategy(ScoringStrategy, Protocol):
+    """
+    Optional extension for strategies that can score batches in columnar form.
+    
+    The engine uses these methods for large batches when the strategy class
+    defines them; results must match the per-email methods exactly.
+    """
+    
+    def calculate_scores_array(self, emails: List[Email], age_hours: Any, current_time: datetime) -> Any:
+        """Calculate raw (unclamped) scores for a batch as a NumPy array."""
+        ...
+    
+    def calculate_base_scores_array(self, emails: List[Email]) -> Any:
+        """Calculate base scores for a batch as a NumPy array."""
+        ...
+    
+    def calculate_dynamic_scores_array(
+        self,
+        emails: List[Email],
+        base_scores: Any,
+        age_hours: Any,
+        current_time: datetime
+    ) -> Any:
+        """Apply temporal multiplier and context boost to precomputed base scores."""
+        ...
+
+
 class CacheProvider(Protocol):
     """
     Interface for caching email scores.
@@ -125,6 +152,83 @@ class CacheProvider(Protocol):
             Number of entries cleared
         """
         ...
+    
+    def get_many(self, keys: List[str]) -> Dict[str, float]:
+        """
+        Retrieve several cached scores in one round-trip.
+        
+        Args:
+            keys: Cache keys (typically email IDs)
+            
+        Returns:
+            Mapping of key to score for the keys that were found and not expired
+        """
+        ...
+    
+    def set_many(self, values: Dict[str, float], ttl: int, soft_ttl: Optional[int] = None) -> None:
+        """
+        Store several scores in one round-trip, all with the same TTL.
+        
+        Args:
+            values: Mapping of cache key to score
+            ttl: Time-to-live in seconds (hard TTL: the entry is gone after it)
+            soft_ttl: Seconds after which the entry is stale - still returned,
+                but flagged by get_many_with_staleness so it can be refreshed
+        """
+        ...
+    
+    def get_many_with_staleness(self, keys: List[str]) -> Dict[str, Tuple[float, bool]]:
+        """
+        Retrieve several cached scores along with whether each is stale.
+        
+        Args:
+            keys: Cache keys
+            
+        Returns:
+            Mapping of key to (score, is_stale) for keys within their hard TTL
+        """
+        ...
+    
+    def delete_many(self, keys: List[str]) -> int:
+        """
+        Remove several cached scores in one round-trip.
+        
+        Args:
+            keys: Cache keys to remove
+            
+        Returns:
+            Number of entries removed (or keys requested, if the backend
+            cannot tell)
+        """
+        ...
+    
+    def get_generations(self, keys: List[str]) -> Dict[str, int]:
+        """
+        Read several generation counters in one round-trip.
+        
+        Generation counters scope cache keys (e.g. per user); bumping one makes
+        every key built from the old value unreachable.
+        
+        Args:
+            keys: Generation counter keys
+            
+        Returns:
+            Mapping of key to generation for counters that exist (missing = 0)
+        """
+        ...
+    
+    def bump_generation(self, key: str, ttl: int) -> int:
+        """
+        Increment a generation counter.
+        
+        Args:
+            key: Generation counter key
+            ttl: Time-to-live in seconds, must outlive any entry it scopes
+            
+        Returns:
+            The new generation
+        """
+        ...
 
 
 class ScoreUpdater(Protocol):
@@ -242,11 +346,32 @@ class PerformanceMonitor(Protocol):
         """Record a cache miss."""
         ...
     
+    def record_batch(self, batch_size: int, duration_ms: float) -> None:
+        """Record the size and total latency of a batch scoring call."""
+        ...
+    
     def get_metrics_summary(self) -> Dict[str, Any]:
         """Get summary of performance metrics."""
         ...
 
 
+class SenderProfileProvider(Protocol):
+    """
+    Interface for reading a sender's engagement history.
+    
+    Returned stats expose open_rate, trash_rate and reply_rate; None means the
+    sender has too little history to be a signal.
+    """
+    
+    def get(self, user_id: Any, from_email: Optional[str]) -> Optional[Any]:
+        """History of one sender of a user."""
+        ...
+    
+    def get_many(self, user_id: Any, from_emails: Iterable[Optional[str]]) -> Dict[Optional[str], Optional[Any]]:
+        """Histories of many senders of one user, keyed by raw from address."""
+        ...
+
+
 # Abstract base classes for common functionality
 
 class BaseScoreUpdater(ABC):
@@ -301,4 +426,38 @@ class BaseCacheProvider(ABC):
     
     def clear_pattern(self, pattern: str) -> int:
         """Default implementation - can be overridden."""
-        return 0
\ No newline at end of file
+        return 0
+    
+    def get_many(self, keys: List[str]) -> Dict[str, float]:
+        """Default implementation - one get per key, override for real batching."""
+        results = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                results[key] = value
+        return results
+    
+    def set_many(self, values: Dict[str, float], ttl: int, soft_ttl: Optional[int] = None) -> None:
+        """Default implementation - one set per key, soft TTL ignored."""
+        for key, value in values.items():
+            self.set(key, value, ttl)
+    
+    def get_many_with_staleness(self, keys: List[str]) -> Dict[str, Tuple[float, bool]]:
+        """Default implementation - entries are never stale before their TTL."""
+        return {key: (value, False) for key, value in self.get_many(keys).items()}
+    
+    def delete_many(self, keys: List[str]) -> int:
+        """Default implementation - one delete per key, override for real batching."""
+        for key in keys:
+            self.delete(key)
+        return len(keys)
+    
+    def get_generations(self, keys: List[str]) -> Dict[str, int]:
+        """Default implementation - counters stored as regular values."""
+        return {key: int(value) for key, value in self.get_many(keys).items()}
+    
+    def bump_generation(self, key: str, ttl: int) -> int:
+        """Default implementation - read and write back, override for atomic increments."""
+        generation = int(self.get(key) or 0) + 1
+        self.set(key, generation, ttl)
+        return generation
\ No newline at end of file
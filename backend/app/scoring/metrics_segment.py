@@ -0,0 +1,310 @@
+"""
+Cross-Worker Metrics Aggregation
+
+Every uvicorn worker keeps its own scoring engine, so counters and latency
+histograms read from one process describe only that worker. Workers publish
+their raw, mergeable metric state into a shared directory (tmpfs by default),
+one file per process, and any worker can merge all of them into fleet-wide
+hit rates and latency percentiles.
+
+Each worker only ever writes its own file and replaces it atomically, so
+readers never see a partial snapshot. When a worker exits, its final snapshot
+is folded into a single retired-totals file (under a file lock) so the
+aggregated counters never go backwards.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from app.scoring.monitor import ScoringPerformanceMonitor
+
+
+class SharedMetricsSegment:
+    """
+    Directory of per-worker metric snapshots shared by the workers on a host.
+    
+    Snapshots that have not been published within stale_after_seconds are
+    ignored. Snapshots of processes that no longer exist are retired: added
+    into the retired totals, which collect() always returns, and removed.
+    """
+    
+    FILE_PREFIX = "worker-"
+    FILE_SUFFIX = ".json"
+    RETIRED_FILE = "retired.json"
+    LOCK_FILE = ".retired.lock"
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        stale_after_seconds: float = 60.0,
+        max_latency_ms: float = 60000.0
+    ):
+        self.path = path or self._default_path()
+        self.stale_after_seconds = stale_after_seconds
+        self.max_latency_ms = max_latency_ms
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        os.makedirs(self.path, exist_ok=True)
+    
+    @staticmethod
+    def _default_path() -> str:
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        return os.path.join(directory, "email_scoring_metrics")
+    
+    def _worker_file(self, pid: int) -> str:
+        return os.path.join(self.path, f"{self.FILE_PREFIX}{pid}{self.FILE_SUFFIX}")
+    
+    def publish(self, state: Dict[str, Any], pid: Optional[int] = None) -> None:
+        """Replace this worker's snapshot with state."""
+        pid = pid or os.getpid()
+        self._write(self._worker_file(pid), {'pid': pid, 'published_at': time.time(), 'state': state})
+    
+    def _write(self, file_path: str, payload: Dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=f".{os.path.basename(file_path)}.")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(payload, f, separators=(',', ':'))
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    
+    def _read(self, file_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(file_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+    
+    def collect(self) -> List[Dict[str, Any]]:
+        """
+        Read the current snapshot of every live worker, plus the retired totals.
+        
+        Returns:
+            List of {'pid', 'published_at', 'state'} payloads; the retired
+            totals (if any) have pid None and 'retired' set
+        """
+        now = time.time()
+        payloads = []
+        
+        for name in os.listdir(self.path):
+            if not (name.startswith(self.FILE_PREFIX) and name.endswith(self.FILE_SUFFIX)):
+                continue
+            
+            file_path = os.path.join(self.path, name)
+            try:
+                payload = self._read(file_path)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"[METRICS_SEGMENT] Skipping unreadable snapshot {name}: {e}")
+                continue
+            if payload is None:
+                continue  # Retired by another worker meanwhile
+            
+            if not self._is_alive(payload.get('pid')):
+                self.retire(payload.get('pid'))
+                continue
+            if now - payload.get('published_at', 0) > self.stale_after_seconds:
+                continue
+            payloads.append(payload)
+        
+        retired = self._read(self._retired_file())
+        if retired is not None:
+            payloads.append(retired)
+        return payloads
+    
+    def retire(self, pid: Optional[int] = None) -> None:
+        """Add a worker's final snapshot (this worker's by default) into the retired totals and delete it."""
+        file_path = self._worker_file(pid or os.getpid())
+        
+        with self._retired_lock():
+            try:
+                payload = self._read(file_path)
+            except ValueError as e:
+                self.logger.warning(f"[METRICS_SEGMENT] Dropping unreadable snapshot of worker {pid}: {e}")
+                payload = None
+            if payload is not None:
+                retired = self._read(self._retired_file()) or {'retired_workers': 0, 'state': {}}
+                self._write(self._retired_file(), {
+                    'pid': None,
+                    'retired': True,
+                    'retired_workers': retired['retired_workers'] + 1,
+                    'published_at': time.time(),
+                    'state': merge_states([retired['state'], payload.get('state', {})], self.max_latency_ms)
+                })
+            self._unlink(file_path)
+    
+    def remove(self, pid: Optional[int] = None) -> None:
+        """Delete a worker's snapshot (this worker's by default) without keeping its totals."""
+        self._unlink(self._worker_file(pid or os.getpid()))
+    
+    def _retired_file(self) -> str:
+        return os.path.join(self.path, self.RETIRED_FILE)
+    
+    @contextmanager
+    def _retired_lock(self):
+        with open(os.path.join(self.path, self.LOCK_FILE), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    @staticmethod
+    def _is_alive(pid: Any) -> bool:
+        if not isinstance(pid, int) or pid <= 0:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True  # Exists, owned by someone else
+        return True
+    
+    def _unlink(self, file_path: str) -> None:
+        try:
+            os.unlink(file_path)
+        except FileNotFoundError:
+            pass
+
+
+def _merge_state_into(
+    monitor: ScoringPerformanceMonitor,
+    counters: Dict[str, float],
+    state: Dict[str, Any],
+    pid: Any = None
+) -> None:
+    for name, value in state.get('counters', {}).items():
+        counters[name] = counters.get(name, 0) + value
+    if 'monitor' in state:
+        try:
+            monitor.merge_state(state['monitor'])
+        except (KeyError, ValueError) as e:
+            logging.getLogger(__name__).warning(
+                f"[METRICS_SEGMENT] Worker {pid} histograms not merged: {e}"
+            )
+
+
+def merge_states(states: List[Dict[str, Any]], max_latency_ms: float = 60000.0) -> Dict[str, Any]:
+    """Add several engine states into one state of the same shape."""
+    monitor = ScoringPerformanceMonitor(max_latency_ms=max_latency_ms)
+    counters: Dict[str, float] = {}
+    for state in states:
+        _merge_state_into(monitor, counters, state)
+    return {'counters': counters, 'monitor': monitor.export_state()}
+
+
+def merge_worker_states(
+    payloads: List[Dict[str, Any]],
+    max_latency_ms: float = 60000.0
+) -> Dict[str, Any]:
+    """
+    Merge per-worker engine states into fleet-wide statistics.
+    
+    Args:
+        payloads: Snapshots returned by SharedMetricsSegment.collect()
+        max_latency_ms: Histogram range the workers were configured with
+    
+    Returns:
+        Summed counters, derived rates and merged latency percentiles (exited
+        workers' final totals included), plus the merged monitor under
+        'monitor' (for Prometheus rendering)
+    """
+    monitor = ScoringPerformanceMonitor(max_latency_ms=max_latency_ms)
+    counters: Dict[str, float] = {}
+    workers = []
+    retired_workers = 0
+    
+    for payload in payloads:
+        _merge_state_into(monitor, counters, payload.get('state', {}), payload.get('pid'))
+        if payload.get('retired'):
+            retired_workers += payload.get('retired_workers', 0)
+        else:
+            workers.append(payload.get('pid'))
+    
+    cache_hits = int(counters.get('cache_hits', 0))
+    cache_misses = int(counters.get('cache_misses', 0))
+    calculations = int(counters.get('calculations', 0))
+    calculation_time = counters.get('calculation_time_ms', 0.0)
+    total_requests = cache_hits + cache_misses
+    
+    return {
+        'workers': len(workers),
+        'worker_pids': sorted(pid for pid in workers if pid is not None),
+        'retired_workers': retired_workers,
+        'total_score_requests': total_requests,
+        'cache_hits': cache_hits,
+        'cache_misses': cache_misses,
+        'cache_hit_rate_percent': round(cache_hits / total_requests * 100, 2) if total_requests else 0.0,
+        'calculations_performed': calculations,
+        'avg_calculation_time_ms': round(calculation_time / calculations, 2) if calculations else 0.0,
+        'counters': counters,
+        'latency': monitor.get_metrics_summary(),
+        'monitor': monitor
+    }
+
+
+class MetricsPublisher:
+    """
+    Background thread that periodically publishes this worker's state.
+    
+    The thread never raises; errors are logged and retried on the next tick.
+    When the publisher stops, the worker's final state is published and retired.
+    """
+    
+    def __init__(
+        self,
+        segment: SharedMetricsSegment,
+        state_fn: Callable[[], Dict[str, Any]],
+        interval_seconds: float = 5.0
+    ):
+        self.segment = segment
+        self.state_fn = state_fn
+        self.interval_seconds = interval_seconds
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        """Start the background thread (no-op if already running)."""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="scoring-metrics-publisher", daemon=True)
+        self._thread.start()
+        self.logger.info(
+            f"[METRICS_SEGMENT] Publishing to {self.segment.path} every {self.interval_seconds}s"
+        )
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """Signal the thread to stop, wait for it and retire this worker's final state."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            self.publish_now()
+            self.segment.retire()
+        except Exception as e:
+            self.logger.error(f"[METRICS_SEGMENT] Could not retire final state: {e}")
+            self.segment.remove()
+    
+    def publish_now(self) -> None:
+        """Publish the current state immediately."""
+        self.segment.publish(self.state_fn())
+    
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.publish_now()
+            except Exception as e:
+                self.logger.error(f"[METRICS_SEGMENT] Publish failed: {e}")
+            self._stop_event.wait(self.interval_seconds)
@@ -0,0 +1,388 @@
+"""
+Scoring Performance Monitor
+
+Thread-safe implementation of the PerformanceMonitor interface. Latencies are
+kept in HDR-style log-linear histograms (fixed relative error, constant
+memory) so p50/p95/p99 can be reported instead of averages, and every metric
+can be rendered in the Prometheus text exposition format.
+
+All hot-path writes go to one of several lock stripes assigned to each thread
+round-robin, so concurrent request threads rarely contend; reads merge the
+stripes.
+"""
+
+import itertools
+import math
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Quantiles reported in summaries and the Prometheus exposition
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _escape_label(value: Any) -> str:
+    """Escape a Prometheus label value (backslash, double quote, newline)."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Thread idents are pthread addresses aligned to large powers of two, so
+# ``get_ident() % stripes`` lands every thread on the same stripe. Each thread
+# instead draws a slot number once, round-robin.
+_thread_slots = itertools.count()
+_thread_local = threading.local()
+
+
+def _stripe_index(stripes: int) -> int:
+    """Pick the stripe for the calling thread."""
+    slot = getattr(_thread_local, 'slot', None)
+    if slot is None:
+        slot = _thread_local.slot = next(_thread_slots)
+    return slot % stripes
+
+
+class StripedCounter:
+    """Counter whose increments are spread over per-stripe locks."""
+    
+    def __init__(self, stripes: int = 8):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._values: List[float] = [0] * stripes
+    
+    def add(self, amount: float = 1) -> None:
+        index = _stripe_index(len(self._locks))
+        with self._locks[index]:
+            self._values[index] += amount
+    
+    @property
+    def value(self) -> float:
+        return sum(self._values)
+    
+    def reset(self) -> None:
+        for index, lock in enumerate(self._locks):
+            with lock:
+                self._values[index] = 0
+
+
+class _HistogramStripe:
+    __slots__ = ('lock', 'counts', 'count', 'total', 'max')
+    
+    def __init__(self, buckets: int):
+        self.lock = threading.Lock()
+        self.counts = [0] * buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class LatencyHistogram:
+    """
+    Log-linear (HDR-style) histogram over non-negative values.
+    
+    Values are recorded as integers of 1/unit_scale resolution (microseconds
+    for millisecond inputs by default). Each power-of-two range is split into
+    2^sub_bucket_bits linear buckets, so any quantile is reported within
+    1/2^sub_bucket_bits relative error (~3% with the default 5 bits), using a
+    few hundred buckets up to max_value. Larger values land in the top bucket;
+    the exact maximum is tracked separately.
+    """
+    
+    def __init__(
+        self,
+        max_value: float = 60000.0,
+        unit_scale: float = 1000.0,
+        sub_bucket_bits: int = 5,
+        stripes: int = 8
+    ):
+        self.unit_scale = unit_scale
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub_buckets = 1 << sub_bucket_bits
+        self._bucket_count = self._index(int(max_value * unit_scale)) + 1
+        self._stripes = [_HistogramStripe(self._bucket_count) for _ in range(stripes)]
+    
+    def _index(self, units: int) -> int:
+        """Bucket index of a value in integer units."""
+        shift = units.bit_length() - self.sub_bucket_bits - 1
+        if shift <= 0:
+            return units
+        mantissa = units >> shift
+        return (shift + 1) * self._sub_buckets + (mantissa - self._sub_buckets)
+    
+    def _bounds(self, index: int) -> Tuple[int, int]:
+        """Lowest value and width (in units) of a bucket."""
+        if index < 2 * self._sub_buckets:
+            return index, 1
+        shift = index // self._sub_buckets - 1
+        mantissa = index % self._sub_buckets + self._sub_buckets
+        return mantissa << shift, 1 << shift
+    
+    def record(self, value: float) -> None:
+        """Record one observation."""
+        value = max(value, 0.0)
+        index = min(self._index(int(value * self.unit_scale)), self._bucket_count - 1)
+        stripe = self._stripes[_stripe_index(len(self._stripes))]
+        with stripe.lock:
+            stripe.counts[index] += 1
+            stripe.count += 1
+            stripe.total += value
+            if value > stripe.max:
+                stripe.max = value
+    
+    def snapshot(self) -> "HistogramSnapshot":
+        """Merge the stripes into a consistent-enough point-in-time view."""
+        counts = [0] * self._bucket_count
+        count = 0
+        total = 0.0
+        maximum = 0.0
+        for stripe in self._stripes:
+            with stripe.lock:
+                for index, bucket_count in enumerate(stripe.counts):
+                    if bucket_count:
+                        counts[index] += bucket_count
+                count += stripe.count
+                total += stripe.total
+                maximum = max(maximum, stripe.max)
+        return HistogramSnapshot(self, counts, count, total, maximum)
+    
+    def export_state(self) -> Dict[str, Any]:
+        """Serializable bucket counts (sparse) plus the geometry needed to merge them."""
+        snapshot = self.snapshot()
+        return {
+            'unit_scale': self.unit_scale,
+            'sub_bucket_bits': self.sub_bucket_bits,
+            'buckets': self._bucket_count,
+            'counts': {str(index): count for index, count in enumerate(snapshot.counts) if count},
+            'count': snapshot.count,
+            'total': snapshot.total,
+            'max': snapshot.max
+        }
+    
+    def merge_state(self, state: Dict[str, Any]) -> None:
+        """
+        Add exported counts (e.g. from another worker) into this histogram.
+        
+        Raises:
+            ValueError: If the state was exported from a histogram with a different geometry
+        """
+        geometry = (state['unit_scale'], state['sub_bucket_bits'], state['buckets'])
+        if geometry != (self.unit_scale, self.sub_bucket_bits, self._bucket_count):
+            raise ValueError(f"Histogram geometry mismatch: {geometry}")
+        
+        stripe = self._stripes[_stripe_index(len(self._stripes))]
+        with stripe.lock:
+            for index, count in state['counts'].items():
+                stripe.counts[int(index)] += count
+            stripe.count += state['count']
+            stripe.total += state['total']
+            stripe.max = max(stripe.max, state['max'])
+    
+    def reset(self) -> None:
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.counts = [0] * self._bucket_count
+                stripe.count = 0
+                stripe.total = 0.0
+                stripe.max = 0.0
+
+
+class HistogramSnapshot:
+    """Merged histogram counts with quantile helpers."""
+    
+    def __init__(self, histogram: LatencyHistogram, counts: List[int], count: int, total: float, maximum: float):
+        self._histogram = histogram
+        self.counts = counts
+        self.count = count
+        self.total = total
+        self.max = maximum
+    
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+    
+    def quantile(self, q: float) -> float:
+        """Value at quantile q (bucket midpoint, capped at the observed maximum)."""
+        if not self.count:
+            return 0.0
+        
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                low, width = self._histogram._bounds(index)
+                return min((low + width / 2) / self._histogram.unit_scale, self.max)
+        return self.max
+    
+    def summary(self, quantiles: Sequence[float] = DEFAULT_QUANTILES, digits: int = 3) -> Dict[str, Any]:
+        result = {
+            'count': self.count,
+            'mean': round(self.mean, digits),
+            'max': round(self.max, digits)
+        }
+        for q in quantiles:
+            result[f"p{q * 100:g}"] = round(self.quantile(q), digits)
+        return result
+
+
+class ScoringPerformanceMonitor:
+    """
+    Thread-safe PerformanceMonitor for the scoring engine.
+    
+    Tracks per-category calculation latency histograms, cache hit/miss
+    counters and batch size/latency distributions.
+    """
+    
+    METRIC_PREFIX = "email_scoring"
+    
+    def __init__(self, max_latency_ms: float = 60000.0, stripes: int = 8):
+        self.max_latency_ms = max_latency_ms
+        self.stripes = stripes
+        self._lock = threading.Lock()  # Guards creation of per-category histograms
+        self._calculation_latency: Dict[str, LatencyHistogram] = {}
+        self._cache_hits = StripedCounter(stripes)
+        self._cache_misses = StripedCounter(stripes)
+        self._batch_sizes = LatencyHistogram(max_value=1_000_000, unit_scale=1.0, stripes=stripes)
+        self._batch_latency = LatencyHistogram(max_value=max_latency_ms, stripes=stripes)
+    
+    def _latency_histogram(self, category: str) -> LatencyHistogram:
+        histogram = self._calculation_latency.get(category)
+        if histogram is None:
+            with self._lock:
+                histogram = self._calculation_latency.setdefault(
+                    category, LatencyHistogram(max_value=self.max_latency_ms, stripes=self.stripes)
+                )
+        return histogram
+    
+    def record_calculation_time(self, duration_ms: float, email_category: str) -> None:
+        """Record how long a score calculation took."""
+        self._latency_histogram(email_category or 'unknown').record(duration_ms)
+    
+    def record_cache_hit(self, key: str) -> None:
+        """Record a cache hit."""
+        self._cache_hits.add()
+    
+    def record_cache_miss(self, key: str) -> None:
+        """Record a cache miss."""
+        self._cache_misses.add()
+    
+    def record_batch(self, batch_size: int, duration_ms: float) -> None:
+        """Record the size and total latency of a batch scoring call."""
+        self._batch_sizes.record(batch_size)
+        self._batch_latency.record(duration_ms)
+    
+    def get_metrics_summary(self) -> Dict[str, Any]:
+        """Get quantile summaries of every tracked metric."""
+        with self._lock:
+            categories = dict(self._calculation_latency)
+        
+        hits = int(self._cache_hits.value)
+        misses = int(self._cache_misses.value)
+        total = hits + misses
+        
+        return {
+            'calculation_latency_ms': {
+                category: histogram.snapshot().summary()
+                for category, histogram in sorted(categories.items())
+            },
+            'cache': {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate_percent': round(hits / total * 100, 2) if total else 0.0
+            },
+            'batch_size': self._batch_sizes.snapshot().summary(digits=1),
+            'batch_latency_ms': self._batch_latency.snapshot().summary()
+        }
+    
+    def render_prometheus(self, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> str:
+        """Render all metrics in the Prometheus text exposition format (version 0.0.4)."""
+        prefix = self.METRIC_PREFIX
+        lines: List[str] = []
+        
+        with self._lock:
+            categories = sorted(self._calculation_latency.items())
+        
+        name = f"{prefix}_calculation_duration_seconds"
+        lines.append(f"# HELP {name} Score calculation latency by email category.")
+        lines.append(f"# TYPE {name} summary")
+        for category, histogram in categories:
+            lines.extend(self._summary_lines(name, histogram.snapshot(), quantiles, 1e-3, {'category': category}))
+        
+        for metric, counter, help_text in (
+            ('cache_hits_total', self._cache_hits, 'Score cache hits.'),
+            ('cache_misses_total', self._cache_misses, 'Score cache misses.')
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            lines.append(f"{prefix}_{metric} {int(counter.value)}")
+        
+        name = f"{prefix}_batch_size"
+        lines.append(f"# HELP {name} Emails per batch scoring call.")
+        lines.append(f"# TYPE {name} summary")
+        lines.extend(self._summary_lines(name, self._batch_sizes.snapshot(), quantiles, 1.0, {}))
+        
+        name = f"{prefix}_batch_duration_seconds"
+        lines.append(f"# HELP {name} Batch scoring latency.")
+        lines.append(f"# TYPE {name} summary")
+        lines.extend(self._summary_lines(name, self._batch_latency.snapshot(), quantiles, 1e-3, {}))
+        
+        return "\n".join(lines) + "\n"
+    
+    def _summary_lines(
+        self,
+        name: str,
+        snapshot: HistogramSnapshot,
+        quantiles: Sequence[float],
+        scale: float,
+        labels: Dict[str, str]
+    ) -> List[str]:
+        lines = [
+            f"{name}{self._labels({**labels, 'quantile': f'{q:g}'})} {snapshot.quantile(q) * scale:.6g}"
+            for q in quantiles
+        ]
+        lines.append(f"{name}_sum{self._labels(labels)} {snapshot.total * scale:.6g}")
+        lines.append(f"{name}_count{self._labels(labels)} {snapshot.count}")
+        return lines
+    
+    def export_state(self) -> Dict[str, Any]:
+        """Serializable, mergeable copy of every metric (see merge_state)."""
+        with self._lock:
+            categories = dict(self._calculation_latency)
+        
+        return {
+            'calculation_latency': {
+                category: histogram.export_state() for category, histogram in categories.items()
+            },
+            'cache_hits': self._cache_hits.value,
+            'cache_misses': self._cache_misses.value,
+            'batch_sizes': self._batch_sizes.export_state(),
+            'batch_latency': self._batch_latency.export_state()
+        }
+    
+    def merge_state(self, state: Dict[str, Any]) -> None:
+        """
+        Add another monitor's exported state into this one.
+        
+        Raises:
+            ValueError: If the state comes from a monitor with different histogram settings
+        """
+        for category, histogram_state in state.get('calculation_latency', {}).items():
+            self._latency_histogram(category).merge_state(histogram_state)
+        self._cache_hits.add(state.get('cache_hits', 0))
+        self._cache_misses.add(state.get('cache_misses', 0))
+        if 'batch_sizes' in state:
+            self._batch_sizes.merge_state(state['batch_sizes'])
+        if 'batch_latency' in state:
+            self._batch_latency.merge_state(state['batch_latency'])
+    
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+    
+    def reset(self) -> None:
+        """Reset every metric."""
+        with self._lock:
+            self._calculation_latency.clear()
+        self._cache_hits.reset()
+        self._cache_misses.reset()
+        self._batch_sizes.reset()
+        self._batch_latency.reset()
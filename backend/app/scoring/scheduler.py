@@ -0,0 +1,146 @@
+"""
+Bucket Crossing Prediction
+
+Predicts when an email's attention score will next cross a flow bucket
+boundary (NOW >= 60, LATER >= 30, REFERENCE below). Stored scores only need
+to be rewritten at those moments, so a background job can keep bucket
+membership correct without rescoring every email on a timer.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional
+from app.models.email import Email
+from app.scoring.engine import EmailScoringEngine
+
+
+class BucketPrediction(NamedTuple):
+    """Current score of an email and when it next changes bucket."""
+    score: float
+    change_at: datetime
+    base_score: float
+
+
+class BucketCrossingPredictor:
+    """
+    Computes the next bucket-change time for emails.
+    
+    The score is base × temporal multiplier + context boost. Decay is
+    non-increasing in age and the context boost only depends on the hour and
+    weekday, so within one clock hour a score can only fall. The predictor
+    therefore walks forward hour by hour (evaluating whole batches at once),
+    and bisects inside the hour where a decay-driven crossing happens.
+    """
+    
+    # Bisection steps inside an hour: 3600s / 2^12 < 1s
+    BISECTION_STEPS = 12
+    
+    def __init__(self, engine: EmailScoringEngine):
+        self.engine = engine
+        self.config = engine.config
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+    
+    def bucket_index(self, score: float) -> int:
+        """Map a score to a bucket index (0=now, 1=later, 2=reference)."""
+        if score >= self.config.BUCKET_NOW_THRESHOLD:
+            return 0
+        elif score >= self.config.BUCKET_LATER_THRESHOLD:
+            return 1
+        else:
+            return 2
+    
+    def predict(
+        self,
+        emails: List[Email],
+        current_time: Optional[datetime] = None
+    ) -> Dict[str, BucketPrediction]:
+        """
+        Score emails now and predict when each will next change bucket.
+        
+        Args:
+            emails: Emails to schedule
+            current_time: Current timestamp (defaults to now, UTC)
+        
+        Returns:
+            Mapping of email ID to BucketPrediction (current score, next
+            bucket change time, base score).
+            Emails with no change inside BUCKET_REFRESH_HORIZON_HOURS get the
+            horizon end so they are re-checked then. Emails whose base score
+            could not be calculated are omitted.
+        """
+        current_time = current_time or datetime.now(timezone.utc)
+        if not emails:
+            return {}
+        
+        base_scores = self.engine.calculate_base_scores(emails)
+        scorable = [(email, base) for email, base in zip(emails, base_scores) if base is not None]
+        emails = [email for email, _ in scorable]
+        bases = [base for _, base in scorable]
+        
+        current_scores = self.engine.apply_dynamic_components_batch(emails, bases, current_time)
+        current_buckets = [self.bucket_index(score) for score in current_scores]
+        
+        horizon_end = current_time + timedelta(hours=self.config.BUCKET_REFRESH_HORIZON_HOURS)
+        results: Dict[str, BucketPrediction] = {}
+        
+        pending = list(range(len(emails)))
+        interval_start = current_time
+        boundary = current_time.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        
+        while pending and interval_start < horizon_end:
+            boundary = min(boundary, horizon_end)
+            before_boundary = max(interval_start, boundary - timedelta(seconds=1))
+            
+            pending_emails = [emails[i] for i in pending]
+            pending_bases = [bases[i] for i in pending]
+            
+            # Context is constant on [interval_start, boundary), so checking just
+            # before the boundary catches any decay-driven crossing in the hour
+            scores_before = self.engine.apply_dynamic_components_batch(pending_emails, pending_bases, before_boundary)
+            scores_at = self.engine.apply_dynamic_components_batch(pending_emails, pending_bases, boundary)
+            
+            still_pending = []
+            for j, i in enumerate(pending):
+                email_id = str(emails[i].id)
+                if self.bucket_index(scores_before[j]) != current_buckets[i]:
+                    change_at = self._bisect_crossing(
+                        emails[i], bases[i], current_buckets[i], interval_start, before_boundary
+                    )
+                    results[email_id] = BucketPrediction(current_scores[i], change_at, bases[i])
+                elif self.bucket_index(scores_at[j]) != current_buckets[i]:
+                    results[email_id] = BucketPrediction(current_scores[i], boundary, bases[i])
+                else:
+                    still_pending.append(i)
+            
+            pending = still_pending
+            interval_start = boundary
+            boundary = boundary + timedelta(hours=1)
+        
+        for i in pending:
+            results[str(emails[i].id)] = BucketPrediction(current_scores[i], horizon_end, bases[i])
+        
+        return results
+    
+    def _bisect_crossing(
+        self,
+        email: Email,
+        base_score: float,
+        bucket: int,
+        start: datetime,
+        end: datetime
+    ) -> datetime:
+        """
+        Find the first moment in (start, end] where the email leaves its bucket.
+        
+        Assumes the bucket is unchanged at start and changed at end, with the
+        score non-increasing in between.
+        """
+        low, high = start, end
+        for _ in range(self.BISECTION_STEPS):
+            middle = low + (high - low) / 2
+            score = self.engine._apply_dynamic_components(email, base_score, middle)
+            if self.bucket_index(score) != bucket:
+                high = middle
+            else:
+                low = middle
+        return high
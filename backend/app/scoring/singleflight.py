@@ -0,0 +1,228 @@
+"""
+Single-Flight Request Coalescing
+
+When several requests miss the cache for the same key at the same time, only
+the first one (the leader) runs the computation; the others wait for its
+result instead of computing the same score again. Waiters can be threads
+(the FastAPI threadpool) or coroutines on an event loop.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class _Flight:
+    """A computation in progress for one key."""
+    
+    __slots__ = ('future', 'leader_thread', 'waiters')
+    
+    def __init__(self):
+        self.future: Future = Future()
+        self.leader_thread = threading.get_ident()
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Per-key in-flight deduplication.
+    
+    The leader publishes its result (or exception) to every waiter and then
+    forgets the key, so results are shared only between callers that overlap;
+    anything arriving later goes back to the cache. Callers should store the
+    result in the cache before the flight ends, so late arrivals hit it.
+    
+    Waiting is bounded by `timeout`: a waiter that gives up computes the value
+    itself. A caller never waits on a flight led by its own thread (which
+    would deadlock, e.g. a coroutine leader on the same event loop).
+    """
+    
+    def __init__(self, timeout: Optional[float] = 10.0):
+        self.timeout = timeout
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        
+        # Statistics
+        self._executions = 0
+        self._coalesced = 0
+        self._timeouts = 0
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Return fn() for key, sharing the result with concurrent callers.
+        
+        Raises:
+            Whatever fn raised (for the leader and all its waiters)
+        """
+        flight, is_leader = self._join(key)
+        if is_leader:
+            return self._lead(key, flight, fn)
+        
+        try:
+            result = flight.future.result(self.timeout)
+        except FutureTimeoutError:
+            self._record_timeout(key)
+            return fn()
+        self._record_coalesced(1)
+        return result
+    
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant of do(): fn is a coroutine function, and waiting yields
+        to the event loop instead of blocking it.
+        """
+        flight, is_leader = self._join(key, same_thread_ok=True)
+        if is_leader:
+            try:
+                result = await fn()
+            except BaseException as e:
+                self._finish(key, flight, error=e)
+                raise
+            self._finish(key, flight, result=result)
+            return result
+        
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(flight.future), self.timeout)
+        except asyncio.TimeoutError:
+            self._record_timeout(key)
+            return await fn()
+        self._record_coalesced(1)
+        return result
+    
+    def do_many(
+        self,
+        keys: Iterable[Hashable],
+        fn: Callable[[List[Hashable]], Dict[Hashable, Any]]
+    ) -> Dict[Hashable, Any]:
+        """
+        Batch variant of do(): claim every key that is not already in flight,
+        compute the claimed keys with a single fn(claimed_keys) call, and wait
+        for the rest.
+        
+        fn returns a mapping for the keys it was given; keys it leaves out
+        resolve to None. If fn raises, the exception propagates to this caller
+        and to every waiter on the claimed keys.
+        
+        Returns:
+            Mapping of every requested key to its result
+        """
+        claimed: List[Tuple[Hashable, _Flight]] = []
+        joined: List[Tuple[Hashable, _Flight]] = []
+        
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                flight = self._flights.get(key)
+                if flight is None or flight.leader_thread == threading.get_ident():
+                    flight = _Flight()
+                    self._flights[key] = flight
+                    claimed.append((key, flight))
+                else:
+                    flight.waiters += 1
+                    joined.append((key, flight))
+            self._executions += 1 if claimed else 0
+        
+        results: Dict[Hashable, Any] = {}
+        if claimed:
+            try:
+                computed = fn([key for key, _ in claimed])
+            except BaseException as e:
+                for key, flight in claimed:
+                    self._finish(key, flight, error=e)
+                raise
+            for key, flight in claimed:
+                results[key] = computed.get(key)
+                self._finish(key, flight, result=results[key])
+        
+        retry = []
+        for key, flight in joined:
+            try:
+                results[key] = flight.future.result(self.timeout)
+            except FutureTimeoutError:
+                self._record_timeout(key)
+                retry.append(key)
+        self._record_coalesced(len(joined) - len(retry))
+        
+        if retry:
+            computed = fn(retry)
+            for key in retry:
+                results[key] = computed.get(key)
+        
+        return results
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics."""
+        with self._lock:
+            in_flight = len(self._flights)
+        return {
+            'executions': self._executions,
+            'calculations_saved': self._coalesced,
+            'wait_timeouts': self._timeouts,
+            'in_flight': in_flight
+        }
+    
+    def reset_stats(self) -> None:
+        """Reset the coalescing counters."""
+        with self._lock:
+            self._executions = 0
+            self._coalesced = 0
+            self._timeouts = 0
+    
+    def _join(self, key: Hashable, same_thread_ok: bool = False) -> Tuple[_Flight, bool]:
+        """
+        Join the flight for key, or start one. Returns (flight, is_leader).
+        
+        Blocking waiters must not join a flight led by their own thread;
+        coroutines may, since awaiting yields to the leader.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and (same_thread_ok or flight.leader_thread != threading.get_ident()):
+                flight.waiters += 1
+                return flight, False
+            
+            flight = _Flight()
+            self._flights[key] = flight
+            self._executions += 1
+            return flight, True
+    
+    def _lead(self, key: Hashable, flight: _Flight, fn: Callable[[], Any]) -> Any:
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, flight, error=e)
+            raise
+        self._finish(key, flight, result=result)
+        return result
+    
+    def _finish(
+        self,
+        key: Hashable,
+        flight: _Flight,
+        result: Any = None,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """Forget the flight and publish its outcome to the waiters."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        
+        if error is not None:
+            flight.future.set_exception(error)
+        else:
+            flight.future.set_result(result)
+        
+        if flight.waiters:
+            self.logger.debug(f"[SINGLE_FLIGHT] {key}: result shared with {flight.waiters} waiters")
+    
+    def _record_coalesced(self, count: int) -> None:
+        if count:
+            with self._lock:
+                self._coalesced += count
+    
+    def _record_timeout(self, key: Hashable) -> None:
+        with self._lock:
+            self._timeouts += 1
+        self.logger.warning(f"[SINGLE_FLIGHT] Timed out waiting for {key}, computing locally")
@@ -8,10 +8,65 @@ Each strategy can have different approaches to calculating email attention score
 import logging
 import re
 from datetime import datetime
-from typing import List, Set
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+import numpy as np
+from sqlalchemy import case, func, literal, or_
 from app.models.email import Email
 from app.scoring.config import ScoringConfig
-from app.scoring.interfaces import ScoringStrategy
+from app.scoring.decay import decay_sql_expression
+from app.scoring.interfaces import ScoringStrategy, SenderProfileProvider
+from app.utils.email_utils import email_sender, normalize_sender
+
+# Label bitmask flags used by the columnar batch path
+_LABEL_IMPORTANT = 1
+_LABEL_STARRED = 2
+
+# Whole-word urgency keywords (lowercase regex fragments)
+URGENT_KEYWORDS = (
+    r'urgent', r'asap', r'deadline', r'expires?', r'final\s+notice',
+    r'action\s+required', r'time\s+sensitive', r'immediate'
+)
+
+
+class SubjectSignals(NamedTuple):
+    """Keyword signals found in a subject line."""
+    urgent: bool
+    deadline: bool
+
+
+class SubjectSignalMatcher:
+    """
+    Finds urgency keywords and deadline phrases in a single regex pass.
+    
+    Deadline phrases are case-insensitive substrings and urgency keywords are
+    whole words. Both are compiled into one alternation (deadline phrases
+    first), so a single finditer over the subject reports every signal. A
+    deadline phrase can itself start with an urgency keyword ("expires
+    today"), so each deadline hit re-checks urgency anchored at its start.
+    
+    Subjects are lowercased once up front; a case-sensitive scan of the
+    lowercased text is about twice as fast as re.IGNORECASE.
+    """
+    
+    def __init__(self, urgent_keywords: Sequence[str], deadline_phrases: Sequence[str]):
+        urgent = '|'.join(urgent_keywords)
+        deadline = '|'.join(re.escape(phrase.lower()) for phrase in sorted(deadline_phrases, key=len, reverse=True))
+        self._urgent = re.compile(rf'\b(?:{urgent})\b')
+        self._combined = re.compile(rf'(?P<deadline>{deadline})|(?P<urgent>\b(?:{urgent})\b)')
+    
+    def scan(self, subject: str) -> SubjectSignals:
+        """Return the urgency and deadline signals of a subject, stopping once both are found."""
+        subject = subject.lower()
+        urgent = deadline = False
+        for match in self._combined.finditer(subject):
+            if match.lastgroup == 'deadline':
+                deadline = True
+                urgent = urgent or self._urgent.match(subject, match.start()) is not None
+            else:
+                urgent = True
+            if urgent and deadline:
+                break
+        return SubjectSignals(urgent, deadline)
 
 
 class EnhancedScoringStrategy:
@@ -31,13 +86,6 @@ class EnhancedScoringStrategy:
         self.config = config
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
         
-        # Precompiled regex patterns for performance
-        self._urgent_patterns = [
-            re.compile(r'\b(urgent|asap|deadline|expires?|final\s+notice)\b', re.IGNORECASE),
-            re.compile(r'\b(action\s+required|time\s+sensitive|immediate)\b', re.IGNORECASE),
-            re.compile(r'\b(expires?\s+(today|tomorrow|soon))\b', re.IGNORECASE)
-        ]
-        
         # Sender authority domain sets
         self._personal_domains = {
             'gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com', 
@@ -55,6 +103,26 @@ class EnhancedScoringStrategy:
             'promotions', 'offers', 'deals', 'sales', 'support+',
             'notifications', 'alerts', 'updates'
         }
+        
+        self._deadline_indicators = (
+            'expires today', 'deadline today', 'due today',
+            'expires tomorrow', 'deadline tomorrow', 'due tomorrow',
+            'final notice', 'last chance', 'expires soon'
+        )
+        
+        # Compiled matchers: one pass over a subject for every urgency and deadline
+        # keyword, one pass over a sender address for every marketing indicator
+        self._subject_matcher = SubjectSignalMatcher(URGENT_KEYWORDS, self._deadline_indicators)
+        self._marketing_pattern = re.compile(
+            '|'.join(re.escape(indicator) for indicator in sorted(self._marketing_indicators))
+        )
+        
+        # Memoized per-subject signals and per-sender authority (bounded, reset when full)
+        self._subject_signals_cache: Dict[str, SubjectSignals] = {}
+        self._sender_authority_cache: Dict[str, float] = {}
+        
+        # Per-user sender history (open/reply/trash rates); attached by the service layer
+        self.sender_profiles: Optional[SenderProfileProvider] = None
     
     def calculate_base_score(self, email: Email) -> float:
         """
@@ -83,7 +151,7 @@ class EnhancedScoringStrategy:
         if self.config.LOG_SCORE_CALCULATIONS:
             self.logger.debug(f"[SCORE_BASE] Engagement score: +{engagement_score:.1f} = {score:.1f}")
         
-        # 3. SENDER AUTHORITY (0-10 points)
+        # 3. SENDER AUTHORITY (0-10 points) and, with sender profiles, the sender's history
         sender_score = self._calculate_sender_authority(email)
         score += sender_score
         
@@ -104,11 +172,10 @@ class EnhancedScoringStrategy:
         """
         Calculate how email relevance changes over time based on category.
         
-        Uses mathematical decay functions for fast, consistent calculations.
+        Uses the category's declarative decay spec for fast, consistent calculations.
         """
         category = (email.category or 'primary').lower()
-        decay_function = self.config.get_temporal_decay_function(category)
-        multiplier = decay_function(age_hours)
+        multiplier = self.config.get_temporal_decay_spec(category)(age_hours)
         
         if self.config.LOG_SCORE_CALCULATIONS:
             email_id = getattr(email, 'gmail_id', 'unknown')
@@ -123,14 +190,190 @@ class EnhancedScoringStrategy:
         """
         Calculate contextual relevance boost based on current situation.
         """
+        category = (email.category or 'primary').lower()
+        boost = self._calculate_time_context_boost(category, current_time)
+        
+        # Deadline urgency boost (time-sensitive)
+        if self._has_deadline_urgency(email, current_time):
+            boost += self.config.DEADLINE_URGENCY_BOOST
+        
+        if self.config.LOG_SCORE_CALCULATIONS and boost > 0:
+            email_id = getattr(email, 'gmail_id', 'unknown')
+            self.logger.debug(f"[SCORE_CONTEXT] {email_id}: context boost = +{boost:.1f}")
+        
+        return boost
+    
+    def calculate_scores_array(
+        self,
+        emails: List[Email],
+        age_hours: np.ndarray,
+        current_time: datetime
+    ) -> np.ndarray:
+        """
+        Calculate raw (unclamped) scores for a batch of emails in columnar form.
+        
+        Produces exactly the same values as calling calculate_base_score,
+        calculate_temporal_multiplier and calculate_context_boost per email, but
+        extracts each email into a handful of NumPy columns (category code,
+        unread flag, label bitmask, sender authority, text urgency flags) and
+        combines them with array operations. Per-category lookups (base score,
+        decay, time-of-day boost) are evaluated once per distinct category.
+        
+        Args:
+            emails: Emails to score
+            age_hours: Age of each email in hours (same order as emails)
+            current_time: Current timestamp
+            
+        Returns:
+            Array of raw scores (base × temporal + context)
+        """
+        base_scores = self.calculate_base_scores_array(emails)
+        return self.calculate_dynamic_scores_array(emails, base_scores, age_hours, current_time)
+    
+    def calculate_base_scores_array(self, emails: List[Email]) -> np.ndarray:
+        """Columnar equivalent of calculate_base_score for a batch of emails."""
+        count = len(emails)
+        category_codes, category_names = self._category_columns(emails)
+        is_unread = np.empty(count, dtype=bool)
+        label_bits = np.zeros(count, dtype=np.uint8)
+        sender_scores = np.empty(count, dtype=np.float64)
+        urgent_subject = np.empty(count, dtype=bool)
+        
+        # Extract columns (the only per-email Python work)
+        for i, email in enumerate(emails):
+            is_unread[i] = not email.is_read
+            labels = email.labels or []
+            if 'IMPORTANT' in labels:
+                label_bits[i] |= _LABEL_IMPORTANT
+            if 'STARRED' in labels:
+                label_bits[i] |= _LABEL_STARRED
+            
+            from_email = email.from_email
+            sender_scores[i] = self._sender_authority_for(from_email) if from_email else 0.0
+            
+            subject = email.subject
+            urgent_subject[i] = bool(subject) and self._subject_has_urgency(subject)
+        
+        if self.sender_profiles is not None:
+            sender_scores += self._sender_history_adjustments(emails)
+        
+        base_table = np.array([self.config.get_base_score(c) for c in category_names], dtype=np.float64)
+        
+        return (
+            base_table[category_codes]
+            + is_unread * self.config.UNREAD_BONUS
+            + ((label_bits & _LABEL_IMPORTANT) != 0) * self.config.IMPORTANT_LABEL_BONUS
+            + ((label_bits & _LABEL_STARRED) != 0) * self.config.STARRED_BONUS
+            + sender_scores
+            + urgent_subject * 5.0
+        )
+    
+    def calculate_dynamic_scores_array(
+        self,
+        emails: List[Email],
+        base_scores: np.ndarray,
+        age_hours: np.ndarray,
+        current_time: datetime
+    ) -> np.ndarray:
+        """
+        Apply temporal decay and context boost to precomputed base scores.
+        
+        Args:
+            emails: Emails being scored
+            base_scores: Base score of each email (same order as emails)
+            age_hours: Age of each email in hours
+            current_time: Current timestamp
+            
+        Returns:
+            Array of raw scores (base × temporal + context)
+        """
+        count = len(emails)
+        category_codes, category_names = self._category_columns(emails)
+        deadline_subject = np.fromiter(
+            (bool(email.subject) and self._subject_has_deadline(email.subject) for email in emails),
+            dtype=bool,
+            count=count
+        )
+        
+        context_table = np.array(
+            [self._calculate_time_context_boost(c, current_time) for c in category_names],
+            dtype=np.float64
+        )
+        
+        temporal = np.empty(count, dtype=np.float64)
+        for code, category in enumerate(category_names):
+            mask = category_codes == code
+            temporal[mask] = self.config.get_temporal_decay_spec(category).evaluate_array(age_hours[mask])
+        
+        context = context_table[category_codes] + deadline_subject * self.config.DEADLINE_URGENCY_BOOST
+        
+        return base_scores * temporal + context
+    
+    def calculate_dynamic_score_sql(
+        self,
+        base_score: Any,
+        category: Any,
+        subject: Any,
+        age_hours: Any,
+        current_time: datetime
+    ) -> Any:
+        """
+        Build base × temporal + context as a SQL expression.
+        
+        Time-of-day boosts are resolved here for current_time and inlined as
+        per-category constants; decay and deadline detection run in SQL.
+        
+        Args:
+            base_score: SQL expression for the stored base score
+            category: SQL expression for the lowercased category ('primary' if unset)
+            subject: SQL expression for the subject line
+            age_hours: SQL expression for the email age in hours
+            current_time: Current timestamp
+            
+        Returns:
+            SQLAlchemy expression for the raw (unclamped) score
+        """
+        temporal = decay_sql_expression(self.config.TEMPORAL_DECAY_SPECS, category, age_hours)
+        
+        default_boost = self._calculate_time_context_boost('primary', current_time)
+        context_whens = []
+        for name in sorted(set(self.config.CATEGORY_BASE_SCORES) | set(self.config.TEMPORAL_DECAY_SPECS)):
+            boost = self._calculate_time_context_boost(name, current_time)
+            if boost != default_boost:
+                context_whens.append((category == name, boost))
+        time_context = case(*context_whens, else_=default_boost) if context_whens else literal(default_boost)
+        
+        subject_lower = func.lower(func.coalesce(subject, ''))
+        deadline_boost = case(
+            (or_(*[subject_lower.contains(indicator, autoescape=True) for indicator in self._deadline_indicators]),
+             self.config.DEADLINE_URGENCY_BOOST),
+            else_=0.0
+        )
+        
+        return base_score * temporal + time_context + deadline_boost
+    
+    def _category_columns(self, emails: List[Email]) -> Tuple[np.ndarray, List[str]]:
+        """Encode normalized email categories as integer codes."""
+        categories: Dict[str, int] = {}
+        category_codes = np.empty(len(emails), dtype=np.int32)
+        
+        for i, email in enumerate(emails):
+            category = (email.category or 'primary').lower()
+            code = categories.get(category)
+            if code is None:
+                code = categories[category] = len(categories)
+            category_codes[i] = code
+        
+        return category_codes, list(categories)
+    
+    def _calculate_time_context_boost(self, category: str, current_time: datetime) -> float:
+        """Calculate the time-of-day and day-of-week boost for a category."""
         boost = 0.0
         current_hour = current_time.hour
         day_of_week = current_time.weekday()  # 0=Monday, 6=Sunday
         is_business_hours = 9 <= current_hour <= 17 and day_of_week < 5
         is_weekend = day_of_week >= 5
         
-        category = (email.category or 'primary').lower()
-        
         # Time-of-day adjustments
         if is_business_hours:
             if category == 'important':
@@ -144,14 +387,6 @@ class EnhancedScoringStrategy:
             if category in ['social', 'newsletters']:
                 boost += self.config.WEEKEND_PERSONAL_BOOST
         
-        # Deadline urgency boost (time-sensitive)
-        if self._has_deadline_urgency(email, current_time):
-            boost += self.config.DEADLINE_URGENCY_BOOST
-        
-        if self.config.LOG_SCORE_CALCULATIONS and boost > 0:
-            email_id = getattr(email, 'gmail_id', 'unknown')
-            self.logger.debug(f"[SCORE_CONTEXT] {email_id}: context boost = +{boost:.1f}")
-        
         return boost
     
     def _calculate_engagement_score(self, email: Email) -> float:
@@ -176,8 +411,90 @@ class EnhancedScoringStrategy:
         if not email.from_email:
             return 0.0
         
-        from_email = email.from_email.lower()
-        domain = from_email.split('@')[-1] if '@' in from_email else ''
+        authority = self._sender_authority_for(email.from_email)
+        if self.sender_profiles is not None:
+            authority += self._sender_history_adjustment(self._sender_history(email))
+        return authority
+    
+    def _sender_history(self, email: Email) -> Optional[Any]:
+        """The sender's profile stats for this email's user (None without enough history)."""
+        try:
+            return self.sender_profiles.get(getattr(email, 'user_id', None), email.from_email)
+        except Exception as e:
+            self.logger.warning(f"[SCORE_BASE] Sender profile lookup failed for {email.from_email}: {e}")
+            return None
+    
+    def _sender_history_adjustment(self, stats: Optional[Any]) -> float:
+        """Points for a sender the user opens and answers, minus points for one they trash."""
+        if stats is None:
+            return 0.0
+        return (
+            (stats.open_rate - 0.5) * 2 * self.config.SENDER_OPEN_RATE_WEIGHT
+            + stats.reply_rate * self.config.SENDER_REPLY_RATE_BOOST
+            - stats.trash_rate * self.config.SENDER_TRASH_RATE_PENALTY
+        )
+    
+    def _sender_histories(self, emails: List[Email]) -> Dict[Tuple[Any, str], Optional[Any]]:
+        """Profile stats by (user id, sender) for a batch: one profile lookup per user."""
+        senders_by_user: Dict[Any, set] = {}
+        for email in emails:
+            if email.from_email:
+                senders_by_user.setdefault(getattr(email, 'user_id', None), set()).add(email.from_email)
+        
+        histories = {}
+        for user_id, senders in senders_by_user.items():
+            try:
+                found = self.sender_profiles.get_many(user_id, senders)
+            except Exception as e:
+                self.logger.warning(f"[SCORE_BASE] Sender profile lookup failed for user {user_id}: {e}")
+                continue
+            for from_email, stats in found.items():
+                histories[(user_id, from_email)] = stats
+        return histories
+    
+    def _sender_history_adjustments(self, emails: List[Email]) -> np.ndarray:
+        """Columnar _sender_history_adjustment: one profile lookup per user and batch."""
+        adjustments = np.zeros(len(emails), dtype=np.float64)
+        histories = self._sender_histories(emails)
+        for i, email in enumerate(emails):
+            if email.from_email:
+                stats = histories.get((getattr(email, 'user_id', None), email.from_email))
+                adjustments[i] = self._sender_history_adjustment(stats)
+        return adjustments
+    
+    def sender_history_versions(self, emails: List[Email]) -> List[str]:
+        """
+        Token per email identifying the sender history its base score reads.
+        
+        Empty without sender profiles. The engine adds it to base-score cache
+        keys, so a profile change reads a different key instead of a stale base.
+        """
+        if self.sender_profiles is None:
+            return [''] * len(emails)
+        
+        histories = self._sender_histories(emails)
+        versions = []
+        for email in emails:
+            stats = histories.get((getattr(email, 'user_id', None), email.from_email)) if email.from_email else None
+            versions.append(
+                'h-' if stats is None
+                else f"h{stats.email_count}.{stats.read_count}.{stats.trashed_count}.{stats.replied_count}"
+            )
+        return versions
+    
+    def _sender_authority_for(self, from_email: str) -> float:
+        """Sender authority adjustment for a raw from address (memoized per sender)."""
+        authority = self._sender_authority_cache.get(from_email)
+        if authority is None:
+            if len(self._sender_authority_cache) >= self.config.TEXT_FEATURE_CACHE_SIZE:
+                self._sender_authority_cache.clear()
+            authority = self._sender_authority_cache[from_email] = self._compute_sender_authority(from_email)
+        return authority
+    
+    def _compute_sender_authority(self, from_email: str) -> float:
+        """Calculate sender authority adjustment for a raw from address."""
+        domain = normalize_sender(from_email)[1]
+        from_email = from_email.lower()
         
         # Authority domain boost
         if domain in self._authority_domains:
@@ -188,7 +505,7 @@ class EnhancedScoringStrategy:
             return self.config.PERSONAL_DOMAIN_BOOST
         
         # Marketing sender penalty
-        if any(indicator in from_email for indicator in self._marketing_indicators):
+        if self._marketing_pattern.search(from_email):
             return self.config.MARKETING_SENDER_PENALTY
         
         return 0.0
@@ -198,28 +515,34 @@ class EnhancedScoringStrategy:
         if not email.subject:
             return 0.0
         
-        # Check for urgent keywords using precompiled patterns
-        for pattern in self._urgent_patterns:
-            if pattern.search(email.subject):
-                return 5.0  # Fixed urgency boost
+        if self._subject_has_urgency(email.subject):
+            return 5.0  # Fixed urgency boost
         
         return 0.0
     
+    def _subject_signals(self, subject: str) -> SubjectSignals:
+        """Urgency and deadline signals of a subject (one scan, memoized per subject)."""
+        signals = self._subject_signals_cache.get(subject)
+        if signals is None:
+            if len(self._subject_signals_cache) >= self.config.TEXT_FEATURE_CACHE_SIZE:
+                self._subject_signals_cache.clear()
+            signals = self._subject_signals_cache[subject] = self._subject_matcher.scan(subject)
+        return signals
+    
+    def _subject_has_urgency(self, subject: str) -> bool:
+        """Check a subject for urgent keywords."""
+        return self._subject_signals(subject).urgent
+    
     def _has_deadline_urgency(self, email: Email, current_time: datetime) -> bool:
         """Check if email has time-sensitive deadline urgency."""
         if not email.subject:
             return False
         
-        subject_lower = email.subject.lower()
-        
-        # Look for deadline indicators
-        deadline_indicators = [
-            'expires today', 'deadline today', 'due today',
-            'expires tomorrow', 'deadline tomorrow', 'due tomorrow',
-            'final notice', 'last chance', 'expires soon'
-        ]
-        
-        return any(indicator in subject_lower for indicator in deadline_indicators)
+        return self._subject_has_deadline(email.subject)
+    
+    def _subject_has_deadline(self, subject: str) -> bool:
+        """Look for deadline indicators in a subject line."""
+        return self._subject_signals(subject).deadline
 
 
 class SimpleScoringStrategy:
@@ -320,7 +643,7 @@ class CategoryOptimizedScoringStrategy:
         
         # Newsletter-specific factors
         if email.from_email:
-            domain = email.from_email.split('@')[-1].lower()
+            domain = email_sender(email)[1]
             
             # Trusted newsletter domains
             trusted_domains = {
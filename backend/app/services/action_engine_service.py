@@ -22,6 +22,7 @@ from ..models.proposed_action import ProposedAction, ProposedActionStatus
 from ..models.email_operation import EmailOperation, OperationType, OperationStatus
 from .email_operations_service import create_operation
 from .action_rule_service import get_action_rules_for_user
+from .category_metadata import get_category_metadata
 
 logger = logging.getLogger(__name__)
 
@@ -295,7 +296,7 @@ def approve_proposed_action(
         
         # Get the email and category
         email = db.query(Email).filter(Email.id == proposed_action.email_id).first()
-        category = db.query(EmailCategory).filter(EmailCategory.id == proposed_action.category_id).first()
+        category = get_category_metadata(db).get_by_id(proposed_action.category_id)
         
         if not email or not category:
             logger.error(f"[ACTION_ENGINE] Email or category not found for proposed action {action_id}")
@@ -13,6 +13,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func, desc
 
 from ..models.email_category import EmailCategory
+from .category_metadata import CategoryInfo, get_category_metadata, invalidate_category_metadata
 from ..models.email import Email
 from ..models.proposed_action import ProposedAction, ProposedActionStatus
 from ..models.email_operation import EmailOperation, OperationStatus
@@ -58,6 +59,7 @@ def update_category_action_rule(
         category.set_action_rule(action, delay_days, enabled)
         
         db.commit()
+        invalidate_category_metadata()
         db.refresh(category)
         
         logger.info(f"[ACTION_RULE] Updated action rule for category {category_id}: action={action}, delay={delay_days}, enabled={enabled}")
@@ -71,7 +73,7 @@ def update_category_action_rule(
 def get_action_rules_for_user(
     db: Session, 
     user_id: UUID
-) -> List[EmailCategory]:
+) -> List[CategoryInfo]:
     """
     Get all categories with action rules enabled for a user
     
@@ -80,16 +82,11 @@ def get_action_rules_for_user(
         user_id: User ID
         
     Returns:
-        List of EmailCategory instances with action rules enabled
+        List of CategoryInfo snapshots (cached category metadata) with action rules enabled
     """
     # For now, we only support system categories with action rules
     # In the future, this could be extended to support user-specific categories
-    categories = db.query(EmailCategory).filter(
-        EmailCategory.is_system == True,
-        EmailCategory.action_enabled == True,
-        EmailCategory.action.isnot(None),
-        EmailCategory.action_delay_days.isnot(None)
-    ).all()
+    categories = list(get_category_metadata(db).system_action_rules)
     
     logger.info(f"[ACTION_RULE] Found {len(categories)} categories with action rules for user {user_id}")
     return categories
@@ -312,6 +309,7 @@ def disable_action_rule(
         
         category.clear_action_rule()
         db.commit()
+        invalidate_category_metadata()
         
         logger.info(f"[ACTION_RULE] Disabled action rule for category {category_id}")
         return True
@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Any, Dict, List
 from datetime import datetime, timedelta
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session
@@ -7,6 +7,7 @@ from app.models.email import Email
 
 def analyze_top_contacts(
     db: Session,
+    user_id: Any,
     limit: int = 10,
     days: int = 30
 ) -> Dict[str, List]:
@@ -15,6 +16,7 @@ def analyze_top_contacts(
     
     Args:
         db: Session - Synchronous Database session.
+        user_id: Any - The user whose contacts to analyze.
         limit: int - Number of top contacts to return.
         days: int - Number of days to analyze.
         
@@ -24,14 +26,19 @@ def analyze_top_contacts(
     # Compute the lower bound using Python's datetime and timedelta.
     lower_bound = datetime.utcnow() - timedelta(days=days)
     
-    # Build the query using the computed lower_bound.
+    # Group on the normalized address so "Name <addr>" variants of one sender count together.
+    # Rows not yet backfilled (see sender_backfill) take the address from the raw header.
+    sender = func.coalesce(
+        Email.sender_email,
+        func.lower(func.trim(func.coalesce(func.substring(Email.from_email, '<([^>]*)>'), Email.from_email)))
+    ).label('sender_email')
     query = (
         select(
-            Email.from_email,
+            sender,
             func.count(Email.id).label('email_count')
         )
-        .where(Email.created_at >= lower_bound)
-        .group_by(Email.from_email)
+        .where(Email.user_id == user_id, Email.created_at >= lower_bound, Email.from_email.isnot(None))
+        .group_by(sender)
         .order_by(func.count(Email.id).desc())
         .limit(limit)
     )
@@ -42,7 +49,7 @@ def analyze_top_contacts(
     return {
         "top_contacts": [
             {
-                "email": row.from_email,
+                "email": row.sender_email,
                 "count": row.email_count
             }
             for row in top_senders
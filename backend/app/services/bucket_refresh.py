@@ -0,0 +1,215 @@
+"""
+Bucket Refresh Service
+
+Keeps the stored Email.attention_score consistent with flow bucket membership.
+Each email carries attention_score_refresh_at, the predicted moment its score
+next crosses a bucket boundary. A background scheduler rewrites only emails
+whose refresh time has passed (or was never set), instead of rescoring every
+email on a timer.
+"""
+
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.models.email import Email
+from app.scoring import BucketCrossingPredictor
+from app.services.enhanced_attention_scoring import get_scoring_engine
+
+logger = logging.getLogger(__name__)
+
+# Global scheduler instance
+_scheduler: Optional["BucketRefreshScheduler"] = None
+
+
+def _as_utc(value: Optional[datetime]) -> datetime:
+    """Timezone-aware UTC timestamp (naive values are taken as UTC, None is now)."""
+    if value is None:
+        return datetime.now(timezone.utc)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def get_bucket_predictor() -> BucketCrossingPredictor:
+    """Get a bucket crossing predictor bound to the global scoring engine."""
+    return BucketCrossingPredictor(get_scoring_engine())
+
+
+def schedule_email_refresh(emails: List[Email], current_time: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Rescore emails and set their next bucket refresh time.
+    
+    Updates attention_score, attention_score_refresh_at and attention_base_score
+    on the ORM objects; the caller is responsible for committing.
+    
+    Args:
+        emails: Emails to rescore and schedule
+        current_time: Current timestamp (defaults to now; naive values are taken as UTC)
+    
+    Returns:
+        Counts of scheduled emails and emails whose stored bucket changed
+    """
+    # Refresh times are stored in a timezone-aware column and compared with it
+    current_time = _as_utc(current_time)
+    predictor = get_bucket_predictor()
+    predictions = predictor.predict(emails, current_time)
+    
+    scheduled = 0
+    bucket_changes = 0
+    for email in emails:
+        prediction = predictions.get(str(email.id))
+        if prediction is None:
+            continue
+        
+        if predictor.bucket_index(prediction.score) != predictor.bucket_index(email.attention_score or 0.0):
+            bucket_changes += 1
+        
+        email.attention_score = prediction.score
+        email.attention_score_refresh_at = prediction.change_at
+        email.attention_base_score = prediction.base_score
+        scheduled += 1
+    
+    return {'scheduled': scheduled, 'bucket_changes': bucket_changes}
+
+
+def refresh_due_emails(
+    session: Session,
+    current_time: Optional[datetime] = None,
+    batch_size: Optional[int] = None,
+    user_id=None
+) -> Dict[str, Any]:
+    """
+    Rescore every email whose bucket refresh time has passed.
+    
+    Emails that were never scheduled (NULL refresh time) are picked up first.
+    Rows are claimed with FOR UPDATE SKIP LOCKED, so several workers can run
+    the scheduler at once without doing the same work twice.
+    
+    Args:
+        session: SQLAlchemy database session
+        current_time: Current timestamp (defaults to now; naive values are taken as UTC)
+        batch_size: Emails per transaction (defaults to BUCKET_REFRESH_BATCH_SIZE)
+        user_id: Restrict the refresh to one user (optional)
+    
+    Returns:
+        Refresh statistics
+    """
+    current_time = _as_utc(current_time)
+    batch_size = batch_size or get_scoring_engine().config.BUCKET_REFRESH_BATCH_SIZE
+    
+    totals = {'refreshed': 0, 'bucket_changes': 0, 'batches': 0}
+    
+    while True:
+        query = session.query(Email).filter(
+            or_(
+                Email.attention_score_refresh_at.is_(None),
+                Email.attention_score_refresh_at <= current_time
+            )
+        )
+        if user_id is not None:
+            query = query.filter(Email.user_id == user_id)
+        
+        emails = (
+            query.order_by(Email.attention_score_refresh_at.asc().nullsfirst())
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        
+        if not emails:
+            break
+        
+        result = schedule_email_refresh(emails, current_time)
+        session.commit()
+        
+        totals['refreshed'] += result['scheduled']
+        totals['bucket_changes'] += result['bucket_changes']
+        totals['batches'] += 1
+        
+        if result['scheduled'] == 0:
+            # Nothing could be scored; avoid spinning on the same rows
+            break
+    
+    if totals['refreshed']:
+        logger.info(
+            f"[BUCKET_REFRESH] Refreshed {totals['refreshed']} emails "
+            f"({totals['bucket_changes']} bucket changes) in {totals['batches']} batches"
+        )
+    
+    return totals
+
+
+class BucketRefreshScheduler:
+    """
+    Background thread that periodically runs refresh_due_emails.
+    
+    The thread owns its own database sessions and never raises; errors are
+    logged and retried on the next tick.
+    """
+    
+    def __init__(self, session_factory, interval_seconds: Optional[int] = None):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds or get_scoring_engine().config.BUCKET_REFRESH_INTERVAL_SECONDS
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+    
+    def start(self) -> None:
+        """Start the background thread (no-op if already running)."""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="bucket-refresh-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"[BUCKET_REFRESH] Scheduler started (interval: {self.interval_seconds}s)")
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """Signal the thread to stop and wait for it."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info("[BUCKET_REFRESH] Scheduler stopped")
+    
+    def run_once(self) -> Dict[str, Any]:
+        """Run a single refresh pass with a fresh session."""
+        session = self.session_factory()
+        try:
+            self.last_run = refresh_due_emails(session)
+            return self.last_run
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"[BUCKET_REFRESH] Refresh pass failed: {e}", exc_info=True)
+            self._stop_event.wait(self.interval_seconds)
+
+
+def start_bucket_refresh_scheduler(session_factory) -> BucketRefreshScheduler:
+    """Start the global bucket refresh scheduler."""
+    global _scheduler
+    
+    if _scheduler is None:
+        _scheduler = BucketRefreshScheduler(session_factory)
+    _scheduler.start()
+    return _scheduler
+
+
+def stop_bucket_refresh_scheduler() -> None:
+    """Stop the global bucket refresh scheduler if it is running."""
+    global _scheduler
+    
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
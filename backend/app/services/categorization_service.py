@@ -4,21 +4,44 @@ Categorization Service - Email categorization logic
 This service consolidates all categorization logic for emails.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional, Sequence
+from collections import Counter, defaultdict
 from datetime import datetime, timezone
 import logging
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, inspect, select, update
 from ..models.email import Email
 from ..models.user import User
 from ..models.email_category import EmailCategory, CategoryKeyword, SenderRule
-from ..utils.email_categorizer import categorize_email as categorize_email_util, RuleBasedCategorizer
-from ..utils.email_utils import set_email_category_and_labels
+from ..utils.email_categorizer import categorize_email as categorize_email_util, get_categorizer, RuleBasedCategorizer
+from ..utils.email_utils import normalize_sender, set_email_category_and_labels
+from .category_metadata import get_category_metadata
 from uuid import UUID
 import uuid
 
 logger = logging.getLogger(__name__)
 
+# Columns the rule-based categorizer reads; emails are categorized as plain rows of these
+CATEGORIZATION_COLUMNS = (
+    Email.id,
+    Email.gmail_id,
+    Email.subject,
+    Email.from_email,
+    Email.sender_email,
+    Email.sender_domain,
+    Email.labels
+)
+
+# Ids per SELECT / UPDATE statement
+CATEGORIZATION_CHUNK_SIZE = 1000
+
+
+class CategorizationResult(NamedTuple):
+    """Category assigned to one email and the rule that decided it."""
+    email_id: UUID
+    category: str
+    reason: str
+
 def categorize_email(
     email_data: Dict[str, Any], 
     db: Session, 
@@ -66,6 +89,10 @@ def categorize_emails_batch(
     """
     Categorize a batch of emails
     
+    Only emails that are still uncategorized in the database are touched
+    (see categorize_uncategorized_emails). The Email objects are not read,
+    so expired instances after a commit don't cost a refresh each.
+    
     Args:
         db: Database session
         emails: List of Email model instances to categorize
@@ -76,48 +103,112 @@ def categorize_emails_batch(
     """
     if not emails:
         return 0
-        
-    categorized_count = 0
-    logger.info(f"[CATEGORIZER] Categorizing {len(emails)} emails for user {user_id}")
     
+    email_ids = []
     for email in emails:
-        try:
-            # Skip if already categorized
-            if email.category:
-                continue
-                
-            # Prepare email data for categorization
-            email_data = {
-                'gmail_id': email.gmail_id,
-                'subject': email.subject,
-                'from_email': email.from_email,
-                'labels': email.labels,
-                'snippet': email.snippet,
-                'is_read': email.is_read
-            }
-            
-            # Categorize the email
-            category = categorize_email(email_data, db, user_id)
-            email.category = category
-            categorized_count += 1
-            
-            logger.debug(f"[CATEGORIZER] Categorized email {email.gmail_id} as '{category}'")
-            
-        except Exception as e:
-            logger.error(f"[CATEGORIZER] Error categorizing email {email.gmail_id}: {str(e)}")
-            continue
+        identity = inspect(email).identity
+        email_ids.append(identity[0] if identity else email.id)
+    return categorize_uncategorized_emails(db, user_id, email_ids)
+
+def categorize_uncategorized_emails(
+    db: Session,
+    user_id: UUID,
+    email_ids: Optional[Sequence[UUID]] = None
+) -> int:
+    """
+    Categorize a user's uncategorized emails with one compiled rule set and
+    write the categories back with one UPDATE per category. Commits.
+    
+    Args:
+        db: Database session
+        user_id: User ID for personalized rules
+        email_ids: Restrict to these emails (default: all of the user's uncategorized emails)
+        
+    Returns:
+        Number of emails categorized
+    """
+    records = load_uncategorized_records(db, user_id, email_ids)
+    if not records:
+        return 0
+    
+    logger.info(f"[CATEGORIZER] Categorizing {len(records)} emails for user {user_id}")
+    results = categorize_records(records, get_categorizer(db, user_id))
     
-    # Commit changes
     try:
+        categorized_count = store_categories(db, results)
         db.commit()
-        logger.info(f"[CATEGORIZER] Successfully categorized {categorized_count} emails")
     except Exception as e:
         db.rollback()
-        logger.error(f"[CATEGORIZER] Error committing categorizations: {str(e)}")
+        logger.error(f"[CATEGORIZER] Error storing categorizations: {str(e)}")
         raise
     
+    counts = Counter(result.category for result in results)
+    logger.info(
+        f"[CATEGORIZER] Successfully categorized {categorized_count} emails: "
+        + ", ".join(f"{category}={count}" for category, count in counts.most_common())
+    )
     return categorized_count
 
+def load_uncategorized_records(
+    db: Session,
+    user_id: UUID,
+    email_ids: Optional[Sequence[UUID]] = None
+) -> List[Any]:
+    """Rows of CATEGORIZATION_COLUMNS for the user's emails whose category is still NULL."""
+    query = select(*CATEGORIZATION_COLUMNS).where(Email.user_id == user_id, Email.category.is_(None))
+    if email_ids is None:
+        return db.execute(query).all()
+    
+    records = []
+    for start in range(0, len(email_ids), CATEGORIZATION_CHUNK_SIZE):
+        chunk = email_ids[start:start + CATEGORIZATION_CHUNK_SIZE]
+        records.extend(db.execute(query.where(Email.id.in_(chunk))).all())
+    return records
+
+def categorize_records(
+    records: Iterable[Any],
+    categorizer: RuleBasedCategorizer
+) -> List[CategorizationResult]:
+    """
+    Categorize lightweight email records (rows of CATEGORIZATION_COLUMNS or
+    dicts with the same keys). Emails the categorizer fails on are skipped.
+    """
+    results = []
+    for record in records:
+        email_data = dict(record._mapping) if hasattr(record, '_mapping') else dict(record)
+        try:
+            category, _, reason = categorizer.categorize(email_data)
+        except Exception as e:
+            logger.error(f"[CATEGORIZER] Error categorizing email {email_data.get('gmail_id')}: {str(e)}")
+            continue
+        results.append(CategorizationResult(email_data['id'], category, reason))
+    return results
+
+def store_categories(db: Session, results: Iterable[CategorizationResult]) -> int:
+    """
+    Write categories with one UPDATE per category (chunked by id), only for
+    rows still uncategorized. Like assigning Email.category, clears the stored
+    base score so the attention score is recalculated. Does not commit.
+    
+    Returns:
+        Number of rows updated
+    """
+    ids_by_category: Dict[str, List[UUID]] = defaultdict(list)
+    for result in results:
+        ids_by_category[result.category].append(result.email_id)
+    
+    updated = 0
+    for category, ids in ids_by_category.items():
+        for start in range(0, len(ids), CATEGORIZATION_CHUNK_SIZE):
+            statement = (
+                update(Email)
+                .where(Email.id.in_(ids[start:start + CATEGORIZATION_CHUNK_SIZE]), Email.category.is_(None))
+                .values(category=category, attention_base_score=None, attention_score_refresh_at=None)
+                .execution_options(synchronize_session=False)
+            )
+            updated += db.execute(statement).rowcount
+    return updated
+
 def recategorize_email_on_label_change(
     db: Session,
     email: Email,
@@ -139,7 +230,7 @@ def recategorize_email_on_label_change(
         True if category changed, False otherwise
     """
     # Check if any relevant labels changed
-    categorizer = RuleBasedCategorizer(db, user_id)
+    categorizer = get_categorizer(db, user_id)
     rule_labels = set()
     for rule in categorizer.rules:
         if rule["type"] == "label":
@@ -164,6 +255,8 @@ def recategorize_email_on_label_change(
         'labels': email.labels,
         'subject': email.subject,
         'from_email': email.from_email,
+        'sender_email': email.sender_email,
+        'sender_domain': email.sender_domain,
         'snippet': email.snippet,
         'is_read': email.is_read
     }
@@ -226,8 +319,8 @@ def calculate_importance(
         logger.debug(f"[IMPORTANCE] No category available, categorizing email {gmail_id}")
         category = categorize_email_util(email_data, db, user_id)
     
-    # Get category priority
-    category_obj = db.query(EmailCategory).filter(EmailCategory.name == category).first()
+    # Get category priority (cached category metadata)
+    category_obj = get_category_metadata(db).get(category)
     if category_obj:
         # Lower priority number = higher importance
         priority = category_obj.priority
@@ -260,7 +353,7 @@ def calculate_importance(
     if from_email:
         # Check for personal domains
         personal_domains = ['gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com']
-        domain = from_email.split('@')[-1].lower() if '@' in from_email else ''
+        domain = normalize_sender(from_email)[1]
         
         if domain in personal_domains:
             score += 5
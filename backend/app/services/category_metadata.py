@@ -0,0 +1,164 @@
+"""
+Category Metadata Cache
+
+Email categories change rarely (category management and action-rule
+endpoints) but are read for every email: importance scoring looks up the
+category priority, category updates validate names, and the action engine
+reads action rules. This module keeps one immutable snapshot of all
+categories per process, reloaded after the writers call
+invalidate_category_metadata() or when the snapshot is older than a TTL
+(which bounds staleness for changes made by other worker processes).
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from ..models.email_category import EmailCategory
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_METADATA_TTL_SECONDS = 300.0
+
+
+@dataclass(frozen=True)
+class CategoryInfo:
+    """Detached, read-only copy of an EmailCategory row."""
+    id: int
+    name: str
+    display_name: str
+    description: Optional[str]
+    priority: int
+    is_system: bool
+    action: Optional[str]
+    action_delay_days: Optional[int]
+    action_enabled: bool
+    
+    @classmethod
+    def from_model(cls, category: EmailCategory) -> 'CategoryInfo':
+        return cls(
+            id=category.id,
+            name=category.name,
+            display_name=category.display_name,
+            description=category.description,
+            priority=category.priority,
+            is_system=bool(category.is_system),
+            action=category.action,
+            action_delay_days=category.action_delay_days,
+            action_enabled=bool(category.action_enabled)
+        )
+    
+    def has_action_rule(self) -> bool:
+        """Same as EmailCategory.has_action_rule."""
+        return self.action is not None and self.action_delay_days is not None and self.action_enabled
+    
+    def get_action_rule(self) -> Optional[dict]:
+        """Same as EmailCategory.get_action_rule."""
+        if not self.has_action_rule():
+            return None
+        return {
+            'action': self.action,
+            'delay_days': self.action_delay_days,
+            'enabled': self.action_enabled
+        }
+
+
+class CategoryMetadata:
+    """
+    Snapshot of all categories with the lookups the hot paths need.
+    
+    Names are not unique (a user category may share a system category's
+    name); lookups by name return the system category, otherwise the one
+    with the lowest id.
+    """
+    
+    def __init__(self, categories: List[CategoryInfo]):
+        ordered = sorted(categories, key=lambda c: (not c.is_system, c.id))
+        self.categories: Tuple[CategoryInfo, ...] = tuple(sorted(categories, key=lambda c: c.id))
+        self.by_id: Dict[int, CategoryInfo] = {c.id: c for c in self.categories}
+        self.by_name: Dict[str, CategoryInfo] = {}
+        self.by_lower_name: Dict[str, CategoryInfo] = {}
+        for category in ordered:
+            self.by_name.setdefault(category.name, category)
+            self.by_lower_name.setdefault(category.name.lower(), category)
+        self.names: FrozenSet[str] = frozenset(self.by_name)
+        self.system_action_rules: Tuple[CategoryInfo, ...] = tuple(
+            c for c in self.categories if c.is_system and c.has_action_rule()
+        )
+    
+    def get(self, name: Optional[str]) -> Optional[CategoryInfo]:
+        """Category by exact name."""
+        return self.by_name.get(name) if name else None
+    
+    def get_ignore_case(self, name: Optional[str]) -> Optional[CategoryInfo]:
+        """Category by case-insensitive name."""
+        return self.by_lower_name.get(name.lower()) if name else None
+    
+    def get_by_id(self, category_id: Optional[int]) -> Optional[CategoryInfo]:
+        return self.by_id.get(category_id)
+    
+    def __len__(self) -> int:
+        return len(self.categories)
+
+
+class CategoryMetadataCache:
+    """Process-wide CategoryMetadata snapshot with invalidation and a TTL."""
+    
+    def __init__(self, ttl_seconds: float = CATEGORY_METADATA_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CategoryMetadata] = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._loads = 0
+        self._hits = 0
+    
+    def get(self, db: Session) -> CategoryMetadata:
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                self._hits += 1
+                return self._snapshot
+            generation = self._generation
+        
+        # Load outside the lock; publish only if nothing was invalidated meanwhile
+        snapshot = CategoryMetadata([
+            CategoryInfo.from_model(category)
+            for category in db.query(EmailCategory).order_by(EmailCategory.id).all()
+        ])
+        with self._lock:
+            self._loads += 1
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._loaded_at = time.monotonic()
+        logger.debug(f"[CATEGORY_METADATA] Loaded {len(snapshot)} categories")
+        return snapshot
+    
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+    
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'loads': self._loads, 'hits': self._hits, 'generation': self._generation}
+
+
+_category_metadata_cache = CategoryMetadataCache()
+
+
+def get_category_metadata(db: Session) -> CategoryMetadata:
+    """Current category snapshot; queries the database only after a change or the TTL."""
+    return _category_metadata_cache.get(db)
+
+
+def invalidate_category_metadata() -> None:
+    """Drop the cached snapshot; call after committing any category create/update/delete."""
+    _category_metadata_cache.invalidate()
+
+
+def get_category_metadata_stats() -> Dict[str, int]:
+    """Load/hit counters of the category metadata cache."""
+    return _category_metadata_cache.get_stats()
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_
 from ..models.email_category import EmailCategory, CategoryKeyword, SenderRule
 from ..models.user import User
+from .category_metadata import invalidate_category_metadata
 from datetime import datetime
 import json
 
@@ -108,6 +109,7 @@ def initialize_system_categories(db: Session) -> List[EmailCategory]:
         created_categories.append(category)
     
     db.commit()
+    invalidate_category_metadata()
     return created_categories
 
 def populate_system_keywords(db: Session) -> int:
@@ -293,6 +293,8 @@ class EmailClassifierService:
                 'gmail_id': email.gmail_id,
                 'subject': email.subject,
                 'from_email': email.from_email,
+                'sender_email': email.sender_email,
+                'sender_domain': email.sender_domain,
                 'snippet': email.snippet,
                 'labels': email.labels,
                 'is_read': email.is_read,
@@ -380,6 +382,8 @@ class EmailClassifierService:
                     'gmail_id': email.gmail_id,
                     'subject': email.subject,
                     'from_email': email.from_email,
+                    'sender_email': email.sender_email,
+                    'sender_domain': email.sender_domain,
                     'snippet': email.snippet,
                     'labels': email.labels,
                     'is_read': email.is_read,
@@ -778,7 +782,7 @@ class EmailClassifierService:
         confidence_score: Optional[float] = None
     ) -> EmailTrashEvent:
         """Record a trash event for future training"""
-        from email.utils import parseaddr
+        from ..utils.email_utils import normalize_sender
         import re
         from collections import Counter
         
@@ -788,8 +792,7 @@ class EmailClassifierService:
             from_email = email_data.get('from_email', 'unknown')
             
             # Extract sender domain
-            _, sender_address = parseaddr(from_email)
-            sender_domain = sender_address.split('@')[-1].lower() if '@' in sender_address else ''
+            sender_domain = normalize_sender(from_email)[1]
             
             # Extract keywords
             text = f"{subject} {email_data.get('snippet', '')}".lower()
@@ -1,21 +1,19 @@
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timezone
 import logging
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.orm import Session, sessionmaker
 from ..models.email import Email
 from ..models.user import User
-from ..models.email_category import EmailCategory
+from ..models.reprocess_job import ReprocessJobStatus
 from email.utils import parsedate_to_datetime
 import dateutil.parser
-from ..utils.email_categorizer import categorize_email as categorize_email_util, RuleBasedCategorizer
+from ..utils.email_categorizer import categorize_email as categorize_email_util
 from uuid import UUID
 import time
-import math
-import json
 from ..services.email_classifier_service import email_classifier_service
-from ..utils.filter_utils import apply_email_filters
-from ..utils.email_utils import set_email_category_and_labels
+from ..services.sender_profiles import SenderProfileUpdates
+from .category_metadata import get_category_metadata
+from .reprocess_jobs import ReprocessJobConflict, run_reprocess_job, start_reprocess_job
 from sqlalchemy import and_
 import uuid
 
@@ -32,6 +30,7 @@ def process_and_store_emails(
     processed_emails = []
     new_emails_count = 0
     updated_emails_count = 0
+    profile_updates = SenderProfileUpdates()
     logger.info(f"[PROCESSOR] Processing {len(emails)} emails for user {user.id} (email: {user.email})")
     
     for i, email_data in enumerate(emails):
@@ -52,6 +51,8 @@ def process_and_store_emails(
             ).first()
             
             if existing_email:
+                profile_updates.labels_changed(existing_email, existing_email.labels, email_data.get('labels'))
+                
                 # Update existing email
                 existing_email.subject = email_data.get('subject')
                 existing_email.from_email = email_data.get('from_email')
@@ -93,6 +94,7 @@ def process_and_store_emails(
                 )
                 
                 db.add(new_email)
+                profile_updates.email_received(new_email)
                 processed_emails.append(new_email)
                 new_emails_count += 1
                 logger.debug(f"[PROCESSOR] Created new email: {gmail_id}")
@@ -101,6 +103,9 @@ def process_and_store_emails(
             logger.error(f"[PROCESSOR] Error processing email {i+1}: {str(e)}")
             continue
     
+    # Update sender history in the same transaction
+    profile_updates.flush(db)
+    
     # Commit all changes
     try:
         db.commit()
@@ -201,15 +206,13 @@ def calculate_importance(
         # Store category in email_data to avoid future recategorization
         email_data['category'] = category
     
-    # Fetch category priorities from the database
-    # Get priorities for all categories
-    categories = db.query(EmailCategory).all()
-    category_priorities = {cat.name.lower(): cat.priority for cat in categories}
+    # Category priorities come from the cached category metadata (no query per email)
+    category_info = get_category_metadata(db).get_ignore_case(category)
     
     # Default adjustments based on priority (lower priority number = higher importance)
     # We'll convert the priority (1-10) to an importance adjustment (-20 to +25)
-    if category and category.lower() in category_priorities:
-        priority = category_priorities[category.lower()]
+    if category_info:
+        priority = category_info.priority
         # Inverse mapping: priority 1 (highest) = +25, priority 10 (lowest) = -20
         adjustment = 30 - (5 * priority)
         score += adjustment
@@ -277,6 +280,10 @@ def reprocess_emails(
     """
     Reprocess emails by updating their categories and other derived attributes
     
+    Runs a reprocess job (see app.services.reprocess_jobs) to completion in
+    the calling thread. The API schedules the same job in the background
+    instead; use this from scripts and tests.
+    
     Args:
         db: Database session
         user_id: User ID who owns the emails
@@ -287,102 +294,30 @@ def reprocess_emails(
         Dictionary with reprocessing statistics
     """
     start_time = datetime.now(timezone.utc)
-    logger.info(f"[REPROCESS] Starting reprocessing for user {user_id}")
-    if filter_params:
-        logger.info(f"[REPROCESS] Filters: {filter_params}")
-    classifier_loaded = email_classifier_service.load_trash_classifier(user_id)
-    if not classifier_loaded:
-        logger.warning(f"[REPROCESS] No classifier model for user {user_id}, using rules-based categorization")
-    query = db.query(Email).filter(Email.user_id == user_id)
-    if not include_reprocessed:
-        query = query.filter(or_(Email.last_reprocessed_at.is_(None), Email.is_dirty.is_(True)))
-    if filter_params:
-        query = apply_email_filters(query, filter_params)
-    total_emails = query.count()
-    logger.info(f"[REPROCESS] {total_emails} emails to reprocess")
-    if total_emails == 0:
-        logger.info(f"[REPROCESS] No emails to reprocess. Exiting.")
-        return {"status": "success", "message": "No emails to reprocess", "reprocessed_count": 0, "duration": 0}
+    try:
+        job = start_reprocess_job(db, user_id, filter_params, include_reprocessed)
+    except ReprocessJobConflict as conflict:
+        job, result = conflict.job, None
+    else:
+        result = run_reprocess_job(job.id, sessionmaker(bind=db.get_bind()))
+    if result is None:
+        return {
+            "status": "running",
+            "message": f"Reprocess job {job.id} is already running",
+            "job_id": job.id,
+            "reprocessed_count": 0,
+            "duration": 0,
+            "category_changes": {}
+        }
     
-    # Process emails in batches to avoid memory issues
-    batch_size = 100
-    total_batches = math.ceil(total_emails / batch_size)
-    reprocessed_count = 0
-    category_changes = {}
-
-    # Instantiate categorizer once for the batch
-    categorizer = RuleBasedCategorizer(db, user_id)
-
-    logger.info(f"[REPROCESS] Processing {total_emails} emails in {total_batches} batches of {batch_size}")
-
-    for batch_num in range(total_batches):
-        offset = batch_num * batch_size
-        batch_query = query.order_by(Email.received_at.desc()).offset(offset).limit(batch_size)
-        batch_emails = batch_query.all()
-
-        logger.info(f"[REPROCESS] Processing batch {batch_num + 1}/{total_batches} ({len(batch_emails)} emails)")
-
-        # Process each email in the batch
-        for email in batch_emails:
-            old_category = email.category
-
-            # Reprocess the email
-            logger.debug(f"[REPROCESS] Reprocessing email {email.id} (Gmail ID: {email.gmail_id})")
-            logger.debug(f"[REPROCESS] Current category: {old_category}")
-
-            # If we have labels, use them to categorize
-            if email.labels:
-                try:
-                    # Create full email data for better categorization
-                    email_data = {
-                        'id': email.id,
-                        'gmail_id': email.gmail_id,
-                        'labels': json.loads(email.labels) if isinstance(email.labels, str) else email.labels,
-                        'subject': email.subject,
-                        'from_email': email.from_email,
-                        'snippet': email.snippet,
-                        'is_read': email.is_read
-                    }
-
-                    logger.info(f"[CLASSIFICATION] Classifying email {email.id} using modular categorizer")
-                    # Use the cached categorizer instance
-                    new_category = categorize_email_util(email_data, db, user_id, categorizer=categorizer)
-
-                    # Always enforce label/category consistency
-                    # Ensure labels is a list before updating
-                    if isinstance(email.labels, str):
-                        try:
-                            email.labels = json.loads(email.labels)
-                        except Exception:
-                            email.labels = [email.labels]
-                    set_email_category_and_labels(email, new_category, db)
-                    if new_category != old_category:
-                        category_changes[new_category] = category_changes.get(new_category, 0) + 1
-                        logger.info(f"[REPROCESS] Email {email.id} category changed: {old_category} → {new_category} and labels updated for consistency")
-                    else:
-                        logger.debug(f"[REPROCESS] Email {email.id} category unchanged ({new_category}), labels updated for consistency")
-                except Exception as e:
-                    logger.error(f"[REPROCESS] Error categorizing email {email.id}: {str(e)}")
-            else:
-                logger.debug(f"[REPROCESS] Email {email.id} has no labels, skipping categorization")
-
-            # Mark as clean and store reprocessing timestamp
-            email.is_dirty = False
-            email.last_reprocessed_at = datetime.now(timezone.utc)
-            reprocessed_count += 1
-
-        # Commit each batch separately
-        db.commit()
-        logger.info(f"[REPROCESS] Batch {batch_num + 1} completed - {reprocessed_count}/{total_emails} emails processed")
-
     duration = (datetime.now(timezone.utc) - start_time).total_seconds()
-    logger.info(f"[REPROCESS] Completed reprocessing {reprocessed_count} emails in {duration:.2f}s. Category changes: {category_changes}")
     return {
-        "status": "success",
-        "message": f"Reprocessed {reprocessed_count} emails",
-        "reprocessed_count": reprocessed_count,
+        "status": "success" if result['status'] == ReprocessJobStatus.COMPLETED.value else "error",
+        "message": result['error_message'] or f"Reprocessed {result['processed']} emails",
+        "job_id": job.id,
+        "reprocessed_count": result['processed'],
         "duration": round(duration, 2),
-        "category_changes": category_changes
+        "category_changes": result['category_changes']
     }
 
 def maybe_train_classifier(db: Session, user_id: UUID) -> Dict[str, Any]:
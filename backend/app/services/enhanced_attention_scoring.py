@@ -6,8 +6,13 @@ backward compatibility with the existing simple scoring service.
 """
 
 import logging
-from typing import List, Optional, Dict, Any
+from dataclasses import asdict
+from types import SimpleNamespace
+from typing import List, Optional, Dict, Any, Callable, Iterable, Iterator
 from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import set_committed_value
 from app.models.email import Email
 from app.scoring import (
     EmailScoringEngine, 
@@ -15,13 +20,33 @@ from app.scoring import (
     current_config,
     EmailScoringDebugger
 )
+from app.scoring.comparison import STRATEGY_TYPES, StrategyComparison
+from app.scoring.metrics_segment import MetricsPublisher, SharedMetricsSegment, merge_worker_states
+from app.services.score_persistence import bulk_update_scores
+from app.services.sender_profiles import attach_sender_profiles
 
 # Global scoring engine instance
 _scoring_engine: Optional[EmailScoringEngine] = None
 _debugger: Optional[EmailScoringDebugger] = None
+_metrics_publisher: Optional[MetricsPublisher] = None
 
 logger = logging.getLogger(__name__)
 
+# Columns loaded for streaming analysis (scoring inputs plus what anomaly summaries show)
+ANALYSIS_COLUMNS = (
+    Email.id,
+    Email.user_id,
+    Email.gmail_id,
+    Email.subject,
+    Email.from_email,
+    Email.sender_email,
+    Email.sender_domain,
+    Email.received_at,
+    Email.labels,
+    Email.is_read,
+    Email.category
+)
+
 
 def get_scoring_engine() -> EmailScoringEngine:
     """
@@ -59,22 +84,40 @@ def get_scoring_engine() -> EmailScoringEngine:
                     raise ImportError("Redis not available")
                     
             except (ImportError, Exception) as e:
-                # Fallback to in-memory cache
-                _scoring_engine = ScoringEngineFactory.create_engine(
-                    config,
-                    strategy_type="enhanced", 
-                    cache_type="memory"
-                )
-                logger.info(f"[ENHANCED_SCORING] Initialized with in-memory cache (Redis unavailable: {e})")
+                # Fallback to a local cache, shared between workers on this host if possible
+                _scoring_engine = _create_local_cache_engine(config)
+                logger.info(f"[ENHANCED_SCORING] Initialized with local {config.LOCAL_CACHE_BACKEND} cache (Redis unavailable: {e})")
                 
         except Exception as e:
             logger.error(f"[ENHANCED_SCORING] Failed to initialize scoring engine: {e}")
             # Ultimate fallback to default
             _scoring_engine = ScoringEngineFactory.create_default_engine(current_config())
+        
+        if attach_sender_profiles(_scoring_engine):
+            logger.info("[ENHANCED_SCORING] Sender history features enabled")
     
     return _scoring_engine
 
 
+def _create_local_cache_engine(config) -> EmailScoringEngine:
+    """Create an engine with the configured local cache, falling back to per-process memory."""
+    if config.LOCAL_CACHE_BACKEND == 'shared_memory':
+        try:
+            return ScoringEngineFactory.create_engine(
+                config,
+                strategy_type="enhanced",
+                cache_type="shared_memory"
+            )
+        except Exception as e:
+            logger.warning(f"[ENHANCED_SCORING] Shared memory cache unavailable, using per-process cache: {e}")
+    
+    return ScoringEngineFactory.create_engine(
+        config,
+        strategy_type="enhanced", 
+        cache_type="memory"
+    )
+
+
 def get_debugger() -> EmailScoringDebugger:
     """Get the global scoring debugger instance."""
     global _debugger
@@ -144,20 +187,26 @@ def calculate_scores_batch(emails: List[Email], current_time: Optional[datetime]
         return result
 
 
-def invalidate_score_cache(email_ids: Optional[List[str]] = None, pattern: Optional[str] = None) -> int:
+def invalidate_score_cache(
+    email_ids: Optional[List[str]] = None,
+    pattern: Optional[str] = None,
+    emails: Optional[List[Email]] = None
+) -> int:
     """
     Invalidate cached attention scores.
     
     Args:
-        email_ids: Specific email IDs to invalidate (optional)
+        email_ids: Specific email IDs to invalidate (optional; only for
+            un-namespaced keys, prefer emails)
         pattern: Pattern to match for bulk invalidation (optional)
+        emails: Emails whose exact cache keys to delete in one call (optional)
         
     Returns:
         Number of cache entries invalidated
     """
     try:
         engine = get_scoring_engine()
-        invalidated = engine.invalidate_cache(email_ids, pattern)
+        invalidated = engine.invalidate_cache(email_ids, pattern, emails)
         
         logger.info(f"[ENHANCED_SCORING] Invalidated {invalidated} cache entries")
         return invalidated
@@ -167,6 +216,29 @@ def invalidate_score_cache(email_ids: Optional[List[str]] = None, pattern: Optio
         return 0
 
 
+def invalidate_user_score_cache(user_id, category: Optional[str] = None) -> Optional[int]:
+    """
+    Invalidate all cached attention scores of one user in O(1).
+    
+    Use after anything that changes many of a user's scores at once (rule
+    changes, resyncs). Other users' cache entries are untouched.
+    
+    Args:
+        user_id: User whose scores to invalidate
+        category: Only invalidate this category (optional)
+        
+    Returns:
+        The new cache generation, or None if invalidation failed
+    """
+    try:
+        engine = get_scoring_engine()
+        return engine.invalidate_user(user_id, category)
+        
+    except Exception as e:
+        logger.error(f"[ENHANCED_SCORING] Error invalidating cache for user {user_id}: {e}")
+        return None
+
+
 def get_scoring_performance_stats() -> Dict[str, Any]:
     """
     Get performance statistics for the scoring system.
@@ -183,6 +255,103 @@ def get_scoring_performance_stats() -> Dict[str, Any]:
         return {'error': str(e)}
 
 
+def _create_metrics_segment(config) -> SharedMetricsSegment:
+    return SharedMetricsSegment(
+        path=config.METRICS_SEGMENT_PATH,
+        stale_after_seconds=config.METRICS_WORKER_STALE_SECONDS,
+        max_latency_ms=config.PERFORMANCE_HISTOGRAM_MAX_MS
+    )
+
+
+def start_metrics_publisher() -> Optional[MetricsPublisher]:
+    """Start publishing this worker's scoring metrics to the shared segment."""
+    global _metrics_publisher
+    
+    config = get_scoring_engine().config
+    if not config.METRICS_AGGREGATION_ENABLED:
+        return None
+    
+    if _metrics_publisher is None:
+        try:
+            _metrics_publisher = MetricsPublisher(
+                _create_metrics_segment(config),
+                lambda: get_scoring_engine().export_metrics_state(),
+                config.METRICS_PUBLISH_INTERVAL_SECONDS
+            )
+        except OSError as e:
+            logger.warning(f"[ENHANCED_SCORING] Metrics segment unavailable, fleet stats disabled: {e}")
+            return None
+    _metrics_publisher.start()
+    return _metrics_publisher
+
+
+def stop_metrics_publisher() -> None:
+    """Stop the metrics publisher and retire this worker's final totals."""
+    global _metrics_publisher
+    
+    if _metrics_publisher is not None:
+        _metrics_publisher.stop()
+        _metrics_publisher = None
+
+
+def _collect_fleet_stats() -> Optional[Dict[str, Any]]:
+    """Merge every worker's published state, including a fresh one for this worker."""
+    if _metrics_publisher is None:
+        return None
+    
+    _metrics_publisher.publish_now()
+    return merge_worker_states(
+        _metrics_publisher.segment.collect(),
+        max_latency_ms=get_scoring_engine().config.PERFORMANCE_HISTOGRAM_MAX_MS
+    )
+
+
+def get_fleet_performance_stats() -> Dict[str, Any]:
+    """
+    Get scoring statistics merged across every worker on this host.
+    
+    Falls back to this worker's statistics when aggregation is disabled.
+    
+    Returns:
+        Dictionary with fleet-wide hit rates, counters and latency percentiles
+    """
+    try:
+        fleet = _collect_fleet_stats()
+        if fleet is None:
+            return {'workers': 1, 'aggregated': False, **get_scoring_engine().get_performance_stats()}
+        
+        fleet.pop('monitor')
+        return {'aggregated': True, **fleet}
+        
+    except Exception as e:
+        logger.error(f"[ENHANCED_SCORING] Error aggregating fleet stats: {e}")
+        return {'error': str(e)}
+
+
+def get_scoring_metrics_text() -> str:
+    """
+    Get scoring metrics in the Prometheus text exposition format.
+    
+    Metrics are merged across workers when aggregation is running, so any
+    worker answering the scrape reports the whole host.
+    
+    Returns:
+        Exposition text, or a comment line if the engine has no monitor
+    """
+    try:
+        fleet = _collect_fleet_stats()
+        if fleet is not None:
+            return fleet['monitor'].render_prometheus()
+    except Exception as e:
+        logger.error(f"[ENHANCED_SCORING] Error aggregating fleet metrics, serving this worker's: {e}")
+    
+    engine = get_scoring_engine()
+    monitor = engine.performance_monitor
+    if monitor is None or not hasattr(monitor, 'render_prometheus'):
+        return "# Scoring performance monitor not configured\n"
+    return monitor.render_prometheus()
+
+
 def debug_email_score(email: Email, current_time: Optional[datetime] = None) -> Dict[str, Any]:
     """
     Get detailed debugging information for an email's score calculation.
@@ -230,33 +399,138 @@ def analyze_score_distribution(emails: List[Email]) -> Dict[str, Any]:
         analysis = debugger.analyze_score_distribution(emails)
         
         # Convert dataclass objects to dictionaries for JSON serialization
-        result = {}
-        for category, stats in analysis.items():
-            result[category] = {
-                'category': stats.category,
-                'count': stats.count,
-                'mean': stats.mean,
-                'median': stats.median,
-                'std_dev': stats.std_dev,
-                'min_score': stats.min_score,
-                'max_score': stats.max_score,
-                'percentiles': stats.percentiles,
-                'score_ranges': stats.score_ranges
-            }
-        
-        return result
+        return {category: asdict(stats) for category, stats in analysis.items()}
         
     except Exception as e:
         logger.error(f"[ENHANCED_SCORING] Error analyzing score distribution: {e}")
         return {'error': str(e)}
 
 
+def stream_user_emails_for_analysis(
+    db: Session,
+    user_id,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    limit: Optional[int] = None,
+    chunk_size: int = 5000
+) -> Iterator[List[SimpleNamespace]]:
+    """
+    Yield a user's emails (newest first) in chunks through a server-side cursor.
+    
+    Only the columns the strategies and anomaly summaries read are loaded, as
+    plain objects rather than ORM instances.
+    """
+    statement = select(*ANALYSIS_COLUMNS).where(Email.user_id == user_id)
+    if min_score is not None:
+        statement = statement.where(Email.attention_score >= min_score)
+    if max_score is not None:
+        statement = statement.where(Email.attention_score < max_score)
+    statement = statement.order_by(Email.received_at.desc())
+    if limit:
+        statement = statement.limit(limit)
+    
+    result = db.execute(statement.execution_options(yield_per=chunk_size))
+    for partition in result.mappings().partitions():
+        yield [SimpleNamespace(**row) for row in partition]
+
+
+def analyze_score_distribution_streaming(
+    email_chunks: Iterable[List[Any]],
+    group_by: str = 'category',
+    include_anomalies: bool = False,
+    max_anomalies: int = 50
+) -> Dict[str, Any]:
+    """
+    Analyze score distribution (and optionally anomalies) over a stream of email chunks.
+    
+    Memory stays flat regardless of the number of emails; see
+    EmailScoringDebugger.analyze_score_stream.
+    
+    Returns:
+        Totals, per-group distribution and (if requested) anomalies
+    """
+    debugger = get_debugger()
+    analysis = debugger.analyze_score_stream(
+        email_chunks,
+        group_by=group_by,
+        max_anomalies=max_anomalies if include_anomalies else 0
+    )
+    
+    result = {
+        'total_emails': analysis['total_emails'],
+        'errors': analysis['errors'],
+        'distribution': {group: asdict(stats) for group, stats in analysis['distribution'].items()}
+    }
+    if include_anomalies:
+        result['anomalies'] = [
+            {**anomaly, 'breakdown': asdict(anomaly['breakdown'])} for anomaly in analysis['anomalies']
+        ]
+        result['anomaly_count'] = analysis['anomaly_count']
+    return result
+
+
+def compare_strategies_for_user(
+    session_factory: Callable[[], Session],
+    user_id,
+    strategy_types: Optional[List[str]] = None,
+    baseline: str = 'enhanced',
+    workers: Optional[int] = None,
+    limit: Optional[int] = None,
+    progress_callback: Optional[Callable[[int], None]] = None
+) -> Dict[str, Any]:
+    """
+    Score a user's whole mailbox with several strategies in parallel worker processes.
+    
+    Reports per-strategy throughput and latency and, for every other strategy,
+    how often it assigns the same flow bucket as the baseline. This occupies
+    several CPU cores for the length of the run, so it is an offline tool
+    (see compare_strategies.py), not a request handler.
+    
+    Args:
+        session_factory: Creates the short-lived sessions emails are read through
+        user_id: User whose emails are compared
+        strategy_types: Strategies to compare (defaults to all)
+        baseline: Strategy the others are compared against
+        workers: Worker processes (defaults to RESCORE_WORKERS or the CPU count)
+        limit: Compare at most this many emails
+        progress_callback: Called with the number of emails compared so far
+    """
+    from app.services.score_rescoring import stream_user_emails
+    
+    config = get_scoring_engine().config
+    strategy_types = list(strategy_types or STRATEGY_TYPES)
+    if baseline not in strategy_types:
+        strategy_types.insert(0, baseline)
+    
+    def row_chunks() -> Iterator[List[Dict[str, Any]]]:
+        remaining = limit
+        for rows in stream_user_emails(session_factory, user_id, config.RESCORE_BATCH_SIZE):
+            if remaining is not None:
+                rows = rows[:remaining]
+                remaining -= len(rows)
+            if rows:
+                yield rows
+            if remaining is not None and remaining <= 0:
+                return
+    
+    comparison = StrategyComparison(
+        config,
+        strategy_types=strategy_types,
+        baseline=baseline,
+        workers=workers or config.RESCORE_WORKERS
+    )
+    return comparison.run(row_chunks(), progress_callback=progress_callback)
+
+
 def update_email_attention_scores(emails: List[Email], force_update: bool = False) -> Dict[str, Any]:
     """
     Update attention scores for a list of emails and save to database.
     
     This function recalculates scores and updates the database. It's useful for
-    batch processing and migration scenarios.
+    batch processing and migration scenarios. Scores are written with chunked
+    set-based UPDATEs through the emails' session (skipping changes below
+    SCORE_WRITE_EPSILON); emails without a session get their attributes set
+    for the caller to flush. The caller is responsible for committing.
     
     Args:
         emails: List of emails to update
@@ -267,43 +541,68 @@ def update_email_attention_scores(emails: List[Email], force_update: bool = Fals
     """
     try:
         updated_count = 0
+        unchanged_count = 0
         error_count = 0
         total_time = 0.0
         
         logger.info(f"[ENHANCED_SCORING] Starting batch update of {len(emails)} email scores")
         
         start_time = datetime.now()
+        engine = get_scoring_engine()
+        config = engine.config
+        batch_size = config.BATCH_SIZE_SCORE_UPDATES
+        session = object_session(emails[0]) if emails else None
+        if session is not None:
+            # The UPDATEs are text() statements, which do not autoflush: pending
+            # or modified emails must reach the database (and get ids) first
+            session.flush()
         
-        for email in emails:
-            try:
-                # Calculate new score
-                if force_update:
-                    # Bypass cache to force recalculation
-                    engine = get_scoring_engine()
-                    new_score = engine.get_current_score(email, bypass_cache=True)
-                else:
-                    new_score = calculate_enhanced_attention_score(email)
-                
-                # Update the email object
-                old_score = email.attention_score
-                email.attention_score = new_score
-                
-                updated_count += 1
-                
-                if abs(new_score - (old_score or 0)) > 5.0:  # Significant change
-                    logger.debug(f"[ENHANCED_SCORING] Score change for {email.id}: {old_score} → {new_score}")
+        for batch_start in range(0, len(emails), batch_size):
+            batch = emails[batch_start:batch_start + batch_size]
+            
+            # Score the whole batch at once (bypass cache to force recalculation)
+            scores = engine.get_scores_batch(batch, bypass_cache=force_update)
+            
+            scored = []
+            for email in batch:
+                new_score = scores.get(str(email.id))
+                if new_score is None:
+                    logger.error(f"[ENHANCED_SCORING] No score calculated for email {email.id}")
+                    error_count += 1
+                    continue
                 
-            except Exception as e:
-                logger.error(f"[ENHANCED_SCORING] Error updating score for email {email.id}: {e}")
-                error_count += 1
+                if abs(new_score - (email.attention_score or 0)) > 5.0:  # Significant change
+                    logger.debug(f"[ENHANCED_SCORING] Score change for {email.id}: {email.attention_score} → {new_score}")
+                scored.append((email, new_score))
+            
+            if session is None:
+                for email, new_score in scored:
+                    email.attention_score = new_score
+                updated_count += len(scored)
+                continue
+            
+            written = bulk_update_scores(
+                session,
+                [{'id': email.id, 'attention_score': new_score} for email, new_score in scored],
+                epsilon=config.SCORE_WRITE_EPSILON,
+                chunk_size=config.SCORE_WRITE_CHUNK_SIZE,
+                bucket_thresholds=(config.BUCKET_NOW_THRESHOLD, config.BUCKET_LATER_THRESHOLD)
+            )
+            # Keep the loaded objects in line with the rows without marking them dirty
+            for email, new_score in scored:
+                if str(email.id) in written:
+                    set_committed_value(email, 'attention_score', new_score)
+            updated_count += len(written)
+            unchanged_count += len(scored) - len(written)
         
         total_time = (datetime.now() - start_time).total_seconds()
         
         result = {
             'total_emails': len(emails),
             'updated_count': updated_count,
+            'unchanged_count': unchanged_count,
             'error_count': error_count,
-            'success_rate': round((updated_count / len(emails)) * 100, 2) if emails else 0,
+            'success_rate': round(((updated_count + unchanged_count) / len(emails)) * 100, 2) if emails else 0,
             'total_time_seconds': round(total_time, 2),
             'emails_per_second': round(len(emails) / total_time, 2) if total_time > 0 else 0,
             'force_update': force_update
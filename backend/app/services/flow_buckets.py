@@ -13,9 +13,9 @@ import logging
 from datetime import datetime
 from typing import Literal, List, Dict, Any, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc, and_
+from sqlalchemy import desc, asc, and_, func
 from app.models.email import Email
-from app.services.enhanced_attention_scoring import calculate_enhanced_attention_score, calculate_scores_batch
+from app.services.enhanced_attention_scoring import calculate_enhanced_attention_score, calculate_scores_batch, get_scoring_engine
 
 logger = logging.getLogger(__name__)
 
@@ -84,6 +84,9 @@ def query_bucket_emails(
     Fresh scores are calculated for display purposes only but don't affect
     which bucket an email is shown in.
     
+    When SQL_FRESH_SCORE_BUCKETS is enabled, the live score is computed in
+    Postgres instead, and bucket membership, ordering and pagination all use it.
+    
     Args:
         session: SQLAlchemy database session
         user_id: ID of the user to query emails for
@@ -101,11 +104,11 @@ def query_bucket_emails(
     """
     logger.debug(f"[FLOW_BUCKETS] Querying {bucket} bucket for user {user_id}, limit={limit}, offset={offset}")
     
-    bucket_filters = {
-        "now": Email.attention_score >= 60.0,
-        "later": and_(Email.attention_score >= 30.0, Email.attention_score < 60.0),
-        "reference": Email.attention_score < 30.0
-    }
+    fresh_score = _get_fresh_score_sql()
+    if fresh_score is not None:
+        return _query_bucket_emails_live(session, user_id, bucket, limit, offset, order_by, fresh_score)
+    
+    bucket_filters = _bucket_filters(Email.attention_score)
     
     # Base query for user's emails in the bucket (using stored scores for consistency)
     base_query = session.query(Email).filter(
@@ -157,6 +160,71 @@ def query_bucket_emails(
         return emails
 
 
+def _bucket_filters(score) -> Dict[BucketType, Any]:
+    """Build the bucket filter conditions for a score column or expression."""
+    return {
+        "now": score >= 60.0,
+        "later": and_(score >= 30.0, score < 60.0),
+        "reference": score < 30.0
+    }
+
+
+def _get_fresh_score_sql(current_time: Optional[datetime] = None):
+    """
+    Get the SQL live-score expression if SQL-side scoring is enabled.
+    
+    Returns None when the mode is off or the scoring strategy has no SQL form,
+    in which case callers use stored scores.
+    """
+    try:
+        engine = get_scoring_engine()
+        if not engine.config.SQL_FRESH_SCORE_BUCKETS:
+            return None
+        return engine.fresh_score_sql(current_time)
+    except Exception as e:
+        logger.error(f"[FLOW_BUCKETS] Error building SQL fresh score, using stored scores: {e}")
+        return None
+
+
+def _query_bucket_emails_live(
+    session: Session,
+    user_id: int,
+    bucket: BucketType,
+    limit: int,
+    offset: int,
+    order_by: str,
+    fresh_score
+) -> List[Email]:
+    """
+    Query a bucket using the live score computed in Postgres.
+    
+    Filtering, ordering and pagination happen in a single query on the same
+    score, so pages are consistent with each other and with the bucket counts.
+    """
+    fresh_score = fresh_score.label("fresh_attention_score")
+    query = session.query(Email, fresh_score).filter(
+        Email.user_id == user_id,
+        _bucket_filters(fresh_score.element)[bucket]
+    )
+    
+    if order_by == "attention_score":
+        query = query.order_by(desc(fresh_score), desc(Email.received_at), Email.id)
+    elif order_by == "date":
+        query = query.order_by(desc(Email.received_at), Email.id)
+    elif order_by == "subject":
+        query = query.order_by(asc(Email.subject), Email.id)
+    
+    rows = query.offset(offset).limit(limit).all()
+    
+    emails = []
+    for email, score in rows:
+        email._current_attention_score = float(score)
+        emails.append(email)
+    
+    logger.info(f"[FLOW_BUCKETS] Returning {len(emails)} emails for {bucket} bucket with live SQL scores")
+    return emails
+
+
 def _email_belongs_in_bucket(score: float, bucket: BucketType) -> bool:
     """
     Check if an email with the given score belongs in the specified bucket.
@@ -193,6 +261,15 @@ def get_bucket_counts(session: Session, user_id: int) -> Dict[BucketType, int]:
         >>> counts = get_bucket_counts(session, user_id=1)
         >>> print(counts["now"])  # 5
     """
+    fresh_score = _get_fresh_score_sql()
+    if fresh_score is not None:
+        # Count all buckets in one pass over the live score
+        filters = _bucket_filters(fresh_score)
+        row = session.query(
+            *[func.count().filter(filters[bucket]) for bucket in ("now", "later", "reference")]
+        ).filter(Email.user_id == user_id).one()
+        return {"now": row[0], "later": row[1], "reference": row[2]}
+    
     # Count emails in NOW bucket (attention_score >= 60)
     now_count = session.query(Email).filter(
         Email.user_id == user_id,
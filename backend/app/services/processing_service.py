@@ -14,6 +14,7 @@ from ..models.email import Email
 from ..models.user import User
 from ..models.email_sync import EmailSync
 from ..services.attention_scoring import calculate_attention_score
+from ..services.sender_profiles import SenderProfileUpdates
 from uuid import UUID
 import uuid
 
@@ -103,6 +104,7 @@ def process_and_store_emails(
     processed_emails = []
     new_emails_count = 0
     updated_emails_count = 0
+    profile_updates = SenderProfileUpdates()
     logger.info(f"[PROCESSOR] Processing {len(emails)} emails for user {user.id} (email: {user.email})")
     
     for i, email_data in enumerate(emails):
@@ -123,6 +125,8 @@ def process_and_store_emails(
             ).first()
             
             if existing_email:
+                profile_updates.labels_changed(existing_email, existing_email.labels, email_data.get('labels'))
+                
                 # Update existing email
                 existing_email.subject = email_data.get('subject')
                 existing_email.from_email = email_data.get('from_email')
@@ -135,6 +139,7 @@ def process_and_store_emails(
                 # Calculate attention score for updated email
                 attention_score = calculate_attention_score(existing_email)
                 existing_email.attention_score = attention_score
+                existing_email.attention_score_refresh_at = None  # Let the bucket refresh scheduler rescore it
                 logger.debug(f"[PROCESSOR] Updated existing email: {gmail_id} with attention score: {attention_score}")
                 
                 processed_emails.append(existing_email)
@@ -162,9 +167,11 @@ def process_and_store_emails(
                 # Calculate attention score for new email
                 attention_score = calculate_attention_score(new_email)
                 new_email.attention_score = attention_score
+                new_email.attention_score_refresh_at = None  # Let the bucket refresh scheduler rescore it
                 logger.debug(f"[PROCESSOR] Created new email: {gmail_id} with attention score: {attention_score}")
                 
                 db.add(new_email)
+                profile_updates.email_received(new_email)
                 processed_emails.append(new_email)
                 new_emails_count += 1
                 logger.debug(f"[PROCESSOR] Created new email: {gmail_id}")
@@ -173,6 +180,9 @@ def process_and_store_emails(
             logger.error(f"[PROCESSOR] Error processing email {i+1}: {str(e)}")
             continue
     
+    # Update sender history in the same transaction
+    profile_updates.flush(db)
+    
     # Commit all changes
     try:
         db.commit()
@@ -202,6 +212,7 @@ def mark_emails_deleted(db: Session, user: User, deleted_gmail_ids: List[str]) -
     deleted_count = 0
     not_found_count = 0
     already_deleted_count = 0
+    profile_updates = SenderProfileUpdates()
     
     # Log the first few deleted Gmail IDs for debugging
     debug_ids = deleted_gmail_ids[:5]
@@ -230,6 +241,7 @@ def mark_emails_deleted(db: Session, user: User, deleted_gmail_ids: List[str]) -
             
             # Mark as deleted by setting category to trash
             email.category = 'trash'
+            profile_updates.trashed(email)
             deleted_count += 1
             
             logger.debug(f"[PROCESSOR] Marked email {gmail_id} as deleted")
@@ -238,6 +250,8 @@ def mark_emails_deleted(db: Session, user: User, deleted_gmail_ids: List[str]) -
             logger.error(f"[PROCESSOR] Error marking email {gmail_id} as deleted: {str(e)}")
             continue
     
+    profile_updates.flush(db)
+    
     # Commit changes
     try:
         db.commit()
@@ -265,6 +279,7 @@ def process_label_changes(db: Session, user: User, label_changes: Dict[str, Dict
         return 0
 
     updated_count = 0
+    profile_updates = SenderProfileUpdates()
     for gmail_id, changes in label_changes.items():
         email = db.query(Email).filter(
             Email.user_id == user.id,
@@ -302,16 +317,19 @@ def process_label_changes(db: Session, user: User, label_changes: Dict[str, Dict
                 changed = True
                 
         if changed:
+            profile_updates.labels_changed(email, email.labels, current_labels)
             email.labels = list(current_labels)
             
             # Recalculate attention score when labels change
             attention_score = calculate_attention_score(email)
             email.attention_score = attention_score
+            email.attention_score_refresh_at = None  # Let the bucket refresh scheduler rescore it
             logger.debug(f"[PROCESSOR] Updated email {gmail_id} attention score to {attention_score} due to label changes")
             
             updated_count += 1
             
     if updated_count > 0:
+        profile_updates.flush(db)
         db.commit()
         logger.info(f"[PROCESSOR] Updated {updated_count} emails due to label changes (with attention score recalculation)")
         
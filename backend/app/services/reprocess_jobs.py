@@ -0,0 +1,708 @@
+"""
+Background Email Reprocessing
+
+Re-runs categorization over a user's stored emails (after rule or category
+changes) as a background job recorded in the reprocess_jobs table.
+
+The runner walks the matching emails with keyset pagination on
+(received_at DESC NULLS FIRST, id DESC): each page starts strictly after the
+key of the previous one, so pages stay cheap deep into a large mailbox and
+rows leaving the filter as they are reprocessed (is_dirty cleared) cannot
+shift later pages. Pages are handed to a thread pool; every worker loads and
+updates its batch in its own session. The job row is the checkpoint: after
+each batch it records the key of the last contiguous finished batch plus the
+running counters, so a run interrupted by a crash or restart resumes from
+there. Batches finished out of order beyond the checkpoint are simply
+reprocessed again on resume, which is harmless.
+
+A runner claims a job with a conditional UPDATE that stores a fresh
+runner_token, so a job is only ever run by one runner. While it runs, a
+heartbeat thread refreshes heartbeat_at every REPROCESS_HEARTBEAT_SECONDS,
+however long a batch takes; a running job whose heartbeat is older than
+REPROCESS_STALE_AFTER_SECONDS is considered interrupted and may be claimed
+again. Every later write of the runner (heartbeats, checkpoints, the final
+status) is an UPDATE conditioned on its token, so a runner whose job was
+taken over stops instead of overwriting the new owner's progress.
+
+Interrupted jobs are picked up by a resumer thread that sweeps for stale
+jobs every REPROCESS_RESUME_INTERVAL_SECONDS. A process restarted within
+the stale window finds its own interrupted job still looking alive; a later
+sweep resumes it once its heartbeat has gone stale.
+"""
+
+import json
+import logging
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import and_, func, or_, tuple_, update
+from sqlalchemy.orm import Query, Session
+
+from ..config import settings
+from ..db import SessionLocal
+from ..models.email import Email
+from ..models.reprocess_job import ReprocessJob, ReprocessJobStatus
+from ..utils.email_categorizer import categorize_email as categorize_email_util, get_categorizer
+from ..utils.email_utils import set_email_category_and_labels
+from ..utils.filter_utils import apply_email_filters
+from .email_classifier_service import email_classifier_service
+
+logger = logging.getLogger(__name__)
+
+REPROCESS_STALE_AFTER_SECONDS = 300.0
+REPROCESS_HEARTBEAT_SECONDS = 30.0
+REPROCESS_RESUME_INTERVAL_SECONDS = 60.0
+
+_UNFINISHED = (ReprocessJobStatus.QUEUED.value, ReprocessJobStatus.RUNNING.value)
+_DATE_FILTERS = ('date_from', 'date_to')
+
+# Keyset order of the runner (matches ix_emails_user_id_received_at_id)
+KEYSET_ORDER = (Email.received_at.desc().nulls_first(), Email.id.desc())
+
+
+class ReprocessJobConflict(Exception):
+    """The user already has a live reprocess job with other parameters."""
+    
+    def __init__(self, job: ReprocessJob):
+        super().__init__(f"Reprocess job {job.id} is still {job.status} with other parameters")
+        self.job = job
+
+
+def serialize_filters(filter_params: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Filter parameters as stored in ReprocessJob.filter_params (dates as ISO strings)."""
+    if not filter_params:
+        return None
+    return {
+        key: value.isoformat() if isinstance(value, (date, datetime)) else value
+        for key, value in filter_params.items()
+    }
+
+
+def load_filters(stored: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Inverse of serialize_filters."""
+    if not stored:
+        return None
+    filters = dict(stored)
+    for key in _DATE_FILTERS:
+        if isinstance(filters.get(key), str):
+            filters[key] = datetime.fromisoformat(filters[key])
+    return filters
+
+
+def build_reprocess_query(
+    db: Session,
+    user_id: UUID,
+    filter_params: Optional[Dict[str, Any]] = None,
+    include_reprocessed: bool = False
+) -> Query:
+    """Query over the emails a reprocess run covers (unordered)."""
+    query = db.query(Email).filter(Email.user_id == user_id)
+    if not include_reprocessed:
+        query = query.filter(or_(Email.last_reprocessed_at.is_(None), Email.is_dirty.is_(True)))
+    if filter_params:
+        query = apply_email_filters(query, filter_params)
+    return query
+
+
+def keyset_after(query: Query, received_at: Optional[datetime], email_id: Optional[UUID]) -> Query:
+    """
+    Restrict a query to the emails after (received_at, id) in KEYSET_ORDER.
+    
+    Emails without received_at come first; a key with received_at None is a
+    position inside that NULL run.
+    """
+    if email_id is None:
+        return query
+    if received_at is None:
+        return query.filter(or_(
+            and_(Email.received_at.is_(None), Email.id < email_id),
+            Email.received_at.isnot(None)
+        ))
+    return query.filter(tuple_(Email.received_at, Email.id) < (received_at, email_id))
+
+
+def next_page(
+    query: Query,
+    received_at: Optional[datetime],
+    email_id: Optional[UUID],
+    batch_size: int
+) -> List[Tuple[Optional[datetime], UUID]]:
+    """Keys (received_at, id) of the next batch_size emails after the given key."""
+    page_query = keyset_after(query.with_entities(Email.received_at, Email.id), received_at, email_id)
+    return [tuple(row) for row in page_query.order_by(*KEYSET_ORDER).limit(batch_size).all()]
+
+
+def start_reprocess_job(
+    db: Session,
+    user_id: UUID,
+    filter_params: Optional[Dict[str, Any]] = None,
+    include_reprocessed: bool = False,
+    force_reprocess: bool = False
+) -> ReprocessJob:
+    """
+    Create a queued reprocess job, or return the user's unfinished one.
+    
+    A live job with the same parameters is returned as is, so repeated
+    requests do not start parallel runs. An interrupted job (stale heartbeat)
+    with the same parameters is returned to be resumed from its checkpoint;
+    one with other parameters is marked failed and replaced.
+    
+    Args:
+        force_reprocess: Mark the matching emails dirty, in the transaction
+            that creates the job (not when an existing job is returned)
+    
+    Raises:
+        ReprocessJobConflict: A live job with other parameters exists
+    """
+    stored_filters = serialize_filters(filter_params)
+    existing = db.query(ReprocessJob).filter(
+        ReprocessJob.user_id == user_id,
+        ReprocessJob.status.in_(_UNFINISHED)
+    ).order_by(ReprocessJob.created_at.desc()).first()
+    
+    if existing is not None:
+        same_params = (
+            existing.filter_params == stored_filters
+            and bool(existing.include_reprocessed) == bool(include_reprocessed)
+        )
+        if not same_params and not _is_stale(existing):
+            raise ReprocessJobConflict(existing)
+        if same_params:
+            logger.info(f"[REPROCESS] Reusing job {existing.id} ({existing.status}) for user {user_id}")
+            return existing
+        existing.status = ReprocessJobStatus.FAILED.value
+        existing.error_message = "Interrupted and superseded by a new reprocess job"
+        existing.finished_at = datetime.now(timezone.utc)
+        existing.runner_token = None  # A runner that was only slow can no longer write to it
+    
+    if force_reprocess:
+        count = build_reprocess_query(db, user_id, filter_params, include_reprocessed=True).update(
+            {"is_dirty": True}, synchronize_session=False
+        )
+        logger.info(f"[REPROCESS] Marked {count} emails as dirty for reprocessing")
+    
+    job = ReprocessJob(
+        user_id=user_id,
+        status=ReprocessJobStatus.QUEUED.value,
+        filter_params=stored_filters,
+        include_reprocessed=bool(include_reprocessed),
+        processed_count=0,
+        error_count=0,
+        category_changes={}
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    logger.info(f"[REPROCESS] Queued job {job.id} for user {user_id}")
+    return job
+
+
+def _is_stale(job: ReprocessJob, now: Optional[datetime] = None) -> bool:
+    if job.status == ReprocessJobStatus.QUEUED.value:
+        return job.started_at is None and _older_than_stale(job.created_at, now)
+    return _older_than_stale(job.heartbeat_at, now)
+
+
+def _older_than_stale(moment: Optional[datetime], now: Optional[datetime]) -> bool:
+    if moment is None:
+        return True
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return (now - moment).total_seconds() > REPROCESS_STALE_AFTER_SECONDS
+
+
+def claim_reprocess_job(db: Session, job_id: UUID, now: Optional[datetime] = None) -> Optional[UUID]:
+    """
+    Atomically take ownership of a queued or interrupted job.
+    
+    Returns:
+        The runner token to pass to update_claimed_job if this caller now
+        runs the job, otherwise None
+    """
+    now = now or datetime.now(timezone.utc)
+    runner_token = uuid.uuid4()
+    cutoff = now - timedelta(seconds=REPROCESS_STALE_AFTER_SECONDS)
+    result = db.execute(
+        update(ReprocessJob)
+        .where(
+            ReprocessJob.id == job_id,
+            or_(
+                ReprocessJob.status == ReprocessJobStatus.QUEUED.value,
+                and_(
+                    ReprocessJob.status == ReprocessJobStatus.RUNNING.value,
+                    or_(ReprocessJob.heartbeat_at.is_(None), ReprocessJob.heartbeat_at < cutoff)
+                )
+            )
+        )
+        .values(
+            status=ReprocessJobStatus.RUNNING.value,
+            runner_token=runner_token,
+            heartbeat_at=now,
+            started_at=func.coalesce(ReprocessJob.started_at, now)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return runner_token if result.rowcount == 1 else None
+
+
+def update_claimed_job(db: Session, job_id: UUID, runner_token: UUID, **values: Any) -> bool:
+    """
+    Write job columns only while runner_token still owns the job, and commit.
+    
+    Returns:
+        False if another runner has claimed the job since (nothing written)
+    """
+    result = db.execute(
+        update(ReprocessJob)
+        .where(ReprocessJob.id == job_id, ReprocessJob.runner_token == runner_token)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def _write_job(db: Session, job: ReprocessJob, runner_token: UUID, **values: Any) -> bool:
+    """update_claimed_job for the runner's detached job, mirroring the values onto it."""
+    for name, value in values.items():
+        setattr(job, name, value)
+    return update_claimed_job(db, job.id, runner_token, **values)
+
+
+class _Heartbeat:
+    """
+    Refreshes a claimed job's heartbeat_at from a daemon thread.
+    
+    Runs next to the batches, so a slow batch does not make a live job look
+    interrupted. Sets lost when the token no longer owns the job.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        job_id: UUID,
+        runner_token: UUID,
+        interval: float = REPROCESS_HEARTBEAT_SECONDS
+    ):
+        self.session_factory = session_factory
+        self.job_id = job_id
+        self.runner_token = runner_token
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"reprocess-heartbeat-{job_id}", daemon=True)
+    
+    def __enter__(self) -> '_Heartbeat':
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stopped.set()
+        self._thread.join()
+    
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                db = self.session_factory()
+                try:
+                    owned = update_claimed_job(db, self.job_id, self.runner_token, heartbeat_at=datetime.now(timezone.utc))
+                finally:
+                    db.close()
+            except Exception as e:
+                # Transient: the next beat retries well before the job goes stale
+                logger.warning(f"[REPROCESS] Heartbeat of job {self.job_id} failed: {e}")
+                continue
+            if not owned:
+                logger.warning(f"[REPROCESS] Job {self.job_id} was claimed by another runner")
+                self.lost.set()
+                return
+
+
+def reprocess_email(db: Session, email: Email, user_id: UUID, categorizer: Any) -> Optional[str]:
+    """
+    Recategorize one email, keep its labels consistent and mark it clean.
+    
+    Returns:
+        The new category if it changed, otherwise None
+    
+    Raises:
+        Exception: If categorization failed (the email is still marked clean)
+    """
+    old_category = email.category
+    new_category = None
+    try:
+        # If we have labels, use them to categorize
+        if email.labels:
+            email_data = {
+                'id': email.id,
+                'gmail_id': email.gmail_id,
+                'labels': json.loads(email.labels) if isinstance(email.labels, str) else email.labels,
+                'subject': email.subject,
+                'from_email': email.from_email,
+                'snippet': email.snippet,
+                'is_read': email.is_read
+            }
+            category = categorize_email_util(email_data, db, user_id, categorizer=categorizer)
+            
+            # Always enforce label/category consistency
+            if isinstance(email.labels, str):
+                try:
+                    email.labels = json.loads(email.labels)
+                except Exception:
+                    email.labels = [email.labels]
+            set_email_category_and_labels(email, category, db)
+            if category != old_category:
+                new_category = category
+                logger.info(f"[REPROCESS] Email {email.id} category changed: {old_category} → {category}")
+        else:
+            logger.debug(f"[REPROCESS] Email {email.id} has no labels, skipping categorization")
+    finally:
+        # Mark as clean and store reprocessing timestamp
+        email.is_dirty = False
+        email.last_reprocessed_at = datetime.now(timezone.utc)
+    return new_category
+
+
+def reprocess_batch(
+    session_factory: Callable[[], Session],
+    user_id: UUID,
+    email_ids: List[UUID]
+) -> Dict[str, Any]:
+    """
+    Reprocess one batch of emails in a fresh session and commit it.
+    
+    Runs in a pool thread. Emails deleted since their page was read are
+    skipped.
+    
+    Returns:
+        processed, errors and category_changes of the batch
+    """
+    db = session_factory()
+    try:
+        categorizer = get_categorizer(db, user_id)
+        emails = db.query(Email).filter(Email.user_id == user_id, Email.id.in_(email_ids)).all()
+        errors = 0
+        category_changes: Dict[str, int] = {}
+        for email in emails:
+            try:
+                new_category = reprocess_email(db, email, user_id, categorizer)
+            except Exception as e:
+                errors += 1
+                logger.error(f"[REPROCESS] Error categorizing email {email.id}: {str(e)}")
+                continue
+            if new_category is not None:
+                category_changes[new_category] = category_changes.get(new_category, 0) + 1
+        db.commit()
+        return {'processed': len(emails), 'errors': errors, 'category_changes': category_changes}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+_LOST_OWNERSHIP = "Job was claimed by another runner"
+
+
+class _Batch:
+    __slots__ = ('future', 'last_key')
+    
+    def __init__(self, future: Future, last_key: Tuple[Optional[datetime], UUID]):
+        self.future = future
+        self.last_key = last_key
+
+
+def run_reprocess_job(
+    job_id: UUID,
+    session_factory: Callable[[], Session] = SessionLocal,
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Run (or resume) a reprocess job to completion.
+    
+    Safe to call for a job another runner owns: the claim fails and nothing
+    happens.
+    
+    Args:
+        job_id: Job to run
+        session_factory: Creates database sessions (coordinator and one per batch)
+        workers: Pool threads (defaults to settings.REPROCESS_WORKERS)
+        batch_size: Emails per batch and checkpoint (defaults to settings.REPROCESS_BATCH_SIZE)
+    
+    Returns:
+        Final job status (see job_status), or None if the job was not claimed
+    """
+    workers = max(1, workers or settings.REPROCESS_WORKERS)
+    batch_size = batch_size or settings.REPROCESS_BATCH_SIZE
+    
+    db = session_factory()
+    try:
+        runner_token = claim_reprocess_job(db, job_id)
+        if runner_token is None:
+            logger.info(f"[REPROCESS] Job {job_id} is finished or owned by another runner, not starting")
+            return None
+        # Detached: the job row is only written through the token-checked _write_job
+        job = db.get(ReprocessJob, job_id)
+        db.expunge(job)
+        user_id = job.user_id
+        
+        with _Heartbeat(session_factory, job.id, runner_token) as heartbeat:
+            try:
+                if not email_classifier_service.load_trash_classifier(user_id):
+                    logger.warning(f"[REPROCESS] No classifier model for user {user_id}, using rules-based categorization")
+                
+                query = build_reprocess_query(db, user_id, load_filters(job.filter_params), job.include_reprocessed)
+                if job.total_emails is None:
+                    _write_job(db, job, runner_token, total_emails=query.count())
+                
+                resumed = job.cursor_id is not None
+                logger.info(
+                    f"[REPROCESS] {'Resuming' if resumed else 'Starting'} job {job.id} for user {user_id}: "
+                    f"{job.total_emails} emails, {job.processed_count} already done "
+                    f"({workers} workers, batch size {batch_size})"
+                )
+                error = _run_batches(db, job, runner_token, heartbeat.lost, query, session_factory, workers, batch_size)
+            except Exception as e:
+                db.rollback()
+                error = str(e)
+                logger.error(f"[REPROCESS] Job {job_id} failed: {error}", exc_info=True)
+        
+        finished_at = datetime.now(timezone.utc)
+        if not _write_job(
+            db, job, runner_token,
+            status=ReprocessJobStatus.FAILED.value if error else ReprocessJobStatus.COMPLETED.value,
+            error_message=error,
+            finished_at=finished_at,
+            heartbeat_at=finished_at
+        ):
+            logger.warning(f"[REPROCESS] Job {job.id} was claimed by another runner, leaving its status to it")
+            return None
+        
+        logger.info(
+            f"[REPROCESS] Job {job.id} {job.status}: {job.processed_count}/{job.total_emails} emails, "
+            f"category changes: {job.category_changes}"
+        )
+        return job_status(job)
+    finally:
+        db.close()
+
+
+def _run_batches(
+    db: Session,
+    job: ReprocessJob,
+    runner_token: UUID,
+    lost: threading.Event,
+    query: Query,
+    session_factory: Callable[[], Session],
+    workers: int,
+    batch_size: int
+) -> Optional[str]:
+    """
+    Feed keyset pages to the pool and checkpoint finished batches in order.
+    
+    Stops submitting once the heartbeat reports the job lost to another runner.
+    
+    Returns:
+        Error message of the first failed batch or of the lost ownership, or None
+    """
+    read_key = (job.cursor_received_at, job.cursor_id)
+    in_flight: Deque[_Batch] = deque()
+    exhausted = False
+    error: Optional[str] = None
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reprocess") as pool:
+        while True:
+            # Keep about two batches per worker queued
+            if error is None and lost.is_set():
+                error = _LOST_OWNERSHIP
+            while not exhausted and error is None and len(in_flight) < 2 * workers:
+                page = next_page(query, read_key[0], read_key[1], batch_size)
+                if not page:
+                    exhausted = True
+                    break
+                read_key = page[-1]
+                future = pool.submit(reprocess_batch, session_factory, job.user_id, [email_id for _, email_id in page])
+                in_flight.append(_Batch(future, read_key))
+            
+            if not in_flight:
+                break
+            wait([in_flight[0].future])
+            error = _drain_completed(db, job, runner_token, in_flight, error)
+    
+    return error
+
+
+def _drain_completed(
+    db: Session,
+    job: ReprocessJob,
+    runner_token: UUID,
+    in_flight: Deque[_Batch],
+    error: Optional[str]
+) -> Optional[str]:
+    """
+    Checkpoint finished batches in submission order.
+    
+    The cursor only moves past a batch once every earlier batch is
+    committed. After a failed batch, or a checkpoint refused because another
+    runner owns the job, the cursor stops advancing; the batches still in
+    flight finish but are not checkpointed.
+    """
+    while in_flight and in_flight[0].future.done():
+        batch = in_flight.popleft()
+        if error is not None:
+            continue
+        try:
+            result = batch.future.result()
+        except Exception as e:
+            error = f"Batch ending at email {batch.last_key[1]} failed: {e}"
+            logger.error(f"[REPROCESS] Job {job.id}: {error}")
+            continue
+        
+        changes = dict(job.category_changes or {})
+        for category, count in result['category_changes'].items():
+            changes[category] = changes.get(category, 0) + count
+        if not _write_job(
+            db, job, runner_token,
+            category_changes=changes,
+            processed_count=job.processed_count + result['processed'],
+            error_count=job.error_count + result['errors'],
+            cursor_received_at=batch.last_key[0],
+            cursor_id=batch.last_key[1],
+            heartbeat_at=datetime.now(timezone.utc)
+        ):
+            error = _LOST_OWNERSHIP
+            logger.warning(f"[REPROCESS] Job {job.id}: {error}")
+            continue
+        logger.debug(f"[REPROCESS] Job {job.id} checkpoint: {job.processed_count}/{job.total_emails} emails")
+    return error
+
+
+def job_status(job: ReprocessJob) -> Dict[str, Any]:
+    """Progress of a job as returned by the status endpoint."""
+    total = job.total_emails or 0
+    progress = min(1.0, job.processed_count / total) if total else (1.0 if job.status == ReprocessJobStatus.COMPLETED.value else 0.0)
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'total': total,
+        'processed': job.processed_count or 0,
+        'errors': job.error_count or 0,
+        'progress': round(progress, 4),
+        'category_changes': dict(job.category_changes or {}),
+        'error_message': job.error_message,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at
+    }
+
+
+def get_reprocess_job(db: Session, user_id: UUID, job_id: Optional[UUID] = None) -> Optional[ReprocessJob]:
+    """A user's job by id, or their most recent job."""
+    query = db.query(ReprocessJob).filter(ReprocessJob.user_id == user_id)
+    if job_id is not None:
+        return query.filter(ReprocessJob.id == job_id).first()
+    return query.order_by(ReprocessJob.created_at.desc()).first()
+
+
+# Global resumer instance
+_resumer: Optional["ReprocessJobResumer"] = None
+
+
+def resume_interrupted_reprocess_jobs(session_factory: Callable[[], Session] = SessionLocal) -> List[UUID]:
+    """
+    Restart jobs left unfinished by a crashed or restarted process.
+    
+    Only jobs that already look interrupted (see _is_stale) are picked up;
+    ReprocessJobResumer repeats the sweep for jobs that go stale later.
+    
+    Each job runs in its own daemon thread; the claim makes sure a job
+    picked up by several processes at once is only run by one.
+    
+    Returns:
+        Ids of the jobs handed to a thread
+    """
+    db = session_factory()
+    try:
+        candidates = db.query(ReprocessJob).filter(ReprocessJob.status.in_(_UNFINISHED)).all()
+        job_ids = [job.id for job in candidates if _is_stale(job)]
+    finally:
+        db.close()
+    
+    for job_id in job_ids:
+        logger.info(f"[REPROCESS] Resuming interrupted job {job_id}")
+        threading.Thread(
+            target=run_reprocess_job,
+            args=(job_id, session_factory),
+            name=f"reprocess-{job_id}",
+            daemon=True
+        ).start()
+    return job_ids
+
+
+class ReprocessJobResumer:
+    """
+    Background thread that periodically runs resume_interrupted_reprocess_jobs.
+    
+    The first sweep runs at start; later ones catch jobs whose heartbeat was
+    still fresh then, such as the job of a process that restarted within
+    REPROCESS_STALE_AFTER_SECONDS. Errors are logged and retried on the next
+    tick.
+    """
+    
+    def __init__(self, session_factory: Callable[[], Session], interval_seconds: float = REPROCESS_RESUME_INTERVAL_SECONDS):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        """Start the background thread (no-op if already running)."""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="reprocess-resumer", daemon=True)
+        self._thread.start()
+        logger.info(f"[REPROCESS] Resumer started (interval: {self.interval_seconds}s)")
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """Signal the thread to stop and wait for it (running jobs are left to their threads)."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info("[REPROCESS] Resumer stopped")
+    
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                resume_interrupted_reprocess_jobs(self.session_factory)
+            except Exception as e:
+                logger.error(f"[REPROCESS] Resume sweep failed: {e}", exc_info=True)
+            self._stop_event.wait(self.interval_seconds)
+
+
+def start_reprocess_resumer(session_factory: Callable[[], Session] = SessionLocal) -> ReprocessJobResumer:
+    """Start the global reprocess job resumer."""
+    global _resumer
+    
+    if _resumer is None:
+        _resumer = ReprocessJobResumer(session_factory)
+    _resumer.start()
+    return _resumer
+
+
+def stop_reprocess_resumer() -> None:
+    """Stop the global reprocess job resumer if it is running."""
+    global _resumer
+    
+    if _resumer is not None:
+        _resumer.stop()
+        _resumer = None
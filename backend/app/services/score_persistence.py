@@ -0,0 +1,111 @@
+"""
+Bulk Score Persistence
+
+Writes recomputed attention scores with set-based statements: each chunk of
+(id, score, ...) rows becomes a single UPDATE ... FROM (VALUES ...) joined on
+the primary key, instead of one UPDATE per ORM object.
+
+Rows whose score moved by less than an epsilon (and whose flow bucket did not
+change) are filtered out inside the statement, so rescoring runs do not
+rewrite - and bloat - rows that are effectively unchanged.
+"""
+
+import logging
+from typing import Any, Dict, List, Sequence, Set, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Writable score columns and their Postgres types (VALUES parameters are untyped otherwise)
+SCORE_COLUMN_TYPES = {
+    'attention_score': 'double precision',
+    'attention_base_score': 'double precision',
+    'attention_score_refresh_at': 'timestamptz'
+}
+
+
+def bulk_update_scores(
+    session: Session,
+    updates: Sequence[Dict[str, Any]],
+    epsilon: float = 0.0,
+    chunk_size: int = 1000,
+    bucket_thresholds: Sequence[float] = ()
+) -> Set[str]:
+    """
+    Write score columns for many emails with chunked UPDATE ... FROM (VALUES).
+    
+    A row is written when any float column is NULL on one side or moved by at
+    least epsilon, when attention_score crosses one of bucket_thresholds, or
+    when a stored refresh time is missing. A refresh time alone is never a
+    reason to rewrite a row: with unchanged scores the stored prediction
+    still holds. Does not commit.
+    
+    Args:
+        session: SQLAlchemy database session
+        updates: Rows with an 'id' plus any of SCORE_COLUMN_TYPES (all rows
+            must carry the same columns)
+        epsilon: Minimum score change worth writing
+        chunk_size: Rows per statement
+        bucket_thresholds: Score boundaries whose crossing always forces a write
+    
+    Returns:
+        IDs (as strings) of the rows actually written
+    """
+    if not updates:
+        return set()
+    
+    columns = [name for name in SCORE_COLUMN_TYPES if name in updates[0]]
+    if not columns:
+        raise ValueError("No score columns to update")
+    
+    written: Set[str] = set()
+    for start in range(0, len(updates), chunk_size):
+        chunk = updates[start:start + chunk_size]
+        statement, params = _build_update(chunk, columns, epsilon, bucket_thresholds)
+        written.update(str(email_id) for email_id in session.execute(statement, params).scalars())
+    
+    logger.debug(
+        f"[SCORE_PERSISTENCE] Wrote {len(written)} of {len(updates)} scores "
+        f"({len(updates) - len(written)} within epsilon {epsilon})"
+    )
+    return written
+
+
+def _build_update(
+    chunk: Sequence[Dict[str, Any]],
+    columns: List[str],
+    epsilon: float,
+    bucket_thresholds: Sequence[float]
+) -> Tuple[Any, Dict[str, Any]]:
+    params: Dict[str, Any] = {'epsilon': epsilon}
+    value_rows = []
+    for i, row in enumerate(chunk):
+        params[f"id_{i}"] = str(row['id'])
+        placeholders = [f"CAST(:id_{i} AS uuid)"]
+        for j, name in enumerate(columns):
+            params[f"v{j}_{i}"] = row[name]
+            placeholders.append(f"CAST(:v{j}_{i} AS {SCORE_COLUMN_TYPES[name]})")
+        value_rows.append(f"({', '.join(placeholders)})")
+    
+    changed = []
+    for name in columns:
+        if SCORE_COLUMN_TYPES[name] == 'timestamptz':
+            changed.append(f"(e.{name} IS NULL AND v.{name} IS NOT NULL)")
+        else:
+            changed.append(
+                f"(e.{name} IS DISTINCT FROM v.{name} AND "
+                f"(e.{name} IS NULL OR v.{name} IS NULL OR abs(e.{name} - v.{name}) >= :epsilon))"
+            )
+    if 'attention_score' in columns:
+        for k, threshold in enumerate(bucket_thresholds):
+            params[f"threshold_{k}"] = threshold
+            changed.append(f"((e.attention_score >= :threshold_{k}) <> (v.attention_score >= :threshold_{k}))")
+    
+    statement = text(
+        f"UPDATE emails AS e SET {', '.join(f'{name} = v.{name}' for name in columns)} "
+        f"FROM (VALUES {', '.join(value_rows)}) AS v(id, {', '.join(columns)}) "
+        f"WHERE e.id = v.id AND ({' OR '.join(changed)}) "
+        f"RETURNING e.id"
+    )
+    return statement, params
@@ -0,0 +1,399 @@
+"""
+Bulk Attention Score Rescoring
+
+Rescores every stored email, e.g. after a scoring configuration change.
+Emails are read per user in id order, one keyset page at a time through a
+short-lived session (so no snapshot or cursor stays open for the whole run),
+scored in batches by a process pool and written back with bulk UPDATEs
+(attention score, base score and next bucket refresh time).
+
+Progress is checkpointed per user as the last email id written, so an
+interrupted run resumes where it stopped. A per-user parallelism limit keeps
+one large mailbox from occupying the whole pool.
+"""
+
+import json
+import logging
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Deque, Dict, Generator, List, Optional, Sequence, Set
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.email import Email
+from app.models.user import User
+from app.scoring import BucketCrossingPredictor, ScoringEngineFactory, current_config
+from app.scoring.config import ScoringConfig
+from app.services.score_persistence import bulk_update_scores
+from app.services.sender_profiles import attach_sender_profiles
+
+logger = logging.getLogger(__name__)
+
+# Columns the scoring strategies read; only these are streamed to the workers
+RESCORE_COLUMNS = (
+    Email.id,
+    Email.user_id,
+    Email.subject,
+    Email.from_email,
+    Email.sender_email,
+    Email.sender_domain,
+    Email.received_at,
+    Email.labels,
+    Email.is_read,
+    Email.category,
+    Email.attention_score
+)
+
+# Scoring engine of a pool worker process (see _init_worker)
+_worker_engine = None
+
+
+@dataclass
+class RescoreProgress:
+    """Running totals of a rescoring run."""
+    users_total: int = 0
+    users_done: int = 0
+    users_failed: int = 0
+    emails_scored: int = 0
+    emails_updated: int = 0
+    emails_unchanged: int = 0  # Scored but within SCORE_WRITE_EPSILON, so not rewritten
+    errors: int = 0
+    started_at: float = field(default_factory=time.time)
+    
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.time() - self.started_at
+    
+    @property
+    def emails_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.emails_scored / elapsed if elapsed > 0 else 0.0
+    
+    def as_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        del result['started_at']
+        result['elapsed_seconds'] = round(self.elapsed_seconds, 2)
+        result['emails_per_second'] = round(self.emails_per_second, 1)
+        return result
+
+
+class RescoreCheckpoint:
+    """
+    Per-user resume points of a rescoring run, persisted as JSON.
+    
+    Stores the users that are finished and, for users in progress, the last
+    email id whose new score has been committed. Saves are atomic (write to a
+    temporary file, then rename). Without a path the checkpoint only lives in
+    memory.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.completed_users: Set[str] = set()
+        self.cursors: Dict[str, str] = {}
+        
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.completed_users = set(data.get('completed_users', []))
+            self.cursors = data.get('cursors', {})
+            logger.info(
+                f"[RESCORE] Resuming from {path}: {len(self.completed_users)} users done, "
+                f"{len(self.cursors)} in progress"
+            )
+    
+    def is_complete(self, user_id: Any) -> bool:
+        return str(user_id) in self.completed_users
+    
+    def resume_after(self, user_id: Any) -> Optional[str]:
+        """Last committed email id of a user in progress (None to start at the beginning)."""
+        return self.cursors.get(str(user_id))
+    
+    def advance(self, user_id: Any, last_email_id: Any) -> None:
+        self.cursors[str(user_id)] = str(last_email_id)
+        self.save()
+    
+    def complete(self, user_id: Any) -> None:
+        self.completed_users.add(str(user_id))
+        self.cursors.pop(str(user_id), None)
+        self.save()
+    
+    def save(self) -> None:
+        if not self.path:
+            return
+        
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".rescore-checkpoint.")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'completed_users': sorted(self.completed_users), 'cursors': self.cursors}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+def _init_worker(config: ScoringConfig) -> None:
+    """Pool initializer: build a cache-less scoring engine once per process."""
+    global _worker_engine
+    _worker_engine = ScoringEngineFactory.create_engine(config, strategy_type="enhanced", cache_type="null")
+    if config.SENDER_PROFILE_FEATURES:
+        attach_sender_profiles(_worker_engine)
+
+
+def _score_rows(rows: List[Dict[str, Any]], current_time: datetime) -> List[Dict[str, Any]]:
+    """
+    Score a batch of email rows in a worker process.
+    
+    Returns:
+        Bulk UPDATE parameter rows (id, attention_score, attention_base_score,
+        attention_score_refresh_at); emails that could not be scored are omitted
+    """
+    emails = [SimpleNamespace(**row) for row in rows]
+    predictions = BucketCrossingPredictor(_worker_engine).predict(emails, current_time)
+    
+    updates = []
+    for row in rows:
+        prediction = predictions.get(str(row['id']))
+        if prediction is None:
+            continue
+        updates.append({
+            'id': row['id'],
+            'attention_score': prediction.score,
+            'attention_base_score': prediction.base_score,
+            'attention_score_refresh_at': prediction.change_at
+        })
+    return updates
+
+
+def write_scores(session: Session, updates: Sequence[Dict[str, Any]], config: ScoringConfig) -> int:
+    """
+    Persist rescored rows with set-based UPDATEs (skipping unchanged scores) and commit.
+    
+    Returns:
+        Number of rows written
+    """
+    if not updates:
+        return 0
+    written = bulk_update_scores(
+        session,
+        updates,
+        epsilon=config.SCORE_WRITE_EPSILON,
+        chunk_size=config.SCORE_WRITE_CHUNK_SIZE,
+        bucket_thresholds=(config.BUCKET_NOW_THRESHOLD, config.BUCKET_LATER_THRESHOLD)
+    )
+    session.commit()
+    return len(written)
+
+
+class _Batch:
+    __slots__ = ('future', 'size', 'last_id')
+    
+    def __init__(self, future: Future, size: int, last_id: Any):
+        self.future = future
+        self.size = size
+        self.last_id = last_id
+
+
+class _UserStream:
+    """Page stream over one user's emails plus its in-flight batches (in submission order)."""
+    
+    def __init__(self, user_id: Any, batches: Generator[List[Dict[str, Any]], None, None]):
+        self.user_id = user_id
+        self.batches = batches
+        self.in_flight: Deque[_Batch] = deque()
+        self.exhausted = False
+        self.failed = False
+    
+    @property
+    def finished(self) -> bool:
+        return (self.exhausted or self.failed) and not self.in_flight
+
+
+def stream_user_emails(
+    session_factory: Callable[[], Session],
+    user_id: Any,
+    batch_size: int,
+    after_id: Optional[Any] = None
+) -> Generator[List[Dict[str, Any]], None, None]:
+    """
+    Yield a user's emails in id order as lists of column dicts.
+    
+    Each page is a keyset query (id > last id) in its own session, closed
+    before the page is yielded, so only one batch per stream is held in
+    memory and no transaction stays open while the batch is being scored.
+    """
+    while True:
+        statement = (
+            select(*RESCORE_COLUMNS)
+            .where(Email.user_id == user_id)
+            .order_by(Email.id)
+            .limit(batch_size)
+        )
+        if after_id is not None:
+            statement = statement.where(Email.id > after_id)
+        
+        session = session_factory()
+        try:
+            rows = [dict(row) for row in session.execute(statement).mappings()]
+        finally:
+            session.close()
+        
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1]['id']
+
+
+def rescore_all_emails(
+    session_factory: Callable[[], Session],
+    user_ids: Optional[Sequence[Any]] = None,
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    per_user_parallelism: Optional[int] = None,
+    checkpoint_path: Optional[str] = None,
+    progress_callback: Optional[Callable[[RescoreProgress], None]] = None,
+    progress_interval_seconds: float = 5.0,
+    current_time: Optional[datetime] = None,
+    config: Optional[ScoringConfig] = None
+) -> Dict[str, Any]:
+    """
+    Rescore every email of the given users (all users by default).
+    
+    Args:
+        session_factory: Creates database sessions (one per page read, one for writing)
+        user_ids: Users to rescore (defaults to every user)
+        workers: Scoring processes (defaults to RESCORE_WORKERS or the CPU count)
+        batch_size: Emails per scoring task and UPDATE (defaults to RESCORE_BATCH_SIZE)
+        per_user_parallelism: Max batches of one user in flight at once
+        checkpoint_path: JSON file to resume from and record progress in (optional)
+        progress_callback: Called with the running totals every progress_interval_seconds
+        current_time: Scoring timestamp (defaults to now, UTC)
+        config: Scoring configuration (defaults to the current environment's)
+    
+    Returns:
+        Final progress totals
+    """
+    config = config or current_config()
+    workers = workers or config.RESCORE_WORKERS or os.cpu_count() or 1
+    batch_size = batch_size or config.RESCORE_BATCH_SIZE
+    per_user_parallelism = per_user_parallelism or config.RESCORE_PER_USER_PARALLELISM
+    current_time = current_time or datetime.now(timezone.utc)
+    checkpoint = RescoreCheckpoint(checkpoint_path)
+    
+    # Enough concurrent users to keep about two batches per worker queued
+    max_active_users = max(1, math.ceil(2 * workers / per_user_parallelism))
+    
+    if user_ids is None:
+        session = session_factory()
+        try:
+            user_ids = list(session.execute(select(User.id).order_by(User.id)).scalars())
+        finally:
+            session.close()
+    
+    write_session = session_factory()
+    try:
+        pending_users = deque(user_id for user_id in user_ids if not checkpoint.is_complete(user_id))
+        progress = RescoreProgress(users_total=len(user_ids), users_done=len(user_ids) - len(pending_users))
+        last_report = time.time()
+        
+        logger.info(
+            f"[RESCORE] Rescoring {len(pending_users)} users with {workers} workers "
+            f"(batch size {batch_size}, {per_user_parallelism} batches per user)"
+        )
+        
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),  # Never fork open DB connections
+            initializer=_init_worker,
+            initargs=(config,)
+        )
+        with pool:
+            active: List[_UserStream] = []
+            
+            while pending_users or active:
+                while pending_users and len(active) < max_active_users:
+                    user_id = pending_users.popleft()
+                    after_id = checkpoint.resume_after(user_id)
+                    active.append(_UserStream(user_id, stream_user_emails(session_factory, user_id, batch_size, after_id)))
+                
+                for stream in active:
+                    while not (stream.exhausted or stream.failed) and len(stream.in_flight) < per_user_parallelism:
+                        rows = next(stream.batches, None)
+                        if not rows:
+                            stream.exhausted = True
+                            break
+                        future = pool.submit(_score_rows, rows, current_time)
+                        stream.in_flight.append(_Batch(future, len(rows), rows[-1]['id']))
+                
+                heads = [stream.in_flight[0].future for stream in active if stream.in_flight]
+                if heads:
+                    wait(heads, return_when=FIRST_COMPLETED)
+                
+                for stream in list(active):
+                    _drain_completed(stream, write_session, checkpoint, progress, config)
+                    if stream.finished:
+                        active.remove(stream)
+                        stream.batches.close()
+                        if stream.failed:
+                            progress.users_failed += 1
+                        else:
+                            checkpoint.complete(stream.user_id)
+                            progress.users_done += 1
+                
+                if progress_callback and time.time() - last_report >= progress_interval_seconds:
+                    progress_callback(progress)
+                    last_report = time.time()
+        
+        if progress_callback:
+            progress_callback(progress)
+        
+        logger.info(f"[RESCORE] Complete: {progress.as_dict()}")
+        return progress.as_dict()
+    
+    finally:
+        write_session.close()
+
+
+def _drain_completed(
+    stream: _UserStream,
+    session: Session,
+    checkpoint: RescoreCheckpoint,
+    progress: RescoreProgress,
+    config: ScoringConfig
+) -> None:
+    """
+    Write a user's finished batches in submission order.
+    
+    The checkpoint only moves past a batch once every earlier batch of the
+    user is committed. After a failed batch the user stops advancing and is
+    retried from that batch on the next run.
+    """
+    while stream.in_flight and stream.in_flight[0].future.done():
+        batch = stream.in_flight.popleft()
+        if stream.failed:
+            continue
+        
+        try:
+            updates = batch.future.result()
+            written = write_scores(session, updates, config)
+            progress.emails_updated += written
+            progress.emails_unchanged += len(updates) - written
+            progress.emails_scored += batch.size
+            progress.errors += batch.size - len(updates)
+            checkpoint.advance(stream.user_id, batch.last_id)
+        except Exception as e:
+            session.rollback()
+            stream.failed = True
+            progress.errors += batch.size
+            logger.error(f"[RESCORE] Batch for user {stream.user_id} ending at {batch.last_id} failed: {e}")
@@ -0,0 +1,106 @@
+"""
+Sender Column Backfill
+
+Fills the normalized Email.sender_email / Email.sender_domain columns for
+rows stored before they existed. New and updated emails get them from the
+model on assignment of from_email; this job only walks rows where they are
+still NULL, in primary-key order, so it can be stopped and rerun at any time.
+
+Each batch is parsed with the same normalize_sender used at ingest and
+written with one UPDATE ... FROM (VALUES ...) statement, bypassing the ORM
+(and therefore the attention-score invalidation that assigning from_email
+would trigger).
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.models.email import Email
+from app.utils.email_utils import normalize_sender
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 2000
+
+
+def backfill_sender_columns(
+    db: Session,
+    user_id: Optional[Any] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Populate sender_email and sender_domain for emails that lack them.
+    
+    Commits after every batch. Rows whose From header holds no address stay
+    NULL and are simply revisited (cheaply) by the next run.
+    
+    Args:
+        db: SQLAlchemy database session
+        user_id: Only backfill this user's emails (default: all users)
+        batch_size: Rows per keyset page and UPDATE statement
+        progress_callback: Called with the running totals after each batch
+    
+    Returns:
+        Totals: emails_scanned, emails_updated, elapsed_seconds
+    """
+    start = time.monotonic()
+    totals = {'emails_scanned': 0, 'emails_updated': 0, 'elapsed_seconds': 0.0}
+    last_id = None
+    
+    while True:
+        query = select(Email.id, Email.from_email).where(
+            Email.sender_email.is_(None),
+            Email.from_email.isnot(None)
+        )
+        if user_id is not None:
+            query = query.where(Email.user_id == user_id)
+        if last_id is not None:
+            query = query.where(Email.id > last_id)
+        rows = db.execute(query.order_by(Email.id).limit(batch_size)).all()
+        if not rows:
+            break
+        
+        updates = []
+        for email_id, from_email in rows:
+            address, domain = normalize_sender(from_email)
+            if address:
+                updates.append((email_id, address, domain or None))
+        if updates:
+            statement, params = _build_update(updates)
+            db.execute(statement, params)
+        db.commit()
+        
+        last_id = rows[-1][0]
+        totals['emails_scanned'] += len(rows)
+        totals['emails_updated'] += len(updates)
+        totals['elapsed_seconds'] = time.monotonic() - start
+        if progress_callback:
+            progress_callback(dict(totals))
+    
+    totals['elapsed_seconds'] = time.monotonic() - start
+    logger.info(
+        f"[SENDER_BACKFILL] Updated {totals['emails_updated']} of {totals['emails_scanned']} emails "
+        f"in {totals['elapsed_seconds']:.1f}s"
+    )
+    return totals
+
+
+def _build_update(updates: Sequence[Tuple[Any, str, Optional[str]]]) -> Tuple[Any, Dict[str, Any]]:
+    params: Dict[str, Any] = {}
+    value_rows: List[str] = []
+    for i, (email_id, address, domain) in enumerate(updates):
+        params[f"id_{i}"] = str(email_id)
+        params[f"address_{i}"] = address
+        params[f"domain_{i}"] = domain
+        value_rows.append(f"(CAST(:id_{i} AS uuid), CAST(:address_{i} AS varchar), CAST(:domain_{i} AS varchar))")
+    
+    statement = text(
+        "UPDATE emails AS e SET sender_email = v.sender_email, sender_domain = v.sender_domain "
+        f"FROM (VALUES {', '.join(value_rows)}) AS v(id, sender_email, sender_domain) "
+        "WHERE e.id = v.id"
+    )
+    return statement, params
@@ -0,0 +1,441 @@
+"""
+Sender Profiles
+
+Per-user sender history (emails received, read, trashed, replied to) kept in
+the sender_profiles table, one row per sender address and one per sender
+domain. Profiles are updated incrementally: ingest, label changes and trash
+events collect counter deltas in a SenderProfileUpdates, which writes them
+with a single upsert inside the caller's transaction.
+
+Scoring strategies and the trash classifier read profiles through
+SenderProfileCache, an in-process LRU, so a sender's history is a dictionary
+lookup on the hot path rather than a query or a scan of the sender's emails.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models.email import Email
+from app.models.sender_profile import SenderProfile
+from app.scoring import current_config
+from app.utils.email_utils import normalize_sender
+
+logger = logging.getLogger(__name__)
+
+PROFILE_COUNTERS = ('email_count', 'read_count', 'trashed_count', 'replied_count', 'important_count')
+
+# (user id, kind, sender key); user ids are stringified so UUIDs and strings match
+ProfileKey = Tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class SenderStats:
+    """Counters of one sender profile, with the derived engagement rates."""
+    email_count: int = 0
+    read_count: int = 0
+    trashed_count: int = 0
+    replied_count: int = 0
+    important_count: int = 0
+    
+    @property
+    def open_rate(self) -> float:
+        return min(1.0, self.read_count / self.email_count) if self.email_count > 0 else 0.0
+    
+    @property
+    def trash_rate(self) -> float:
+        return min(1.0, self.trashed_count / self.email_count) if self.email_count > 0 else 0.0
+    
+    @property
+    def reply_rate(self) -> float:
+        return min(1.0, self.replied_count / self.email_count) if self.email_count > 0 else 0.0
+
+
+def profile_keys(user_id: Any, from_email: Optional[str]) -> List[ProfileKey]:
+    """Address and domain profile keys of a sender (empty for unparseable senders)."""
+    address, domain = normalize_sender(from_email)
+    keys = []
+    if domain:
+        keys.append((str(user_id), 'address', address))
+        keys.append((str(user_id), 'domain', domain))
+    return keys
+
+
+def _is_sent(labels: Optional[Sequence[str]]) -> bool:
+    return bool(labels) and 'SENT' in labels
+
+
+def _is_trashed(labels: Optional[Sequence[str]], category: Optional[str]) -> bool:
+    """Whether an email counts as trashed: TRASH label or trash category, whichever came first."""
+    return 'TRASH' in (labels or []) or category == 'trash'
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Comparable timestamp: naive values are taken as UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class SenderProfileUpdates:
+    """
+    Sender profile counter deltas collected during one unit of work.
+    
+    Record events as they happen, then call flush() before committing: all
+    deltas are written with one INSERT ... ON CONFLICT DO UPDATE, and
+    replies are attributed to the sender of the latest message the user
+    answered in each thread.
+    """
+    
+    def __init__(self):
+        self._deltas: Dict[ProfileKey, Dict[str, int]] = {}
+        self._seen_at: Dict[ProfileKey, datetime] = {}
+        self._sent: List[Tuple[Any, str, Optional[datetime]]] = []
+    
+    def __len__(self) -> int:
+        return len(self._deltas) + len(self._sent)
+    
+    def email_received(self, email: Any) -> None:
+        """A new email was stored (sent mail is counted as a reply in its thread instead)."""
+        labels = email.labels or []
+        if _is_sent(labels):
+            if email.thread_id:
+                self._sent.append((email.user_id, email.thread_id, email.received_at))
+            return
+        
+        self._add(
+            email.user_id,
+            email.from_email,
+            seen_at=email.received_at,
+            email_count=1,
+            read_count=int(bool(email.is_read)),
+            trashed_count=int(_is_trashed(labels, email.category)),
+            important_count=int('IMPORTANT' in labels)
+        )
+    
+    def labels_changed(
+        self,
+        email: Any,
+        old_labels: Optional[Sequence[str]],
+        new_labels: Optional[Sequence[str]],
+        old_category: Optional[str] = None
+    ) -> None:
+        """
+        An email's labels changed (UNREAD, TRASH and IMPORTANT transitions are counted).
+        
+        Trash counts the TRASH label and the trash category as one state, so
+        an email already trashed by category (see trashed) is not counted
+        again when its TRASH label arrives. Pass old_category when the
+        category changed together with the labels.
+        """
+        old, new = set(old_labels or []), set(new_labels or [])
+        if 'SENT' in new:
+            return
+        if old_category is None:
+            old_category = email.category
+        
+        def transition(label: str) -> int:
+            return int(label in new) - int(label in old)
+        
+        self._add(
+            email.user_id,
+            email.from_email,
+            read_count=-transition('UNREAD'),
+            trashed_count=int(_is_trashed(new, email.category)) - int(_is_trashed(old, old_category)),
+            important_count=transition('IMPORTANT')
+        )
+    
+    def read_changed(self, email: Any, was_read: bool) -> None:
+        """An email was marked read or unread without a label change."""
+        if bool(email.is_read) != bool(was_read) and not _is_sent(email.labels):
+            self._add(email.user_id, email.from_email, read_count=1 if email.is_read else -1)
+    
+    def trashed(self, email: Any, restored: bool = False) -> None:
+        """
+        An email was moved to (or restored from) trash by category, without a label change.
+        
+        Not counted when the email carries the TRASH label, which was counted
+        when it arrived (see labels_changed).
+        """
+        if not _is_sent(email.labels) and 'TRASH' not in (email.labels or []):
+            self._add(email.user_id, email.from_email, trashed_count=-1 if restored else 1)
+    
+    def flush(self, db: Session) -> int:
+        """
+        Write the collected deltas in the caller's transaction (does not commit).
+        
+        Runs in a savepoint: a failed profile update is logged and dropped
+        without aborting the caller's transaction.
+        
+        Returns:
+            Number of profile rows upserted
+        """
+        if not self:
+            return 0
+        
+        keys = list(self._deltas)
+        try:
+            with db.begin_nested():
+                self._resolve_replies(db)
+                rows = self._rows()
+                if rows:
+                    db.execute(upsert_statement(rows))
+            written = len(rows)
+        except Exception as e:
+            logger.warning(f"[SENDER_PROFILES] Could not update {len(self._deltas)} sender profiles: {e}")
+            written = 0
+        finally:
+            cache = get_sender_profile_cache()
+            if cache is not None:
+                cache.invalidate(keys + list(self._deltas))
+            self._deltas.clear()
+            self._seen_at.clear()
+            self._sent.clear()
+        
+        logger.debug(f"[SENDER_PROFILES] Upserted {written} sender profiles")
+        return written
+    
+    def _add(self, user_id: Any, from_email: Optional[str], seen_at: Optional[datetime] = None, **counts: int) -> None:
+        if not any(counts.values()):
+            return
+        seen_at = _utc(seen_at)
+        for key in profile_keys(user_id, from_email):
+            deltas = self._deltas.setdefault(key, dict.fromkeys(PROFILE_COUNTERS, 0))
+            for name, value in counts.items():
+                deltas[name] += value
+            if seen_at is not None and (key not in self._seen_at or seen_at > self._seen_at[key]):
+                self._seen_at[key] = seen_at
+    
+    def _resolve_replies(self, db: Session) -> None:
+        """Credit each sent email to the sender of the latest earlier inbound message in its thread."""
+        threads_by_user: Dict[Any, Set[str]] = {}
+        for user_id, thread_id, _ in self._sent:
+            threads_by_user.setdefault(user_id, set()).add(thread_id)
+        
+        for user_id, thread_ids in threads_by_user.items():
+            inbound: Dict[str, List[Tuple[Optional[datetime], str]]] = {}
+            rows = db.execute(
+                select(Email.thread_id, Email.from_email, Email.received_at, Email.labels)
+                .where(Email.user_id == user_id, Email.thread_id.in_(thread_ids))
+            )
+            for thread_id, from_email, received_at, labels in rows:
+                if not _is_sent(labels):
+                    inbound.setdefault(thread_id, []).append((_utc(received_at), from_email))
+            
+            for sent_user, thread_id, sent_at in self._sent:
+                if sent_user != user_id or thread_id not in inbound:
+                    continue
+                sent_at = _utc(sent_at)
+                earlier = [
+                    message for message in inbound[thread_id]
+                    if sent_at is None or message[0] is None or message[0] <= sent_at
+                ]
+                if earlier:
+                    _, from_email = max(earlier, key=lambda message: (message[0] is not None, message[0]))
+                    self._add(user_id, from_email, replied_count=1)
+        
+        self._sent.clear()
+    
+    def _rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for key in sorted(self._deltas):  # Stable lock order between concurrent writers
+            deltas = self._deltas[key]
+            if not any(deltas.values()):
+                continue
+            user_id, kind, sender_key = key
+            seen_at = self._seen_at.get(key)
+            rows.append({
+                'id': uuid.uuid4(),
+                'user_id': uuid.UUID(user_id),
+                'kind': kind,
+                'sender_key': sender_key,
+                **deltas,
+                'first_seen_at': seen_at,
+                'last_seen_at': seen_at
+            })
+        return rows
+
+
+def upsert_statement(rows: List[Dict[str, Any]]) -> Any:
+    """INSERT ... ON CONFLICT that adds each row's counters to the stored profile."""
+    statement = pg_insert(SenderProfile).values(rows)
+    excluded = statement.excluded
+    updates = {
+        name: func.greatest(0, getattr(SenderProfile, name) + getattr(excluded, name))
+        for name in PROFILE_COUNTERS
+    }
+    updates['first_seen_at'] = func.least(SenderProfile.first_seen_at, excluded.first_seen_at)
+    updates['last_seen_at'] = func.greatest(SenderProfile.last_seen_at, excluded.last_seen_at)
+    updates['updated_at'] = func.now()
+    return statement.on_conflict_do_update(constraint='uq_sender_profiles_user_kind_key', set_=updates)
+
+
+def load_sender_profiles(db: Session, user_id: Any, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], SenderStats]:
+    """Fetch stored profiles of one user by (kind, sender_key) in a single query."""
+    by_kind: Dict[str, Set[str]] = {}
+    for kind, sender_key in keys:
+        by_kind.setdefault(kind, set()).add(sender_key)
+    if not by_kind:
+        return {}
+    
+    counters = [getattr(SenderProfile, name) for name in PROFILE_COUNTERS]
+    statement = select(SenderProfile.kind, SenderProfile.sender_key, *counters).where(
+        SenderProfile.user_id == user_id,
+        or_(*(
+            and_(SenderProfile.kind == kind, SenderProfile.sender_key.in_(sender_keys))
+            for kind, sender_keys in by_kind.items()
+        ))
+    )
+    return {
+        (row[0], row[1]): SenderStats(*(max(0, count or 0) for count in row[2:]))
+        for row in db.execute(statement)
+    }
+
+
+class SenderProfileCache:
+    """
+    In-process LRU of sender profiles with a time-to-live.
+    
+    get_many() answers from memory and loads every missing profile of a batch
+    in one query. Unknown senders are cached too, so repeated lookups of
+    senders without history stay in memory. Local writes invalidate their
+    keys immediately; other processes see them after ttl_seconds.
+    """
+    
+    def __init__(
+        self,
+        loader: Optional[Callable[[Any, Set[Tuple[str, str]]], Dict[Tuple[str, str], SenderStats]]] = None,
+        max_entries: int = 50000,
+        ttl_seconds: float = 300.0,
+        min_emails: int = 5
+    ):
+        self.loader = loader or _load_with_new_session
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.min_emails = min_emails
+        self._entries: "OrderedDict[ProfileKey, Tuple[float, Optional[SenderStats]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    def get(self, user_id: Any, from_email: Optional[str]) -> Optional[SenderStats]:
+        """History of a sender: the address profile, else the domain profile, if either has enough emails."""
+        return self.get_many(user_id, [from_email]).get(from_email)
+    
+    def get_many(self, user_id: Any, from_emails: Iterable[Optional[str]]) -> Dict[Optional[str], Optional[SenderStats]]:
+        """Histories of many senders of one user (see get)."""
+        keys_by_sender = {from_email: profile_keys(user_id, from_email) for from_email in set(from_emails)}
+        wanted = {key for keys in keys_by_sender.values() for key in keys}
+        found = self._lookup(wanted)
+        
+        missing = wanted - set(found)
+        if missing:
+            found.update(self._load(user_id, missing))
+        
+        result = {}
+        for from_email, keys in keys_by_sender.items():
+            result[from_email] = next(
+                (found[key] for key in keys if found.get(key) is not None and found[key].email_count >= self.min_emails),
+                None
+            )
+        return result
+    
+    def invalidate(self, keys: Iterable[ProfileKey]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate_percent': round(self._hits / lookups * 100, 2) if lookups else 0.0
+            }
+    
+    def _lookup(self, keys: Set[ProfileKey]) -> Dict[ProfileKey, Optional[SenderStats]]:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None or entry[0] < now:
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[1]
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+        return found
+    
+    def _load(self, user_id: Any, keys: Set[ProfileKey]) -> Dict[ProfileKey, Optional[SenderStats]]:
+        try:
+            stored = self.loader(user_id, {(kind, sender_key) for _, kind, sender_key in keys})
+        except Exception as e:
+            # Cache the misses anyway: without the database every lookup would retry
+            logger.warning(f"[SENDER_PROFILES] Could not load {len(keys)} sender profiles: {e}")
+            stored = {}
+        
+        loaded = {key: stored.get((key[1], key[2])) for key in keys}
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key, stats in loaded.items():
+                self._entries[key] = (expires_at, stats)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return loaded
+
+
+def _load_with_new_session(user_id: Any, keys: Set[Tuple[str, str]]) -> Dict[Tuple[str, str], SenderStats]:
+    from app.db import SessionLocal
+    
+    db = SessionLocal()
+    try:
+        return load_sender_profiles(db, user_id, keys)
+    finally:
+        db.close()
+
+
+_profile_cache: Optional[SenderProfileCache] = None
+_profile_cache_lock = threading.Lock()
+
+
+def get_sender_profile_cache() -> Optional[SenderProfileCache]:
+    """The process-wide profile cache, or None when sender profile features are disabled."""
+    global _profile_cache
+    
+    config = current_config()
+    if not config.SENDER_PROFILE_FEATURES:
+        return None
+    
+    if _profile_cache is None:
+        with _profile_cache_lock:
+            if _profile_cache is None:
+                _profile_cache = SenderProfileCache(
+                    max_entries=config.SENDER_PROFILE_CACHE_SIZE,
+                    ttl_seconds=config.SENDER_PROFILE_CACHE_TTL_SECONDS,
+                    min_emails=config.SENDER_PROFILE_MIN_EMAILS
+                )
+    return _profile_cache
+
+
+def attach_sender_profiles(engine: Any) -> bool:
+    """Let an engine's strategy read sender history, if it supports it and the feature is enabled."""
+    cache = get_sender_profile_cache()
+    if cache is None or not hasattr(engine.scoring_strategy, 'sender_profiles'):
+        return False
+    engine.scoring_strategy.sender_profiles = cache
+    return True
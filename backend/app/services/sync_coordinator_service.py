@@ -18,6 +18,7 @@ from . import gmail_service
 from . import processing_service
 from . import categorization_service
 from . import email_operations_service
+from . import enhanced_attention_scoring
 import time
 
 logger = logging.getLogger(__name__)
@@ -356,6 +357,9 @@ async def perform_full_sync(db: Session, user: User) -> Dict[str, Any]:
         # Categorize emails
         categorized_count = categorization_service.categorize_emails_batch(db, processed_emails, user_id)
         
+        # A full resync can change any of the user's scores
+        enhanced_attention_scoring.invalidate_user_score_cache(user_id)
+        
         # Get or create sync record and update checkpoint
         email_sync = processing_service.get_or_create_email_sync(db, user)
         
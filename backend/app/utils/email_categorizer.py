@@ -3,25 +3,47 @@ Email categorization utilities with a simple, one-pass rule engine.
 
 This module fetches categorization rules from the database, flattens
 them into an ordered list, and assigns the first matching category.
+
+Compiled categorizers are cached per user (get_categorizer). The rule CRUD
+endpoints call invalidate_categorizer_cache after committing, so the rules
+are loaded once per change instead of once per email; a TTL bounds how long
+another worker process can keep serving rules it did not see change.
 """
 
 import logging
+import threading
+import time
 import warnings
-from typing import Optional, Dict, Any, Tuple, List
+from collections import OrderedDict
+from typing import Optional, Dict, Any, FrozenSet, Tuple, List
 from uuid import UUID
 from sqlalchemy.orm import Session
+from ..scoring.singleflight import SingleFlight
 from ..services.category_service import get_categorization_rules
-from email.utils import parseaddr
+from .email_utils import email_sender
+from .string_matchers import AhoCorasickMatcher
 
 logger = logging.getLogger(__name__)
 
+# Compiled categorizer cache: most recently used users, rebuilt after a rule change or the TTL
+CATEGORIZER_CACHE_SIZE = 1024
+CATEGORIZER_CACHE_TTL_SECONDS = 300.0
+
 class DuplicateSenderRuleWarning(Warning):
     pass
 
+def domain_rule_key(pattern: str) -> str:
+    """Lookup key of a domain sender rule: "@Shop.com" and "shop.com" both match senders at shop.com."""
+    return (pattern or "").strip().lower().lstrip("@")
+
 class RuleBasedCategorizer:
     """
     One-pass engine: flatten all DB rules + hard-coded labels,
     sort by (priority – weight), then return on first match.
+    Keyword/substring rules are compiled into an Aho-Corasick automaton, so a
+    lookup scans the subject and sender once regardless of how many rules
+    there are. Domain rules are a dict keyed by domain, probed with the
+    sender's normalized address, its domain and each parent domain.
     """
     def __init__(self, db: Session = None, user_id: Optional[UUID] = None):
         self.db = db
@@ -73,6 +95,37 @@ class RuleBasedCategorizer:
             type_order = {"label": 0, "domain": 1, "substring": 2}
             return (type_order.get(r["type"], 99), r["priority"] - r["weight"])
         self.rules.sort(key=rule_sort_key)
+        self._compile()
+
+    def _compile(self) -> None:
+        """
+        Compile the sorted rules into matchers whose values are rule indexes.
+        The lowest matching index within a stage is the rule a sequential scan
+        of self.rules would have returned first.
+        """
+        self._label_rules = [(i, r["value"]) for i, r in enumerate(self.rules) if r["type"] == "label"]
+        self._trash_substring_rules = frozenset(
+            i for i, r in enumerate(self.rules) if r["type"] == "substring" and r["category"] == "trash"
+        )
+        # Keyword and substring sender rules, matched against both sender and subject
+        self._substring_matcher = AhoCorasickMatcher(
+            (r["value"].lower(), i) for i, r in enumerate(self.rules) if r["type"] == "substring"
+        )
+        # Domain rules by domain key; rules are sorted, so the first index is the winner (trash domain rules never applied)
+        self._domain_rules: Dict[str, int] = {}
+        for i, r in enumerate(self.rules):
+            if r["type"] == "domain" and r["category"] != "trash":
+                key = domain_rule_key(r["value"])
+                if key:
+                    self._domain_rules.setdefault(key, i)
+
+    def _domain_rule_matches(self, address: str, domain: str) -> FrozenSet[int]:
+        """Domain rules for the sender: its exact address, its domain or any parent domain."""
+        keys = [address] if address else []
+        while domain:
+            keys.append(domain)
+            domain = domain.partition('.')[2]
+        return frozenset(self._domain_rules[key] for key in keys if key in self._domain_rules)
 
     def categorize(self, email_data: Dict[str, Any]) -> Tuple[str, float, str]:
         """
@@ -80,47 +133,47 @@ class RuleBasedCategorizer:
         """
         labels     = email_data.get("labels", []) or []
         subject    = (email_data.get("subject") or "").lower()
-        from_email_raw = (email_data.get("from_email") or "").lower()
-        _, from_email = parseaddr(from_email_raw)
-        from_email = from_email.lower()
+        from_email, sender_domain = email_sender(email_data)
         labels_upper = [label.upper() for label in labels]
 
         # 1. Label rules (TRASH, SPAM)
-        for r in self.rules:
-            if r["type"] == "label":
-                if r["value"] in labels:
-                    logger.info(f"[EMAIL_CAT] Rule match: type=label, value={r['value']}, category={r['category']}, reason={r['reason']}")
-                    return r["category"], 1.0, r["reason"]
+        for i, value in self._label_rules:
+            if value in labels:
+                r = self.rules[i]
+                logger.debug(f"[EMAIL_CAT] Rule match: type=label, value={r['value']}, category={r['category']}, reason={r['reason']}")
+                return r["category"], 1.0, r["reason"]
+
+        # One scan of each text finds every matching rule; stages below pick the first by precedence
+        sender_matches = self._substring_matcher.find_all(from_email)
+        subject_matches = self._substring_matcher.find_all(subject)
 
         # 2. Trash keyword rules (subject or from_email) - take precedence over sender rules for other categories
-        for r in self.rules:
-            if r["type"] == "substring" and r["category"] == "trash":
-                if r["value"].lower() in from_email:
-                    logger.info(f"[EMAIL_CAT] Rule match: type=trash-body, value={r['value']}, category=trash, reason=body trash keyword match | Body: {subject[:40]}")
-                    return r["category"], 1.0, r["reason"]
-                if r["value"].lower() in subject:
-                    logger.info(f"[EMAIL_CAT] Rule match: type=trash-subject, value={r['value']}, category=trash, reason=subject trash keyword match | Subject: {subject}")
-                    return r["category"], 1.0, r["reason"]
-
-        # 3. Sender rules (domain/substring) - for non-trash categories
-        for r in self.rules:
-            if r["type"] in ("domain", "substring") and r["category"] != "trash":
-                if r["type"] == "domain" and from_email.endswith(r["value"].lower()):
-                    logger.info(f"[EMAIL_CAT] Rule match: type=domain, value={r['value']}, category={r['category']}, reason=domain match | From: {from_email}")
-                    return r["category"], 1.0, r["reason"]
-                if r["type"] == "substring" and r["value"].lower() in from_email:
-                    logger.info(f"[EMAIL_CAT] Rule match: type=sender, value={r['value']}, category={r['category']}, reason=sender match | From: {from_email}")
-                    return r["category"], 1.0, r["reason"]
-
-        # 4. Keyword rules (substring in from_email or subject) for non-trash categories
-        for r in self.rules:
-            if r["type"] == "substring" and r["category"] != "trash":
-                if r["value"].lower() in from_email:
-                    logger.info(f"[EMAIL_CAT] Rule match: type=body, value={r['value']}, category={r['category']}, reason=body keyword match | Body: {subject[:40]}")
-                    return r["category"], 1.0, r["reason"]
-                if r["value"].lower() in subject:
-                    logger.info(f"[EMAIL_CAT] Rule match: type=subject, value={r['value']}, category={r['category']}, reason=subject keyword match | Subject: {subject}")
-                    return r["category"], 1.0, r["reason"]
+        trash_matches = (sender_matches | subject_matches) & self._trash_substring_rules
+        if trash_matches:
+            i = min(trash_matches)
+            r = self.rules[i]
+            if i in sender_matches:
+                logger.debug(f"[EMAIL_CAT] Rule match: type=trash-body, value={r['value']}, category=trash, reason=body trash keyword match | Body: {subject[:40]}")
+            else:
+                logger.debug(f"[EMAIL_CAT] Rule match: type=trash-subject, value={r['value']}, category=trash, reason=subject trash keyword match | Subject: {subject}")
+            return r["category"], 1.0, r["reason"]
+
+        # 3. Sender rules (domain/substring) - for non-trash categories; domain rules sort first
+        sender_rule_matches = (sender_matches - self._trash_substring_rules) | self._domain_rule_matches(from_email, sender_domain)
+        if sender_rule_matches:
+            r = self.rules[min(sender_rule_matches)]
+            if r["type"] == "domain":
+                logger.debug(f"[EMAIL_CAT] Rule match: type=domain, value={r['value']}, category={r['category']}, reason=domain match | From: {from_email}")
+            else:
+                logger.debug(f"[EMAIL_CAT] Rule match: type=sender, value={r['value']}, category={r['category']}, reason=sender match | From: {from_email}")
+            return r["category"], 1.0, r["reason"]
+
+        # 4. Keyword rules in the subject for non-trash categories (sender matches were taken above)
+        keyword_matches = subject_matches - self._trash_substring_rules
+        if keyword_matches:
+            r = self.rules[min(keyword_matches)]
+            logger.debug(f"[EMAIL_CAT] Rule match: type=subject, value={r['value']}, category={r['category']}, reason=subject keyword match | Subject: {subject}")
+            return r["category"], 1.0, r["reason"]
 
         # fallback: archive if removed from inbox, else important
         if "INBOX" not in labels_upper:
@@ -128,6 +181,98 @@ class RuleBasedCategorizer:
         return "important", 1.0, "fallback:important"
 
 
+class _CategorizerCache:
+    """
+    Per-user RuleBasedCategorizer instances keyed by rule-set version.
+    
+    The version of a user is (global version, user version): system rule
+    changes bump the global one and invalidate everyone, a user's own rule
+    changes bump only theirs. Concurrent misses for the same user and version
+    share one build.
+    """
+    
+    def __init__(self, max_entries: int = CATEGORIZER_CACHE_SIZE, ttl_seconds: float = CATEGORIZER_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Optional[str], Tuple[Tuple[int, int], float, RuleBasedCategorizer]]" = OrderedDict()
+        self._global_version = 0
+        self._user_versions: Dict[str, int] = {}
+        self._builds = SingleFlight()
+        self._hits = 0
+        self._misses = 0
+    
+    def get(self, db: Session, user_id: Optional[UUID]) -> 'RuleBasedCategorizer':
+        user_key = str(user_id) if user_id else None
+        with self._lock:
+            version = (self._global_version, self._user_versions.get(user_key, 0))
+            entry = self._entries.get(user_key)
+            if entry is not None and entry[0] == version and time.monotonic() - entry[1] < self.ttl_seconds:
+                self._entries.move_to_end(user_key)
+                self._hits += 1
+                return entry[2]
+            self._misses += 1
+        
+        return self._builds.do((user_key, version), lambda: self._build(db, user_id, user_key, version))
+    
+    def _build(self, db: Session, user_id: Optional[UUID], user_key: Optional[str], version: Tuple[int, int]) -> 'RuleBasedCategorizer':
+        categorizer = RuleBasedCategorizer(db, user_id)
+        # Only the compiled rules are shared; don't pin the building request's session
+        categorizer.db = None
+        with self._lock:
+            self._entries[user_key] = (version, time.monotonic(), categorizer)
+            self._entries.move_to_end(user_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.debug(f"[EMAIL_CAT] Compiled {len(categorizer.rules)} rules for user {user_key} (version {version})")
+        return categorizer
+    
+    def invalidate(self, user_id: Optional[UUID] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._global_version += 1
+                self._entries.clear()
+            else:
+                user_key = str(user_id)
+                self._user_versions[user_key] = self._user_versions.get(user_key, 0) + 1
+                self._entries.pop(user_key, None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / total if total else 0.0,
+                'global_version': self._global_version
+            }
+
+
+_categorizer_cache = _CategorizerCache()
+
+
+def get_categorizer(db: Session, user_id: Optional[UUID] = None) -> RuleBasedCategorizer:
+    """
+    Compiled categorizer for a user's current rule set, built (with the rule
+    queries) only when the rules changed or the cached one expired.
+    """
+    return _categorizer_cache.get(db, user_id)
+
+
+def invalidate_categorizer_cache(user_id: Optional[UUID] = None) -> None:
+    """
+    Drop cached categorizers after a rule change: a user's own rules when
+    user_id is given, otherwise system rules (every user).
+    """
+    _categorizer_cache.invalidate(user_id)
+
+
+def get_categorizer_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the compiled categorizer cache."""
+    return _categorizer_cache.get_stats()
+
+
 def categorize_email(
     email_data: Dict[str, Any],
     db: Session,
@@ -143,7 +288,7 @@ def categorize_email(
     try:
         logger.info("[EMAIL_CAT] Starting categorization")
         if categorizer is None:
-            categorizer = RuleBasedCategorizer(db, user_id)
+            categorizer = get_categorizer(db, user_id)
         category, confidence, reason = categorizer.categorize(email_data)
         logger.info(f"[EMAIL_CAT] Result: {category} | Reason: {reason} | Subject: '{email_data.get('subject', '')[:40]}' | From: {email_data.get('from_email', '')}")
         return category
@@ -170,7 +315,7 @@ def determine_category(
             "from_email": from_email,
             "gmail_id": "unknown"
         }
-        categorizer = RuleBasedCategorizer(db, user_id)
+        categorizer = get_categorizer(db, user_id)
         category, _, _ = categorizer.categorize(email_data)
         return category
     except Exception:
@@ -192,7 +337,7 @@ def categorize_email_from_labels(
             "from_email": "",
             "gmail_id": "unknown_from_labels"
         }
-        categorizer = RuleBasedCategorizer(db, user_id)
+        categorizer = get_categorizer(db, user_id)
         category, _, _ = categorizer.categorize(email_data)
         return category
     except Exception:
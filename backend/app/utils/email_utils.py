@@ -1,5 +1,38 @@
+from email.utils import parseaddr
+from functools import lru_cache
+from typing import Optional, Tuple
 from sqlalchemy.orm import Session
-from ..models.email_category import EmailCategory
+
+@lru_cache(maxsize=65536)
+def normalize_sender(from_email: Optional[str]) -> Tuple[str, str]:
+    """
+    Split a From header ("Name <addr>" or a bare address) into a lowercase
+    (address, domain) pair. Either part is an empty string when missing.
+    Memoized: the same senders recur across a mailbox.
+    """
+    if not from_email:
+        return '', ''
+    _, address = parseaddr(from_email)
+    address = address.strip().lower()
+    if '@' not in address:
+        return address, ''
+    return address, address.rsplit('@', 1)[1]
+
+def email_sender(email) -> Tuple[str, str]:
+    """
+    (address, domain) of an Email, or of any row/dict carrying from_email:
+    the stored sender_email/sender_domain columns when populated, otherwise
+    parsed from the raw header.
+    """
+    if isinstance(email, dict):
+        address, domain, from_email = email.get('sender_email'), email.get('sender_domain'), email.get('from_email')
+    else:
+        address = getattr(email, 'sender_email', None)
+        domain = getattr(email, 'sender_domain', None)
+        from_email = getattr(email, 'from_email', None)
+    if address:
+        return address, domain or ''
+    return normalize_sender(from_email)
 
 def set_email_category_and_labels(email, new_category, db: Session = None):
     """
@@ -8,7 +41,9 @@ def set_email_category_and_labels(email, new_category, db: Session = None):
     Raise ValueError if invalid.
     """
     if db is not None:
-        valid_categories = {cat.name for cat in db.query(EmailCategory).all()}
+        # Imported here: the Email model imports this module
+        from ..services.category_metadata import get_category_metadata
+        valid_categories = get_category_metadata(db).names
         if new_category not in valid_categories:
             raise ValueError(f"Invalid category '{new_category}'. Must be one of: {', '.join(valid_categories)}")
     old_category = email.category
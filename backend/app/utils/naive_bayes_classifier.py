@@ -7,10 +7,10 @@ import logging
 from collections import Counter, defaultdict
 import math
 from uuid import UUID
-from email.utils import parseaddr
 from sqlalchemy.orm import Session
 from ..models.email import Email
 from ..models.email_trash_event import EmailTrashEvent
+from .email_utils import email_sender, normalize_sender
 from datetime import datetime, timezone
 import os
 
@@ -28,10 +28,7 @@ def extract_domain(email_address: str) -> str:
     Returns:
         Domain or empty string if no valid domain found
     """
-    _, address = parseaddr(email_address)
-    if '@' in address:
-        return address.split('@')[-1].lower()
-    return ''
+    return normalize_sender(email_address)[1]
 
 # Model cache - store loaded models keyed by user_id (None for global)
 _model_cache = {}
@@ -107,7 +104,8 @@ class NaiveBayesClassifier:
         self.feature_weights = {
             'text': 0.6,
             'subject': 0.2,  # Increased importance of subject
-            'sender_domain': 0.2
+            'sender_domain': 0.2,
+            'sender_history': 0.5  # Sender profile trash rate, when email_data carries one
         }
         
         # Feature importance tracking
@@ -174,19 +172,18 @@ class NaiveBayesClassifier:
         features['tokens'] = features['subject_tokens'] + features['content_tokens']
         
         # Get sender domain and email parts
-        from_email = email_data.get('from_email', '')
-        _, sender_address = parseaddr(from_email)
+        sender_address, domain = email_sender(email_data)
         
         features['sender_domain'] = ''
         features['sender_local_part'] = ''
         
-        if '@' in sender_address:
-            local_part, domain = sender_address.split('@', 1)
-            features['sender_domain'] = domain.lower()
-            features['sender_local_part'] = local_part.lower()
+        if domain:
+            local_part = sender_address.rsplit('@', 1)[0]
+            features['sender_domain'] = domain
+            features['sender_local_part'] = local_part
             
             # Check for common marketing/no-reply patterns
-            if any(pattern in local_part.lower() for pattern in 
+            if any(pattern in local_part for pattern in 
                   ['noreply', 'no-reply', 'donotreply', 'do-not-reply', 'marketing', 'newsletter', 
                    'news', 'updates', 'info', 'hello', 'support', 'team', 'notification']):
                 features['sender_type'] = 'marketing'
@@ -511,6 +508,15 @@ class NaiveBayesClassifier:
             final_log_prob_trash = log_prob_trash + self.feature_weights['sender_domain'] * log_domain_prob_trash
             final_log_prob_not_trash = log_prob_not_trash + self.feature_weights['sender_domain'] * log_domain_prob_not_trash
             
+            # How often this user has trashed the sender's mail (sender profile, smoothed)
+            sender_history = email_data.get('sender_history')
+            if sender_history is not None:
+                alpha = self.laplace_smoothing_alpha
+                history_trash = (sender_history.trashed_count + alpha) / (sender_history.email_count + 2 * alpha)
+                history_weight = self.feature_weights.get('sender_history', 0.5)
+                final_log_prob_trash += history_weight * math.log(history_trash)
+                final_log_prob_not_trash += history_weight * math.log(1 - history_trash)
+            
             # Make prediction
             predicted_class = 'trash' if final_log_prob_trash > final_log_prob_not_trash else 'not_trash'
             
@@ -809,6 +815,9 @@ def classify_email(email_data: Dict[str, Any], user_id: Optional[UUID] = None) -
             logger.warning(f"[ML-CLASSIFIER] Model not trained yet, returning default classification for {gmail_id}")
             return ('not_trash', 0.5)
         
+        if user_id and 'sender_history' not in email_data:
+            email_data['sender_history'] = _sender_history(user_id, email_data.get('from_email'))
+        
         predicted_class, confidence = classifier.classify(email_data)
         
         classification_result = f"[ML-CLASSIFIER] Email {gmail_id} classified as '{predicted_class}' with confidence {confidence:.2f}"
@@ -827,6 +836,18 @@ def classify_email(email_data: Dict[str, Any], user_id: Optional[UUID] = None) -
         logger.error(f"[ML-CLASSIFIER] Error classifying email: {str(e)}", exc_info=True)
         return ('not_trash', 0.5)
 
+def _sender_history(user_id: UUID, from_email: Optional[str]) -> Optional[Any]:
+    """Sender profile stats from the in-process cache (None if disabled or too little history)."""
+    # Import here to avoid circular imports
+    from ..services.sender_profiles import get_sender_profile_cache
+    
+    try:
+        cache = get_sender_profile_cache()
+        return cache.get(user_id, from_email) if cache is not None else None
+    except Exception as e:
+        logger.warning(f"[ML-CLASSIFIER] Sender profile lookup failed for {from_email}: {e}")
+        return None
+
 def record_trash_event(
     db: Session,
     email_id: UUID,
@@ -862,8 +883,7 @@ def record_trash_event(
                    f"Subject='{subject}...', Source={categorization_source}")
         
         # Extract sender domain
-        _, sender_address = parseaddr(from_email)
-        sender_domain = sender_address.split('@')[-1].lower() if '@' in sender_address else ''
+        sender_domain = normalize_sender(from_email)[1]
         
         # Extract keywords (simplified version)
         subject = email_data.get('subject', '')
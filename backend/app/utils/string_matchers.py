@@ -0,0 +1,76 @@
+"""
+Multi-pattern string matchers for compiled rule sets.
+
+AhoCorasickMatcher finds every pattern occurring as a substring of a text in
+one scan, however many patterns there are. It is built once and is read-only
+afterwards, so a compiled matcher can be shared between threads.
+
+Matching is exact and case-sensitive (callers lower-case both sides). The
+empty pattern matches every text, as with `'' in text`.
+"""
+
+from collections import deque
+from typing import Dict, FrozenSet, Generic, Hashable, Iterable, List, Tuple, TypeVar
+
+T = TypeVar('T', bound=Hashable)
+
+
+class AhoCorasickMatcher(Generic[T]):
+    """
+    Aho-Corasick automaton over (pattern, value) pairs.
+    
+    find_all(text) returns the values of all patterns that occur in text,
+    equivalent to {value for pattern, value in pairs if pattern in text}.
+    """
+    
+    def __init__(self, patterns: Iterable[Tuple[str, T]]):
+        # Node 0 is the root; each node has goto edges, a failure link and the
+        # values of every pattern ending here (including via failure links)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        outputs: List[set] = [set()]
+        
+        for pattern, value in patterns:
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append(set())
+                node = next_node
+            outputs[node].add(value)
+        
+        # Breadth-first failure links; a node inherits its failure target's outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                outputs[child] |= outputs[self._fail[child]]
+        
+        self._outputs: List[FrozenSet[T]] = [frozenset(values) for values in outputs]
+    
+    def find_all(self, text: str) -> FrozenSet[T]:
+        """Values of all patterns occurring in text."""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found = set(outputs[0])
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if outputs[node]:
+                found |= outputs[node]
+        return frozenset(found)
+    
+    def __len__(self) -> int:
+        """Number of automaton states."""
+        return len(self._goto)
+
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Fill the normalized sender_email / sender_domain columns of stored emails.
+
+Run once after the add_normalized_sender_columns migration. Only rows where
+the columns are still NULL are touched, so the job can be interrupted and
+rerun safely.
+
+Usage:
+    python backfill_senders.py [--user USER_ID] [--batch-size N]
+"""
+
+import argparse
+import logging
+import sys
+sys.path.append('.')
+
+from app.db import SessionLocal
+from app.services.sender_backfill import DEFAULT_BATCH_SIZE, backfill_sender_columns
+
+
+def print_progress(totals: dict) -> None:
+    print(
+        f"   • {totals['emails_scanned']} scanned, {totals['emails_updated']} updated | "
+        f"{totals['elapsed_seconds']:.1f}s",
+        flush=True
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backfill normalized sender columns")
+    parser.add_argument("--user", help="Only backfill this user's emails (default: all users)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per batch")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    
+    print("🚀 Backfilling sender_email / sender_domain...")
+    
+    db = SessionLocal()
+    try:
+        totals = backfill_sender_columns(
+            db,
+            user_id=args.user,
+            batch_size=args.batch_size,
+            progress_callback=print_progress
+        )
+    except KeyboardInterrupt:
+        print("\n⏸  Interrupted - rerun to continue (finished batches are committed)")
+        return 130
+    finally:
+        db.close()
+    
+    print("✅ Backfill complete:")
+    print(f"   • Emails scanned: {totals['emails_scanned']}")
+    print(f"   • Emails updated: {totals['emails_updated']}")
+    print(f"   • Time: {totals['elapsed_seconds']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Compare the scoring strategies across a user's mailbox.
+
+Every strategy scores the same emails in parallel worker processes. The
+report gives each strategy's throughput and batch/single-email latency
+percentiles, and how often each candidate puts an email in the same flow
+bucket as the baseline. Live shadow scoring (SHADOW_STRATEGY) is reported
+under /flow/debug/performance instead.
+
+This keeps several CPU cores busy for the length of the run, so run it
+offline (or on a host that is not serving requests).
+
+Usage:
+    python compare_strategies.py USER_ID [--baseline enhanced|simple|category]
+                                 [--strategy NAME ...] [--limit N] [--workers N]
+                                 [--output PATH]
+"""
+
+import argparse
+import json
+import logging
+import sys
+sys.path.append('.')
+
+from app.db import SessionLocal
+from app.scoring.comparison import STRATEGY_TYPES
+from app.services.enhanced_attention_scoring import compare_strategies_for_user
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare scoring strategies across a user's mailbox")
+    parser.add_argument("user_id", help="User whose emails are compared")
+    parser.add_argument("--baseline", choices=STRATEGY_TYPES, default="enhanced", help="Strategy the others are compared against")
+    parser.add_argument("--strategy", action="append", dest="strategies", choices=STRATEGY_TYPES,
+                        help="Strategy to compare (repeatable; default: all)")
+    parser.add_argument("--limit", type=int, help="Compare at most this many emails (default: all)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: RESCORE_WORKERS or the CPU count)")
+    parser.add_argument("--output", help="Write the full JSON report to this file")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    
+    print(f"🔬 Comparing scoring strategies for user {args.user_id}...")
+    
+    try:
+        comparison = compare_strategies_for_user(
+            SessionLocal,
+            args.user_id,
+            strategy_types=args.strategies,
+            baseline=args.baseline,
+            workers=args.workers,
+            limit=args.limit,
+            progress_callback=lambda compared: print(f"   • {compared} emails compared", flush=True)
+        )
+    except KeyboardInterrupt:
+        print("\n⏸  Interrupted")
+        return 130
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(comparison, f, indent=2, default=str)
+        print(f"📝 Report written to {args.output}")
+    else:
+        print(json.dumps(comparison, indent=2, default=str))
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
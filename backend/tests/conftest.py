@@ -297,6 +297,11 @@ def db_session(setup_test_db):
     session.close()
     transaction.rollback()
     connection.close()
+    # Cached rule sets and category metadata must not outlive the rolled-back rows
+    from app.services.category_metadata import invalidate_category_metadata
+    from app.utils.email_categorizer import invalidate_categorizer_cache
+    invalidate_categorizer_cache()
+    invalidate_category_metadata()
 
 @pytest.fixture(scope="function")
 def db(db_session):
@@ -11,6 +11,7 @@ This module tests the core Action Engine functionality including:
 import pytest
 from datetime import datetime, timezone, timedelta
 from uuid import UUID
+from unittest.mock import patch
 from sqlalchemy.orm import Session
 
 from app.models.email import Email
@@ -28,6 +29,7 @@ from app.services.action_engine_service import (
     cleanup_expired_proposals,
     get_proposed_actions_for_user
 )
+from app.services.category_metadata import get_category_metadata
 from app.services.action_rule_service import (
     update_category_action_rule,
     get_action_rules_for_user,
@@ -178,6 +180,18 @@ class TestActionRuleService:
         db.refresh(test_category)
         assert test_category.has_action_rule() == False
 
+    def test_action_rule_changes_refresh_cached_rules(self, db: Session, test_user: User, test_category: EmailCategory):
+        """Test that cached action rules follow rule updates and disabling"""
+        # Load the cached category metadata before the rule exists
+        assert test_category.id not in [rule.id for rule in get_action_rules_for_user(db, test_user.id)]
+        
+        update_category_action_rule(db, test_category.id, "TRASH", 14, True)
+        rules = {rule.id: rule for rule in get_action_rules_for_user(db, test_user.id)}
+        assert rules[test_category.id].get_action_rule() == {'action': 'TRASH', 'delay_days': 14, 'enabled': True}
+        
+        disable_action_rule(db, test_category.id)
+        assert test_category.id not in [rule.id for rule in get_action_rules_for_user(db, test_user.id)]
+
 class TestActionEngineService:
     """Test Action Engine Service functionality"""
     
@@ -262,6 +276,17 @@ class TestActionEngineService:
         db.refresh(proposed_action)
         assert proposed_action.status == ProposedActionStatus.APPROVED
     
+    def test_approve_proposed_action_reads_cached_category(self, db: Session, test_user: User, test_category: EmailCategory, test_emails: list[Email]):
+        """Test approving a proposed action without querying its category"""
+        proposed_action = create_proposed_action(db, test_emails[0], test_category, "ARCHIVE")
+        
+        metadata = get_category_metadata(db)
+        with patch('app.services.action_engine_service.get_category_metadata', return_value=metadata) as cached:
+            operation = approve_proposed_action(db, proposed_action.id)
+        
+        assert operation is not None
+        cached.assert_called_once_with(db)
+    
     def test_reject_proposed_action(self, db: Session, test_user: User, test_category: EmailCategory, test_emails: list[Email]):
         """Test rejecting proposed action"""
         email = test_emails[0]
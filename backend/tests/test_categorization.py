@@ -0,0 +1,465 @@
+"""
+Tests for Email Categorization
+
+This module tests the compiled rule-based categorizer: sender and domain
+rule matching on the normalized sender columns, the per-user categorizer
+cache, the compiled rule matchers, set-based batch categorization, the
+shared category metadata snapshot and cache invalidation by the rule and
+category endpoints.
+"""
+
+import uuid
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock, MagicMock, patch
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+from app.main import app
+from app.db import get_db
+from app.dependencies import get_current_user
+from app.models.email import Email
+from app.services import categorization_service, email_processor
+from app.services import category_metadata
+from app.services.category_metadata import CategoryMetadataCache
+from app.utils import email_categorizer
+from app.utils.email_categorizer import RuleBasedCategorizer
+from app.utils.email_utils import normalize_sender
+from app.utils.string_matchers import AhoCorasickMatcher
+
+
+class TestSenderRuleMatching:
+    """Test sender rule lookups on the normalized sender address and domain."""
+    
+    def make_categorizer(self, senders):
+        rules = {
+            'categories': {1: {'name': 'newsletters', 'priority': 10}},
+            'senders': {1: senders},
+            'keywords': {}
+        }
+        with patch('app.utils.email_categorizer.get_categorization_rules', return_value=rules):
+            return RuleBasedCategorizer(None, None)
+    
+    def test_categorizer_matches_sender_rules_on_normalized_address(self):
+        """Domain rules apply to the stored address, not the display name."""
+        categorizer = self.make_categorizer([{'pattern': 'substack.com', 'is_domain': True, 'weight': 1}])
+        
+        category, _, reason = categorizer.categorize({
+            'labels': ['INBOX'], 'subject': 'Weekly', 'from_email': 'Writer <Writer@Substack.com>',
+            'sender_email': 'writer@substack.com', 'sender_domain': 'substack.com'
+        })
+        assert (category, reason) == ('newsletters', 'sender:substack.com')
+    
+    @pytest.mark.parametrize('sender, matched', [
+        ('a@substack.com', True),
+        ('Writer <a@news.Substack.com>', True),
+        ('a@notsubstack.com', False),
+        ('a@substack.com.evil.example', False),
+    ])
+    def test_domain_rules_match_domain_and_subdomains(self, sender, matched):
+        """A domain rule is a lookup of the sender's domain and parent domains, not a string suffix."""
+        categorizer = self.make_categorizer([{'pattern': '@Substack.com', 'is_domain': True, 'weight': 1}])
+        category, _, _ = categorizer.categorize({'labels': ['INBOX'], 'subject': 'Weekly', 'from_email': sender})
+        assert (category == 'newsletters') == matched
+    
+    def test_domain_rules_match_exact_address_and_stored_domain(self):
+        """Address rules match the stored address; the stored domain is preferred over parsing."""
+        categorizer = self.make_categorizer([
+            {'pattern': 'digest@company.com', 'is_domain': True, 'weight': 1},
+            {'pattern': 'lists.example', 'is_domain': True, 'weight': 1}
+        ])
+        assert categorizer.categorize({'labels': ['INBOX'], 'from_email': 'Digest <digest@company.com>'})[2] == 'sender:digest@company.com'
+        assert categorizer.categorize({'labels': ['INBOX'], 'from_email': 'boss@company.com'})[2] == 'fallback:important'
+        assert categorizer.categorize({
+            'labels': ['INBOX'], 'from_email': 'garbled', 'sender_email': 'x@lists.example', 'sender_domain': 'lists.example'
+        })[2] == 'sender:lists.example'
+
+
+class TestCategorizerCache:
+    """Test the per-user compiled rule-set cache and its version-based invalidation."""
+    
+    RULES = {
+        'categories': {1: {'name': 'newsletters', 'priority': 10}},
+        'senders': {1: [{'pattern': 'substack.com', 'is_domain': True, 'weight': 1}]},
+        'keywords': {}
+    }
+    EMAIL = {'labels': ['INBOX'], 'subject': 'Weekly', 'from_email': 'Writer <writer@substack.com>'}
+    
+    def test_rules_load_once_per_user_until_invalidated(self):
+        """A sync's worth of emails issues one rule load; a rule change forces exactly one more."""
+        email_categorizer.invalidate_categorizer_cache()
+        with patch('app.utils.email_categorizer.get_categorization_rules', return_value=self.RULES) as load_rules:
+            for _ in range(50):
+                assert email_categorizer.categorize_email(self.EMAIL, None, 'user-a') == 'newsletters'
+            email_categorizer.categorize_email(self.EMAIL, None, 'user-b')
+            assert load_rules.call_count == 2
+            
+            email_categorizer.invalidate_categorizer_cache('user-a')
+            email_categorizer.categorize_email(self.EMAIL, None, 'user-a')
+            email_categorizer.categorize_email(self.EMAIL, None, 'user-b')
+            assert load_rules.call_count == 3
+            
+            # System rule changes invalidate every user
+            email_categorizer.invalidate_categorizer_cache()
+            email_categorizer.categorize_email(self.EMAIL, None, 'user-b')
+            assert load_rules.call_count == 4
+        email_categorizer.invalidate_categorizer_cache()
+    
+    def test_cached_categorizer_does_not_keep_session(self):
+        """Only compiled rules are shared between requests."""
+        cache = email_categorizer._CategorizerCache()
+        with patch('app.utils.email_categorizer.get_categorization_rules', return_value=self.RULES):
+            categorizer = cache.get(Mock(), 'user-a')
+        assert categorizer.db is None
+        assert categorizer.categorize(self.EMAIL)[0] == 'newsletters'
+    
+    def test_ttl_and_lru_bound_the_cache(self):
+        """Entries expire after the TTL and the least recently used user is evicted."""
+        cache = email_categorizer._CategorizerCache(max_entries=2, ttl_seconds=60.0)
+        with patch('app.utils.email_categorizer.get_categorization_rules', return_value=self.RULES) as load_rules, \
+             patch('app.utils.email_categorizer.time.monotonic', return_value=1000.0) as clock:
+            cache.get(None, 'user-a')
+            cache.get(None, 'user-b')
+            cache.get(None, 'user-a')
+            cache.get(None, 'user-c')
+            assert load_rules.call_count == 3
+            assert cache.get_stats()['entries'] == 2
+            
+            cache.get(None, 'user-a')
+            assert load_rules.call_count == 3
+            cache.get(None, 'user-b')
+            assert load_rules.call_count == 4
+            
+            clock.return_value = 1061.0
+            cache.get(None, 'user-b')
+            assert load_rules.call_count == 5
+
+
+class TestCompiledRuleMatching:
+    """Test the compiled matchers against the sequential rule scan they replace."""
+    
+    @staticmethod
+    def sequential_categorize(rules, email_data):
+        """The four-pass scan over the sorted rules, with domain rules matched by domain label."""
+        labels = email_data.get("labels", []) or []
+        subject = (email_data.get("subject") or "").lower()
+        from_email, domain = normalize_sender(email_data.get("from_email"))
+        for r in rules:
+            if r["type"] == "label" and r["value"] in labels:
+                return r["category"], r["reason"]
+        for r in rules:
+            if r["type"] == "substring" and r["category"] == "trash":
+                if r["value"].lower() in from_email or r["value"].lower() in subject:
+                    return r["category"], r["reason"]
+        for r in rules:
+            if r["type"] in ("domain", "substring") and r["category"] != "trash":
+                key = r["value"].lower().lstrip("@")
+                if r["type"] == "domain" and key and (key in (from_email, domain) or domain.endswith("." + key)):
+                    return r["category"], r["reason"]
+                if r["type"] == "substring" and r["value"].lower() in from_email:
+                    return r["category"], r["reason"]
+        for r in rules:
+            if r["type"] == "substring" and r["category"] != "trash":
+                if r["value"].lower() in from_email or r["value"].lower() in subject:
+                    return r["category"], r["reason"]
+        if "INBOX" not in [label.upper() for label in labels]:
+            return "archive", "fallback:archive"
+        return "important", "fallback:important"
+    
+    def test_matcher_agrees_with_in(self):
+        """Overlapping patterns, shared prefixes and the empty pattern behave like `in`."""
+        patterns = ['he', 'she', 'his', 'hers', 'e', 'ers', '']
+        texts = ['ushers', 'his', 'h', '', 'shehershis', 'xyz']
+        substring = AhoCorasickMatcher((p, p) for p in patterns)
+        for text in texts:
+            assert substring.find_all(text) == {p for p in patterns if p in text}
+    
+    def test_compiled_categorizer_matches_sequential_precedence(self):
+        """Random rule sets and emails: compiled lookup returns exactly what the passes returned."""
+        rng = np.random.default_rng(7)
+        fragments = ['deal', 'sale', 'news', 'letter', 'invoice', 'bank', 'shop', 'promo', 'alert', 'a', 'co']
+        domains = ['shop.com', 'news.shop.com', 'notshop.com', 'bank.example', 'mail.bank.example', 'x.co', 'co']
+        # Rule-only patterns: "@" forms, exact addresses and addresses that are a suffix of another sender
+        sender_patterns = domains + fragments + ['@shop.com', '@Bank.example', 'deal@shop.com', 'a@x.co', 'o@x.co']
+        
+        for trial in range(40):
+            categories, senders, keywords = {}, {}, {}
+            for cat_id, name in enumerate(['trash', 'newsletters', 'finance', 'promotions'], start=1):
+                categories[cat_id] = {'name': name, 'priority': int(rng.integers(0, 4))}
+                senders[cat_id] = [
+                    {'pattern': str(rng.choice(sender_patterns)), 'is_domain': bool(rng.random() < 0.6),
+                     'weight': int(rng.integers(0, 3))}
+                    for _ in range(int(rng.integers(0, 4)))
+                ]
+                keywords[cat_id] = [
+                    {'keyword': str(rng.choice(fragments)).upper() if rng.random() < 0.2 else str(rng.choice(fragments)),
+                     'weight': int(rng.integers(0, 3))}
+                    for _ in range(int(rng.integers(0, 5)))
+                ]
+            rules = {'categories': categories, 'senders': senders, 'keywords': keywords}
+            with patch('app.utils.email_categorizer.get_categorization_rules', return_value=rules), \
+                 patch('app.utils.email_categorizer.warnings.warn'):
+                categorizer = RuleBasedCategorizer(None, None)
+            
+            for _ in range(25):
+                email_data = {
+                    'labels': list(rng.choice(['INBOX', 'TRASH', 'SPAM', 'IMPORTANT'], size=int(rng.integers(0, 3)))),
+                    'subject': ' '.join(rng.choice(fragments, size=3)).title(),
+                    'from_email': f"Sender <{rng.choice(fragments)}@{rng.choice(domains)}>"
+                }
+                category, _, reason = categorizer.categorize(email_data)
+                assert (category, reason) == self.sequential_categorize(categorizer.rules, email_data), (trial, email_data)
+
+
+class TestBatchCategorization:
+    """Test set-based categorization of lightweight records."""
+    
+    RULES = {
+        'categories': {1: {'name': 'newsletters', 'priority': 10}, 2: {'name': 'finance', 'priority': 5}},
+        'senders': {1: [{'pattern': 'substack.com', 'is_domain': True, 'weight': 1}]},
+        'keywords': {2: [{'keyword': 'invoice', 'weight': 1}]}
+    }
+    
+    def make_categorizer(self):
+        with patch('app.utils.email_categorizer.get_categorization_rules', return_value=self.RULES):
+            return RuleBasedCategorizer(None, None)
+    
+    def test_categorize_records_returns_category_and_reason(self):
+        """Rows and dicts are categorized alike; a record the categorizer rejects is skipped."""
+        records = [
+            SimpleNamespace(_mapping={'id': 1, 'subject': 'Weekly', 'from_email': 'W <w@substack.com>', 'labels': ['INBOX']}),
+            {'id': 2, 'subject': 'Your invoice', 'from_email': 'billing@shop.example', 'labels': ['INBOX']},
+            {'id': 3, 'subject': 'Hi', 'from_email': 'friend@home.example', 'labels': []},
+            {'id': 4, 'subject': object(), 'from_email': 'x@y.example', 'labels': ['INBOX']}
+        ]
+        results = categorization_service.categorize_records(records, self.make_categorizer())
+        assert [tuple(r) for r in results] == [
+            (1, 'newsletters', 'sender:substack.com'),
+            (2, 'finance', 'keyword:invoice'),
+            (3, 'archive', 'fallback:archive')
+        ]
+    
+    def test_store_categories_issues_one_update_per_category(self):
+        """Rows are grouped by category and only still-uncategorized rows are written."""
+        db = MagicMock()
+        db.execute.return_value.rowcount = 2
+        results = [
+            categorization_service.CategorizationResult(i, 'newsletters' if i % 2 else 'finance', 'r')
+            for i in range(4)
+        ]
+        
+        assert categorization_service.store_categories(db, results) == 4
+        assert db.execute.call_count == 2
+        sql = str(db.execute.call_args_list[0].args[0].compile(dialect=postgresql.dialect()))
+        assert 'emails.category IS NULL' in sql
+        assert 'attention_base_score=' in sql
+    
+    def test_batch_filters_categorized_emails_in_sql_and_commits_once(self):
+        """categorize_emails_batch loads uncategorized rows in one SELECT and writes them back in bulk."""
+        emails = [Email(id=i, gmail_id=f'g{i}', subject='Weekly', from_email='w@substack.com', labels=['INBOX'])
+                  for i in range(3)]
+        rows = [SimpleNamespace(_mapping={'id': i, 'subject': 'Weekly', 'from_email': 'w@substack.com',
+                                          'sender_email': 'w@substack.com', 'labels': ['INBOX']}) for i in (0, 2)]
+        db = MagicMock()
+        db.execute.side_effect = [Mock(all=Mock(return_value=rows)), Mock(rowcount=2)]
+        
+        with patch.object(categorization_service, 'get_categorizer', return_value=self.make_categorizer()):
+            assert categorization_service.categorize_emails_batch(db, emails, 'user-1') == 2
+        
+        select_sql = str(db.execute.call_args_list[0].args[0].compile(dialect=postgresql.dialect()))
+        assert 'emails.category IS NULL' in select_sql
+        assert db.commit.call_count == 1
+
+
+class TestCategoryMetadataCache:
+    """Test the shared category metadata snapshot."""
+    
+    @staticmethod
+    def make_category(id, name, priority, is_system=True, action=None, delay=None, enabled=False):
+        return SimpleNamespace(id=id, name=name, display_name=name.title(), description=None, priority=priority,
+                               is_system=is_system, action=action, action_delay_days=delay, action_enabled=enabled)
+    
+    def make_db(self, categories):
+        db = MagicMock()
+        db.query.return_value.order_by.return_value.all.return_value = categories
+        return db
+    
+    def test_snapshot_loads_once_until_invalidated(self):
+        """Reads are served from the snapshot; invalidation forces one reload."""
+        cache = CategoryMetadataCache()
+        db = self.make_db([self.make_category(1, 'primary', 1)])
+        for _ in range(10):
+            assert cache.get(db).get('primary').priority == 1
+        assert db.query.call_count == 1
+        
+        cache.invalidate()
+        cache.get(db)
+        assert db.query.call_count == 2
+    
+    def test_lookups_prefer_system_categories_and_expose_action_rules(self):
+        """Duplicate names resolve to the system category; only complete system rules are action rules."""
+        cache = CategoryMetadataCache()
+        metadata = cache.get(self.make_db([
+            self.make_category(1, 'newsletters', 4, action='ARCHIVE', delay=7, enabled=True),
+            self.make_category(2, 'Newsletters', 9, is_system=False),
+            self.make_category(3, 'trash', 9, action='TRASH', delay=None, enabled=True),
+            self.make_category(4, 'mine', 5, is_system=False, action='TRASH', delay=3, enabled=True)
+        ]))
+        
+        assert metadata.get_ignore_case('NEWSLETTERS').id == 1
+        assert metadata.get('Newsletters').id == 2
+        assert metadata.names == {'newsletters', 'Newsletters', 'trash', 'mine'}
+        assert [c.id for c in metadata.system_action_rules] == [1]
+        assert metadata.get_by_id(1).get_action_rule() == {'action': 'ARCHIVE', 'delay_days': 7, 'enabled': True}
+    
+    def test_calculate_importance_does_not_query_categories(self):
+        """The importance hot path reads priorities from the snapshot."""
+        metadata = CategoryMetadataCache().get(self.make_db([self.make_category(1, 'primary', 1)]))
+        db = MagicMock()
+        email_data = {'gmail_id': 'g1', 'subject': 'hello', 'labels': ['INBOX'], 'category': 'Primary',
+                      'from_email': 'a@b.example', 'is_read': True}
+        with patch.object(email_processor, 'get_category_metadata', return_value=metadata), \
+             patch.object(categorization_service, 'get_category_metadata', return_value=metadata):
+            email_processor.calculate_importance(dict(email_data), db, None)
+            categorization_service.calculate_importance(dict(email_data, category='primary'), db, None)
+        db.query.assert_not_called()
+
+
+class TestCategorizerCacheEndpoints:
+    """Test that the rule endpoints invalidate the cached categorizers they affect."""
+    
+    USER_ID = '6f1c2a9e-0d4b-4c7e-9a51-3b8e2f7d1c40'
+    
+    @pytest.fixture
+    def client(self):
+        """Test client with a mocked session and user; invalidation calls are recorded."""
+        mock_db = MagicMock()
+        mock_user = Mock()
+        mock_user.id = uuid.UUID(self.USER_ID)
+        app.dependency_overrides[get_db] = lambda: mock_db
+        app.dependency_overrides[get_current_user] = lambda: mock_user
+        
+        with patch('app.routers.email_management.invalidate_categorizer_cache') as invalidate:
+            yield TestClient(app), mock_db, invalidate
+        
+        app.dependency_overrides.clear()
+    
+    def owned(self, **values):
+        return SimpleNamespace(id=7, user_id=uuid.UUID(self.USER_ID), pattern='shop.com', is_domain=True,
+                               keyword='sale', is_regex=False, weight=1, category_id=1, **values)
+    
+    @pytest.mark.parametrize('path, json', [
+        ('/email-management/keywords', {'category_name': 'promotions', 'keyword': 'sale'}),
+        ('/email-management/sender-rules', {'category_name': 'promotions', 'pattern': 'shop.com'}),
+    ])
+    def test_adding_a_rule_invalidates_the_user(self, client, path, json):
+        """New user rules rebuild only that user's categorizer."""
+        client, _, invalidate = client
+        with patch('app.routers.email_management.add_user_keyword', return_value=True), \
+                patch('app.routers.email_management.add_user_sender_rule', return_value=True):
+            response = client.post(path, json=json)
+        
+        assert response.status_code == 200
+        invalidate.assert_called_once_with(uuid.UUID(self.USER_ID))
+    
+    @pytest.mark.parametrize('method, path, json', [
+        ('patch', '/email-management/sender-rules/7', {'weight': 3}),
+        ('patch', '/email-management/sender-rules/7/pattern', {'pattern': 'mail.shop.com', 'is_domain': True}),
+        ('patch', '/email-management/keywords/7', {'weight': 3}),
+        ('delete', '/email-management/sender-rules/7', None),
+        ('delete', '/email-management/keywords/7', None),
+    ])
+    def test_changing_own_rules_invalidates_the_user(self, client, method, path, json):
+        """Updates and deletes of a user's own rules rebuild only that user's categorizer."""
+        client, db, invalidate = client
+        # The pattern update also checks for a duplicate rule (none here)
+        db.query.return_value.filter.return_value.first.side_effect = [self.owned(), None]
+        
+        response = client.request(method, path, json=json)
+        
+        assert response.status_code == 200
+        invalidate.assert_called_once_with(uuid.UUID(self.USER_ID))
+    
+    def test_initializing_system_rules_invalidates_everyone(self, client):
+        """System rules are shared, so every cached categorizer is dropped."""
+        client, _, invalidate = client
+        with patch('app.routers.email_management.initialize_system_categories', return_value=[]), \
+                patch('app.routers.email_management.populate_system_keywords', return_value=0), \
+                patch('app.routers.email_management.populate_system_sender_rules', return_value=0):
+            response = client.post('/email-management/initialize-categories')
+        
+        assert response.status_code == 201
+        invalidate.assert_called_once_with()
+    
+    def test_deleting_a_category_invalidates_everyone(self, client):
+        """The cascade removes every user's rules of the category."""
+        client, db, invalidate = client
+        db.query.return_value.filter.return_value.first.return_value = SimpleNamespace(name='receipts', is_system=False)
+        
+        response = client.delete('/email-management/categories/receipts')
+        
+        assert response.status_code == 200
+        invalidate.assert_called_once_with()
+
+
+class TestCategoryMetadataEndpoints:
+    """Test the endpoints that read or invalidate the category metadata snapshot."""
+    
+    USER_ID = '6f1c2a9e-0d4b-4c7e-9a51-3b8e2f7d1c40'
+    EMAIL_ID = '550e8400-e29b-41d4-a716-446655440001'
+    
+    @pytest.fixture
+    def client(self):
+        """Test client with a mocked session and user, and an empty metadata snapshot."""
+        mock_db = MagicMock()
+        mock_user = Mock()
+        mock_user.id = uuid.UUID(self.USER_ID)
+        app.dependency_overrides[get_db] = lambda: mock_db
+        app.dependency_overrides[get_current_user] = lambda: mock_user
+        category_metadata.invalidate_category_metadata()
+        
+        with patch('app.routers.emails.email_operations_service.create_operation'):
+            yield TestClient(app), mock_db
+        
+        category_metadata.invalidate_category_metadata()
+        app.dependency_overrides.clear()
+    
+    def seed(self, db):
+        """The mocked session serves one email and the category table."""
+        email = SimpleNamespace(id=uuid.UUID(self.EMAIL_ID), user_id=self.USER_ID, from_email='deals@shop.example',
+                                labels=['INBOX'], category='primary', is_read=True, thread_id='t1')
+        db.query.return_value.filter.return_value.first.return_value = email
+        db.query.return_value.order_by.return_value.all.return_value = [
+            TestCategoryMetadataCache.make_category(1, 'primary', 1),
+            TestCategoryMetadataCache.make_category(2, 'promotions', 4),
+            TestCategoryMetadataCache.make_category(3, 'trash', 9)
+        ]
+        return email
+    
+    def test_update_category_validates_against_the_snapshot(self, client):
+        """Category names are checked against the cached snapshot, loaded once for both requests."""
+        client, db = client
+        email = self.seed(db)
+        
+        response = client.post(f"/emails/{self.EMAIL_ID}/update-category", json={'category': 'Promotions'})
+        rejected = client.post(f"/emails/{self.EMAIL_ID}/update-category", json={'category': 'receipts'})
+        
+        assert response.status_code == 200
+        assert response.json()['category'] == email.category == 'promotions'
+        assert rejected.status_code == 400
+        assert rejected.json()['detail'] == 'Invalid category. Must be one of: primary, promotions, trash'
+        assert db.query.return_value.order_by.return_value.all.call_count == 1
+    
+    def test_category_create_and_delete_invalidate_the_snapshot(self, client):
+        """Creating or deleting a category drops the snapshot for the next reader."""
+        client, db = client
+        db.query.return_value.filter.return_value.first.side_effect = [
+            None, SimpleNamespace(name='receipts', is_system=False)
+        ]
+        
+        with patch('app.routers.email_management.invalidate_category_metadata') as invalidate:
+            created = client.post('/email-management/categories', json={'name': 'receipts', 'display_name': 'Receipts'})
+            deleted = client.delete('/email-management/categories/receipts')
+        
+        assert (created.status_code, deleted.status_code) == (201, 200)
+        assert invalidate.call_count == 2
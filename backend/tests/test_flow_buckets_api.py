@@ -247,6 +247,90 @@ class TestFlowBucketsAPI:
         assert response.status_code == 422
 
 
+class TestScoringDebugAPI:
+    """Test the scoring debug endpoints."""
+    
+    @pytest.fixture
+    def client(self):
+        """Create test client with mocked dependencies."""
+        mock_user = Mock()
+        mock_user.id = "test-user-id"
+        
+        app.dependency_overrides[get_db] = lambda: Mock()
+        app.dependency_overrides[get_current_user] = lambda: mock_user
+        
+        client = TestClient(app)
+        yield client
+        
+        app.dependency_overrides.clear()
+    
+    @pytest.fixture
+    def engine(self):
+        """Engine with a real performance monitor, standing in for the worker's engine."""
+        from app.scoring.config import TestingScoringConfig
+        from app.scoring.engine import ScoringEngineFactory
+        
+        from app.scoring.debugger import EmailScoringDebugger
+        
+        engine = ScoringEngineFactory.create_engine(TestingScoringConfig(), strategy_type="simple", cache_type="memory")
+        with patch('app.services.enhanced_attention_scoring.get_scoring_engine', return_value=engine), \
+             patch('app.routers.flow_buckets.get_scoring_engine', return_value=engine), \
+             patch('app.services.enhanced_attention_scoring.get_debugger', return_value=EmailScoringDebugger(engine)), \
+             patch('app.services.enhanced_attention_scoring._metrics_publisher', None):
+            yield engine
+    
+    def test_metrics_endpoint_renders_prometheus(self, client, engine):
+        """Test the Prometheus export of this worker's latency histograms."""
+        engine.performance_monitor.record_calculation_time(10.0, 'work')
+        
+        response = client.get("/flow/debug/performance/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'email_scoring_calculation_duration_seconds_count{category="work"} 1' in response.text
+    
+    def test_metrics_endpoint_survives_segment_errors(self, client, engine):
+        """Test that a failing shared segment falls back to this worker's metrics."""
+        engine.performance_monitor.record_cache_hit('k')
+        publisher = Mock()
+        publisher.publish_now.side_effect = OSError("No space left on device")
+        
+        with patch('app.services.enhanced_attention_scoring._metrics_publisher', publisher):
+            response = client.get("/flow/debug/performance/metrics")
+        
+        assert response.status_code == 200
+        assert "email_scoring_cache_hits_total 1" in response.text
+    
+    def test_score_distribution_streams_a_bounded_sample(self, client, engine):
+        """Test that the distribution analysis scores at most `limit` newest emails by default."""
+        from datetime import datetime
+        from types import SimpleNamespace
+        
+        emails = [
+            SimpleNamespace(id=f"email-{i}", gmail_id=f"gmail-{i}", subject="Hello", from_email="a@example.com",
+                            received_at=datetime(2024, 1, 8, 10, 0, 0), labels=[], is_read=False, category="primary")
+            for i in range(20)
+        ]
+        
+        with patch('app.routers.flow_buckets.stream_user_emails_for_analysis', return_value=iter([emails])) as mock_stream:
+            response = client.get("/flow/debug/score-distribution")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_emails_analyzed"] == 20
+        assert data["analysis"]["primary"]["count"] == 20
+        assert mock_stream.call_args.kwargs["limit"] == 1000
+        
+        response = client.get("/flow/debug/score-distribution?limit=1000000")
+        assert response.status_code == 422
+    
+    def test_strategy_comparison_is_not_served(self, client):
+        """Test that the multi-process strategy comparison is only available offline (compare_strategies.py)."""
+        response = client.get("/flow/debug/strategy-comparison")
+        
+        assert response.status_code == 404
+
+
 class TestEmailResponseModel:
     """Test the EmailResponse model serialization."""
     
@@ -7,7 +7,13 @@ query composition, and edge cases.
 """
 
 import pytest
-from unittest.mock import Mock, MagicMock
+from datetime import datetime, timezone
+from unittest.mock import Mock, MagicMock, patch
+from app.config import Settings
+from app.scoring.cache_providers import NullCacheProvider
+from app.scoring.config import TestingScoringConfig
+from app.scoring.engine import EmailScoringEngine
+from app.scoring.strategies import EnhancedScoringStrategy
 from app.services.flow_buckets import (
     classify_bucket,
     classify_bucket_from_score,
@@ -15,6 +21,8 @@ from app.services.flow_buckets import (
     get_bucket_counts,
     get_bucket_summary
 )
+from app.scoring.scheduler import BucketCrossingPredictor
+from app.services import bucket_refresh
 
 
 class TestBucketClassification:
@@ -173,6 +181,94 @@ class TestQueryBucketEmails:
             assert query_mock.order_by.called
 
 
+class TestLiveSqlScoring:
+    """Test bucket queries that score emails inside Postgres."""
+    
+    @pytest.fixture
+    def sql_engine(self):
+        config = TestingScoringConfig(SQL_FRESH_SCORE_BUCKETS=True)
+        engine = EmailScoringEngine(EnhancedScoringStrategy(config), NullCacheProvider(), config)
+        with patch('app.services.flow_buckets.get_scoring_engine', return_value=engine):
+            yield engine
+    
+    def test_query_uses_live_score_without_python_resort(self, sql_engine):
+        """Rows come back ordered by the SQL score, which is exposed for display."""
+        session = Mock()
+        query_mock = Mock()
+        session.query.return_value = query_mock
+        query_mock.filter.return_value = query_mock
+        query_mock.order_by.return_value = query_mock
+        query_mock.offset.return_value = query_mock
+        query_mock.limit.return_value = query_mock
+        
+        first, second = Mock(), Mock()
+        query_mock.all.return_value = [(first, 82.5), (second, 64.0)]
+        
+        with patch('app.services.flow_buckets.calculate_scores_batch') as batch_mock:
+            result = query_bucket_emails(session, user_id=1, bucket="now", limit=2, offset=2)
+        
+        batch_mock.assert_not_called()
+        assert len(session.query.call_args[0]) == 2  # Email plus the live score column
+        query_mock.offset.assert_called_once_with(2)
+        query_mock.limit.assert_called_once_with(2)
+        assert result == [first, second]
+        assert first._current_attention_score == 82.5
+        assert second._current_attention_score == 64.0
+    
+    def test_bucket_counts_use_single_query(self, sql_engine):
+        """All bucket counts come from one aggregate query over the live score."""
+        session = Mock()
+        query_mock = Mock()
+        session.query.return_value = query_mock
+        query_mock.filter.return_value = query_mock
+        query_mock.one.return_value = (3, 7, 20)
+        
+        counts = get_bucket_counts(session, user_id=1)
+        
+        session.query.assert_called_once()
+        assert counts == {"now": 3, "later": 7, "reference": 20}
+
+
+class TestBucketRefresh:
+    """Test the bucket refresh scheduler's database-facing half."""
+    
+    @pytest.fixture
+    def predictor(self):
+        config = TestingScoringConfig()
+        engine = EmailScoringEngine(EnhancedScoringStrategy(config), NullCacheProvider(), config)
+        predictor = BucketCrossingPredictor(engine)
+        with patch.object(bucket_refresh, 'get_bucket_predictor', return_value=predictor):
+            yield predictor
+    
+    def test_naive_current_time_is_stored_as_utc(self, predictor):
+        """Refresh times written to the timezone-aware column are always aware."""
+        email = Mock(id='e1', gmail_id='g1', category='promotions', is_read=False, labels=[],
+                     from_email='deals@shop.example', subject='Sale', attention_score=None,
+                     received_at=datetime(2024, 1, 9, 12, 0, tzinfo=timezone.utc))
+        
+        result = bucket_refresh.schedule_email_refresh([email], datetime(2024, 1, 9, 20, 30))
+        
+        assert result['scheduled'] == 1
+        assert email.attention_score_refresh_at.tzinfo is not None
+        assert email.attention_score_refresh_at > datetime(2024, 1, 9, 20, 30, tzinfo=timezone.utc)
+    
+    def test_due_query_compares_with_aware_time(self, predictor):
+        """The due-email filter binds a UTC-aware timestamp even for naive input."""
+        session = MagicMock()
+        query_mock = session.query.return_value
+        query_mock.filter.return_value = query_mock
+        query_mock.order_by.return_value.limit.return_value.with_for_update.return_value.all.return_value = []
+        
+        bucket_refresh.refresh_due_emails(session, current_time=datetime(2024, 1, 9, 20, 30), batch_size=10)
+        
+        due_clause = query_mock.filter.call_args_list[0][0][0]
+        bound = due_clause.clauses[1].right.value
+        assert bound == datetime(2024, 1, 9, 20, 30, tzinfo=timezone.utc)
+    
+    def test_scheduler_is_off_by_default(self):
+        """Each API worker would otherwise start its own scheduler."""
+        assert Settings.model_fields['BUCKET_REFRESH_SCHEDULER_ENABLED'].default is False
+
 class TestBucketCounts:
     """Test bucket counting functions."""
     
@@ -308,4 +404,4 @@ class TestEdgeCases:
             email = Mock()
             email.attention_score = score
             result = classify_bucket(email)
-            assert result == expected_bucket, f"Score {score} should be in '{expected_bucket}' bucket"
\ No newline at end of file
+            assert result == expected_bucket, f"Score {score} should be in '{expected_bucket}' bucket"
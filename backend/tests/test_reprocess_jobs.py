@@ -0,0 +1,308 @@
+"""
+Tests for Reprocess Jobs
+
+This module tests the background reprocess job runner: keyset pagination,
+in-order checkpointing, claims and runner tokens, the heartbeat thread,
+job conflicts and the reprocess endpoints.
+"""
+
+import threading
+import uuid
+import pytest
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import ANY, Mock, MagicMock, patch
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+from app.main import app
+from app.db import get_db
+from app.dependencies import get_current_user
+from app.models.email import Email
+from app.services import reprocess_jobs
+
+
+class TestReprocessJobs:
+    """Test keyset pagination and checkpointing of background reprocess jobs."""
+    
+    @staticmethod
+    def compile(query):
+        return str(query.statement.compile(dialect=postgresql.dialect()))
+    
+    TOKEN = 'token-1'
+    
+    @staticmethod
+    def make_job():
+        return SimpleNamespace(id='job-1', user_id='user-1', total_emails=30, processed_count=0, error_count=0,
+                               category_changes={}, cursor_received_at=None, cursor_id=None, heartbeat_at=None)
+    
+    @staticmethod
+    def make_db(owned=True):
+        """Session whose token-checked UPDATEs match the job while owned."""
+        db = Mock()
+        db.execute.return_value.rowcount = 1 if owned else 0
+        return db
+    
+    @staticmethod
+    def finished(result=None, error=None):
+        future = Future()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        return future
+    
+    def test_keyset_pages_follow_received_at_then_id(self):
+        """Pages continue strictly after the last key, with NULL received_at emails first."""
+        from sqlalchemy.orm import Query
+        query = Query(Email).filter(Email.user_id == 'user-1')
+        
+        first = self.compile(reprocess_jobs.keyset_after(query, None, None).order_by(*reprocess_jobs.KEYSET_ORDER))
+        in_nulls = self.compile(reprocess_jobs.keyset_after(query, None, 'some-id'))
+        after_key = self.compile(reprocess_jobs.keyset_after(query, datetime(2024, 1, 1), 'some-id'))
+        
+        assert 'ORDER BY emails.received_at DESC NULLS FIRST, emails.id DESC' in first
+        assert 'OFFSET' not in first
+        assert 'emails.received_at IS NULL AND emails.id <' in in_nulls
+        assert 'emails.received_at IS NOT NULL' in in_nulls
+        assert '(emails.received_at, emails.id) < (' in after_key
+    
+    def test_checkpoint_only_advances_past_contiguous_batches(self):
+        """A batch finished out of order is checkpointed only once the batches before it are."""
+        job = self.make_job()
+        db = self.make_db()
+        head = Future()
+        in_flight = deque([
+            reprocess_jobs._Batch(head, (datetime(2024, 1, 3), 'id-3')),
+            reprocess_jobs._Batch(self.finished({'processed': 10, 'errors': 1, 'category_changes': {'trash': 2}}),
+                                  (datetime(2024, 1, 2), 'id-2'))
+        ])
+        
+        assert reprocess_jobs._drain_completed(db, job, self.TOKEN, in_flight, None) is None
+        assert job.cursor_id is None and job.processed_count == 0
+        db.commit.assert_not_called()
+        
+        head.set_result({'processed': 10, 'errors': 0, 'category_changes': {'trash': 1, 'primary': 3}})
+        assert reprocess_jobs._drain_completed(db, job, self.TOKEN, in_flight, None) is None
+        assert not in_flight
+        assert (job.cursor_received_at, job.cursor_id) == (datetime(2024, 1, 2), 'id-2')
+        assert job.processed_count == 20 and job.error_count == 1
+        assert job.category_changes == {'trash': 3, 'primary': 3}
+        assert db.commit.call_count == 2
+        checkpoint = db.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+        assert 'reprocess_jobs.runner_token = ' in str(checkpoint)
+        assert self.TOKEN in checkpoint.params.values()
+    
+    def test_failed_batch_stops_the_checkpoint(self):
+        """After a failed batch later batches are not checkpointed, so a rerun resumes at the failure."""
+        job = self.make_job()
+        db = self.make_db()
+        in_flight = deque([
+            reprocess_jobs._Batch(self.finished({'processed': 10, 'errors': 0, 'category_changes': {}}),
+                                  (datetime(2024, 1, 3), 'id-3')),
+            reprocess_jobs._Batch(self.finished(error=RuntimeError('deadlock')), (datetime(2024, 1, 2), 'id-2')),
+            reprocess_jobs._Batch(self.finished({'processed': 10, 'errors': 0, 'category_changes': {}}),
+                                  (datetime(2024, 1, 1), 'id-1'))
+        ])
+        
+        error = reprocess_jobs._drain_completed(db, job, self.TOKEN, in_flight, None)
+        
+        assert 'deadlock' in error
+        assert job.cursor_id == 'id-3' and job.processed_count == 10
+        assert db.commit.call_count == 1
+    
+    def test_stored_filters_round_trip_and_stale_detection(self):
+        """Date filters survive the JSON column; only silent running jobs count as interrupted."""
+        filters = {'categories': ['trash'], 'date_from': datetime(2024, 1, 1), 'date_to': datetime(2024, 1, 31, 23, 59)}
+        assert reprocess_jobs.load_filters(reprocess_jobs.serialize_filters(filters)) == filters
+        
+        now = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        alive = SimpleNamespace(status='running', heartbeat_at=now - timedelta(seconds=30), started_at=now)
+        silent = SimpleNamespace(status='running', heartbeat_at=now - timedelta(hours=1), started_at=now)
+        assert not reprocess_jobs._is_stale(alive, now)
+        assert reprocess_jobs._is_stale(silent, now)
+    
+    def test_checkpoint_refused_after_another_runner_claims_the_job(self):
+        """A runner that lost its claim writes nothing more and stops checkpointing."""
+        job = self.make_job()
+        db = self.make_db(owned=False)
+        in_flight = deque([
+            reprocess_jobs._Batch(self.finished({'processed': 10, 'errors': 0, 'category_changes': {}}),
+                                  (datetime(2024, 1, 3), 'id-3')),
+            reprocess_jobs._Batch(self.finished({'processed': 10, 'errors': 0, 'category_changes': {}}),
+                                  (datetime(2024, 1, 2), 'id-2'))
+        ])
+        
+        error = reprocess_jobs._drain_completed(db, job, self.TOKEN, in_flight, None)
+        
+        assert error == reprocess_jobs._LOST_OWNERSHIP
+        assert not in_flight
+        assert db.execute.call_count == 1
+    
+    def test_lost_job_submits_no_more_batches(self):
+        """Once the heartbeat reports the job lost, no further page is read."""
+        lost = threading.Event()
+        lost.set()
+        with patch.object(reprocess_jobs, 'next_page') as next_page:
+            error = reprocess_jobs._run_batches(self.make_db(), self.make_job(), self.TOKEN, lost, Mock(), Mock(), 2, 10)
+        
+        assert error == reprocess_jobs._LOST_OWNERSHIP
+        next_page.assert_not_called()
+    
+    def test_heartbeat_beats_independently_of_batches(self):
+        """The heartbeat thread refreshes heartbeat_at on its own and reports a lost claim."""
+        db = self.make_db()
+        beats = threading.Semaphore(0)
+        
+        def execute(statement):
+            beats.release()
+            return db.execute.return_value
+        
+        db.execute.side_effect = execute
+        with reprocess_jobs._Heartbeat(lambda: db, 'job-1', self.TOKEN, interval=0.01) as heartbeat:
+            assert beats.acquire(timeout=5) and beats.acquire(timeout=5)
+            db.execute.return_value.rowcount = 0
+            assert heartbeat.lost.wait(timeout=5)
+        
+        sql = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+        assert 'SET heartbeat_at=' in sql and 'reprocess_jobs.runner_token = ' in sql
+        assert db.close.call_count == db.execute.call_count
+    
+    def test_claim_stores_a_fresh_runner_token(self):
+        """Each successful claim returns a new token, written by the same UPDATE."""
+        db = self.make_db()
+        token = reprocess_jobs.claim_reprocess_job(db, 'job-1')
+        
+        assert token is not None
+        assert token in db.execute.call_args.args[0].compile().params.values()
+        assert reprocess_jobs.claim_reprocess_job(self.make_db(owned=False), 'job-1') is None
+    
+    def test_live_job_with_other_filters_conflicts_before_marking_emails(self):
+        """A second request with other filters is refused and force_reprocess marks nothing."""
+        existing = SimpleNamespace(id='job-1', status='running', filter_params={'categories': ['trash']},
+                                   include_reprocessed=False, heartbeat_at=datetime.now(timezone.utc))
+        db = MagicMock()
+        db.query.return_value.filter.return_value.order_by.return_value.first.return_value = existing
+        
+        with patch.object(reprocess_jobs, 'build_reprocess_query') as build_query:
+            with pytest.raises(reprocess_jobs.ReprocessJobConflict) as conflict:
+                reprocess_jobs.start_reprocess_job(db, 'user-1', {'categories': ['primary']}, force_reprocess=True)
+            assert reprocess_jobs.start_reprocess_job(db, 'user-1', {'categories': ['trash']}, force_reprocess=True) is existing
+        
+        assert conflict.value.job is existing
+        build_query.assert_not_called()
+        db.add.assert_not_called()
+    
+    def test_forced_job_marks_emails_dirty_in_its_transaction(self):
+        """force_reprocess marks the matching emails dirty and queues the job with one commit."""
+        db = MagicMock()
+        db.query.return_value.filter.return_value.order_by.return_value.first.return_value = None
+        
+        with patch.object(reprocess_jobs, 'build_reprocess_query') as build_query:
+            job = reprocess_jobs.start_reprocess_job(db, 'user-1', {'categories': ['trash']}, force_reprocess=True)
+        
+        build_query.assert_called_once_with(db, 'user-1', {'categories': ['trash']}, include_reprocessed=True)
+        build_query.return_value.update.assert_called_once_with({'is_dirty': True}, synchronize_session=False)
+        db.add.assert_called_once_with(job)
+        assert db.commit.call_count == 1
+    
+    
+    def test_job_interrupted_by_a_quick_restart_is_resumed_once_stale(self):
+        """A restart inside the stale window skips the job; a later sweep resumes it."""
+        now = datetime.now(timezone.utc)
+        job = SimpleNamespace(id='job-1', status='running', heartbeat_at=now - timedelta(seconds=60), started_at=now)
+        db = MagicMock()
+        db.query.return_value.filter.return_value.all.return_value = [job]
+        
+        with patch.object(reprocess_jobs, 'run_reprocess_job') as run_job:
+            assert reprocess_jobs.resume_interrupted_reprocess_jobs(lambda: db) == []
+            job.heartbeat_at = now - timedelta(seconds=reprocess_jobs.REPROCESS_STALE_AFTER_SECONDS + 60)
+            assert reprocess_jobs.resume_interrupted_reprocess_jobs(lambda: db) == ['job-1']
+            for thread in threading.enumerate():
+                if thread.name == 'reprocess-job-1':
+                    thread.join(timeout=5)
+        
+        run_job.assert_called_once_with('job-1', ANY)
+    
+    def test_resumer_sweeps_repeatedly_until_stopped(self):
+        """The resumer keeps sweeping, survives a failed sweep and stops cleanly."""
+        sweeps = threading.Semaphore(0)
+        
+        def sweep(session_factory):
+            sweeps.release()
+            raise RuntimeError('database unavailable')
+        
+        resumer = reprocess_jobs.ReprocessJobResumer(Mock(), interval_seconds=0.01)
+        with patch.object(reprocess_jobs, 'resume_interrupted_reprocess_jobs', side_effect=sweep):
+            resumer.start()
+            try:
+                assert all(sweeps.acquire(timeout=5) for _ in range(3))
+            finally:
+                resumer.stop()
+        
+        assert resumer._thread is None
+
+
+class TestReprocessEndpoints:
+    """Test the reprocess endpoints."""
+    
+    USER_ID = '6f1c2a9e-0d4b-4c7e-9a51-3b8e2f7d1c40'
+    JOB_ID = '0b9e1c52-7d3a-4f6e-8a21-5c4d3e2f1a09'
+    
+    @pytest.fixture
+    def client(self):
+        """Test client with a mocked session and user; background runs are recorded, not executed."""
+        mock_db = MagicMock()
+        mock_user = Mock()
+        mock_user.id = uuid.UUID(self.USER_ID)
+        app.dependency_overrides[get_db] = lambda: mock_db
+        app.dependency_overrides[get_current_user] = lambda: mock_user
+        
+        with patch('app.routers.email_management.run_reprocess_job') as run_job:
+            yield TestClient(app), run_job
+        
+        app.dependency_overrides.clear()
+    
+    def make_job(self, status='queued'):
+        return SimpleNamespace(id=uuid.UUID(self.JOB_ID), status=status, total_emails=None, processed_count=0,
+                               error_count=0, category_changes={}, error_message=None,
+                               created_at=datetime(2024, 1, 8, tzinfo=timezone.utc), started_at=None, finished_at=None)
+    
+    def test_reprocess_queues_a_background_job(self, client):
+        """The request returns the queued job and schedules its run."""
+        client, run_job = client
+        with patch('app.routers.email_management.start_reprocess_job', return_value=self.make_job()) as start:
+            response = client.post('/email-management/reprocess',
+                                   json={'categories': ['trash'], 'force_reprocess': True})
+        
+        assert response.status_code == 200
+        assert response.json()['job_id'] == self.JOB_ID and response.json()['status'] == 'queued'
+        assert start.call_args.args[2:] == ({'categories': ['trash']}, False, True)
+        run_job.assert_called_once_with(uuid.UUID(self.JOB_ID))
+    
+    def test_reprocess_with_other_filters_while_running_conflicts(self, client):
+        """A live job with other filters is reported with 409 and nothing is scheduled."""
+        client, run_job = client
+        conflict = reprocess_jobs.ReprocessJobConflict(self.make_job(status='running'))
+        with patch('app.routers.email_management.start_reprocess_job', side_effect=conflict):
+            response = client.post('/email-management/reprocess', json={'categories': ['primary']})
+        
+        assert response.status_code == 409
+        assert response.json()['detail']['job_id'] == self.JOB_ID
+        assert response.json()['detail']['status'] == 'running'
+        run_job.assert_not_called()
+    
+    def test_reprocess_status_endpoints(self, client):
+        """Status is served for the latest or a given job; no job is a 404."""
+        client, _ = client
+        with patch('app.routers.email_management.get_reprocess_job', return_value=self.make_job('running')) as get_job:
+            latest = client.get('/email-management/reprocess/status')
+            by_id = client.get(f'/email-management/reprocess/{self.JOB_ID}')
+        with patch('app.routers.email_management.get_reprocess_job', return_value=None):
+            missing = client.get('/email-management/reprocess/status')
+        
+        assert latest.status_code == by_id.status_code == 200
+        assert latest.json()['status'] == 'running'
+        assert get_job.call_args.args[2] == uuid.UUID(self.JOB_ID)
+        assert missing.status_code == 404
@@ -0,0 +1,72 @@
+"""
+Tests for Score Persistence
+
+This module tests the set-based score writer and the session handling of
+the callers that persist scores through it.
+"""
+
+from datetime import datetime
+from unittest.mock import Mock, patch
+from app.models.email import Email
+from app.scoring.config import TestingScoringConfig
+from app.scoring.engine import ScoringEngineFactory
+from app.services.score_persistence import bulk_update_scores
+
+
+class TestScorePersistence:
+    """Test the set-based score writer."""
+    
+    def test_chunks_into_update_from_values(self):
+        """Each chunk is one UPDATE ... FROM (VALUES) with typed parameters."""
+        session = Mock()
+        session.execute.return_value.scalars.side_effect = [['a', 'b'], ['c']]
+        updates = [{'id': key, 'attention_score': 50.0} for key in 'abcde']
+        
+        written = bulk_update_scores(session, updates, epsilon=0.5, chunk_size=3, bucket_thresholds=(60.0, 30.0))
+        
+        assert written == {'a', 'b', 'c'}
+        assert session.execute.call_count == 2
+        statement, params = session.execute.call_args_list[0].args
+        sql = str(statement)
+        assert "UPDATE emails AS e SET attention_score = v.attention_score" in sql
+        assert "FROM (VALUES (CAST(:id_0 AS uuid), CAST(:v0_0 AS double precision))" in sql
+        assert "abs(e.attention_score - v.attention_score) >= :epsilon" in sql
+        assert "(e.attention_score >= :threshold_0) <> (v.attention_score >= :threshold_0)" in sql
+        assert sql.endswith("RETURNING e.id")
+        assert params['epsilon'] == 0.5
+        assert params['id_2'] == 'c' and 'id_3' not in params
+    
+    def test_refresh_time_only_fills_missing_values(self):
+        """A new refresh time alone does not rewrite a row that already has one."""
+        session = Mock()
+        session.execute.return_value.scalars.return_value = []
+        bulk_update_scores(session, [{'id': 'a', 'attention_score': 1.0, 'attention_score_refresh_at': datetime(2024, 1, 1)}])
+        
+        sql = str(session.execute.call_args.args[0])
+        assert "(e.attention_score_refresh_at IS NULL AND v.attention_score_refresh_at IS NOT NULL)" in sql
+        assert "v(id, attention_score, attention_score_refresh_at)" in sql
+    
+    def test_pending_emails_are_flushed_before_writing(self):
+        """Unflushed emails reach the database before the text() UPDATE that targets them."""
+        from app.services.enhanced_attention_scoring import update_email_attention_scores
+        
+        engine = ScoringEngineFactory.create_engine(TestingScoringConfig(), strategy_type="simple", cache_type="null")
+        email = Mock(spec=Email)
+        email.id = 'email-1'
+        email.category = 'primary'
+        email.labels = []
+        email.is_read = False
+        email.received_at = datetime(2024, 1, 8, 10, 0, 0)
+        email.subject = 'Hello'
+        email.from_email = 'a@example.com'
+        email.attention_score = 0.0
+        session = Mock()
+        session.execute.return_value.scalars.return_value = ['email-1']
+        
+        with patch('app.services.enhanced_attention_scoring.get_scoring_engine', return_value=engine), \
+             patch('app.services.enhanced_attention_scoring.object_session', return_value=session), \
+             patch('app.services.enhanced_attention_scoring.set_committed_value'):
+            result = update_email_attention_scores([email])
+        
+        assert result['updated_count'] == 1
+        assert [call[0] for call in session.method_calls[:2]] == ['flush', 'execute']
@@ -0,0 +1,111 @@
+"""
+Tests for Score Rescoring
+
+This module tests the bulk rescoring job: worker scoring, keyset paging in
+short-lived sessions, ordered write-back and checkpoints.
+"""
+
+import pytest
+from datetime import datetime
+from unittest.mock import Mock
+from app.scoring.config import TestingScoringConfig
+from app.scoring.engine import ScoringEngineFactory
+from app.scoring.scheduler import BucketCrossingPredictor
+from app.services import score_rescoring
+from app.services.score_rescoring import RescoreCheckpoint, RescoreProgress
+
+
+class TestRescoring:
+    """Test worker scoring, ordered write-back and checkpoints of the bulk rescoring job."""
+    
+    @pytest.fixture
+    def rows(self):
+        received_at = datetime(2024, 1, 8, 9, 0, 0)
+        return [
+            {'id': f'email-{i}', 'user_id': 'user-1', 'subject': 'Urgent: reply today', 'from_email': 'boss@company.com',
+             'received_at': received_at, 'labels': ['IMPORTANT'], 'is_read': False, 'category': 'important',
+             'attention_score': 0.0}
+            for i in range(3)
+        ]
+    
+    def test_score_rows_matches_bucket_predictor(self, rows):
+        """Workers produce the same score, base score and refresh time as the scheduler."""
+        config = TestingScoringConfig()
+        score_rescoring._init_worker(config)
+        current_time = datetime(2024, 1, 8, 12, 0, 0)
+        
+        updates = score_rescoring._score_rows(rows, current_time)
+        
+        engine = ScoringEngineFactory.create_engine(config, strategy_type="enhanced", cache_type="null")
+        expected = BucketCrossingPredictor(engine).predict([Mock(**row) for row in rows], current_time)
+        assert [update['id'] for update in updates] == [row['id'] for row in rows]
+        for update in updates:
+            prediction = expected[update['id']]
+            assert update['attention_score'] == pytest.approx(prediction.score)
+            assert update['attention_base_score'] == pytest.approx(prediction.base_score)
+            assert update['attention_score_refresh_at'] == prediction.change_at
+    
+    def test_checkpoint_round_trip(self, tmp_path):
+        """Completed users and per-user cursors survive a restart."""
+        path = str(tmp_path / "rescore.json")
+        checkpoint = RescoreCheckpoint(path)
+        checkpoint.advance('user-1', 'email-5')
+        checkpoint.advance('user-2', 'email-9')
+        checkpoint.complete('user-2')
+        
+        restored = RescoreCheckpoint(path)
+        assert restored.resume_after('user-1') == 'email-5'
+        assert restored.is_complete('user-2')
+        assert restored.resume_after('user-2') is None
+    
+    def test_batches_written_in_order_and_failure_stops_cursor(self):
+        """The checkpoint never skips past an unwritten or failed batch."""
+        def batch(last_id, result=None, error=None):
+            future = score_rescoring.Future()
+            if error:
+                future.set_exception(error)
+            elif result is not None:
+                future.set_result(result)
+            return score_rescoring._Batch(future, 1, last_id)
+        
+        session = Mock()
+        session.execute.return_value.scalars.return_value = ['email-1']
+        checkpoint = RescoreCheckpoint()
+        progress = RescoreProgress()
+        stream = score_rescoring._UserStream('user-1', iter(()))
+        pending = batch('email-2')
+        stream.in_flight.extend([batch('email-1', [{'id': 'email-1', 'attention_score': 1.0}]), pending,
+                                 batch('email-3', [{'id': 'email-3', 'attention_score': 1.0}])])
+        
+        score_rescoring._drain_completed(stream, session, checkpoint, progress, TestingScoringConfig())
+        assert checkpoint.resume_after('user-1') == 'email-1'
+        assert len(stream.in_flight) == 2
+        
+        pending.future.set_exception(RuntimeError("worker died"))
+        score_rescoring._drain_completed(stream, session, checkpoint, progress, TestingScoringConfig())
+        assert stream.failed and not stream.in_flight
+        assert checkpoint.resume_after('user-1') == 'email-1'
+        assert progress.emails_updated == 1
+        assert progress.errors == 1
+    
+    def test_pages_are_read_in_short_lived_sessions(self):
+        """Each page is a keyset query in its own session, closed before the page is yielded."""
+        sessions = []
+        pages = [[{'id': 'email-1'}, {'id': 'email-2'}], [{'id': 'email-3'}]]
+        
+        def session_factory():
+            session = Mock()
+            session.execute.return_value.mappings.return_value = pages[len(sessions)]
+            sessions.append(session)
+            return session
+        
+        stream = score_rescoring.stream_user_emails(session_factory, 'user-1', batch_size=2)
+        
+        assert next(stream) == pages[0]
+        assert len(sessions) == 1 and sessions[0].close.called
+        assert next(stream) == pages[1]
+        assert next(stream, None) is None
+        assert len(sessions) == 2 and sessions[1].close.called
+        sql = str(sessions[1].execute.call_args.args[0])
+        assert "emails.id > :id_1" in sql
+        assert "LIMIT :param_1" in sql
@@ -6,15 +6,35 @@ scenarios to ensure reliability and correctness.
 """
 
 import pytest
+import asyncio
+import os
+import pickle
+import threading
 import time
+import numpy as np
+from sqlalchemy.dialects import postgresql
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 from unittest.mock import Mock, patch, MagicMock
 from app.models.email import Email
 from app.scoring.config import ScoringConfig, TestingScoringConfig
+from app.scoring.decay import decay_sql_expression
 from app.scoring.strategies import EnhancedScoringStrategy, SimpleScoringStrategy
-from app.scoring.cache_providers import InMemoryCacheProvider, NullCacheProvider
+from app.scoring.cache_providers import (
+    InMemoryCacheProvider,
+    NullCacheProvider,
+    RedisCacheProvider,
+    MultiTierCacheProvider,
+    SharedMemoryCacheProvider
+)
 from app.scoring.engine import EmailScoringEngine, ScoringEngineFactory
-from app.scoring.debugger import EmailScoringDebugger
+from app.scoring import comparison
+from app.scoring.comparison import AgreementStats, StrategyComparison
+from app.scoring.debugger import EmailScoringDebugger, ScoreSketch
+from app.scoring.scheduler import BucketCrossingPredictor
+from app.scoring.singleflight import SingleFlight
+from app.scoring.monitor import LatencyHistogram, ScoringPerformanceMonitor, _stripe_index
+from app.scoring.metrics_segment import SharedMetricsSegment, merge_worker_states
 
 
 class TestScoringConfiguration:
@@ -57,6 +77,46 @@ class TestScoringConfiguration:
         important_decay = config.get_temporal_decay_function('important')
         assert important_decay(0) == 1.0  # Fresh
         assert important_decay(168) >= 0.5  # Should still be above 50% after a week
+    
+    def test_decay_specs_match_retention_curves(self):
+        """Decay specs should reproduce the per-period retention they are built from."""
+        config = ScoringConfig()
+        
+        promo = config.get_temporal_decay_spec('promotions')
+        assert promo(12) == pytest.approx(0.8)
+        assert promo(1000) == 0.1  # Floor
+        assert config.get_temporal_decay_spec('trash')(500) == 0.1
+        assert config.get_temporal_decay_spec('unknown') == config.TEMPORAL_DECAY_SPECS['default']
+    
+    def test_decay_spec_array_matches_scalar(self):
+        """NumPy evaluation should agree with scalar evaluation."""
+        config = ScoringConfig()
+        ages = np.array([0.0, 0.5, 6.0, 24.0, 72.0, 168.0, 2000.0])
+        
+        for category, spec in config.TEMPORAL_DECAY_SPECS.items():
+            expected = [spec(age) for age in ages]
+            assert spec.evaluate_array(ages) == pytest.approx(expected), category
+    
+    def test_config_is_picklable(self):
+        """Configs must survive pickling so they can be shipped to worker processes."""
+        config = ScoringConfig()
+        restored = pickle.loads(pickle.dumps(config))
+        
+        assert restored.TEMPORAL_DECAY_SPECS == config.TEMPORAL_DECAY_SPECS
+        assert restored.get_temporal_decay_function('social')(18) == pytest.approx(0.85)
+    
+    def test_decay_sql_expression(self):
+        """Decay specs should compile to a Postgres CASE expression."""
+        from sqlalchemy import column
+        
+        config = ScoringConfig()
+        expression = decay_sql_expression(config.TEMPORAL_DECAY_SPECS, column('category'), column('age_hours'))
+        sql = str(expression.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+        
+        assert sql.startswith('CASE WHEN')
+        assert 'greatest(' in sql.lower()
+        assert 'power(' in sql.lower()
+        assert "'promotions'" in sql
 
 
 class TestInMemoryCacheProvider:
@@ -115,6 +175,207 @@ class TestInMemoryCacheProvider:
         cleared = cache.clear_pattern('email:*')
         assert cleared == 2
         assert cache.get('other:789') == 70.0  # Should remain
+    
+    def test_bulk_operations(self):
+        """Test get_many/set_many/delete_many."""
+        cache = InMemoryCacheProvider()
+        
+        cache.set_many({'a': 10.0, 'b': 20.0, 'c': 30.0}, 3600)
+        assert cache.get_many(['a', 'b', 'missing']) == {'a': 10.0, 'b': 20.0}
+        
+        deleted = cache.delete_many(['a', 'missing'])
+        assert deleted == 1
+        assert cache.get_many(['a', 'b', 'c']) == {'b': 20.0, 'c': 30.0}
+    
+    def test_set_many_respects_size_limit(self):
+        """Bulk writes should evict the oldest entries like single writes."""
+        cache = InMemoryCacheProvider(max_entries=2)
+        
+        cache.set_many({'key1': 1.0, 'key2': 2.0, 'key3': 3.0}, 3600)
+        
+        assert cache.get('key1') is None
+        assert cache.get_many(['key2', 'key3']) == {'key2': 2.0, 'key3': 3.0}
+
+
+class TestInMemoryCacheExpiry:
+    """Test timing-wheel expiry and maintained statistics."""
+    
+    @pytest.fixture
+    def clock(self):
+        now = [1_700_000_000.5]
+        with patch('app.scoring.cache_providers.time.time', lambda: now[0]):
+            yield now
+    
+    def test_cleanup_expired_uses_wheel(self, clock):
+        """Expired entries are dropped across TTLs from seconds to weeks."""
+        cache = InMemoryCacheProvider()
+        cache.set('short', 1.0, 5)
+        cache.set('hour', 2.0, 3600)
+        cache.set('weeks', 3.0, 3600 * 24 * 14)
+        
+        clock[0] += 10
+        assert cache.cleanup_expired() == 1
+        
+        clock[0] += 3600
+        assert cache.cleanup_expired() == 1
+        assert cache.get('weeks') == 3.0
+        
+        clock[0] += 3600 * 24 * 14
+        assert cache.cleanup_expired() == 1
+        assert cache.get_stats()['total_entries'] == 0
+    
+    def test_overwrite_reschedules_expiry(self, clock):
+        """Refreshing an entry moves its expiry instead of keeping the old one."""
+        cache = InMemoryCacheProvider()
+        cache.set('key', 1.0, 5)
+        cache.set('key', 2.0, 3600)
+        
+        clock[0] += 10
+        assert cache.cleanup_expired() == 0
+        assert cache.get('key') == 2.0
+    
+    def test_stats_from_counters(self, clock):
+        """Stats report expiries, evictions and measured memory."""
+        cache = InMemoryCacheProvider(max_entries=2)
+        
+        cache.set('a', 1.0, 5)
+        cache.set('b', 2.0, 3600)
+        cache.set('c', 3.0, 3600)  # Evicts 'a'
+        full_memory = cache.get_stats()['memory_usage_bytes']
+        clock[0] += 3601
+        
+        stats = cache.get_stats()
+        assert stats['evicted_total'] == 1
+        assert stats['expired_total'] == 2
+        assert stats['total_entries'] == 0
+        assert 0 < stats['memory_usage_bytes'] < full_memory
+
+
+class TestRedisBulkCacheOperations:
+    """Test batched Redis and multi-tier cache operations."""
+    
+    def test_redis_get_many_uses_mget(self):
+        """get_many should issue a single MGET."""
+        redis_client = MagicMock()
+        redis_client.mget.return_value = [b'42.5', None]
+        cache = RedisCacheProvider(redis_client)
+        
+        assert cache.get_many(['a', 'b']) == {'a': 42.5}
+        redis_client.mget.assert_called_once_with(['email_score:a', 'email_score:b'])
+        redis_client.get.assert_not_called()
+    
+    def test_redis_set_many_uses_pipeline(self):
+        """set_many should pipeline SETEX commands."""
+        redis_client = MagicMock()
+        pipe = redis_client.pipeline.return_value
+        cache = RedisCacheProvider(redis_client)
+        
+        cache.set_many({'a': 1.0, 'b': 2.0}, 60)
+        
+        redis_client.pipeline.assert_called_once_with(transaction=False)
+        assert pipe.setex.call_count == 2
+        pipe.execute.assert_called_once()
+    
+    def test_multi_tier_get_many_only_queries_redis_for_misses(self):
+        """Memory hits should not be fetched from Redis again."""
+        redis_client = MagicMock()
+        redis_client.mget.return_value = [b'20.0']
+        cache = MultiTierCacheProvider(redis_client)
+        cache.memory_cache.set('a', 10.0, 3600)
+        
+        assert cache.get_many(['a', 'b']) == {'a': 10.0, 'b': 20.0}
+        redis_client.mget.assert_called_once_with(['email_score:b'])
+        
+        # Redis hit should be promoted to the memory tier
+        assert cache.memory_cache.get('b') == 20.0
+
+
+class TestSharedMemoryCacheProvider:
+    """Test the mmap-backed cache shared between worker processes."""
+    
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / "scores.cache")
+    
+    def test_basic_cache_operations(self, path):
+        """Set, get and delete through the shared table."""
+        cache = SharedMemoryCacheProvider(path=path, max_entries=100)
+        
+        assert cache.get('missing') is None
+        cache.set('key1', 42.5, 3600)
+        assert cache.get('key1') == 42.5
+        
+        cache.delete('key1')
+        assert cache.get('key1') is None
+        cache.close()
+    
+    def test_cache_expiration(self, path):
+        """Expired entries are not returned."""
+        cache = SharedMemoryCacheProvider(path=path, max_entries=100)
+        cache.set('key1', 42.5, 5)
+        
+        with patch('app.scoring.cache_providers.time.time', return_value=time.time() + 10):
+            assert cache.get('key1') is None
+        cache.close()
+    
+    def test_bulk_operations(self, path):
+        """get_many/set_many/delete_many work across stripes."""
+        cache = SharedMemoryCacheProvider(path=path, max_entries=1000)
+        values = {f'key{i}': float(i) for i in range(200)}
+        
+        cache.set_many(values, 3600)
+        assert cache.get_many(list(values)) == values
+        assert cache.delete_many(['key1', 'key2', 'nope']) == 2
+        assert len(cache.get_many(list(values))) == 198
+        cache.close()
+    
+    def test_entries_shared_between_providers(self, path):
+        """A second attachment to the same file sees the first one's writes."""
+        writer = SharedMemoryCacheProvider(path=path, max_entries=100)
+        reader = SharedMemoryCacheProvider(path=path, max_entries=5000)
+        
+        # The reader adopts the existing layout instead of re-creating the table
+        assert reader.slots == writer.slots
+        
+        writer.set('key1', 7.0, 3600)
+        assert reader.get('key1') == 7.0
+        assert reader.bump_generation('gen:u:1', 60) == 1
+        assert writer.bump_generation('gen:u:1', 60) == 2
+        assert writer.get_generations(['gen:u:1', 'gen:u:2']) == {'gen:u:1': 2}
+        
+        writer.close()
+        reader.close()
+    
+    def test_clear_pattern(self, path):
+        """Key strings are not stored, so any pattern clears the whole table rather than nothing."""
+        cache = SharedMemoryCacheProvider(path=path, max_entries=100)
+        cache.set_many({'a': 1.0, 'b': 2.0}, 3600)
+        
+        assert cache.clear_pattern('a*') == 2
+        assert cache.get_many(['a', 'b']) == {}
+        cache.set('a', 1.0, 3600)
+        assert cache.clear_pattern('*') == 1
+        cache.close()
+    
+    def test_first_attachment_starts_empty(self, path):
+        """A table left behind by a previous run is not served after a restart."""
+        cache = SharedMemoryCacheProvider(path=path, max_entries=100)
+        cache.set('key1', 7.0, 3600)
+        cache.close()
+        
+        restarted = SharedMemoryCacheProvider(path=path, max_entries=100)
+        assert restarted.get('key1') is None
+        restarted.close()
+    
+    def test_full_probe_window_evicts_soonest_expiry(self, path):
+        """Inserts never fail: the entry closest to expiry makes room."""
+        cache = SharedMemoryCacheProvider(path=path, max_entries=1, stripes=1)
+        for i in range(cache.slots):
+            cache.set(f'key{i}', float(i), 3600 + i)
+        cache.set('new', 99.0, 7200)
+        
+        assert cache.get('new') == 99.0
+        cache.close()
 
 
 class TestEnhancedScoringStrategy:
@@ -224,6 +485,32 @@ class TestEnhancedScoringStrategy:
             score = strategy._calculate_content_urgency(sample_email)
             assert score == 5.0, f"Failed to detect urgency in: {subject}"
     
+    def test_subject_signals_single_pass(self, strategy):
+        """One scan reports urgency and deadline hits, including overlapping ones."""
+        cases = {
+            'Your invoice expires today': (True, True),
+            'Payment due tomorrow': (False, True),
+            'Last chance to save': (False, True),
+            'Time sensitive: please review': (True, False),
+            'Weekly newsletter': (False, False),
+            'Immediately available': (False, False),
+            'Overdue today': (False, True),
+            'FINAL NOTICE': (True, True),
+        }
+        for subject, (urgent, deadline) in cases.items():
+            assert strategy._subject_signals(subject) == (urgent, deadline), subject
+        
+        assert strategy._subject_has_urgency('Your invoice expires today')
+        assert strategy._subject_signals_cache['Your invoice expires today'].deadline
+    
+    def test_sender_authority_memoized(self, strategy):
+        """Sender authority is computed once per raw address."""
+        with patch.object(strategy, '_compute_sender_authority', wraps=strategy._compute_sender_authority) as compute:
+            for _ in range(3):
+                assert strategy._sender_authority_for('Deals@Shop.example') == -5.0
+        
+        assert compute.call_count == 1
+    
     def test_sender_authority_personal_domain(self, strategy, sample_email):
         """Test sender authority scoring for personal domains."""
         sample_email.from_email = 'john@gmail.com'
@@ -377,6 +664,709 @@ class TestEmailScoringEngine:
         assert score == 50.0  # Safe default
 
 
+class TestVectorizedBatchScoring:
+    """Test the columnar NumPy batch scoring path."""
+    
+    @pytest.fixture
+    def config(self):
+        config = TestingScoringConfig()
+        config.VECTORIZED_BATCH_MIN_SIZE = 1
+        return config
+    
+    @pytest.fixture
+    def emails(self):
+        subjects = ['URGENT: Action required', 'Weekly digest', 'Offer expires today', None]
+        senders = ['boss@github.com', 'friend@gmail.com', 'noreply@shop.com', None]
+        categories = ['important', 'newsletters', 'promotions', 'social', 'archive', 'trash', None, 'Custom']
+        
+        emails = []
+        for i in range(24):
+            email = Mock(spec=Email)
+            email.id = f'vector-email-{i}'
+            email.gmail_id = f'vector_gmail_{i}'
+            email.category = categories[i % len(categories)]
+            email.is_read = i % 3 == 0
+            email.labels = [['IMPORTANT'], ['STARRED', 'INBOX'], [], None][i % 4]
+            email.from_email = senders[i % len(senders)]
+            email.subject = subjects[i % len(subjects)]
+            email.received_at = None if i == 5 else datetime.now() - timedelta(hours=i * 7)
+            emails.append(email)
+        return emails
+    
+    def test_vectorized_matches_per_email_scoring(self, config, emails):
+        """Vectorized batch scores should equal per-email scores."""
+        engine = EmailScoringEngine(EnhancedScoringStrategy(config), NullCacheProvider(), config)
+        current_time = datetime(2024, 1, 9, 14, 0, 0)
+        
+        batch_scores = engine.get_scores_batch(emails, current_time)
+        
+        for email in emails:
+            expected = engine.calculate_fresh_score(email, current_time)
+            assert batch_scores[str(email.id)] == pytest.approx(expected, abs=1e-9)
+    
+    def test_vectorized_path_skipped_for_small_batches(self, config, emails):
+        """Batches below the minimum size should use the per-email path."""
+        config.VECTORIZED_BATCH_MIN_SIZE = 100
+        strategy = EnhancedScoringStrategy(config)
+        engine = EmailScoringEngine(strategy, NullCacheProvider(), config)
+        
+        with patch.object(EnhancedScoringStrategy, 'calculate_scores_array') as mock_array:
+            engine.get_scores_batch(emails)
+            mock_array.assert_not_called()
+    
+    def test_vectorized_failure_falls_back(self, config, emails):
+        """Errors in the columnar path should fall back to per-email scoring."""
+        engine = EmailScoringEngine(EnhancedScoringStrategy(config), NullCacheProvider(), config)
+        
+        with patch.object(EnhancedScoringStrategy, 'calculate_scores_array', side_effect=ValueError("boom")):
+            scores = engine.get_scores_batch(emails)
+        
+        assert len(scores) == len(emails)
+        assert all(0.0 <= score <= 100.0 for score in scores.values())
+
+
+class TestComponentCacheMode:
+    """Test caching base scores and re-deriving the final score on read."""
+    
+    @pytest.fixture
+    def config(self):
+        config = TestingScoringConfig()
+        config.CACHE_MODE = 'components'
+        config.VECTORIZED_BATCH_MIN_SIZE = 1
+        return config
+    
+    @pytest.fixture
+    def sample_email(self):
+        email = Mock(spec=Email)
+        email.id = 'component-email'
+        email.gmail_id = 'component_gmail'
+        email.category = 'promotions'
+        email.is_read = False
+        email.labels = ['IMPORTANT']
+        email.from_email = 'sales@store.com'
+        email.subject = 'Sale expires today'
+        email.received_at = datetime(2024, 1, 8, 9, 0, 0)
+        return email
+    
+    def test_cached_base_score_gives_exact_aging_scores(self, config, sample_email):
+        """Cache hits should still reflect temporal decay at read time."""
+        cache = InMemoryCacheProvider()
+        engine = EmailScoringEngine(EnhancedScoringStrategy(config), cache, config)
+        reference = EmailScoringEngine(EnhancedScoringStrategy(config), NullCacheProvider(), config)
+        
+        day_one = datetime(2024, 1, 8, 12, 0, 0)
+        week_later = datetime(2024, 1, 15, 12, 0, 0)
+        
+        first = engine.get_current_score(sample_email, day_one)
+        later = engine.get_current_score(sample_email, week_later)
+        
+        assert first == reference.get_current_score(sample_email, day_one)
+        assert later == reference.get_current_score(sample_email, week_later)
+        assert later < first
+        
+        stats = engine.get_performance_stats()
+        assert stats['cache_hits'] == 1
+        assert stats['cache_misses'] == 1
+    
+    def test_state_change_uses_new_base_key(self, config, sample_email):
+        """Reading an email should not return the cached unread base score."""
+        engine = EmailScoringEngine(EnhancedScoringStrategy(config), InMemoryCacheProvider(), config)
+        current_time = datetime(2024, 1, 8, 12, 0, 0)
+        
+        unread_score = engine.get_current_score(sample_email, current_time)
+        sample_email.is_read = True
+        read_score = engine.get_current_score(sample_email, current_time)
+        
+        assert read_score < unread_score
+        assert engine.get_performance_stats()['cache_misses'] == 2
+    
+    def test_batch_matches_single_scoring(self, config, sample_email):
+        """Batch scoring in components mode should match per-email scoring."""
+        emails = []
+        for i, category in enumerate(['important', 'promotions', 'social', None]):
+            email = Mock(spec=Email)
+            email.id = f'component-batch-{i}'
+            email.category = category
+            email.is_read = i % 2 == 0
+            email.labels = ['STARRED'] if i == 1 else []
+            email.from_email = 'friend@gmail.com'
+            email.subject = 'Deadline today'
+            email.received_at = datetime(2024, 1, 8, 9, 0, 0) - timedelta(hours=i * 20)
+            emails.append(email)
+        
+        engine = EmailScoringEngine(EnhancedScoringStrategy(config), InMemoryCacheProvider(), config)
+        reference = EmailScoringEngine(EnhancedScoringStrategy(config), NullCacheProvider(), config)
+        current_time = datetime(2024, 1, 9, 20, 0, 0)
+        
+        first_pass = engine.get_scores_batch(emails, current_time)
+        second_pass = engine.get_scores_batch(emails, current_time)  # All base-score hits
+        
+        for email in emails:
+            expected = reference.get_current_score(email, current_time)
+            assert first_pass[str(email.id)] == pytest.approx(expected, abs=1e-9)
+            assert second_pass[str(email.id)] == pytest.approx(expected, abs=1e-9)
+        
+        assert engine.get_performance_stats()['cache_hits'] == len(emails)
+
+
+class TestGenerationInvalidation:
+    """Test per-user generation counters for cache invalidation."""
+    
+    def _make_email(self, email_id, user_id, category='promotions'):
+        email = Mock(spec=Email)
+        email.id = email_id
+        email.user_id = user_id
+        email.gmail_id = f'{email_id}_gmail'
+        email.category = category
+        email.is_read = False
+        email.labels = []
+        email.from_email = 'news@store.com'
+        email.subject = 'Weekly deals'
+        email.received_at = datetime(2024, 1, 8, 9, 0, 0)
+        return email
+    
+    @pytest.fixture
+    def engine(self):
+        config = TestingScoringConfig()
+        config.CACHE_GENERATIONS = True
+        return EmailScoringEngine(EnhancedScoringStrategy(config), InMemoryCacheProvider(), config)
+    
+    def test_invalidate_user_only_affects_that_user(self, engine):
+        """Bumping one user's generation leaves other users' entries cached."""
+        current_time = datetime(2024, 1, 8, 12, 0, 0)
+        alice_email = self._make_email('alice-1', 'alice')
+        bob_email = self._make_email('bob-1', 'bob')
+        engine.get_scores_batch([alice_email, bob_email], current_time)
+        
+        assert engine.invalidate_user('alice') == 1
+        
+        assert engine.peek_cached_score(alice_email, current_time) is None
+        assert engine.peek_cached_score(bob_email, current_time) is not None
+    
+    def test_category_generation(self, engine):
+        """With category generations, a category can be invalidated on its own."""
+        engine.config.CACHE_CATEGORY_GENERATIONS = True
+        current_time = datetime(2024, 1, 8, 12, 0, 0)
+        promo = self._make_email('promo-1', 'alice', 'promotions')
+        social = self._make_email('social-1', 'alice', 'social')
+        engine.get_scores_batch([promo, social], current_time)
+        
+        engine.invalidate_user('alice', 'promotions')
+        
+        assert engine.peek_cached_score(promo, current_time) is None
+        assert engine.peek_cached_score(social, current_time) is not None
+    
+    def test_invalidate_emails_deletes_exact_keys_in_one_call(self, engine):
+        """Per-email invalidation deletes namespaced keys in one batch, without key scans."""
+        engine.config.CACHE_MODE = 'components'
+        current_time = datetime(2024, 1, 8, 12, 0, 0)
+        emails = [self._make_email(f'alice-{i}', 'alice') for i in range(3)]
+        bob_email = self._make_email('bob-1', 'bob')
+        engine.get_scores_batch(emails + [bob_email], current_time)
+        
+        with patch.object(engine.cache, 'clear_pattern') as clear_pattern, \
+             patch.object(engine.cache, 'delete_many', wraps=engine.cache.delete_many) as delete_many:
+            assert engine.invalidate_cache(emails=emails) == 3
+        
+        clear_pattern.assert_not_called()
+        delete_many.assert_called_once()
+        assert len(delete_many.call_args[0][0]) == 6  # Score and base key per email
+        assert all(engine.peek_cached_score(email, current_time) is None for email in emails)
+        assert engine.peek_cached_score(bob_email, current_time) is not None
+        
+        with pytest.raises(ValueError):
+            engine.invalidate_cache(['alice-0'])
+    
+    def test_generations_survive_eviction(self):
+        """Generation counters are not subject to LRU eviction."""
+        cache = InMemoryCacheProvider(max_entries=1)
+        cache.bump_generation('gen:alice', 3600)
+        cache.set_many({'a': 1.0, 'b': 2.0}, 3600)
+        
+        assert cache.get_generations(['gen:alice', 'gen:bob']) == {'gen:alice': 1}
+    
+    def test_redis_bump_is_atomic_incr(self):
+        """Redis generations use INCR with an expiry."""
+        redis_client = MagicMock()
+        pipe = redis_client.pipeline.return_value
+        pipe.execute.return_value = [3, True]
+        cache = RedisCacheProvider(redis_client)
+        
+        assert cache.bump_generation('gen:alice', 60) == 3
+        pipe.incr.assert_called_once_with('email_score:gen:alice')
+        pipe.expire.assert_called_once_with('email_score:gen:alice', 60)
+
+
+class TestSingleFlight:
+    """Test coalescing of concurrent cache misses."""
+    
+    def test_concurrent_calls_share_one_calculation(self):
+        """Threads asking for the same key while it is in flight wait for the leader."""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+        
+        def calculate():
+            calls.append(1)
+            release.wait(5)
+            return 42.0
+        
+        def worker():
+            results.append(flight.do('email-1', calculate))
+        
+        leader = threading.Thread(target=worker)
+        leader.start()
+        while flight.get_stats()['in_flight'] == 0:
+            time.sleep(0.001)
+        
+        followers = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        
+        assert results == [42.0] * 5
+        assert len(calls) == 1
+        assert flight.get_stats()['calculations_saved'] == 4
+        assert flight.get_stats()['in_flight'] == 0
+    
+    def test_errors_propagate_to_waiters(self):
+        """A failed calculation raises in every caller and is not remembered."""
+        flight = SingleFlight()
+        
+        def fail():
+            raise ValueError("boom")
+        
+        with pytest.raises(ValueError):
+            flight.do('email-1', fail)
+        assert flight.do('email-1', lambda: 1.0) == 1.0
+    
+    def test_do_many_waits_only_for_keys_in_flight(self):
+        """A batch computes the keys nobody else is calculating, in one call."""
+        flight = SingleFlight()
+        release = threading.Event()
+        batch_calls = []
+        
+        def slow_single():
+            release.wait(5)
+            return 1.0
+        
+        leader = threading.Thread(target=lambda: flight.do('a', slow_single))
+        leader.start()
+        while flight.get_stats()['in_flight'] == 0:
+            time.sleep(0.001)
+        
+        def calculate(keys):
+            batch_calls.append(list(keys))
+            release.set()
+            return {key: 2.0 for key in keys}
+        
+        results = flight.do_many(['a', 'b', 'c', 'b'], calculate)
+        leader.join(5)
+        
+        assert results == {'a': 1.0, 'b': 2.0, 'c': 2.0}
+        assert batch_calls == [['b', 'c']]
+        assert flight.get_stats()['calculations_saved'] == 1
+    
+    def test_do_async_coalesces_coroutines(self):
+        """Coroutines on one event loop share a calculation without blocking it."""
+        flight = SingleFlight()
+        calls = []
+        
+        async def calculate():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 7.0
+        
+        async def main():
+            return await asyncio.gather(*(flight.do_async('email-1', calculate) for _ in range(3)))
+        
+        assert asyncio.run(main()) == [7.0, 7.0, 7.0]
+        assert len(calls) == 1
+        assert flight.get_stats()['calculations_saved'] == 2
+    
+    def test_engine_coalesces_concurrent_misses(self):
+        """Concurrent get_current_score misses on one email calculate its score once."""
+        config = TestingScoringConfig()
+        strategy = Mock()
+        release = threading.Event()
+        
+        def slow_base_score(email):
+            release.wait(5)
+            return 40.0
+        
+        strategy.calculate_base_score.side_effect = slow_base_score
+        strategy.calculate_temporal_multiplier.return_value = 1.0
+        strategy.calculate_context_boost.return_value = 0.0
+        engine = EmailScoringEngine(strategy, InMemoryCacheProvider(), config)
+        
+        email = Mock(spec=Email)
+        email.id = 'email-1'
+        email.category = 'primary'
+        email.user_id = 'user-1'
+        email.labels = []
+        email.is_read = False
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(engine.get_current_score(email))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        assert results == [40.0] * 5
+        assert strategy.calculate_base_score.call_count == 1
+        stats = engine.get_performance_stats()
+        assert stats['single_flight']['calculations_saved'] == 4
+        assert stats['calculations_performed'] == 1
+
+
+class TestStaleWhileRevalidate:
+    """Test soft/hard TTLs in the cache providers and background refresh in the engine."""
+    
+    @pytest.fixture
+    def clock(self):
+        now = [1_700_000_000.5]
+        with patch('app.scoring.cache_providers.time.time', lambda: now[0]):
+            yield now
+    
+    def test_memory_entry_goes_stale_before_expiring(self, clock):
+        """Between the soft and hard TTL an entry is returned and flagged stale."""
+        cache = InMemoryCacheProvider()
+        cache.set_many({'a': 1.0}, 100, soft_ttl=60)
+        assert cache.get_many_with_staleness(['a']) == {'a': (1.0, False)}
+        
+        clock[0] += 70
+        assert cache.get_many_with_staleness(['a']) == {'a': (1.0, True)}
+        assert cache.get('a') == 1.0
+        
+        clock[0] += 40
+        assert cache.get_many_with_staleness(['a']) == {}
+    
+    def test_redis_stores_stale_time_with_score(self, clock):
+        """Redis entries carry their soft expiry; plain scores are never stale."""
+        redis_client = MagicMock()
+        pipe = redis_client.pipeline.return_value
+        cache = RedisCacheProvider(redis_client)
+        
+        cache.set_many({'a': 42.5}, 100, soft_ttl=60)
+        pipe.setex.assert_called_once_with('email_score:a', 100, f"42.5|{clock[0] + 60:.3f}")
+        
+        redis_client.mget.return_value = [f"42.5|{clock[0] - 1:.3f}".encode(), b'10.0']
+        assert cache.get_many_with_staleness(['a', 'b']) == {'a': (42.5, True), 'b': (10.0, False)}
+        assert cache.get_many(['a', 'b']) == {'a': 42.5, 'b': 10.0}
+    
+    def test_multi_tier_does_not_promote_stale_entries(self, clock):
+        """Stale Redis hits stay in Redis so the refreshed value is read next time."""
+        redis_client = MagicMock()
+        redis_client.mget.return_value = [f"1.0|{clock[0] - 1:.3f}".encode(), f"2.0|{clock[0] + 60:.3f}".encode()]
+        cache = MultiTierCacheProvider(redis_client)
+        
+        assert cache.get_many_with_staleness(['stale', 'fresh']) == {'stale': (1.0, True), 'fresh': (2.0, False)}
+        assert cache.memory_cache.get('stale') is None
+        
+        clock[0] += 61
+        assert cache.memory_cache.get_many_with_staleness(['fresh']) == {'fresh': (2.0, True)}
+    
+    def test_shared_memory_staleness(self, clock, tmp_path):
+        """The shared table keeps the soft expiry next to the hard one."""
+        cache = SharedMemoryCacheProvider(path=str(tmp_path / "scores.cache"), max_entries=100)
+        cache.set_many({'a': 1.0}, 100, soft_ttl=60)
+        
+        clock[0] += 70
+        assert cache.get_many_with_staleness(['a']) == {'a': (1.0, True)}
+        cache.close()
+    
+    def test_engine_serves_stale_score_and_refreshes_in_background(self, clock):
+        """A stale hit returns the cached score at once; the refresh rewrites it."""
+        config = TestingScoringConfig()
+        config.STALE_WHILE_REVALIDATE = True
+        strategy = Mock()
+        strategy.calculate_base_score.return_value = 40.0
+        strategy.calculate_temporal_multiplier.return_value = 1.0
+        strategy.calculate_context_boost.return_value = 0.0
+        engine = EmailScoringEngine(strategy, InMemoryCacheProvider(), config)
+        
+        email = Mock(spec=Email)
+        email.id = 'email-1'
+        email.category = 'promotions'
+        email.labels = []
+        email.is_read = False
+        current_time = datetime(2024, 1, 8, 12, 0, 0)
+        
+        assert engine.get_current_score(email, current_time) == 40.0
+        
+        ttl = config.get_cache_ttl('promotions')
+        clock[0] += ttl * config.CACHE_SOFT_TTL_RATIO + 1
+        strategy.calculate_base_score.return_value = 20.0
+        
+        assert engine.get_current_score(email, current_time) == 40.0  # Stale, served immediately
+        engine._refresh_executor.shutdown(wait=True)
+        
+        assert engine.peek_cached_score(email, current_time) == 20.0
+        stats = engine.get_performance_stats()['stale_while_revalidate']
+        assert stats['stale_hits'] == 1
+        assert stats['background_refreshes'] == 1
+        assert stats['refresh_queue'] == 0
+
+
+class TestScoringPerformanceMonitor:
+    """Test latency histograms, concurrent recording and Prometheus export."""
+    
+    def test_histogram_quantiles_within_bucket_error(self):
+        """Quantiles land within the histogram's ~3% relative error."""
+        histogram = LatencyHistogram()
+        for value in range(1, 1001):
+            histogram.record(float(value))
+        
+        snapshot = histogram.snapshot()
+        assert snapshot.count == 1000
+        assert snapshot.mean == pytest.approx(500.5)
+        assert snapshot.max == 1000.0
+        for q, expected in ((0.5, 500), (0.95, 950), (0.99, 990)):
+            assert snapshot.quantile(q) == pytest.approx(expected, rel=0.03)
+    
+    def test_values_above_max_are_clamped(self):
+        """Out-of-range values count in the top bucket; the exact max is kept."""
+        histogram = LatencyHistogram(max_value=100.0)
+        histogram.record(5000.0)
+        
+        snapshot = histogram.snapshot()
+        assert snapshot.count == 1
+        assert snapshot.max == 5000.0
+        assert snapshot.quantile(0.99) <= 5000.0
+    
+    def test_concurrent_recording_loses_no_updates(self):
+        """Counts stay exact when many threads record at once."""
+        monitor = ScoringPerformanceMonitor()
+        
+        def work():
+            for _ in range(1000):
+                monitor.record_calculation_time(1.0, 'work')
+                monitor.record_cache_hit('k')
+        
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        summary = monitor.get_metrics_summary()
+        assert summary['calculation_latency_ms']['work']['count'] == 8000
+        assert summary['cache']['hits'] == 8000
+    
+    def test_threads_spread_across_stripes(self):
+        """Each thread gets its own stripe instead of all hashing to stripe 0."""
+        indexes = []
+        
+        def work():
+            indexes.append((_stripe_index(8), _stripe_index(8)))
+        
+        for _ in range(8):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+        
+        assert all(first == second for first, second in indexes)
+        assert len({first for first, _ in indexes}) == 8
+    
+    def test_render_prometheus(self):
+        """Latencies are exported in seconds with category and quantile labels."""
+        monitor = ScoringPerformanceMonitor()
+        monitor.record_calculation_time(10.0, 'promo"tions')
+        monitor.record_cache_miss('k')
+        monitor.record_batch(50, 20.0)
+        
+        text = monitor.render_prometheus()
+        assert "# TYPE email_scoring_calculation_duration_seconds summary" in text
+        assert 'email_scoring_calculation_duration_seconds{category="promo\\"tions",quantile="0.99"} 0.01' in text
+        assert 'email_scoring_calculation_duration_seconds_count{category="promo\\"tions"} 1' in text
+        assert "email_scoring_cache_misses_total 1" in text
+        assert "email_scoring_batch_size_count 1" in text
+        assert text.endswith("\n")
+    
+    def test_engine_reports_latency_percentiles(self):
+        """Engines built by the factory expose histogram summaries in their stats."""
+        engine = ScoringEngineFactory.create_engine(TestingScoringConfig(), strategy_type="simple", cache_type="memory")
+        email = Mock(spec=Email)
+        email.id = 'email-1'
+        email.category = 'primary'
+        email.labels = []
+        email.is_read = False
+        email.received_at = datetime(2024, 1, 8, 10, 0, 0)
+        email.subject = 'Hello'
+        email.from_email = 'a@example.com'
+        
+        engine.get_scores_batch([email], datetime(2024, 1, 8, 12, 0, 0))
+        
+        latency = engine.get_performance_stats()['latency']
+        assert latency['batch_size']['count'] == 1
+        assert latency['cache']['misses'] == 1
+        
+        engine.reset_performance_stats()
+        assert engine.get_performance_stats()['latency']['batch_size']['count'] == 0
+
+
+class TestMetricsAggregation:
+    """Test publishing per-worker metrics to the shared segment and merging them."""
+    
+    @pytest.fixture
+    def segment(self, tmp_path):
+        return SharedMetricsSegment(path=str(tmp_path / "metrics"), stale_after_seconds=60)
+    
+    def _worker_state(self, latencies, hits, misses):
+        monitor = ScoringPerformanceMonitor()
+        for latency in latencies:
+            monitor.record_calculation_time(latency, 'primary')
+        for _ in range(hits):
+            monitor.record_cache_hit('k')
+        return {
+            'counters': {'cache_hits': hits, 'cache_misses': misses, 'calculations': len(latencies),
+                         'calculation_time_ms': float(sum(latencies))},
+            'monitor': monitor.export_state()
+        }
+    
+    def test_merges_counters_and_histograms_across_workers(self, segment):
+        """Fleet hit rate and percentiles cover every live worker."""
+        segment.publish(self._worker_state([1.0] * 90, hits=90, misses=10), pid=os.getpid())
+        segment.publish(self._worker_state([100.0] * 10, hits=0, misses=100), pid=os.getppid())
+        
+        fleet = merge_worker_states(segment.collect())
+        
+        assert fleet['workers'] == 2
+        assert fleet['cache_hit_rate_percent'] == 45.0
+        assert fleet['calculations_performed'] == 100
+        latency = fleet['latency']['calculation_latency_ms']['primary']
+        assert latency['count'] == 100
+        assert latency['p50'] == pytest.approx(1.0, rel=0.03)
+        assert latency['p95'] == pytest.approx(100.0, rel=0.03)
+        assert 'email_scoring_cache_hits_total 90' in fleet['monitor'].render_prometheus()
+    
+    def test_ignores_dead_and_stale_workers(self, segment):
+        """Snapshots of exited processes are retired; silent workers are skipped."""
+        segment.publish(self._worker_state([1.0], hits=1, misses=0), pid=2 ** 22 + 12345)
+        segment.publish(self._worker_state([1.0], hits=1, misses=0), pid=os.getpid())
+        
+        with patch('app.scoring.metrics_segment.time.time', return_value=time.time() + 120):
+            assert [payload['pid'] for payload in segment.collect()] == [None]
+        assert [payload['pid'] for payload in segment.collect()] == [os.getpid(), None]
+        assert not os.path.exists(segment._worker_file(2 ** 22 + 12345))
+        
+        segment.remove()
+        assert [payload.get('retired') for payload in segment.collect()] == [True]
+    
+    def test_exited_workers_totals_are_kept(self, segment):
+        """Fleet counters never go backwards when a worker exits."""
+        segment.publish(self._worker_state([1.0] * 3, hits=3, misses=1), pid=2 ** 22 + 12345)
+        segment.publish(self._worker_state([1.0] * 2, hits=2, misses=0), pid=2 ** 22 + 12346)
+        segment.publish(self._worker_state([1.0], hits=1, misses=0), pid=os.getpid())
+        
+        fleet = merge_worker_states(segment.collect())
+        assert fleet['workers'] == 1
+        assert fleet['retired_workers'] == 2
+        assert fleet['cache_hits'] == 6
+        assert fleet['latency']['calculation_latency_ms']['primary']['count'] == 6
+        
+        segment.retire()
+        fleet = merge_worker_states(segment.collect())
+        assert fleet['workers'] == 0
+        assert fleet['retired_workers'] == 3
+        assert fleet['cache_hits'] == 6
+        assert 'email_scoring_cache_hits_total 6' in fleet['monitor'].render_prometheus()
+    
+    def test_engine_export_is_mergeable(self, segment):
+        """Engine state round-trips through the segment into fleet stats."""
+        engine = ScoringEngineFactory.create_engine(TestingScoringConfig(), strategy_type="simple", cache_type="memory")
+        engine._record_cache_hit('a')
+        engine._record_cache_miss('b')
+        engine._record_calculation_time(4.0, 'primary')
+        
+        segment.publish(engine.export_metrics_state())
+        fleet = merge_worker_states(segment.collect())
+        
+        assert fleet['cache_hits'] == 1
+        assert fleet['cache_misses'] == 1
+        assert fleet['avg_calculation_time_ms'] == 4.0
+        assert fleet['latency']['cache']['hit_rate_percent'] == 50.0
+
+
+class TestSqlFreshScore:
+    """Test the SQL expression for live scores."""
+    
+    def test_fresh_score_sql_compiles_for_postgres(self):
+        """Enhanced strategy scores should translate to a Postgres expression."""
+        config = TestingScoringConfig()
+        engine = EmailScoringEngine(EnhancedScoringStrategy(config), NullCacheProvider(), config)
+        expression = engine.fresh_score_sql(datetime(2024, 1, 9, 10, 0, 0))
+        sql = str(expression.compile(dialect=postgresql.dialect())).lower()
+        
+        assert 'emails.attention_base_score is null' in sql
+        assert 'greatest' in sql and 'least' in sql
+        assert 'power' in sql
+        assert 'extract(epoch' in sql
+    
+    def test_fresh_score_sql_unsupported_strategy(self):
+        """Strategies without a SQL form should opt out."""
+        config = TestingScoringConfig()
+        engine = EmailScoringEngine(SimpleScoringStrategy(config), NullCacheProvider(), config)
+        
+        assert engine.fresh_score_sql() is None
+
+
+class TestBucketCrossingPredictor:
+    """Test prediction of the next flow bucket change."""
+    
+    @pytest.fixture
+    def engine(self):
+        config = TestingScoringConfig()
+        return EmailScoringEngine(EnhancedScoringStrategy(config), NullCacheProvider(), config)
+    
+    @pytest.fixture
+    def predictor(self, engine):
+        return BucketCrossingPredictor(engine)
+    
+    def _make_email(self, email_id, category, labels, received_at):
+        email = Mock(spec=Email)
+        email.id = email_id
+        email.gmail_id = f'{email_id}_gmail'
+        email.category = category
+        email.is_read = False
+        email.labels = labels
+        email.from_email = 'boss@github.com'
+        email.subject = 'Quarterly planning'
+        email.received_at = received_at
+        return email
+    
+    def test_predicted_time_is_first_bucket_change(self, engine, predictor):
+        """The bucket should be unchanged just before the predicted time and changed at it."""
+        current_time = datetime(2024, 1, 9, 20, 30, 0)  # Tuesday evening, no context boosts
+        email = self._make_email('crossing-email', 'promotions', ['IMPORTANT', 'STARRED'], current_time)
+        
+        score, change_at, _ = predictor.predict([email], current_time)['crossing-email']
+        
+        assert score == engine.get_current_score(email, current_time)
+        assert change_at > current_time
+        
+        before = engine.get_current_score(email, change_at - timedelta(seconds=2))
+        after = engine.get_current_score(email, change_at)
+        assert predictor.bucket_index(before) == predictor.bucket_index(score)
+        assert predictor.bucket_index(after) != predictor.bucket_index(score)
+    
+    def test_stable_email_is_rechecked_at_horizon(self, engine, predictor):
+        """Emails that never change bucket get the horizon as refresh time."""
+        current_time = datetime(2024, 1, 9, 20, 30, 0)
+        email = self._make_email('stable-email', 'trash', [], current_time)
+        
+        _, change_at, _ = predictor.predict([email], current_time)['stable-email']
+        
+        assert change_at == current_time + timedelta(hours=engine.config.BUCKET_REFRESH_HORIZON_HOURS)
+
+
 class TestScoringEngineFactory:
     """Test the scoring engine factory."""
     
@@ -565,6 +1555,163 @@ class TestEmailScoringDebugger:
         assert report['summary']['total_emails'] == 5
 
 
+class TestStreamingScoreAnalysis:
+    """Test mergeable score sketches and single-pass streaming analysis."""
+    
+    def test_small_sketch_is_exact(self):
+        """Below the exact limit, statistics match the exact computations."""
+        scores = [12.5, 40.0, 55.3, 61.0, 99.9, 100.0, 3.2]
+        sketch = ScoreSketch()
+        sketch.add(scores[:3])
+        sketch.add(scores[3:])
+        
+        assert sketch.exact
+        assert sketch.quantile(0.9) == pytest.approx(float(np.percentile(scores, 90)))
+        assert sketch.std_dev == pytest.approx(np.std(scores, ddof=1))
+        assert sketch.range_counts() == {'0-20': 2, '20-40': 0, '40-60': 2, '60-80': 1, '80-100': 2}
+    
+    def test_large_sketch_stays_within_a_bin(self):
+        """Folded histograms keep percentiles within the bin width and moments exact."""
+        rng = np.random.default_rng(7)
+        scores = np.round(rng.uniform(0, 100, 50_000), 1)
+        left, right = ScoreSketch(), ScoreSketch()
+        for chunk in np.array_split(scores[:25_000], 10):
+            left.add(chunk)
+        right.add(scores[25_000:])
+        left.merge(right)
+        
+        assert not left.exact
+        assert left.count == 50_000
+        assert left.mean == pytest.approx(scores.mean())
+        assert left.std_dev == pytest.approx(scores.std(ddof=1))
+        for q in (0.25, 0.5, 0.99):
+            assert abs(left.quantile(q) - np.percentile(scores, q * 100)) <= ScoreSketch.BIN_WIDTH
+        assert sum(left.range_counts().values()) == 50_000
+    
+    def test_stream_finds_anomalies_across_chunks(self):
+        """Outliers are found with bounded retention while scoring chunk by chunk."""
+        engine = Mock()
+        engine.config = TestingScoringConfig()
+        engine.logger = Mock()
+        debugger = EmailScoringDebugger(engine)
+        debugger.debug_score_calculation = Mock(return_value=None)
+        
+        def make_email(i, score):
+            return SimpleNamespace(id=f'e{i}', gmail_id=f'g{i}', category='primary', subject='s', from_email='a@b.com',
+                                   is_read=False, received_at=None, score=score)
+        
+        chunks = [[make_email(c * 100 + i, 40.0 + (i % 5)) for i in range(100)] for c in range(20)]
+        chunks[7][3].score = 99.0
+        chunks[15][50].score = 1.0
+        engine.calculate_base_scores.side_effect = lambda emails: [e.score for e in emails]
+        engine.apply_dynamic_components_batch.side_effect = lambda emails, bases, current_time: bases
+        
+        result = debugger.analyze_score_stream(chunks, max_anomalies=5)
+        
+        assert result['total_emails'] == 2000
+        assert result['distribution']['primary'].count == 2000
+        assert [a['email_id'] for a in result['anomalies']] == ['e703', 'e1550']
+        assert result['anomaly_count'] == 2
+
+
+class TestStrategyComparison:
+    """Test the mailbox-wide strategy comparison harness and shadow scoring."""
+    
+    @pytest.fixture
+    def rows(self):
+        received_at = datetime(2024, 1, 8, 9, 0, 0)
+        subjects = ['Urgent: reply today', 'Weekly newsletter', '50% off sale', 'Lunch?']
+        categories = ['important', 'newsletters', 'promotions', 'primary']
+        return [
+            {'id': f'email-{i}', 'user_id': 'user-1', 'subject': subjects[i % 4], 'from_email': f'sender{i % 7}@company.com',
+             'received_at': received_at - timedelta(hours=i), 'labels': ['INBOX'], 'is_read': bool(i % 3),
+             'category': categories[i % 4], 'attention_score': 0.0}
+            for i in range(60)
+        ]
+    
+    def test_agreement_stats_confusion_matrix(self):
+        """Bucket changes land in the right cell and failed scores are skipped."""
+        config = TestingScoringConfig()
+        stats = AgreementStats()
+        stats.add([70.0, 45.0, 10.0, 65.0], [75.0, 20.0, 12.0, float('nan')], config)
+        
+        summary = stats.summary()
+        assert summary['emails'] == 3
+        assert summary['bucket_changes'] == 1
+        assert summary['confusion']['later']['reference'] == 1
+        assert summary['score_difference']['max'] == pytest.approx(25.0)
+    
+    def test_comparison_run_aggregates_all_strategies(self, rows):
+        """Every strategy scores every email; the baseline agrees with its own scores."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        def thread_pool(max_workers, mp_context, initializer, initargs):
+            return ThreadPoolExecutor(max_workers=1, initializer=initializer, initargs=initargs)
+        
+        config = TestingScoringConfig()
+        harness = StrategyComparison(config, strategy_types=['enhanced', 'simple', 'category'], workers=2,
+                                     latency_samples_per_chunk=5)
+        chunks = [rows[:25], rows[25:50], rows[50:]]
+        with patch.object(comparison, 'ProcessPoolExecutor', thread_pool):
+            report = harness.run(chunks, current_time=datetime(2024, 1, 8, 12, 0, 0))
+        
+        assert report['emails'] == 60
+        assert report['chunks'] == 3
+        assert set(report['agreement']) == {'simple', 'category'}
+        for name, summary in report['strategies'].items():
+            assert summary['emails'] == 60
+            assert summary['failed'] == 0
+            assert summary['single_email_latency_ms']['count'] == 15
+            assert sum(summary['buckets'].values()) == 60
+        
+        engine = ScoringEngineFactory.create_engine(config, strategy_type="simple", cache_type="null")
+        expected = [engine.calculate_fresh_score(SimpleNamespace(**row), datetime(2024, 1, 8, 12, 0, 0)) for row in rows]
+        assert report['strategies']['simple']['scores']['mean'] == pytest.approx(np.mean(expected), abs=0.01)
+    
+    def test_compare_for_user_streams_limited_pages(self, rows):
+        """The offline comparison reads pages through the session factory and stops at the limit."""
+        from app.services.enhanced_attention_scoring import compare_strategies_for_user
+        
+        session_factory = Mock()
+        pages = [rows[:25], rows[25:50], rows[50:]]
+        harness = Mock()
+        harness.run.side_effect = lambda chunks, progress_callback=None: [len(chunk) for chunk in chunks]
+        
+        with patch('app.services.score_rescoring.stream_user_emails', return_value=iter(pages)) as mock_stream, \
+             patch('app.services.enhanced_attention_scoring.StrategyComparison', return_value=harness):
+            report = compare_strategies_for_user(session_factory, 'user-1', limit=30, workers=2)
+        
+        assert report == [25, 5]
+        assert mock_stream.call_args.args[0] is session_factory
+    
+    def test_shadow_scorer_samples_served_scores(self, rows):
+        """Sampled requests are re-scored off the request path and compared with served scores."""
+        config = TestingScoringConfig(SHADOW_STRATEGY='simple', SHADOW_SAMPLE_RATE=1.0)
+        engine = ScoringEngineFactory.create_engine(config, strategy_type="enhanced", cache_type="memory")
+        emails = [SimpleNamespace(**row) for row in rows]
+        
+        engine.get_scores_batch(emails, current_time=datetime(2024, 1, 8, 12, 0, 0))
+        assert engine.shadow_scorer.drain()
+        
+        shadow = engine.get_performance_stats()['shadow']
+        assert shadow['candidate'] == 'simple'
+        assert shadow['sampled'] == 60
+        assert shadow['agreement']['emails'] == 60
+        assert shadow['candidate_latency_ms']['count'] == 60
+    
+    def test_shadow_scorer_drops_when_backlogged(self):
+        """A full queue drops samples instead of blocking the request."""
+        config = TestingScoringConfig()
+        scorer = comparison.ShadowScorer(Mock(), config, sample_rate=1.0, max_pending=1, name='simple')
+        scorer._ensure_thread = Mock()  # Keep the queue from being consumed
+        emails = [SimpleNamespace(id=f'e{i}') for i in range(3)]
+        scores = {f'e{i}': 50.0 for i in range(3)}
+        
+        assert scorer.submit(emails, scores, datetime(2024, 1, 8)) == 3
+        assert scorer.submit(emails, scores, datetime(2024, 1, 8)) == 0
+        assert scorer.get_stats()['dropped'] == 3
+
+
 class TestIntegrationScenarios:
     """Integration tests for complete scoring scenarios."""
     
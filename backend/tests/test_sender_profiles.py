@@ -0,0 +1,281 @@
+"""
+Tests for Sender Profiles
+
+This module tests incremental sender profile updates, the profile LRU,
+history-based scoring and its cache keys, normalized sender columns, and the
+trash accounting and top-contacts grouping of the endpoints.
+"""
+
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import Mock, patch, MagicMock
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+from app.main import app
+from app.db import get_db
+from app.dependencies import get_current_user
+from app.models.email import Email
+from app.scoring.config import ScoringConfig, TestingScoringConfig
+from app.scoring.cache_providers import NullCacheProvider
+from app.scoring.engine import EmailScoringEngine
+from app.scoring.strategies import EnhancedScoringStrategy
+from app.services.sender_profiles import SenderProfileCache, SenderProfileUpdates, SenderStats, upsert_statement
+from app.services.sender_backfill import _build_update as build_sender_backfill_update
+from app.utils.email_utils import email_sender, normalize_sender
+
+
+class TestSenderProfiles:
+    """Test incremental sender profile updates, the profile LRU and history-based scoring."""
+    
+    USER_ID = '6f1c2a9e-0d4b-4c7e-9a51-3b8e2f7d1c40'
+    
+    def make_email(self, **overrides):
+        values = {'user_id': self.USER_ID, 'thread_id': 't1', 'from_email': 'Boss <Boss@Company.com>',
+                  'labels': ['INBOX', 'UNREAD'], 'is_read': False, 'category': 'primary',
+                  'received_at': datetime(2024, 1, 8, 9, 0, 0), 'subject': 'Status', 'id': 'e1', 'gmail_id': 'g1'}
+        values.update(overrides)
+        return SimpleNamespace(**values)
+    
+    def test_normalize_sender(self):
+        """Display names are dropped and addresses lowercased."""
+        assert normalize_sender('Boss <Boss@Company.com>') == ('boss@company.com', 'company.com')
+        assert normalize_sender('alerts@Bank.example') == ('alerts@bank.example', 'bank.example')
+        assert normalize_sender(None) == ('', '')
+    
+    def test_updates_collect_deltas_for_address_and_domain(self):
+        """Ingest and label transitions accumulate into one upsert row per profile."""
+        updates = SenderProfileUpdates()
+        email = self.make_email()
+        updates.email_received(email)
+        updates.labels_changed(email, ['INBOX', 'UNREAD'], ['TRASH', 'IMPORTANT'])
+        
+        rows = {(row['kind'], row['sender_key']): row for row in updates._rows()}
+        assert set(rows) == {('address', 'boss@company.com'), ('domain', 'company.com')}
+        row = rows[('address', 'boss@company.com')]
+        assert (row['email_count'], row['read_count'], row['trashed_count'], row['important_count']) == (1, 1, 1, 1)
+        
+        sql = str(upsert_statement(updates._rows()).compile(dialect=postgresql.dialect()))
+        assert 'ON CONFLICT ON CONSTRAINT uq_sender_profiles_user_kind_key DO UPDATE' in sql
+        assert 'greatest(' in sql
+    
+    def test_sent_mail_credits_latest_earlier_sender_in_thread(self):
+        """A reply is attributed to whoever wrote the message being answered."""
+        updates = SenderProfileUpdates()
+        updates.email_received(self.make_email(from_email='me@home.example', labels=['SENT'],
+                                               received_at=datetime(2024, 1, 8, 12, 0, 0)))
+        db = MagicMock()
+        db.execute.return_value = [
+            ('t1', 'Boss <boss@company.com>', datetime(2024, 1, 8, 9, 0, 0), ['INBOX']),
+            ('t1', 'Colleague <cc@company.com>', datetime(2024, 1, 8, 13, 0, 0), ['INBOX']),
+            ('t1', 'me@home.example', datetime(2024, 1, 8, 12, 0, 0), ['SENT'])
+        ]
+        
+        updates._resolve_replies(db)
+        
+        rows = {(row['kind'], row['sender_key']): row for row in updates._rows()}
+        assert rows[('address', 'boss@company.com')]['replied_count'] == 1
+        assert ('address', 'cc@company.com') not in rows
+        assert ('address', 'me@home.example') not in rows
+    
+    def test_cache_loads_misses_once_and_falls_back_to_domain(self):
+        """One load per batch of misses; sparse address history defers to the domain profile."""
+        loader = Mock(return_value={
+            ('address', 'boss@company.com'): SenderStats(email_count=2, read_count=2),
+            ('domain', 'company.com'): SenderStats(email_count=40, read_count=10, trashed_count=20)
+        })
+        cache = SenderProfileCache(loader=loader, min_emails=5)
+        
+        first = cache.get_many(self.USER_ID, ['Boss <boss@company.com>', 'new@elsewhere.example'])
+        second = cache.get(self.USER_ID, 'Boss <boss@company.com>')
+        
+        assert loader.call_count == 1
+        assert first['Boss <boss@company.com>'].trash_rate == pytest.approx(0.5)
+        assert first['new@elsewhere.example'] is None
+        assert second == first['Boss <boss@company.com>']
+        
+        cache.invalidate([(self.USER_ID, 'domain', 'company.com')])
+        cache.get(self.USER_ID, 'Boss <boss@company.com>')
+        assert loader.call_count == 2
+    
+    def test_cache_evicts_least_recently_used(self):
+        """The LRU stays within max_entries."""
+        cache = SenderProfileCache(loader=Mock(return_value={}), max_entries=4)
+        for i in range(5):
+            cache.get(self.USER_ID, f'user{i}@domain{i}.example')
+        assert cache.get_stats()['entries'] == 4
+    
+    def test_history_adjusts_base_score_in_both_paths(self):
+        """Sender history shifts the base score identically per email and in the columnar path."""
+        config = TestingScoringConfig(VECTORIZED_BATCH_MIN_SIZE=1)
+        strategy = EnhancedScoringStrategy(config)
+        emails = [self.make_email(id=f'e{i}', from_email=sender)
+                  for i, sender in enumerate(['Boss <boss@company.com>', 'deals@shop.example', 'x@y.example'])]
+        plain = [strategy.calculate_base_score(email) for email in emails]
+        
+        provider = Mock()
+        histories = {
+            'Boss <boss@company.com>': SenderStats(email_count=10, read_count=10, replied_count=5),
+            'deals@shop.example': SenderStats(email_count=10, trashed_count=10),
+            'x@y.example': None
+        }
+        provider.get.side_effect = lambda user_id, from_email: histories[from_email]
+        provider.get_many.side_effect = lambda user_id, senders: {sender: histories[sender] for sender in senders}
+        strategy.sender_profiles = provider
+        
+        single = [strategy.calculate_base_score(email) for email in emails]
+        batch = strategy.calculate_base_scores_array(emails)
+        
+        assert single[0] - plain[0] == pytest.approx(config.SENDER_OPEN_RATE_WEIGHT + 0.5 * config.SENDER_REPLY_RATE_BOOST)
+        assert single[1] - plain[1] == pytest.approx(-config.SENDER_OPEN_RATE_WEIGHT - config.SENDER_TRASH_RATE_PENALTY)
+        assert single[2] == plain[2]
+        assert batch.tolist() == pytest.approx(single)
+        assert provider.get_many.call_count == 1
+    
+    def test_trash_by_category_and_label_counts_once(self):
+        """Moving to trash by category, then receiving the TRASH label, is one trashed email."""
+        updates = SenderProfileUpdates()
+        email = self.make_email(category='trash')
+        updates.trashed(email)
+        updates.labels_changed(email, ['INBOX', 'UNREAD'], ['TRASH', 'UNREAD'])
+        
+        email = self.make_email(id='e2', labels=['TRASH'])
+        updates.trashed(email)
+        
+        rows = {(row['kind'], row['sender_key']): row for row in updates._rows()}
+        assert rows[('address', 'boss@company.com')]['trashed_count'] == 1
+    
+    def test_category_restore_with_label_removal_counts_once(self):
+        """Restoring a trashed email that also loses its TRASH label undoes one trashed email."""
+        updates = SenderProfileUpdates()
+        email = self.make_email(category='primary', labels=['INBOX'])
+        updates.labels_changed(email, ['TRASH'], ['INBOX'], old_category='trash')
+        
+        rows = {(row['kind'], row['sender_key']): row for row in updates._rows()}
+        assert rows[('address', 'boss@company.com')]['trashed_count'] == -1
+    
+    def test_sender_profile_features_are_opt_in(self):
+        """Profiles are read only when enabled, so default scoring opens no extra sessions."""
+        assert ScoringConfig().SENDER_PROFILE_FEATURES is False
+    
+    def test_base_cache_key_follows_sender_history(self):
+        """A profile change moves the base score to a new cache key; no profiles, no version."""
+        config = TestingScoringConfig(CACHE_MODE='components')
+        engine = EmailScoringEngine(EnhancedScoringStrategy(config), NullCacheProvider(), config)
+        email = self.make_email()
+        plain_key = engine._base_cache_key(email)
+        
+        provider = Mock()
+        provider.get_many.return_value = {email.from_email: SenderStats(email_count=10, read_count=4)}
+        engine.scoring_strategy.sender_profiles = provider
+        first_key = engine._base_cache_key(email)
+        provider.get_many.return_value = {email.from_email: SenderStats(email_count=11, read_count=4, trashed_count=1)}
+        second_key = engine._base_cache_key(email)
+        
+        assert ':h' not in plain_key
+        assert first_key.startswith(plain_key) and first_key.endswith(':h10.4.0.0')
+        assert second_key != first_key
+        assert engine._base_cache_keys([email], ['']) == [second_key]
+    
+    def test_email_keeps_normalized_sender_columns_in_sync(self):
+        """Assigning from_email fills sender_email/sender_domain, which email_sender prefers."""
+        email = Email(from_email='Boss <Boss@Company.com>')
+        assert (email.sender_email, email.sender_domain) == ('boss@company.com', 'company.com')
+        
+        email.from_email = None
+        assert email.sender_email is None and email.sender_domain is None
+        
+        stored = {'from_email': 'garbled', 'sender_email': 'a@b.example', 'sender_domain': 'b.example'}
+        assert email_sender(stored) == ('a@b.example', 'b.example')
+        assert email_sender(SimpleNamespace(from_email='A <a@b.example>')) == ('a@b.example', 'b.example')
+    
+    def test_sender_authority_reads_domain_behind_display_name(self):
+        """A "Name <addr>" header gets the same domain authority as the bare address."""
+        strategy = EnhancedScoringStrategy(TestingScoringConfig())
+        named = self.make_email(from_email='Friend <friend@gmail.com>')
+        bare = self.make_email(from_email='friend@gmail.com')
+        
+        assert strategy._calculate_sender_authority(named) == strategy._calculate_sender_authority(bare)
+        assert strategy._calculate_sender_authority(named) == strategy.config.PERSONAL_DOMAIN_BOOST
+    
+    def test_sender_backfill_update_statement(self):
+        """The backfill writes a whole batch with one UPDATE ... FROM (VALUES)."""
+        statement, params = build_sender_backfill_update([
+            ('00000000-0000-0000-0000-000000000001', 'a@b.example', 'b.example'),
+            ('00000000-0000-0000-0000-000000000002', 'nodomain', None)
+        ])
+        sql = str(statement)
+        assert sql.startswith('UPDATE emails AS e SET sender_email = v.sender_email')
+        assert 'AS v(id, sender_email, sender_domain)' in sql
+        assert params['address_1'] == 'nodomain' and params['domain_1'] is None
+
+
+class TestSenderProfileEndpoints:
+    """Test the sender profile updates recorded by the email endpoints."""
+    
+    USER_ID = '6f1c2a9e-0d4b-4c7e-9a51-3b8e2f7d1c40'
+    EMAIL_ID = '550e8400-e29b-41d4-a716-446655440001'
+    
+    @pytest.fixture
+    def db(self):
+        """Mocked session and user; profile rows are collected instead of upserted."""
+        mock_db = MagicMock()
+        mock_user = Mock()
+        mock_user.id = self.USER_ID
+        app.dependency_overrides[get_db] = lambda: mock_db
+        app.dependency_overrides[get_current_user] = lambda: mock_user
+        
+        mock_db.profile_rows = []
+        
+        def flush(updates, db):
+            mock_db.profile_rows.extend(updates._rows())
+            return 0
+        
+        with patch.object(SenderProfileUpdates, 'flush', autospec=True, side_effect=flush), \
+                patch('app.routers.emails.email_operations_service.create_operation'):
+            yield mock_db
+        
+        app.dependency_overrides.clear()
+    
+    def make_email(self, **overrides):
+        values = {'id': self.EMAIL_ID, 'user_id': self.USER_ID, 'from_email': 'Boss <boss@company.com>',
+                  'subject': 'Status', 'snippet': 'Status', 'labels': ['INBOX'], 'category': 'primary',
+                  'is_read': True, 'thread_id': 't1'}
+        values.update(overrides)
+        return SimpleNamespace(**values)
+    
+    def trashed_counts(self, db):
+        return {row['sender_key']: row['trashed_count'] for row in db.profile_rows}
+    
+    def test_delete_counts_sender_trash(self, db):
+        """Moving an inbox email to trash counts one trashed email for the sender."""
+        db.query.return_value.filter.return_value.first.return_value = self.make_email()
+        
+        response = TestClient(app).delete(f"/emails/{self.EMAIL_ID}")
+        
+        assert response.status_code == 200
+        assert self.trashed_counts(db) == {'boss@company.com': 1, 'company.com': 1}
+    
+    def test_delete_of_email_trashed_by_category_is_not_counted_again(self, db):
+        """An email already in the trash category gains the TRASH label without a second count."""
+        db.query.return_value.filter.return_value.first.return_value = self.make_email(category='trash')
+        
+        response = TestClient(app).delete(f"/emails/{self.EMAIL_ID}")
+        
+        assert response.status_code == 200
+        assert self.trashed_counts(db) == {}
+    
+    def test_top_contacts_are_scoped_to_the_user_and_cover_unbackfilled_rows(self, db):
+        """Top contacts filter on the current user and parse senders whose columns are still NULL."""
+        db.execute.return_value.fetchall.return_value = [SimpleNamespace(sender_email='boss@company.com', email_count=3)]
+        
+        response = TestClient(app).get("/analytics/top-contacts?limit=5")
+        
+        assert response.status_code == 200
+        assert response.json()['top_contacts'] == [{'email': 'boss@company.com', 'count': 3}]
+        statement = db.execute.call_args.args[0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert 'emails.user_id = ' in sql
+        assert 'coalesce(emails.sender_email, lower(trim(coalesce(SUBSTRING(emails.from_email' in sql
+        assert 'sender_email IS NOT NULL' not in sql
+        assert self.USER_ID in statement.compile().params.values()
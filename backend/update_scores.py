@@ -1,71 +1,80 @@
 #!/usr/bin/env python3
 """
-Quick script to update email attention scores using the enhanced scoring system.
-This will apply our new algorithm to existing emails.
+Rescore stored email attention scores with the enhanced scoring system.
+
+Run after a scoring configuration change. Every email of the selected users
+is streamed from the database, scored by a pool of worker processes and
+written back in bulk. Pass --checkpoint to make the run resumable: rerunning
+with the same file skips users that are done and continues the others after
+the last committed email.
+
+Usage:
+    python update_scores.py [--user USER_ID ...] [--workers N] [--batch-size N]
+                            [--per-user-parallelism N] [--checkpoint PATH]
 """
 
-import sys
+import argparse
+import logging
 import os
+import sys
 sys.path.append('.')
 
-from app.db import get_db
-from app.models.email import Email
-from app.services.enhanced_attention_scoring import (
-    update_email_attention_scores,
-    get_scoring_performance_stats
-)
+from app.db import SessionLocal
+from app.services.score_rescoring import RescoreProgress, rescore_all_emails
+
+
+def print_progress(progress: RescoreProgress) -> None:
+    print(
+        f"   • users {progress.users_done}/{progress.users_total} | "
+        f"{progress.emails_scored} scored, {progress.emails_updated} updated, {progress.errors} errors | "
+        f"{progress.emails_per_second:.0f} emails/sec",
+        flush=True
+    )
 
-def main():
-    print("🚀 Updating email attention scores with enhanced algorithm...")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rescore email attention scores")
+    parser.add_argument("--user", action="append", dest="users", help="User ID to rescore (repeatable; default: all users)")
+    parser.add_argument("--workers", type=int, help="Scoring processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, help="Emails per scoring task and bulk UPDATE")
+    parser.add_argument("--per-user-parallelism", type=int, help="Max batches of one user in flight at once")
+    parser.add_argument("--checkpoint", help="JSON checkpoint file to resume from and record progress in")
+    parser.add_argument("--restart", action="store_true", help="Ignore and overwrite an existing checkpoint")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    
+    if args.restart and args.checkpoint and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
     
-    # Get database session
-    db = next(get_db())
+    print("🚀 Rescoring email attention scores with enhanced algorithm...")
     
     try:
-        # Get a sample of emails to update
-        emails = db.query(Email).limit(100).all()
-        
-        if not emails:
-            print("❌ No emails found in database")
-            return
-        
-        print(f"📧 Found {len(emails)} emails to update")
-        
-        # Update scores using enhanced scoring
-        result = update_email_attention_scores(emails, force_update=True)
-        
-        print(f"✅ Update complete:")
-        print(f"   • Total emails: {result['total_emails']}")
-        print(f"   • Updated: {result['updated_count']}")
-        print(f"   • Errors: {result['error_count']}")
-        print(f"   • Success rate: {result['success_rate']}%")
-        print(f"   • Time: {result['total_time_seconds']:.2f}s")
-        print(f"   • Speed: {result['emails_per_second']:.1f} emails/sec")
-        
-        # Commit the changes
-        db.commit()
-        print("💾 Changes committed to database")
-        
-        # Show performance stats
-        stats = get_scoring_performance_stats()
-        print(f"\n📊 Scoring system performance:")
-        print(f"   • Cache hit rate: {stats.get('cache_hit_rate_percent', 0)}%")
-        print(f"   • Calculations performed: {stats.get('calculations_performed', 0)}")
-        
-        # Show some sample scores
-        updated_emails = db.query(Email).limit(10).all()
-        print(f"\n🎯 Sample updated scores:")
-        for email in updated_emails:
-            bucket = "NOW" if email.attention_score >= 60 else "LATER" if email.attention_score >= 30 else "REFERENCE"
-            print(f"   • {email.subject[:40]:<40} | {email.attention_score:5.1f} | {bucket}")
-        
-    except Exception as e:
-        print(f"❌ Error updating scores: {e}")
-        db.rollback()
-        import traceback
-        traceback.print_exc()
-    finally:
-        db.close()
+        result = rescore_all_emails(
+            SessionLocal,
+            user_ids=args.users,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            per_user_parallelism=args.per_user_parallelism,
+            checkpoint_path=args.checkpoint,
+            progress_callback=print_progress,
+            progress_interval_seconds=args.progress_interval
+        )
+    except KeyboardInterrupt:
+        print("\n⏸  Interrupted" + (f" - rerun with --checkpoint {args.checkpoint} to resume" if args.checkpoint else ""))
+        return 130
+    
+    print("✅ Rescoring complete:")
+    print(f"   • Users: {result['users_done']}/{result['users_total']} ({result['users_failed']} failed)")
+    print(f"   • Emails scored: {result['emails_scored']}")
+    print(f"   • Rows updated: {result['emails_updated']} ({result['emails_unchanged']} unchanged, not rewritten)")
+    print(f"   • Errors: {result['errors']}")
+    print(f"   • Time: {result['elapsed_seconds']:.2f}s")
+    print(f"   • Speed: {result['emails_per_second']:.1f} emails/sec")
+    
+    return 1 if result['users_failed'] else 0
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -247,8 +247,8 @@ function CategoriesImprovedPageContent() {
   const handleReprocessEmails = async () => {
     try {
       setReprocessingEmails(true);
-      const result = await reprocessAllEmails();
-      toast.success(`Reprocessing completed! ${result.processed} emails updated.`);
+      await reprocessAllEmails();
+      toast.success('Reprocessing started in the background');
     } catch (err) {
       console.error('Error reprocessing emails:', err);
       toast.error('Failed to reprocess emails');